@@ -4,36 +4,48 @@
 Admin dashboard s pokročilými statistikami a vizualizacemi
 """
 
-from datetime import datetime, timedelta
-from typing import Dict, List, Any
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import copy_context
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Any, Iterable, Optional
 from sqlalchemy import func, desc
-from app.database import SessionLocal
-from app.models import User, TestSession, Badge, UserBadge, Lesson
+from app.database import ReadSessionLocal, primary_preferred
+from app.models import User, TestSession, Badge, UserBadge, Lesson, Attempt, QuestionStat, CategoryStat
+from app.pagination import keyset_page, DEFAULT_PAGE_SIZE
+from app.services.analytics_service import get_trend_buckets
+import hashlib
+import json
 import logging
+import os
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
 class DashboardStats:
-    """Generování statistik pro admin dashboard."""
-    
-    def __init__(self):
-        self.session = SessionLocal()
+    """
+    Generování statistik pro admin dashboard.
+
+    Každá metoda si otevře vlastní session z `session_factory` a po výpočtu ji
+    vrátí do poolu, takže instance nedrží spojení mezi voláními. Výchozí
+    ReadSessionLocal čte z read repliky, pokud je nastavená. Chyby databáze
+    metody nepolykají - DashboardStatsService neúspěšnou sekci necachuje.
+    """
     
-    def __del__(self):
-        if hasattr(self, 'session'):
-            self.session.close()
+    def __init__(self, session_factory=ReadSessionLocal):
+        self.session_factory = session_factory
     
     def get_overview_stats(self) -> Dict[str, Any]:
         """Vrací základní přehledové statistiky."""
-        try:
+        with self.session_factory() as session:
             # Základní čísla
-            total_users = self.session.query(User).count()
-            total_tests = self.session.query(TestSession).filter(TestSession.is_completed == True).count()
-            total_badges_awarded = self.session.query(UserBadge).count()
+            total_users = session.query(User).count()
+            total_tests = session.query(TestSession).filter(TestSession.is_completed == True).count()
+            total_badges_awarded = session.query(UserBadge).count()
             
             # Průměrné skóre za posledních 30 dní
             thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-            recent_sessions = self.session.query(TestSession).filter(
+            recent_sessions = session.query(TestSession).filter(
                 TestSession.is_completed == True,
                 TestSession.completed_at >= thirty_days_ago,
                 TestSession.current_score.isnot(None)
@@ -53,201 +65,97 @@ class DashboardStats:
                 'success_rate_30d': round(success_rate, 1),
                 'tests_this_month': len(recent_sessions)
             }
-            
-        except Exception as e:
-            logger.error(f"❌ Chyba při získávání přehledových statistik: {e}")
-            return {}
     
     def get_question_analytics(self) -> List[Dict[str, Any]]:
-        """Analyzuje výkon jednotlivých otázek."""
-        try:
-            # Získej všechny dokončené test sessions
-            completed_sessions = self.session.query(TestSession).filter(
-                TestSession.is_completed == True,
-                TestSession.answers.isnot(None)
-            ).all()
+        """Analyzuje výkon jednotlivých otázek (čte průběžně udržovaný rollup question_stats)."""
+        with self.session_factory() as session:
+            question_stats = session.query(QuestionStat).filter(
+                QuestionStat.attempts > 0
+            ).order_by(QuestionStat.score_sum / QuestionStat.attempts).all()
             
-            question_stats = {}
-            
-            for session in completed_sessions:
-                for answer in session.answers or []:
-                    question_text = answer.get('question', 'Neznámá otázka')
-                    score = answer.get('score', 0)
-                    
-                    if question_text not in question_stats:
-                        question_stats[question_text] = {
-                            'question': question_text,
-                            'total_attempts': 0,
-                            'total_score': 0,
-                            'correct_answers': 0,
-                            'categories': set()
-                        }
-                    
-                    stats = question_stats[question_text]
-                    stats['total_attempts'] += 1
-                    stats['total_score'] += score
-                    
-                    if score >= 80:
-                        stats['correct_answers'] += 1
-                    
-                    # Přidej kategorii, pokud existuje
-                    if 'category' in answer:
-                        stats['categories'].add(answer['category'])
-            
-            # Převeď na seznam a spočítej průměry
             result = []
-            for question, stats in question_stats.items():
-                if stats['total_attempts'] > 0:
-                    avg_score = stats['total_score'] / stats['total_attempts']
-                    success_rate = (stats['correct_answers'] / stats['total_attempts']) * 100
-                    
-                    result.append({
-                        'question': stats['question'][:100] + '...' if len(stats['question']) > 100 else stats['question'],
-                        'attempts': stats['total_attempts'],
-                        'avg_score': round(avg_score, 1),
-                        'success_rate': round(success_rate, 1),
-                        'categories': list(stats['categories']),
-                        'difficulty_rating': self._calculate_difficulty_rating(avg_score, success_rate)
-                    })
-            
-            # Seřaď podle obtížnosti (nejtěžší první)
-            result.sort(key=lambda x: x['avg_score'])
+            for stats in question_stats:
+                avg_score = stats.score_sum / stats.attempts
+                success_rate = (stats.correct_count / stats.attempts) * 100
+                question_text = stats.question_text
+                
+                result.append({
+                    'question': question_text[:100] + '...' if len(question_text) > 100 else question_text,
+                    'attempts': stats.attempts,
+                    'avg_score': round(avg_score, 1),
+                    'success_rate': round(success_rate, 1),
+                    'categories': [stats.category] if stats.category else [],
+                    'difficulty_rating': self._calculate_difficulty_rating(avg_score, success_rate)
+                })
             
+            # Seřazeno podle obtížnosti (nejtěžší první) už v SQL
             return result
-            
-        except Exception as e:
-            logger.error(f"❌ Chyba při analýze otázek: {e}")
-            return []
     
-    def get_user_performance_trends(self) -> Dict[str, Any]:
-        """Analyzuje trendy výkonu uživatelů."""
-        try:
-            # Získej data za posledních 90 dní
-            ninety_days_ago = datetime.utcnow() - timedelta(days=90)
+    def get_user_performance_trends(self, start: Optional[date] = None, end: Optional[date] = None,
+                                    granularity: str = "week", lesson_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Analyzuje trendy výkonu uživatelů v rozsahu [start, end] (výchozí posledních 90 dní).
+        Čte předagregované denní/týdenní buckety z performance_rollups.
+        """
+        with self.session_factory() as session:
+            end = end or datetime.utcnow().date()
+            start = start or end - timedelta(days=90)
             
-            sessions = self.session.query(TestSession).filter(
-                TestSession.is_completed == True,
-                TestSession.completed_at >= ninety_days_ago,
-                TestSession.current_score.isnot(None)
-            ).order_by(TestSession.completed_at).all()
+            buckets = get_trend_buckets(session, start, end, granularity=granularity, lesson_id=lesson_id)
             
-            # Seskup podle týdnů
-            weekly_data = {}
-            for session in sessions:
-                week_start = session.completed_at.date() - timedelta(days=session.completed_at.weekday())
-                week_key = week_start.strftime('%Y-%W')
-                
-                if week_key not in weekly_data:
-                    weekly_data[week_key] = {
-                        'week': week_start.strftime('%d.%m'),
-                        'total_tests': 0,
-                        'total_score': 0,
-                        'successful_tests': 0
-                    }
-                
-                data = weekly_data[week_key]
-                data['total_tests'] += 1
-                data['total_score'] += session.current_score
-                
-                if session.current_score >= 90:
-                    data['successful_tests'] += 1
-            
-            # Převeď na seznam a spočítaj průměry
             trend_data = []
-            for week_key in sorted(weekly_data.keys()):
-                data = weekly_data[week_key]
-                avg_score = data['total_score'] / data['total_tests'] if data['total_tests'] > 0 else 0
-                success_rate = (data['successful_tests'] / data['total_tests'] * 100) if data['total_tests'] > 0 else 0
+            for bucket in buckets:
+                tests = bucket['tests']
+                avg_score = bucket['score_sum'] / tests if tests > 0 else 0
+                success_rate = (bucket['successful_tests'] / tests * 100) if tests > 0 else 0
                 
                 trend_data.append({
-                    'week': data['week'],
-                    'tests': data['total_tests'],
+                    'week': bucket['bucket_start'].strftime('%d.%m'),
+                    'bucket_start': bucket['bucket_start'].isoformat(),
+                    'tests': tests,
                     'avg_score': round(avg_score, 1),
                     'success_rate': round(success_rate, 1)
                 })
             
             return {
+                'granularity': granularity,
                 'weekly_trends': trend_data,
                 'total_weeks': len(trend_data),
                 'improvement_trend': self._calculate_improvement_trend(trend_data)
             }
-            
-        except Exception as e:
-            logger.error(f"❌ Chyba při analýze trendů: {e}")
-            return {}
     
     def get_category_performance(self) -> List[Dict[str, Any]]:
-        """Analyzuje výkon podle kategorií otázek."""
-        try:
-            completed_sessions = self.session.query(TestSession).filter(
-                TestSession.is_completed == True,
-                TestSession.answers.isnot(None)
-            ).all()
-            
-            category_stats = {}
+        """Analyzuje výkon podle kategorií otázek (čte průběžně udržovaný rollup category_stats)."""
+        with self.session_factory() as session:
+            category_stats = session.query(CategoryStat).filter(
+                CategoryStat.attempts > 0
+            ).order_by(CategoryStat.score_sum / CategoryStat.attempts).all()
             
-            for session in completed_sessions:
-                for answer in session.answers or []:
-                    # Zkus získat kategorii z odpovědi nebo z otázky
-                    category = 'Neznámá'
-                    if isinstance(answer, dict):
-                        category = answer.get('category', 'Neznámá')
-                        # Pokud není v odpovědi, zkus najít v questions_data
-                        if category == 'Neznámá' and hasattr(session, 'questions_data'):
-                            question_index = answer.get('question_index', -1)
-                            if 0 <= question_index < len(session.questions_data):
-                                category = session.questions_data[question_index].get('category', 'Neznámá')
-                    
-                    score = answer.get('score', 0) if isinstance(answer, dict) else 0
-                    
-                    if category not in category_stats:
-                        category_stats[category] = {
-                            'category': category,
-                            'total_attempts': 0,
-                            'total_score': 0,
-                            'correct_answers': 0
-                        }
-                    
-                    stats = category_stats[category]
-                    stats['total_attempts'] += 1
-                    stats['total_score'] += score
-                    
-                    if score >= 80:
-                        stats['correct_answers'] += 1
-            
-            # Převeď na seznam a spočítej průměry
             result = []
-            for category, stats in category_stats.items():
-                if stats['total_attempts'] > 0:
-                    avg_score = stats['total_score'] / stats['total_attempts']
-                    success_rate = (stats['correct_answers'] / stats['total_attempts']) * 100
-                    
-                    result.append({
-                        'category': stats['category'],
-                        'attempts': stats['total_attempts'],
-                        'avg_score': round(avg_score, 1),
-                        'success_rate': round(success_rate, 1),
-                        'performance_level': self._get_performance_level(avg_score)
-                    })
-            
-            # Seřaď podle průměrného skóre (nejhorší první)
-            result.sort(key=lambda x: x['avg_score'])
+            for stats in category_stats:
+                avg_score = stats.score_sum / stats.attempts
+                success_rate = (stats.correct_count / stats.attempts) * 100
+                
+                result.append({
+                    'category': stats.category,
+                    'attempts': stats.attempts,
+                    'avg_score': round(avg_score, 1),
+                    'success_rate': round(success_rate, 1),
+                    'performance_level': self._get_performance_level(avg_score)
+                })
             
+            # Seřazeno podle průměrného skóre (nejhorší první) už v SQL
             return result
-            
-        except Exception as e:
-            logger.error(f"❌ Chyba při analýze kategorií: {e}")
-            return []
     
     def get_badge_statistics(self) -> Dict[str, Any]:
         """Statistiky udělených odznaků."""
-        try:
+        with self.session_factory() as session:
             # Celkové statistiky
-            total_badges = self.session.query(Badge).count()
-            total_awarded = self.session.query(UserBadge).count()
+            total_badges = session.query(Badge).count()
+            total_awarded = session.query(UserBadge).count()
             
             # Statistiky podle odznaků
-            badge_stats = self.session.query(
+            badge_stats = session.query(
                 Badge.name,
                 Badge.category,
                 func.count(UserBadge.id).label('awarded_count')
@@ -272,10 +180,6 @@ class DashboardStats:
                 'most_popular': badge_data[0] if badge_data else None,
                 'least_popular': badge_data[-1] if badge_data else None
             }
-            
-        except Exception as e:
-            logger.error(f"❌ Chyba při statistikách odznaků: {e}")
-            return {}
     
     def _calculate_difficulty_rating(self, avg_score: float, success_rate: float) -> str:
         """Vypočítá obtížnost otázky."""
@@ -327,6 +231,190 @@ class DashboardStats:
         else:
             return "Slabá"
 
+def default_lesson_name(level: int) -> str:
+    """Název lekce pro úroveň, která v katalogu lekcí nemá záznam."""
+    if level == 0:
+        return "Vstupní test"
+    if level == 1:
+        return "Lekce 1: Základy"
+    return f"Lekce {level}"
+
+def get_user_progress_page(session, after: Optional[str] = None, before: Optional[str] = None,
+                           limit: int = DEFAULT_PAGE_SIZE) -> Dict[str, Any]:
+    """
+    Stránka přehledu pokroku uživatelů jedním SQL dotazem.
+    Počty pokusů, poslední pokus a nejlepší skóre se agregují v databázi (GROUP BY),
+    název lekce se připojí z katalogu lekcí - žádné lazy-loady user.attempts.
+    """
+    attempt_stats = session.query(
+        Attempt.user_id.label("user_id"),
+        func.count(Attempt.id).label("attempts_count"),
+        func.max(Attempt.created_at).label("last_attempt_at"),
+        func.max(Attempt.score).label("best_score")
+    ).group_by(Attempt.user_id).subquery()
+    
+    lesson_names = session.query(
+        Lesson.lesson_number.label("lesson_number"),
+        func.min(Lesson.title).label("title")
+    ).group_by(Lesson.lesson_number).subquery()
+    
+    level = func.coalesce(User.current_lesson_level, 0)
+    query = session.query(
+        User.id,
+        User.name,
+        User.created_at,
+        level.label("level"),
+        func.coalesce(attempt_stats.c.attempts_count, 0).label("attempts_count"),
+        attempt_stats.c.last_attempt_at,
+        attempt_stats.c.best_score,
+        lesson_names.c.title.label("lesson_title")
+    ).outerjoin(
+        attempt_stats, attempt_stats.c.user_id == User.id
+    ).outerjoin(
+        lesson_names, lesson_names.c.lesson_number == level
+    )
+    
+    page = keyset_page(query, User, sort="id", descending=False, after=after, before=before, limit=limit)
+    page["items"] = [
+        {
+            'user_id': row.id,
+            'name': row.name,
+            'level': row.level,
+            'lesson_name': row.lesson_title or default_lesson_name(row.level),
+            'attempts_count': row.attempts_count,
+            'last_attempt_at': row.last_attempt_at,
+            'best_score': row.best_score
+        } for row in page["items"]
+    ]
+    return page
+
+# === Cachovaná služba statistik ===
+# Každá sekce dashboardu má vlastní TTL cache, souběžní návštěvníci sdílejí jeden
+# výpočet (single-flight) a nezávislé sekce se počítají paralelně na thread poolu.
+
+# Název sekce -> metoda DashboardStats, která ji počítá
+DASHBOARD_SECTIONS = {
+    "overview": "get_overview_stats",
+    "question_analytics": "get_question_analytics",
+    "performance_trends": "get_user_performance_trends",
+    "category_performance": "get_category_performance",
+    "badge_statistics": "get_badge_statistics",
+}
+
+DEFAULT_TTL_SECONDS = float(os.getenv("DASHBOARD_CACHE_TTL", "60"))
+
+
+def _section_ttl(section: str) -> float:
+    """TTL sekce - DASHBOARD_CACHE_TTL_<SEKCE>, jinak globální DASHBOARD_CACHE_TTL."""
+    return float(os.getenv(f"DASHBOARD_CACHE_TTL_{section.upper()}", DEFAULT_TTL_SECONDS))
+
+
+class DashboardStatsService:
+    """TTL cache + single-flight + paralelní výpočet sekcí DashboardStats."""
+
+    def __init__(self, ttl_seconds: Optional[Dict[str, float]] = None, max_workers: Optional[int] = None,
+                 stats_factory=None):
+        self.ttl_seconds = {section: _section_ttl(section) for section in DASHBOARD_SECTIONS}
+        self.ttl_seconds.update(ttl_seconds or {})
+        self.stats_factory = stats_factory or DashboardStats
+        self._max_workers = max_workers or int(os.getenv("DASHBOARD_STATS_WORKERS", str(len(DASHBOARD_SECTIONS))))
+        self._executor = None
+        self._lock = threading.Lock()
+        self._cache: Dict[str, tuple] = {}  # sekce -> (hodnota, čas výpočtu)
+        self._in_flight: Dict[str, Future] = {}
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        # Thread pool vzniká až při prvním použití, ne při importu modulu
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self._max_workers,
+                                                        thread_name_prefix="dashboard-stats")
+        return self._executor
+
+    def _compute(self, section: str) -> Any:
+        """Spočítá sekci - metody DashboardStats si berou vlastní DB session (Session není thread-safe)."""
+        started = time.monotonic()
+        stats = self.stats_factory()
+        try:
+            return getattr(stats, DASHBOARD_SECTIONS[section])()
+        finally:
+            logger.info(f"📊 Sekce dashboardu '{section}' spočítána za {time.monotonic() - started:.3f}s")
+
+    def get_section(self, section: str) -> Any:
+        """
+        Vrátí sekci z cache, nebo ji spočítá - souběžná volání sdílejí jeden výpočet.
+        Request s vynuceným primárem (po zápisu admina) cache obejde a čerstvou hodnotou ji přepíše.
+        """
+        if section not in DASHBOARD_SECTIONS:
+            raise KeyError(f"Neznámá sekce dashboardu: {section}")
+
+        if primary_preferred():
+            value = self._compute(section)
+            with self._lock:
+                self._cache[section] = (value, time.monotonic())
+            return value
+
+        with self._lock:
+            cached = self._cache.get(section)
+            if cached and time.monotonic() - cached[1] < self.ttl_seconds[section]:
+                return cached[0]
+            future = self._in_flight.get(section)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[section] = future
+
+        if not owner:
+            return future.result()
+
+        try:
+            value = self._compute(section)
+        except Exception as e:
+            with self._lock:
+                self._in_flight.pop(section, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._cache[section] = (value, time.monotonic())
+            self._in_flight.pop(section, None)
+        future.set_result(value)
+        return value
+
+    def get_sections(self, sections: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Vrátí více sekcí najednou; chybějící v cache se počítají paralelně.
+        Každá úloha běží v kopii contextvars requestu, aby se zachoval `prefer_primary`.
+        """
+        sections = list(sections or DASHBOARD_SECTIONS)
+        futures = {section: self.executor.submit(copy_context().run, self.get_section, section) for section in sections}
+        result = {}
+        for section, future in futures.items():
+            try:
+                result[section] = future.result()
+            except Exception as e:
+                logger.error(f"❌ Chyba při výpočtu sekce dashboardu '{section}': {e}")
+                result[section] = None
+        return result
+
+    def invalidate(self, section: Optional[str] = None) -> None:
+        """Zahodí cache jedné sekce, případně všech."""
+        with self._lock:
+            if section:
+                self._cache.pop(section, None)
+            else:
+                self._cache.clear()
+
+
+def compute_etag(payload: Any) -> str:
+    """Silný ETag z kanonické JSON reprezentace dat."""
+    body = json.dumps(payload, sort_keys=True, default=str, ensure_ascii=False)
+    return '"' + hashlib.sha1(body.encode("utf-8")).hexdigest() + '"'
+
+dashboard_stats_service = DashboardStatsService()
+
 class ScenarioEngine:
     """Engine pro interaktivní scénáře."""
     
@@ -0,0 +1,328 @@
+"""
+Metriky aplikace ve formátu Prometheus a middleware měřící requesty.
+
+`registry` drží čítače, gauge a histogramy (vlastní minimální implementace bez
+závislosti na prometheus_client); `registry.render()` vrací text pro /metrics.
+
+`TimingMiddleware` (čisté ASGI, pokrývá HTTP i WebSockety) měří latenci podle
+šablony routy (`/admin/users/{id}/edit`, ne konkrétní URL - omezená kardinalita),
+počítá rozpracované requesty a otevřená WebSocket spojení a vzorkuje strukturované
+logy requestů: výchozí 1 %, chyby (5xx / výjimka) vždy. Vzorkování lze nastavit
+po routách (REQUEST_LOG_ROUTE_RATES), media-stream routy jsou ve výchozím stavu tiché.
+"""
+
+import fnmatch
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from starlette.routing import Match
+
+logger = logging.getLogger("uvicorn")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONNECTION_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+REQUEST_LOG_SAMPLE_RATE = float(os.getenv("REQUEST_LOG_SAMPLE_RATE", "0.01"))
+# Media stream posílá ~50 rámců/s na hovor - logy spojení ani health checků nechceme
+DEFAULT_ROUTE_SAMPLE_RATES = {
+    "/voice/media-stream": 0.0,
+    "/audio": 0.0,
+    "/audio-test": 0.0,
+    "/test": 0.0,
+    "/health": 0.0,
+    "/metrics": 0.0,
+}
+UNMATCHED_ROUTE = "unmatched"
+_ROUTE_CACHE_LIMIT = 2048
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Metrika {self.name} očekává labely {self.labelnames}, dostala {tuple(labels)}")
+        return tuple(labels[name] for name in self.labelnames)
+
+    def _header(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                                 for key, value in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # labely -> [počty v bucketech (nekumulativně), součet, počet]
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def snapshot(self, **labels) -> Dict:
+        """Počet, součet a kumulativní buckety jedné kombinace labelů (pro testy a admin)."""
+        with self._lock:
+            counts, total, count = self._values.get(self._key(labels), [[0] * len(self.buckets), 0.0, 0])
+            counts = list(counts)
+        cumulative, running = [], 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            running += bucket_count
+            cumulative.append((bound, running))
+        return {"count": count, "sum": total, "buckets": cumulative}
+
+    def label_values(self) -> list:
+        with self._lock:
+            return [dict(zip(self.labelnames, key)) for key in self._values]
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted((key, (list(state[0]), state[1], state[2])) for key, state in self._values.items())
+        lines = self._header()
+        for key, (counts, total, count) in items:
+            running = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                running += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {running}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Registr metrik; `counter` / `gauge` / `histogram` vrací existující metriku se stejným jménem."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif type(metric) is not cls:
+                raise ValueError(f"Metrika {name} už je registrovaná jako {metric.kind}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+registry = MetricsRegistry()
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# === Middleware ===
+
+def parse_route_rates(value: Optional[str]) -> Dict[str, float]:
+    """Přepisy vzorkování ve tvaru "/admin/*=0.1,/voice/process=1" (vzory fnmatch nad šablonou routy)."""
+    rates = {}
+    for item in (value or "").split(","):
+        if "=" not in item:
+            continue
+        pattern, rate = item.rsplit("=", 1)
+        rates[pattern.strip()] = float(rate)
+    return rates
+
+
+def match_route(scope):
+    """Routa aplikace, na kterou request míří (před samotným routováním); PARTIAL např. pro 405."""
+    partial = None
+    app = scope.get("app")
+    for route in getattr(getattr(app, "router", None), "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route
+        if match == Match.PARTIAL and partial is None:
+            partial = route
+    return partial
+
+
+class TimingMiddleware:
+    """
+    ASGI middleware: latence podle routy, rozpracované requesty, otevřená WebSocket
+    spojení a vzorkované strukturované logy requestů (chyby se logují vždy).
+    """
+
+    def __init__(self, app, registry: MetricsRegistry = registry, sample_rate: float = REQUEST_LOG_SAMPLE_RATE,
+                 route_rates: Optional[Dict[str, float]] = None, random_fn: Callable[[], float] = random.random):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.route_rates = {**DEFAULT_ROUTE_SAMPLE_RATES, **parse_route_rates(os.getenv("REQUEST_LOG_ROUTE_RATES")),
+                            **(route_rates or {})}
+        self.random = random_fn
+        self._route_cache: Dict[Tuple, str] = {}
+        self._rate_cache: Dict[str, float] = {}
+        self.request_duration = registry.histogram(
+            "http_request_duration_seconds", "Latence HTTP requestů podle routy", ("method", "route", "status"))
+        self.requests_in_flight = registry.gauge(
+            "http_requests_in_flight", "Rozpracované HTTP requesty podle routy", ("route",))
+        self.connection_duration = registry.histogram(
+            "websocket_connection_duration_seconds", "Délka WebSocket spojení podle routy", ("route",),
+            buckets=CONNECTION_BUCKETS)
+        self.connections_open = registry.gauge(
+            "websocket_connections_open", "Otevřená WebSocket spojení podle routy", ("route",))
+
+    def route_template(self, scope) -> str:
+        key = (scope["type"], scope.get("method"), scope["path"])
+        template = self._route_cache.get(key)
+        if template is not None:
+            return template
+        route = match_route(scope)
+        template = route.path if route is not None else UNMATCHED_ROUTE
+        if len(self._route_cache) < _ROUTE_CACHE_LIMIT:
+            self._route_cache[key] = template
+        return template
+
+    def route_sample_rate(self, route: str) -> float:
+        rate = self._rate_cache.get(route)
+        if rate is None:
+            rate = self.sample_rate
+            for pattern, pattern_rate in self.route_rates.items():
+                if fnmatch.fnmatchcase(route, pattern):
+                    rate = pattern_rate
+                    if pattern == route:
+                        break
+            self._rate_cache[route] = rate
+        return rate
+
+    def _log(self, scope, route: str, status, duration: float, error: Optional[BaseException]) -> None:
+        failed = error is not None or (isinstance(status, int) and status >= 500 and scope["type"] == "http")
+        if not failed:
+            rate = self.route_sample_rate(route)
+            if rate <= 0 or self.random() >= rate:
+                return
+        record = {
+            "type": scope["type"],
+            "method": scope.get("method", "WS"),
+            "route": route,
+            "path": scope["path"],
+            "status": status,
+            "duration_ms": round(duration * 1000, 1),
+        }
+        if error is not None:
+            record["error"] = f"{type(error).__name__}: {error}"
+        logger.log(logging.ERROR if failed else logging.INFO, json.dumps(record, ensure_ascii=False))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+
+        route = self.route_template(scope)
+        is_http = scope["type"] == "http"
+        in_flight = self.requests_in_flight if is_http else self.connections_open
+        state = {"status": None}
+
+        async def send_wrapper(message):
+            message_type = message["type"]
+            if message_type == "http.response.start":
+                state["status"] = message["status"]
+            elif message_type == "websocket.close":
+                state["status"] = message.get("code", 1000)
+            elif message_type == "websocket.accept" and state["status"] is None:
+                state["status"] = 101
+            await send(message)
+
+        in_flight.inc(route=route)
+        started = time.perf_counter()
+        error = None
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            in_flight.dec(route=route)
+            if is_http:
+                status = state["status"] or 500
+                self.request_duration.observe(duration, method=scope["method"], route=route, status=str(status))
+            else:
+                status = state["status"]
+                self.connection_duration.observe(duration, route=route)
+            self._log(scope, route, status, duration, error)
@@ -1,14 +1,21 @@
 from datetime import datetime, timedelta
 from typing import List, Optional
-from sqlalchemy import String, Integer, DateTime, ForeignKey, JSON, Text, Boolean, Float
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import String, Integer, DateTime, Date, ForeignKey, JSON, Text, Boolean, Float, UniqueConstraint, Index, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 from .database import Base
+from .phone import format_phone_number_e164
+
+# Na Postgresu binární JSONB (bez re-parsování, GIN indexy, operátor @>), jinde obecný JSON
+JSONVariant = JSON().with_variant(JSONB(), "postgresql")
 
 class User(Base):
     __tablename__ = "users"
     id = mapped_column(Integer, primary_key=True)
     name = mapped_column(String(100), nullable=False)
     phone = mapped_column(String(20), nullable=False)
+    # Telefon v E.164 pro hledání duplicit (phone může být ve tvaru zadaném adminem, např. "+420 777 123 456")
+    phone_normalized = mapped_column(String(20), nullable=True)
     email = mapped_column(String(120), nullable=True)
     level = mapped_column(String(20), nullable=True, default="beginner")
     language = mapped_column(String(2), nullable=True, default="cs")
@@ -18,14 +25,33 @@ class User(Base):
     attempts = relationship("Attempt", back_populates="user")
     badges = relationship("UserBadge", back_populates="user")
 
+    @validates("phone")
+    def _sync_phone_normalized(self, key, phone):
+        self.phone_normalized = format_phone_number_e164(phone) if phone else None
+        return phone
+
+# Indexy pro vyhledávání podle prefixu jména / telefonu a keyset stránkování v adminu
+Index("ix_users_name_lower", func.lower(User.name).label("name_lower"),
+      postgresql_ops={"name_lower": "varchar_pattern_ops"})
+Index("ix_users_phone", User.phone, postgresql_ops={"phone": "varchar_pattern_ops"})
+Index("ix_users_created_at_id", User.created_at, User.id)
+# Jeden uživatel na telefonní číslo (import vkládá s ON CONFLICT DO NOTHING); pattern_ops i pro prefixové hledání v adminu
+Index("uq_users_phone_normalized", User.phone_normalized, unique=True,
+      postgresql_ops={"phone_normalized": "varchar_pattern_ops"})
+
 class Lesson(Base):
     __tablename__ = "lessons"
+    __table_args__ = (
+        # GIN (jsonb_path_ops) pro dotazy typu questions @> '[{"category": ..., "difficulty": ...}]'
+        Index("ix_lessons_questions_gin", "questions", postgresql_using="gin",
+              postgresql_ops={"questions": "jsonb_path_ops"}).ddl_if(dialect="postgresql"),
+    )
     id = mapped_column(Integer, primary_key=True)
     title = mapped_column(String(200), nullable=False)
     description = mapped_column(Text, nullable=True)  # Nový sloupec pro popis lekce
     language = mapped_column(String(2), nullable=False, default="cs")
     script = mapped_column(Text, nullable=False, default="")  # Změněno na nullable=False s default
-    questions = mapped_column(JSON, nullable=False)
+    questions = mapped_column(JSONVariant, nullable=False)
     level = mapped_column(String(20), nullable=False, default="beginner")
     base_difficulty = mapped_column(String(20), nullable=False, default="medium") # "easy", "medium", "hard"
     lesson_number = mapped_column(Integer, nullable=False, default=0)
@@ -58,9 +84,14 @@ class Badge(Base):
     description = mapped_column(Text, nullable=False)
     icon_svg = mapped_column(Text, nullable=True) # Ikonka jako SVG kód
     category = mapped_column(String(50), nullable=False) # Kategorie, za kterou se odznak uděluje
+    rule = mapped_column(JSON, nullable=True) # Deklarativní pravidlo udělení (viz app/services/badge_rules.py)
 
 class UserBadge(Base):
     __tablename__ = "user_badges"
+    __table_args__ = (
+        # Každý odznak nejvýš jednou na uživatele - backfill vkládá s ON CONFLICT DO NOTHING
+        Index("uq_user_badges_user_badge", "user_id", "badge_id", unique=True),
+    )
     id = mapped_column(Integer, primary_key=True)
     user_id = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
     badge_id = mapped_column(Integer, ForeignKey("badges.id"), nullable=False)
@@ -81,27 +112,42 @@ class TestSession(Base):
     # Stav testování
     current_question_index = mapped_column(Integer, nullable=False, default=0)
     total_questions = mapped_column(Integer, nullable=False, default=0)
-    questions_data = mapped_column(JSON, nullable=False)
+    questions_data = mapped_column(JSONVariant, nullable=False)
     
     # Adaptivní obtížnost a sledování chyb
     difficulty_score = mapped_column(Float, nullable=False, default=50.0)
-    failed_categories = mapped_column(JSON, nullable=False, default=list)
+    failed_categories = mapped_column(JSONVariant, nullable=False, default=list)
     
     # Výsledky
-    answers = mapped_column(JSON, nullable=False, default=list)
-    scores = mapped_column(JSON, nullable=False, default=list)
+    answers = mapped_column(JSONVariant, nullable=False, default=list)
+    scores = mapped_column(JSONVariant, nullable=False, default=list)
     current_score = mapped_column(Float, nullable=False, default=0.0)
     
     # Metadata
     started_at = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
     completed_at = mapped_column(DateTime, nullable=True)
     is_completed = mapped_column(Boolean, nullable=False, default=False)
+    # Po archivaci zůstává jen souhrn, questions_data a answers jsou v test_session_archive
+    archived_at = mapped_column(DateTime, nullable=True)
+    # Poslední odpověď / navázání hovoru; nedokončená session nečinná déle než TTL (nebo resetovaná adminem) se označí jako opuštěná
+    last_activity_at = mapped_column(DateTime, nullable=True, default=datetime.utcnow)
+    abandoned_at = mapped_column(DateTime, nullable=True)
     
     # Relationships
     user = relationship("User")
     lesson = relationship("Lesson")
     attempt = relationship("Attempt")
 
+# Kandidáti archivace: dokončené a ještě nearchivované sessions podle data dokončení
+Index("ix_test_sessions_archive_candidates", TestSession.completed_at,
+      postgresql_where=TestSession.archived_at.is_(None), sqlite_where=TestSession.archived_at.is_(None))
+# Rozpracované sessions (bez dokončených a opuštěných): hledání aktivní session a sweeper nečinných
+_open_session = (TestSession.is_completed == False) & TestSession.abandoned_at.is_(None)
+Index("ix_test_sessions_active", TestSession.user_id, TestSession.lesson_id,
+      postgresql_where=_open_session, sqlite_where=_open_session)
+Index("ix_test_sessions_idle", TestSession.last_activity_at,
+      postgresql_where=_open_session, sqlite_where=_open_session)
+
 class Answer(Base):
     __tablename__ = "answers"
     id = mapped_column(Integer, primary_key=True)
@@ -127,23 +173,196 @@ class Attempt(Base):
     feedback = mapped_column(Text)
     created_at = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
     completed_at = mapped_column(DateTime)
-    next_due = mapped_column(DateTime)
+    next_due = mapped_column(DateTime, index=True)
+    lease_until = mapped_column(DateTime, nullable=True)  # zámek dispatcheru opakování - po vypršení ho převezme jiný worker
     user = relationship("User", back_populates="attempts")
     lesson = relationship("Lesson", back_populates="attempts")
     answers = relationship("Answer", back_populates="attempt")
     
     def calculate_next_due(self) -> None:
-        if self.score is None:
-            self.next_due = datetime.utcnow() + timedelta(days=1)
-        elif self.score < 80:
-            self.next_due = datetime.utcnow() + timedelta(days=3)
-        elif self.score < 90:
-            self.next_due = datetime.utcnow() + timedelta(days=7)
-        else:
-            self.next_due = datetime.utcnow() + timedelta(days=30) 
+        """
+        Naplánuje první opakování jen podle skóre, bez zápisu do databáze.
+        Hodnocení se stavem uživatele zapisuje spaced_repetition.record_attempt_review.
+        """
+        from app.services.spaced_repetition import first_review_due
+        self.next_due = first_review_due(self.score)
             
     def calculate_overall_score(self) -> float:
         if not self.answers:
             return 0.0
         total_score = sum(answer.score for answer in self.answers)
-        return total_score / len(self.answers) 
\ No newline at end of file
+        return total_score / len(self.answers)
+
+
+class QuestionStat(Base):
+    """Průběžně udržovaná agregace odpovědí pro jednotlivé otázky"""
+    __tablename__ = "question_stats"
+
+    id = mapped_column(Integer, primary_key=True)
+    question_key = mapped_column(String(40), nullable=False, unique=True)  # SHA-1 textu otázky
+    question_text = mapped_column(Text, nullable=False)
+    category = mapped_column(String(100), nullable=True)
+    attempts = mapped_column(Integer, nullable=False, default=0)
+    score_sum = mapped_column(Float, nullable=False, default=0.0)
+    correct_count = mapped_column(Integer, nullable=False, default=0)
+    updated_at = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class CategoryStat(Base):
+    """Průběžně udržovaná agregace odpovědí podle kategorií otázek"""
+    __tablename__ = "category_stats"
+
+    id = mapped_column(Integer, primary_key=True)
+    category = mapped_column(String(100), nullable=False, unique=True)
+    attempts = mapped_column(Integer, nullable=False, default=0)
+    score_sum = mapped_column(Float, nullable=False, default=0.0)
+    correct_count = mapped_column(Integer, nullable=False, default=0)
+    updated_at = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+
+class PerformanceRollup(Base):
+    """Výsledky dokončených testů agregované po dnech / týdnech a lekcích"""
+    __tablename__ = "performance_rollups"
+    __table_args__ = (
+        UniqueConstraint("granularity", "bucket_start", "lesson_id", name="uq_performance_rollup_bucket"),
+    )
+
+    id = mapped_column(Integer, primary_key=True)
+    granularity = mapped_column(String(10), nullable=False)  # "day", "week"
+    bucket_start = mapped_column(Date, nullable=False)  # den, resp. pondělí daného týdne
+    lesson_id = mapped_column(Integer, ForeignKey("lessons.id"), nullable=False)
+    tests = mapped_column(Integer, nullable=False, default=0)
+    score_sum = mapped_column(Float, nullable=False, default=0.0)
+    successful_tests = mapped_column(Integer, nullable=False, default=0)
+    updated_at = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class UserDeletionJob(Base):
+    """Průběh mazání uživatele a jeho historie po dávkách na pozadí"""
+    __tablename__ = "user_deletion_jobs"
+
+    id = mapped_column(Integer, primary_key=True)
+    user_id = mapped_column(Integer, nullable=False, index=True)  # bez FK - uživatel na konci zmizí
+    user_name = mapped_column(String(100), nullable=True)
+    status = mapped_column(String(20), nullable=False, default="pending")  # pending, running, completed, failed
+    phase = mapped_column(String(30), nullable=False, default="answers")
+    deleted_counts = mapped_column(JSON, nullable=False, default=dict)
+    error = mapped_column(Text, nullable=True)
+    created_at = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = mapped_column(DateTime, nullable=False, default=datetime.utcnow)  # heartbeat workeru
+    completed_at = mapped_column(DateTime, nullable=True)
+
+
+class Campaign(Base):
+    """Hromadná volací kampaň - kohorta uživatelů + lekce, volání řízená limiterem"""
+    __tablename__ = "campaigns"
+
+    id = mapped_column(Integer, primary_key=True)
+    name = mapped_column(String(200), nullable=False)
+    lesson_id = mapped_column(Integer, ForeignKey("lessons.id"), nullable=False)
+    status = mapped_column(String(20), nullable=False, default="draft")  # draft, running, paused, completed, cancelled
+    cohort = mapped_column(JSON, nullable=False, default=dict)  # filtr, podle kterého se vybrali uživatelé
+    calls_per_second = mapped_column(Float, nullable=False, default=1.0)
+    max_concurrent_calls = mapped_column(Integer, nullable=False, default=5)
+    max_retries = mapped_column(Integer, nullable=False, default=2)  # opakování při busy / no-answer
+    retry_delay_seconds = mapped_column(Integer, nullable=False, default=600)
+    stats = mapped_column(JSON, nullable=False, default=dict)  # poslední snímek počtů podle stavu
+    created_at = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at = mapped_column(DateTime, nullable=True)
+    completed_at = mapped_column(DateTime, nullable=True)
+
+    lesson = relationship("Lesson")
+
+
+class CampaignCall(Base):
+    """Jeden hovor kampaně včetně opakování a posledního stavu z Twilio callbacku"""
+    __tablename__ = "campaign_calls"
+    __table_args__ = (
+        UniqueConstraint("campaign_id", "user_id", name="uq_campaign_call_user"),
+        Index("ix_campaign_calls_dispatch", "campaign_id", "status", "next_try_at"),
+    )
+
+    id = mapped_column(Integer, primary_key=True)
+    campaign_id = mapped_column(Integer, ForeignKey("campaigns.id"), nullable=False)
+    user_id = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
+    attempt_id = mapped_column(Integer, ForeignKey("attempts.id"), nullable=True)
+    # queued, dialing, in_progress, completed, busy, no_answer, failed, cancelled
+    status = mapped_column(String(20), nullable=False, default="queued")
+    call_sid = mapped_column(String(64), nullable=True, index=True)
+    tries = mapped_column(Integer, nullable=False, default=0)
+    next_try_at = mapped_column(DateTime, nullable=True)
+    twilio_status = mapped_column(String(20), nullable=True)
+    duration_seconds = mapped_column(Integer, nullable=True)
+    error = mapped_column(Text, nullable=True)
+    created_at = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class ReviewState(Base):
+    """Spaced-repetition stav (SM-2) jednoho uživatele pro jednu kategorii otázek"""
+    __tablename__ = "review_states"
+    __table_args__ = (
+        UniqueConstraint("user_id", "category", name="uq_review_state_user_category"),
+    )
+
+    id = mapped_column(Integer, primary_key=True)
+    user_id = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
+    category = mapped_column(String(100), nullable=False)
+    easiness = mapped_column(Float, nullable=False, default=2.5)
+    interval_days = mapped_column(Float, nullable=False, default=0.0)
+    repetitions = mapped_column(Integer, nullable=False, default=0)
+    lapses = mapped_column(Integer, nullable=False, default=0)
+    last_quality = mapped_column(Float, nullable=True)
+    last_reviewed_at = mapped_column(DateTime, nullable=True)
+    due_at = mapped_column(DateTime, nullable=True, index=True)
+    updated_at = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+
+class JobCheckpoint(Base):
+    """Průběh dlouhých dávkových jobů (poslední zpracované id), aby šly po přerušení navázat"""
+    __tablename__ = "job_checkpoints"
+
+    name = mapped_column(String(100), primary_key=True)
+    last_id = mapped_column(Integer, nullable=False, default=0)
+    processed = mapped_column(Integer, nullable=False, default=0)
+    stats = mapped_column(JSON, nullable=True)
+    updated_at = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+
+class ArchivedTestSession(Base):
+    """
+    Objemná data (otázky a odpovědi) dokončených sessions přesunutá z test_sessions.
+    Na Postgresu je tabulka rozdělená na měsíční partition podle completed_at.
+    """
+    __tablename__ = "test_session_archive"
+    __table_args__ = (
+        Index("ix_test_session_archive_user_id", "user_id"),
+        {"postgresql_partition_by": "RANGE (completed_at)"},
+    )
+
+    # Partition klíč musí být součástí primárního klíče
+    session_id = mapped_column(Integer, primary_key=True)
+    completed_at = mapped_column(DateTime, primary_key=True)
+    user_id = mapped_column(Integer, nullable=False)
+    lesson_id = mapped_column(Integer, nullable=False)
+    attempt_id = mapped_column(Integer, nullable=True)
+    questions_data = mapped_column(JSONVariant, nullable=False)
+    answers = mapped_column(JSONVariant, nullable=False)
+    archived_at = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+
+class OpenAIUsageDaily(Base):
+    """Denní součty volání OpenAI podle volajícího a modelu (tokeny, latence, odhad nákladů)"""
+    __tablename__ = "openai_usage_daily"
+
+    day = mapped_column(Date, primary_key=True)
+    caller = mapped_column(String(50), primary_key=True)  # tag místa volání, např. "entry_test_eval"
+    model = mapped_column(String(100), primary_key=True)
+    calls = mapped_column(Integer, nullable=False, default=0)
+    errors = mapped_column(Integer, nullable=False, default=0)
+    retries = mapped_column(Integer, nullable=False, default=0)
+    prompt_tokens = mapped_column(Integer, nullable=False, default=0)
+    completion_tokens = mapped_column(Integer, nullable=False, default=0)
+    characters = mapped_column(Integer, nullable=False, default=0)  # vstup TTS
+    audio_seconds = mapped_column(Float, nullable=False, default=0.0)  # přepsané audio
+    latency_seconds = mapped_column(Float, nullable=False, default=0.0)
+    cost_usd = mapped_column(Float, nullable=False, default=0.0)
+    updated_at = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
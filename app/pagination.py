@@ -0,0 +1,89 @@
+"""
+Keyset (seek) stránkování pro admin seznamy.
+
+Místo OFFSET se stránka určuje kurzorem - klíčem posledního (resp. prvního)
+zobrazeného řádku - takže cena stránky nezávisí na tom, jak daleko v seznamu jsme.
+Kurzor je `id`, nebo `created_at|id` při řazení podle data vytvoření.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import tuple_
+
+SORT_KEYS = ("id", "created_at")
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+LIKE_ESCAPE = "\\"
+
+
+def like_prefix(term: str) -> str:
+    """Vzor LIKE pro hledání podle prefixu - `%` a `_` v hledaném textu se berou doslova (escape=LIKE_ESCAPE)."""
+    escaped = term.replace(LIKE_ESCAPE, LIKE_ESCAPE * 2).replace("%", LIKE_ESCAPE + "%").replace("_", LIKE_ESCAPE + "_")
+    return escaped + "%"
+
+
+def encode_cursor(row, sort: str) -> str:
+    if sort == "created_at":
+        return f"{row.created_at.isoformat()}|{row.id}"
+    return str(row.id)
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple:
+    """Rozloží kurzor na hodnoty klíče; neplatný kurzor vyhodí ValueError."""
+    if sort == "created_at":
+        created_at, row_id = cursor.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    return (int(cursor),)
+
+
+def keyset_page(query, model, sort: str = "id", descending: bool = True, after: Optional[str] = None,
+                before: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE) -> Dict[str, Any]:
+    """
+    Vrátí jednu stránku dotazu `query` seřazeného podle `sort` (a `id` jako tie-breaker).
+
+    `after` = kurzor pro další stránku, `before` = kurzor pro předchozí stránku.
+    Výsledek: {"items", "next_cursor", "prev_cursor", "sort", "limit"}.
+    """
+    if sort not in SORT_KEYS:
+        raise ValueError(f"Nepodporované řazení: {sort}")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    key_columns = [model.created_at, model.id] if sort == "created_at" else [model.id]
+    key = tuple_(*key_columns) if len(key_columns) > 1 else key_columns[0]
+
+    backwards = before is not None and after is None
+    cursor = before if backwards else after
+    if cursor:
+        values = decode_cursor(cursor, sort)
+        value = tuple_(*values) if len(values) > 1 else values[0]
+        # Sestupně + další stránka => menší klíče; vzestupně + předchozí stránka => také menší
+        if descending != backwards:
+            query = query.filter(key < value)
+        else:
+            query = query.filter(key > value)
+
+    # Při listování zpět se řadí opačně a výsledek se pak otočí
+    order_descending = descending != backwards
+    query = query.order_by(*[col.desc() if order_descending else col.asc() for col in key_columns])
+
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if backwards:
+        rows.reverse()
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if has_more or backwards:
+            next_cursor = encode_cursor(rows[-1], sort)
+        if (has_more and backwards) or (after and not backwards):
+            prev_cursor = encode_cursor(rows[0], sort)
+
+    return {
+        "items": rows,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
+        "sort": sort,
+        "limit": limit,
+    }
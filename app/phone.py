@@ -0,0 +1,71 @@
+"""
+Normalizace telefonních čísel (bez závislostí, použitelné z FastAPI, Flask i skriptů).
+"""
+
+import re
+
+# E.164: + a 8 až 15 číslic
+E164_PATTERN = re.compile(r'^\+[1-9]\d{7,14}$')
+
+
+def format_phone_number(phone: str) -> str:
+    """Formátuje telefonní číslo do formátu E.164 s mezerami pro zobrazení."""
+    # Odstraň všechny nečíselné znaky kromě mezer
+    digits = re.sub(r'[^\d\s]', '', phone)
+    
+    # Pokud číslo začíná 00, nahraď to za +
+    if digits.startswith('00'):
+        digits = '+420' + digits[2:]
+    
+    # Pokud číslo začíná 0, nahraď to za +420
+    if digits.startswith('0'):
+        digits = '+420' + digits[1:]
+    
+    # Pokud číslo nezačíná +, přidej +420
+    if not digits.startswith('+'):
+        digits = '+420' + digits
+    
+    # Odstraň duplicitní +420
+    if digits.startswith('+420420'):
+        digits = '+420' + digits[7:]
+    
+    # Odstraň mezery
+    digits = digits.replace(' ', '')
+    
+    # Přidej mezery po +420 a každých 3 číslech
+    if len(digits) > 4:
+        formatted = digits[:4] + ' '  # +420
+        remaining = digits[4:]
+        for i in range(0, len(remaining), 3):
+            formatted += remaining[i:i+3] + ' '
+        return formatted.strip()
+    
+    return digits
+
+def format_phone_number_e164(phone: str) -> str:
+    """Formátuje telefonní číslo do čistého E.164 formátu pro Twilio volání."""
+    # Odstraň všechny nečíselné znaky
+    digits = re.sub(r'[^\d+]', '', phone)
+    
+    # Pokud číslo začíná 00, nahraď to za +420
+    if digits.startswith('00'):
+        digits = '+420' + digits[2:]
+    
+    # Pokud číslo začíná 0, nahraď to za +420
+    elif digits.startswith('0'):
+        digits = '+420' + digits[1:]
+    
+    # Pokud číslo nezačíná +, přidej +420
+    elif not digits.startswith('+'):
+        digits = '+420' + digits
+    
+    # Odstraň duplicitní +420
+    if digits.startswith('+420420'):
+        digits = '+420' + digits[7:]
+    
+    return digits
+
+
+def is_valid_e164(phone: str) -> bool:
+    """Ověří, že číslo (už normalizované) odpovídá formátu E.164."""
+    return bool(E164_PATTERN.match(phone or ""))
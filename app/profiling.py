@@ -0,0 +1,292 @@
+"""
+Profilování běžícího workeru na vyžádání (admin /admin/profile/*), bez restartu a odpojení hovorů.
+
+- CPU: vzorkovací profiler ve vlákně na pozadí čte `sys._current_frames()` každých
+  `interval_ms` a vrací collapsed stacks (`vlákno;modul:funkce;... počet`) pro
+  flamegraph.pl / speedscope. Délka je omezená PROFILE_MAX_SECONDS, interval
+  PROFILE_MIN_INTERVAL_MS a profiler interval sám prodlužuje, aby vzorkování nezabralo
+  víc než PROFILE_MAX_OVERHEAD času. Najednou běží nejvýš jeden profil.
+- Jeden request: `arm_request_profile` nastraží profil na další request na danou routu
+  (nebo s hlavičkou X-Profile-Request); ProfilingMiddleware během něj vzorkuje jen zásobníky
+  tohoto requestu (korutina requestu v event loopu, endpoint ve vlákně threadpoolu).
+- Paměť: tracemalloc baseline + diff snímků pro hledání růstu paměti v dlouho žijících
+  WebSocket handlerech. Tracemalloc zpomaluje alokace, proto se sám vypne po
+  PROFILE_MEMORY_MAX_SECONDS.
+"""
+
+import inspect
+import linecache
+import os
+import secrets
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+from app.metrics import match_route
+
+PROFILE_MAX_SECONDS = int(os.getenv("PROFILE_MAX_SECONDS", "60"))
+PROFILE_MIN_INTERVAL_MS = float(os.getenv("PROFILE_MIN_INTERVAL_MS", "5"))
+PROFILE_MAX_OVERHEAD = float(os.getenv("PROFILE_MAX_OVERHEAD", "0.05"))
+PROFILE_MAX_DEPTH = int(os.getenv("PROFILE_MAX_DEPTH", "64"))
+REQUEST_PROFILE_TIMEOUT_SECONDS = int(os.getenv("REQUEST_PROFILE_TIMEOUT_SECONDS", "600"))
+PROFILE_MEMORY_MAX_SECONDS = int(os.getenv("PROFILE_MEMORY_MAX_SECONDS", "900"))
+PROFILE_REQUEST_HEADER = "x-profile-request"
+
+
+class ProfilerBusyError(RuntimeError):
+    """Už běží jiný CPU profil (nebo paměťový, pokud ho spustil někdo jiný)."""
+
+
+_sampler_lock = threading.Lock()
+_labels: Dict[object, str] = {}
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    label = _labels.get(code)
+    if label is None:
+        module = frame.f_globals.get("__name__") or os.path.basename(code.co_filename)
+        label = _labels[code] = f"{module}:{code.co_name}".replace(";", ",").replace(" ", "_")
+    return label
+
+
+class SamplingProfiler:
+    """Vzorkuje zásobníky všech vláken (kromě svého); `keep` může vzorky filtrovat."""
+
+    def __init__(self, interval_ms: float = 10.0, max_depth: int = PROFILE_MAX_DEPTH,
+                 keep: Optional[Callable[[int, List], bool]] = None):
+        self.interval = max(interval_ms, PROFILE_MIN_INTERVAL_MS) / 1000
+        self.max_depth = max_depth
+        self.keep = keep
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.sampling_seconds = 0.0
+        self.wall_seconds = 0.0
+
+    def sample(self) -> None:
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            frames = []
+            while frame is not None:
+                frames.append(frame)
+                frame = frame.f_back
+            # Filtr vidí celý zásobník (middleware requestu bývá hluboko), popisky jen nejvnitřnější rámce
+            if self.keep is not None and not self.keep(thread_id, frames):
+                continue
+            labels = [_frame_label(item) for item in reversed(frames[:self.max_depth])]
+            if len(frames) > self.max_depth:
+                labels.insert(0, "[zkráceno]")
+            thread_name = names.get(thread_id, str(thread_id)).replace(" ", "_").replace(";", ",")
+            self.stacks[";".join([thread_name] + labels)] += 1
+        self.samples += 1
+
+    def run(self, seconds: float, stop: Optional[threading.Event] = None) -> None:
+        """Vzorkuje `seconds` sekund (nejvýš PROFILE_MAX_SECONDS) nebo do nastavení `stop`."""
+        stop = stop or threading.Event()
+        started = time.perf_counter()
+        deadline = started + min(seconds, PROFILE_MAX_SECONDS)
+        while not stop.is_set() and time.perf_counter() < deadline:
+            sample_started = time.perf_counter()
+            self.sample()
+            cost = time.perf_counter() - sample_started
+            self.sampling_seconds += cost
+            # Vzorek s mnoha vlákny je dražší - interval se natáhne, aby režie zůstala pod limitem
+            stop.wait(max(self.interval, cost / PROFILE_MAX_OVERHEAD - cost))
+        self.wall_seconds = time.perf_counter() - started
+
+    def collapsed(self) -> str:
+        """Collapsed stacks (formát flamegraph.pl / speedscope), nejčastější první."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self) -> Dict:
+        return {"samples": self.samples, "stacks": len(self.stacks), "wall_seconds": round(self.wall_seconds, 3),
+                "overhead": round(self.sampling_seconds / self.wall_seconds, 4) if self.wall_seconds else 0.0}
+
+
+def profile_cpu(seconds: float, interval_ms: float = 10.0) -> SamplingProfiler:
+    """Blokující CPU profil celého workeru (volat mimo event loop, např. přes asyncio.to_thread)."""
+    if not _sampler_lock.acquire(blocking=False):
+        raise ProfilerBusyError("CPU profil už běží")
+    try:
+        profiler = SamplingProfiler(interval_ms)
+        profiler.run(seconds)
+        return profiler
+    finally:
+        _sampler_lock.release()
+
+
+# === Profil jednoho requestu ===
+
+class RequestProfile:
+    __slots__ = ("token", "route", "interval_ms", "status", "expires_at", "path", "result", "summary")
+
+    def __init__(self, route: Optional[str], interval_ms: float, timeout: float):
+        self.token = secrets.token_urlsafe(12)
+        self.route = route
+        self.interval_ms = interval_ms
+        self.status = "armed"  # armed -> running -> done | expired
+        self.expires_at = time.time() + timeout
+        self.path: Optional[str] = None
+        self.result = ""
+        self.summary: Dict = {}
+
+    def as_dict(self) -> Dict:
+        if self.status == "armed" and time.time() > self.expires_at:
+            self.status = "expired"
+        return {"token": self.token, "route": self.route, "status": self.status, "path": self.path, **self.summary}
+
+
+_request_profiles: Dict[str, RequestProfile] = {}
+_armed: List[RequestProfile] = []
+_armed_lock = threading.Lock()
+
+
+def arm_request_profile(route: Optional[str] = None, interval_ms: float = 5.0,
+                        timeout: float = REQUEST_PROFILE_TIMEOUT_SECONDS) -> RequestProfile:
+    """
+    Nastraží profil dalšího requestu na šablonu routy `route` (např. /voice/process - Twilio
+    hlavičky přidat neumí), jinak dalšího requestu s hlavičkou X-Profile-Request: <token>.
+    """
+    profile = RequestProfile(route, interval_ms, timeout)
+    with _armed_lock:
+        _request_profiles[profile.token] = profile
+        _armed.append(profile)
+        # Dokončené profily držíme jen omezeně
+        for token in list(_request_profiles)[:-50]:
+            if _request_profiles[token].status in ("done", "expired"):
+                del _request_profiles[token]
+    return profile
+
+
+def get_request_profile(token: str) -> Optional[RequestProfile]:
+    return _request_profiles.get(token)
+
+
+def _claim(scope, route) -> Optional[RequestProfile]:
+    header_token = dict(scope.get("headers") or []).get(PROFILE_REQUEST_HEADER.encode(), b"").decode()
+    template = getattr(route, "path", None)
+    now = time.time()
+    with _armed_lock:
+        for profile in list(_armed):
+            if now > profile.expires_at:
+                _armed.remove(profile)
+                profile.status = "expired"
+            elif header_token == profile.token or (profile.route and profile.route == template):
+                if not _sampler_lock.acquire(blocking=False):
+                    return None  # běží CPU profil, zkusíme další request
+                _armed.remove(profile)
+                profile.status = "running"
+                return profile
+    return None
+
+
+class ProfilingMiddleware:
+    """Pokud je nastražený profil requestu, vzorkuje zásobníky prvního odpovídajícího requestu."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not _armed or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        route = match_route(scope)
+        profile = _claim(scope, route)
+        if profile is None:
+            return await self.app(scope, receive, send)
+
+        marker = sys._getframe()
+        loop_thread = threading.get_ident()
+        endpoint = getattr(route, "endpoint", None)
+        endpoint_code = getattr(inspect.unwrap(endpoint), "__code__", None) if endpoint else None
+
+        def keep(thread_id, frames):
+            # Event loop: jen když běží korutina tohoto requestu; threadpool: sync endpoint requestu
+            if thread_id == loop_thread:
+                return any(frame is marker for frame in frames)
+            return endpoint_code is not None and any(frame.f_code is endpoint_code for frame in frames)
+
+        profiler = SamplingProfiler(profile.interval_ms, keep=keep)
+        stop = threading.Event()
+        sampler = threading.Thread(target=profiler.run, args=(PROFILE_MAX_SECONDS, stop),
+                                   name="request-profiler", daemon=True)
+        profile.path = scope["path"]
+        sampler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            stop.set()
+            sampler.join(timeout=1)
+            profile.result = profiler.collapsed()
+            profile.summary = profiler.summary()
+            profile.status = "done"
+            _sampler_lock.release()
+
+
+# === Paměť (tracemalloc) ===
+
+_memory_lock = threading.Lock()
+_memory_state: Dict = {"baseline": None, "started_at": None, "timer": None}
+_MEMORY_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def start_memory_tracing(frames: int = 10) -> Dict:
+    """Zapne tracemalloc a uloží výchozí snímek; po PROFILE_MEMORY_MAX_SECONDS se sám vypne."""
+    with _memory_lock:
+        if _memory_state["baseline"] is not None or tracemalloc.is_tracing():
+            raise ProfilerBusyError("Sledování paměti už běží")
+        tracemalloc.start(max(1, min(frames, 50)))
+        _memory_state["baseline"] = tracemalloc.take_snapshot().filter_traces(_MEMORY_FILTERS)
+        _memory_state["started_at"] = time.time()
+        timer = _memory_state["timer"] = threading.Timer(PROFILE_MEMORY_MAX_SECONDS, stop_memory_tracing)
+        timer.daemon = True
+        timer.start()
+    return memory_status()
+
+
+def memory_status() -> Dict:
+    traced, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+    started_at = _memory_state["started_at"]
+    return {"tracing": _memory_state["baseline"] is not None, "traced_kib": traced // 1024, "peak_kib": peak // 1024,
+            "running_seconds": round(time.time() - started_at, 1) if started_at else 0,
+            "auto_stop_seconds": PROFILE_MEMORY_MAX_SECONDS}
+
+
+def memory_diff(top: int = 30, key_type: str = "lineno", reset_baseline: bool = False) -> str:
+    """Rozdíl aktuálního snímku proti baseline - největší přírůstky první."""
+    with _memory_lock:
+        baseline = _memory_state["baseline"]
+        if baseline is None:
+            raise RuntimeError("Sledování paměti neběží - nejdřív ho spusťte")
+        snapshot = tracemalloc.take_snapshot().filter_traces(_MEMORY_FILTERS)
+        stats = snapshot.compare_to(baseline, key_type)
+        if reset_baseline:
+            _memory_state["baseline"] = snapshot
+    lines = [f"# tracemalloc diff ({key_type}), celkem {sum(stat.size_diff for stat in stats) / 1024:+.1f} KiB"]
+    for stat in stats[:top]:
+        lines.append(f"{stat.size_diff / 1024:+.1f} KiB ({stat.count_diff:+d} bloků), celkem {stat.size / 1024:.1f} KiB: "
+                     f"{stat.traceback[-1].filename}:{stat.traceback[-1].lineno}")
+        if key_type == "traceback":
+            lines.extend(f"    {line}" for line in stat.traceback.format())
+    return "\n".join(lines) + "\n"
+
+
+def stop_memory_tracing() -> Dict:
+    with _memory_lock:
+        if _memory_state["timer"] is not None:
+            _memory_state["timer"].cancel()
+        _memory_state.update(baseline=None, started_at=None, timer=None)
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+    return memory_status()
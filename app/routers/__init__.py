@@ -0,0 +1,6 @@
+"""
+FastAPI routery aplikace (admin, system, voice, media, profiling), připojené v main.py.
+
+Moduly routerů importují těžká SDK (OpenAI, pydub, NumPy) až uvnitř handlerů,
+takže import main.py a první /health zůstávají rychlé.
+"""
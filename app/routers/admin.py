@@ -0,0 +1,1672 @@
+"""
+Admin rozhraní (/admin): dashboard, uživatelé, lekce, analytika, exporty a kampaně.
+"""
+
+import io
+import logging
+import os
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, File, Form, Path, Query, Request, Response, UploadFile, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, StreamingResponse
+from sqlalchemy import func
+
+from admin_dashboard import DashboardStats, DASHBOARD_SECTIONS, compute_etag, dashboard_stats_service, get_user_progress_page
+from app.database import ReadSessionLocal, SessionLocal
+from app.models import Attempt, Campaign, Lesson, TestSession, User
+from app.pagination import keyset_page, like_prefix, DEFAULT_PAGE_SIZE, LIKE_ESCAPE, MAX_PAGE_SIZE
+from app.phone import format_phone_number_e164
+from app.routers.common import templates
+from app.services.analytics_service import rebuild_rollups, backfill_trend_rollups
+from app.services.campaign_service import create_campaign, campaign_stats, set_campaign_status, start_campaign
+from app.services.export_service import ExportUnavailableError, check_parquet_available, export_filename, iter_export_rows, stream_csv, stream_parquet
+from app.services.openai_client import COST_WINDOW_DAYS, daily_usage
+from app.services.question_query import find_questions
+from app.services.session_archive import ARCHIVE_AFTER_DAYS, archive_completed_sessions
+from app.services.session_sweeper import SESSION_IDLE_TTL_MINUTES, sweep_abandoned_sessions
+from app.services.user_deletion import create_deletion_job, get_deletion_job, resume_stale_deletion_jobs, start_deletion_job_in_background
+from app.services.user_import import IMPORT_BATCH_SIZE, import_users_csv
+from app.tracing import TRACE_BUFFER_SIZE, call_latency_summary, recent_traces, trace_tree
+
+logger = logging.getLogger("uvicorn")
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+@router.get("/", response_class=HTMLResponse)
+def admin_root(request: Request):
+    # Přesměrování na dashboard
+    return RedirectResponse(url="/admin/dashboard", status_code=status.HTTP_302_FOUND)
+
+@router.get("/dashboard", response_class=HTMLResponse, name="admin_dashboard")
+def admin_dashboard(request: Request):
+    sections = dashboard_stats_service.get_sections()
+    return templates.TemplateResponse("admin/dashboard.html", {
+        "request": request,
+        "stats": sections["overview"] or {},
+        "sections": sections
+    })
+
+@router.get("/dashboard/stats.json", response_class=JSONResponse, name="admin_dashboard_stats")
+def admin_dashboard_stats(request: Request, sections: Optional[str] = Query(None)):
+    """Statistiky dashboardu jako JSON s ETag - prohlížeč může levně pollovat přes If-None-Match"""
+    requested = [s.strip() for s in sections.split(",") if s.strip()] if sections else None
+    unknown = [s for s in requested or [] if s not in DASHBOARD_SECTIONS]
+    if unknown:
+        return JSONResponse(status_code=400, content={"error": f"Neznámé sekce: {', '.join(unknown)}"})
+    
+    payload = dashboard_stats_service.get_sections(requested)
+    etag = compute_etag(payload)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return JSONResponse(content=jsonable_encoder(payload), headers=headers)
+
+def _user_search_filter(search: str):
+    """Prefix telefonu (začíná + nebo číslicí) hledá v normalizovaném E.164 čísle, jinak prefix jména."""
+    if search[0] == "+" or search[0].isdigit():
+        return User.phone_normalized.like(like_prefix(format_phone_number_e164(search)), escape=LIKE_ESCAPE)
+    return func.lower(User.name).like(like_prefix(search.lower()), escape=LIKE_ESCAPE)
+
+@router.get("/users", response_class=HTMLResponse, name="admin_list_users")
+def admin_list_users(
+    request: Request,
+    q: str = Query("", max_length=100),
+    sort: str = Query("id", pattern="^(id|created_at)$"),
+    after: Optional[str] = Query(None),
+    before: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    session = ReadSessionLocal()
+    try:
+        # Jen sloupce potřebné pro tabulku - bez detail (Text)
+        query = session.query(
+            User.id,
+            User.name,
+            User.phone,
+            User.language,
+            func.coalesce(User.current_lesson_level, 0).label("current_lesson_level"),
+            User.created_at
+        )
+        
+        # Vyhledávání podle prefixu telefonu nebo jména - obojí indexované
+        search = q.strip()
+        if search:
+            query = query.filter(_user_search_filter(search))
+        
+        page = keyset_page(query, User, sort=sort, descending=False, after=after, before=before, limit=limit)
+        
+        return templates.TemplateResponse("admin/users_list.html", {"request": request, "users": page["items"], "page": page, "q": search})
+    except Exception as e:
+        logger.error(f"❌ Kritická chyba v admin_list_users: {e}")
+        session.rollback() # Důležitý rollback
+        
+        # Fallback - prázdný seznam
+        return templates.TemplateResponse("admin/users_list.html", {"request": request, "users": [], "page": None, "q": q, "error": str(e)})
+    finally:
+        session.close()
+
+@router.get("/users/new", response_class=HTMLResponse, name="admin_new_user_get")
+def admin_new_user_get(request: Request):
+    # Prázdný formulář pro nového uživatele
+    return templates.TemplateResponse("admin/user_form.html", {"request": request, "user": None, "form": {"name": "", "phone": "", "language": "cs", "detail": "", "name.errors": [], "phone.errors": [], "language.errors": [], "detail.errors": []}})
+
+@router.post("/users/new", response_class=HTMLResponse)
+def admin_new_user_post(request: Request, name: str = Form(...), phone: str = Form(...), language: str = Form(...), detail: str = Form("")):
+    errors = {"name": [], "phone": [], "language": [], "detail": []}
+    if not name:
+        errors["name"].append("Jméno je povinné.")
+    if not phone or not (phone.startswith("+420") or phone.startswith("0")) or len(phone.replace(" ", "")) < 9:
+        errors["phone"].append("Telefon musí být ve formátu +420XXXXXXXXX nebo 0XXXXXXXXX")
+    if language not in ["cs", "en"]:
+        errors["language"].append("Neplatný jazyk.")
+    if any(errors.values()):
+        return templates.TemplateResponse("admin/user_form.html", {"request": request, "user": None, "form": {"name": name, "phone": phone, "language": language, "detail": detail, "name.errors": errors["name"], "phone.errors": errors["phone"], "language.errors": errors["language"], "detail.errors": errors["detail"]}})
+    user = User(name=name, phone=phone, language=language, detail=detail)
+    # Dočasně bez current_lesson_level
+    session = SessionLocal()
+    session.add(user)
+    try:
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        form = {"name": name, "phone": phone, "language": language, "detail": detail, "name.errors": [str(e)], "phone.errors": [], "language.errors": [], "detail.errors": []}
+        session.close()
+        return templates.TemplateResponse("admin/user_form.html", {"request": request, "user": None, "form": form})
+    session.close()
+    return RedirectResponse(url="/admin/users", status_code=status.HTTP_302_FOUND)
+
+@router.post("/users/import", response_class=JSONResponse, name="admin_import_users")
+def admin_import_users(
+    file: UploadFile = File(...),
+    batch_size: int = Form(IMPORT_BATCH_SIZE),
+    dry_run: bool = Form(False)
+):
+    """Hromadný import uživatelů z CSV - vrací report s chybami po řádcích"""
+    batch_size = max(1, min(batch_size, 5000))
+    try:
+        lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+        report = import_users_csv(lines, batch_size=batch_size, dry_run=dry_run)
+    except UnicodeDecodeError:
+        return JSONResponse(status_code=400, content={"error": "Soubor musí být CSV v kódování UTF-8"})
+    finally:
+        file.file.close()
+    if report["created"] and not dry_run:
+        dashboard_stats_service.invalidate()
+    return report
+
+@router.get("/users/{id}/edit", response_class=HTMLResponse, name="admin_edit_user_get")
+def admin_edit_user_get(request: Request, id: int = Path(...)):
+    session = SessionLocal()
+    user = session.query(User).get(id)
+    if not user:
+        session.close()
+        return RedirectResponse(url="/admin/users", status_code=status.HTTP_302_FOUND)
+    form = {"name": user.name, "phone": user.phone, "language": user.language, "detail": user.detail, "name.errors": [], "phone.errors": [], "language.errors": [], "detail.errors": []}
+    session.close()
+    return templates.TemplateResponse("admin/user_form.html", {"request": request, "user": user, "form": form})
+
+@router.post("/users/{id}/edit", response_class=HTMLResponse)
+def admin_edit_user_post(request: Request, id: int = Path(...), name: str = Form(...), phone: str = Form(...), language: str = Form(...), detail: str = Form("")):
+    session = SessionLocal()
+    user = session.query(User).get(id)
+    if not user:
+        session.close()
+        return RedirectResponse(url="/admin/users", status_code=status.HTTP_302_FOUND)
+    errors = {"name": [], "phone": [], "language": [], "detail": []}
+    if not name:
+        errors["name"].append("Jméno je povinné.")
+    if not phone or not (phone.startswith("+420") or phone.startswith("0")) or len(phone.replace(" ", "")) < 9:
+        errors["phone"].append("Telefon musí být ve formátu +420XXXXXXXXX nebo 0XXXXXXXXX")
+    if language not in ["cs", "en"]:
+        errors["language"].append("Neplatný jazyk.")
+    if any(errors.values()):
+        form = {"name": name, "phone": phone, "language": language, "detail": detail, "name.errors": errors["name"], "phone.errors": errors["phone"], "language.errors": errors["language"], "detail.errors": errors["detail"]}
+        session.close()
+        return templates.TemplateResponse("admin/user_form.html", {"request": request, "user": user, "form": form})
+    user.name = name
+    user.phone = phone
+    user.language = language
+    user.detail = detail
+    try:
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        form = {"name": name, "phone": phone, "language": language, "detail": detail, "name.errors": [str(e)], "phone.errors": [], "language.errors": [], "detail.errors": []}
+        session.close()
+        return templates.TemplateResponse("admin/user_form.html", {"request": request, "user": user, "form": form})
+    session.close()
+    return RedirectResponse(url="/admin/users", status_code=status.HTTP_302_FOUND)
+
+@router.post("/users/{user_id}/delete", name="admin_delete_user")
+def admin_delete_user(request: Request, user_id: int = Path(...), force: bool = Query(False)):
+    session = SessionLocal()
+    try:
+        user = session.query(User).get(user_id)
+        if not user:
+            logger.warning(f"❌ Pokus o smazání neexistujícího uživatele ID: {user_id}")
+            return templates.TemplateResponse("message.html", {
+                "request": request,
+                "message": f"❌ Uživatel s ID {user_id} nebyl nalezen.",
+                "back_url": "/admin/users",
+                "back_text": "Zpět na uživatele"
+            })
+        
+        # Zkontroluj závislé záznamy
+        test_sessions_count = session.query(TestSession).filter(TestSession.user_id == user_id).count()
+        attempts_count = session.query(Attempt).filter(Attempt.user_id == user_id).count()
+        
+        if (test_sessions_count > 0 or attempts_count > 0) and not force:
+            logger.warning(f"❌ Nelze smazat uživatele {user.name} (ID: {user_id}) - má {test_sessions_count} test sessions a {attempts_count} pokusů")
+            
+            # Nabídni možnost vynutit smazání
+            force_delete_url = f"/admin/users/{user_id}/delete?force=true"
+            return templates.TemplateResponse("message.html", {
+                "request": request,
+                "message": f"❌ Uživatel '{user.name}' má související záznamy:\n\n• {test_sessions_count} aktivních testů\n• {attempts_count} pokusů\n\nChcete pokračovat a smazat uživatele i se všemi souvisejícími záznamy?",
+                "back_url": "/admin/users",
+                "back_text": "Zrušit",
+                "action_url": force_delete_url,
+                "action_text": "Vynutit smazání",
+                "action_class": "btn-danger"
+            })
+        
+        # Pokud force=true, smaž historii po dávkách na pozadí (žádná dlouhá transakce v requestu)
+        if force and (test_sessions_count > 0 or attempts_count > 0):
+            logger.info(f"🔥 VYNUTIT SMAZÁNÍ: Job na pozadí pro {test_sessions_count} test sessions a {attempts_count} pokusů uživatele {user.name}")
+            user_name = user.name
+            session.close()
+            job = create_deletion_job(user_id)
+            start_deletion_job_in_background(job["id"])
+            return templates.TemplateResponse("message.html", {
+                "request": request,
+                "message": f"🗑️ Mazání uživatele '{user_name}' běží na pozadí (job #{job['id']}).\n\nPrůběh: /admin/users/deletion-jobs/{job['id']}",
+                "back_url": "/admin/users",
+                "back_text": "Zpět na uživatele"
+            })
+        
+        # Smazání uživatele
+        user_name = user.name
+        session.delete(user)
+        session.commit()
+        
+        logger.info(f"✅ Uživatel '{user_name}' (ID: {user_id}) byl úspěšně smazán")
+        return templates.TemplateResponse("message.html", {
+            "request": request,
+            "message": f"✅ Uživatel '{user_name}' byl úspěšně smazán.",
+            "back_url": "/admin/users",
+            "back_text": "Zpět na uživatele"
+        })
+        
+    except Exception as e:
+        session.rollback()
+        logger.error(f"❌ Chyba při mazání uživatele ID {user_id}: {str(e)}")
+        return templates.TemplateResponse("message.html", {
+            "request": request,
+            "message": f"❌ Chyba při mazání uživatele: {str(e)}",
+            "back_url": "/admin/users",
+            "back_text": "Zpět na uživatele"
+        })
+    finally:
+        session.close()
+
+@router.post("/users/{user_id}/call", name="admin_call_user")
+def admin_call_user(user_id: int = Path(...)):
+    session = SessionLocal()
+    user = session.query(User).get(user_id)
+    if not user:
+        session.close()
+        return RedirectResponse(url="/admin/users", status_code=status.HTTP_302_FOUND)
+    lesson = session.query(Lesson).filter_by(language=user.language).order_by(Lesson.id.desc()).first()
+    if not lesson:
+        session.close()
+        return RedirectResponse(url="/admin/users", status_code=status.HTTP_302_FOUND)
+    
+    # Vytvoření nového pokusu - volá se hned, next_due nastaví až vyhodnocení (jinak by ho vytočil i plánovač)
+    attempt = Attempt(
+        user_id=user.id,
+        lesson_id=lesson.id,
+        next_due=None
+    )
+    session.add(attempt)
+    session.commit()
+    
+    try:
+        from app.services.twilio_service import TwilioService
+        twilio = TwilioService()
+        base_url = os.getenv("WEBHOOK_BASE_URL", "https://lecture-app-production.up.railway.app")
+        webhook_url = f"{base_url.rstrip('/')}/voice/?attempt_id={attempt.id}"  # ✅ Používám attempt.id
+        logger.info(f"Volám uživatele {user.phone} s webhook URL: {webhook_url}")
+        twilio.call(user.phone, webhook_url)
+    except Exception as e:
+        logger.error(f"Chyba při volání Twilio: {e}")
+    finally:
+        session.close()
+    
+    return RedirectResponse(url="/admin/users", status_code=status.HTTP_302_FOUND)
+
+@router.post("/users/{user_id}/call/lesson/{lesson_number}", name="admin_call_user_lesson")
+def admin_call_user_lesson(user_id: int = Path(...), lesson_number: int = Path(...)):
+    """Zavolá uživateli s konkrétní lekcí podle čísla lekce"""
+    session = SessionLocal()
+    try:
+        user = session.query(User).get(user_id)
+        if not user:
+            return RedirectResponse(url="/admin/users", status_code=status.HTTP_302_FOUND)
+        
+        # Najdi lekci podle čísla - FALLBACK na jakoukoliv lekci
+        lesson = session.query(Lesson).filter_by(
+            lesson_number=lesson_number,
+            language=user.language
+        ).first()
+        
+        # Fallback - pokud není lekce s číslem, vezmi první dostupnou
+        if not lesson:
+            logger.warning(f"Lekce {lesson_number} nenalezena, používám fallback")
+            lesson = session.query(Lesson).filter_by(language=user.language).first()
+        
+        # Fallback - pokud není žádná lekce v jazyce, vezmi první lekci
+        if not lesson:
+            logger.warning(f"Žádná lekce v jazyce {user.language}, používám první dostupnou")
+            lesson = session.query(Lesson).first()
+        
+        if not lesson:
+            logger.error("Žádná lekce v databázi!")
+            return RedirectResponse(url="/admin/users", status_code=status.HTTP_302_FOUND)
+        
+        # Vytvoření nového pokusu - volá se hned, next_due nastaví až vyhodnocení
+        attempt = Attempt(
+            user_id=user.id,
+            lesson_id=lesson.id,
+            next_due=None
+        )
+        session.add(attempt)
+        session.commit()
+        
+        # Volání přes Twilio
+        from app.services.twilio_service import TwilioService
+        twilio = TwilioService()
+        base_url = os.getenv("WEBHOOK_BASE_URL", "https://lecture-app-production.up.railway.app")
+        webhook_url = f"{base_url.rstrip('/')}/voice/?attempt_id={attempt.id}"
+        
+        logger.info(f"Volám uživatele {user.phone} s lekcí {lesson.id} (číslo {lesson_number}): {webhook_url}")
+        twilio.call(user.phone, webhook_url)
+        
+    except Exception as e:
+        logger.error(f"❌ KRITICKÁ CHYBA při volání s lekcí: {e}")
+        import traceback
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        # Fallback na původní funkci
+        return admin_call_user(user_id)
+    finally:
+        session.close()
+    
+    return RedirectResponse(url="/admin/users", status_code=status.HTTP_302_FOUND)
+
+@router.post("/users/{user_id}/advance", name="admin_advance_user")
+def admin_advance_user(user_id: int = Path(...)):
+    """Manuálně posune uživatele do další lekce"""
+    session = SessionLocal()
+    try:
+        user = session.query(User).get(user_id)
+        if not user:
+            return RedirectResponse(url="/admin/users", status_code=status.HTTP_302_FOUND)
+        
+        # Bezpečná kontrola current_lesson_level
+        if not hasattr(user, 'current_lesson_level') or user.current_lesson_level is None:
+            user.current_lesson_level = 0
+        
+        if user.current_lesson_level < 10:
+            user.current_lesson_level += 1
+            
+            # Bezpečné vytvoření progress záznamu
+            try:
+                from app.models import UserProgress
+                progress = UserProgress(
+                    user_id=user.id,
+                    lesson_number=user.current_lesson_level - 1,  # Předchozí lekce je dokončena
+                    is_completed=True,
+                    best_score=95.0,  # Manuální postup = vysoké skóre
+                    attempts_count=1,
+                    first_completed_at=datetime.now()
+                )
+                session.add(progress)
+            except Exception as progress_error:
+                logger.warning(f"Chyba při vytváření progress záznamu: {progress_error}")
+                # Pokračuj bez progress záznamu
+            
+            session.commit()
+            logger.info(f"Uživatel {user.name} manuálně posunut na lekci {user.current_lesson_level}")
+        
+    except Exception as e:
+        logger.error(f"❌ Chyba při posunu uživatele: {e}")
+        import traceback
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        session.rollback()
+    finally:
+        session.close()
+    
+    return RedirectResponse(url="/admin/users", status_code=status.HTTP_302_FOUND)
+
+@router.post("/users/{user_id}/reset-test", name="admin_reset_test")
+def admin_reset_test(user_id: int = Path(...)):
+    """Resetuje test session pro uživatele"""
+    session = SessionLocal()
+    try:
+        # Označ všechny aktivní test sessions jako dokončené; abandoned_at je vyřadí ze statistik (nejde o dokončení testu)
+        active_sessions = session.query(TestSession).filter(
+            TestSession.user_id == user_id,
+            TestSession.is_completed == False,
+            TestSession.abandoned_at.is_(None)
+        ).all()
+        
+        now = datetime.utcnow()
+        for test_session in active_sessions:
+            test_session.is_completed = True
+            test_session.completed_at = now
+            test_session.abandoned_at = now
+        
+        session.commit()
+        logger.info(f"🔄 Admin resetoval test sessions pro uživatele {user_id}")
+        return RedirectResponse(url="/admin/users", status_code=302)
+    finally:
+        session.close()
+
+@router.get("/create-lesson-0", name="admin_create_lesson_0")
+def admin_create_lesson_0(request: Request):
+    """Endpoint pro vytvoření Lekce 0 s 30 základními otázkami"""
+    try:
+        logger.info("🚀 Vytváření Lekce 0...")
+        
+        # 30 základních otázek z obráběcích kapalin a servisu
+        questions = [
+            {
+                "number": 1,
+                "question": "K čemu slouží obráběcí kapaliny při obrábění kovů?",
+                "correct_answer": "K chlazení, mazání a odvodu třísek",
+                "keywords": ["chlazení", "mazání", "třísky", "odvod"],
+                "enabled": True
+            },
+            {
+                "number": 2,
+                "question": "Jaké jsou hlavní typy obráběcích kapalin?",
+                "correct_answer": "Vodní roztoky, oleje a emulze",
+                "keywords": ["vodní", "oleje", "emulze", "typy"],
+                "enabled": True
+            },
+            {
+                "number": 3,
+                "question": "Proč je důležité pravidelně kontrolovat koncentraci emulze?",
+                "correct_answer": "Pro zajištění správné funkce a předcházení bakteriálnímu růstu",
+                "keywords": ["koncentrace", "funkce", "bakterie", "kontrola"],
+                "enabled": True
+            },
+            {
+                "number": 4,
+                "question": "Jak se měří koncentrací obráběcí emulze?",
+                "correct_answer": "Refraktometrem nebo titrací",
+                "keywords": ["refraktometr", "titrace"],
+                "enabled": True
+            },
+            {
+                "number": 5,
+                "question": "Jaká je optimální koncentrace pro většinu obráběcích emulzí?",
+                "correct_answer": "3-8 procent",
+                "keywords": ["3", "8", "procent", "koncentrace"],
+                "enabled": True
+            },
+            {
+                "number": 6,
+                "question": "Co způsobuje pěnění obráběcích kapalin?",
+                "correct_answer": "Vysoká rychlost oběhu, kontaminace nebo špatná koncentrace",
+                "keywords": ["pěnění", "rychlost", "kontaminace", "koncentrace"],
+                "enabled": True
+            },
+            {
+                "number": 7,
+                "question": "Jak často se má měnit obráběcí kapalina?",
+                "correct_answer": "Podle stavu kapaliny, obvykle každé 2-6 měsíců",
+                "keywords": ["měnit", "stav", "měsíc", "pravidelně"],
+                "enabled": True
+            },
+            {
+                "number": 8,
+                "question": "Jaké jsou příznaky zkažené obráběcí kapaliny?",
+                "correct_answer": "Zápach, změna barvy, pěnění nebo růst bakterií",
+                "keywords": ["zápach", "barva", "pěnění", "bakterie"],
+                "enabled": True
+            },
+            {
+                "number": 9,
+                "question": "Co je to pH obráběcí kapaliny a jaká má být hodnota?",
+                "correct_answer": "Míra kyselosti, optimálně 8,5-9,5",
+                "keywords": ["pH", "kyselost", "8,5", "9,5"],
+                "enabled": True
+            },
+            {
+                "number": 10,
+                "question": "Proč je důležité udržovat správné pH?",
+                "correct_answer": "Zabraňuje korozi a růstu bakterií",
+                "keywords": ["koroze", "bakterie", "ochrana"],
+                "enabled": True
+            },
+            {
+                "number": 11,
+                "question": "Jak se připravuje emulze z koncentrátu?",
+                "correct_answer": "Koncentrát se přidává do vody, nikdy naopak",
+                "keywords": ["koncentrát", "voda", "příprava", "pořadí"],
+                "enabled": True
+            },
+            {
+                "number": 12,
+                "question": "Jaká je funkce biocidů v obráběcích kapalinách?",
+                "correct_answer": "Zabíjejí bakterie a houby",
+                "keywords": ["biocidy", "bakterie", "houby", "dezinfekce"],
+                "enabled": True
+            },
+            {
+                "number": 13,
+                "question": "Co způsobuje korozi na obráběcích strojích?",
+                "correct_answer": "Nízké pH, kontaminace nebo stará kapalina",
+                "keywords": ["koroze", "pH", "kontaminace", "stará"],
+                "enabled": True
+            },
+            {
+                "number": 14,
+                "question": "Jak se testuje kvalita obráběcí kapaliny?",
+                "correct_answer": "Měření pH, koncentrace, čistoty a mikrobiologie",
+                "keywords": ["pH", "koncentrace", "čistota", "mikrobiologie"],
+                "enabled": True
+            },
+            {
+                "number": 15,
+                "question": "Jaké jsou bezpečnostní opatření při práci s obráběcími kapalinami?",
+                "correct_answer": "Ochranné rukavice, brýle a větrání",
+                "keywords": ["rukavice", "brýle", "větrání", "ochrana"],
+                "enabled": True
+            },
+            {
+                "number": 16,
+                "question": "Co je filtrace obráběcích kapalin?",
+                "correct_answer": "Odstranění nečistot a částic z kapaliny",
+                "keywords": ["filtrace", "nečistoty", "částice", "čištění"],
+                "enabled": True
+            },
+            {
+                "number": 17,
+                "question": "Proč se obráběcí kapaliny recyklují?",
+                "correct_answer": "Kvůli úspoře nákladů a ochraně životního prostředí",
+                "keywords": ["recyklace", "úspora", "prostředí", "náklady"],
+                "enabled": True
+            },
+            {
+                "number": 18,
+                "question": "Jaká je role aditiv v obráběcích kapalinách?",
+                "correct_answer": "Zlepšují vlastnosti jako mazání, ochranu před korozí",
+                "keywords": ["aditiva", "mazání", "koroze", "vlastnosti"],
+                "enabled": True
+            },
+            {
+                "number": 19,
+                "question": "Co je to EP přísada?",
+                "correct_answer": "Extreme Pressure - přísada pro vysoké tlaky",
+                "keywords": ["EP", "extreme", "pressure", "tlak"],
+                "enabled": True
+            },
+            {
+                "number": 20,
+                "question": "Jak se likvidují použité obráběcí kapaliny?",
+                "correct_answer": "Jako nebezpečný odpad ve specializovaných firmách",
+                "keywords": ["likvidace", "nebezpečný", "odpad", "specializované"],
+                "enabled": True
+            },
+            {
+                "number": 21,
+                "question": "Co způsobuje bakteriální růst v obráběcích kapalinách?",
+                "correct_answer": "Vysoká teplota, nízké pH nebo kontaminace",
+                "keywords": ["bakterie", "teplota", "pH", "kontaminace"],
+                "enabled": True
+            },
+            {
+                "number": 22,
+                "question": "Jaké jsou výhody syntetických obráběcích kapalin?",
+                "correct_answer": "Delší životnost, lepší čistota a stabilita",
+                "keywords": ["syntetické", "životnost", "čistota", "stabilita"],
+                "enabled": True
+            },
+            {
+                "number": 23,
+                "question": "Co je to mazací film?",
+                "correct_answer": "Tenká vrstva kapaliny mezi nástrojem a obrobkem",
+                "keywords": ["mazací", "film", "vrstva", "nástroj"],
+                "enabled": True
+            },
+            {
+                "number": 24,
+                "question": "Proč je důležité chlazení při obrábění?",
+                "correct_answer": "Zabraňuje přehřátí nástroje a obrobku",
+                "keywords": ["chlazení", "přehřátí", "nástroj", "obrobek"],
+                "enabled": True
+            },
+            {
+                "number": 25,
+                "question": "Co je to tramp oil?",
+                "correct_answer": "Cizí olej kontaminující obráběcí kapalinu",
+                "keywords": ["tramp", "oil", "cizí", "kontaminace"],
+                "enabled": True
+            },
+            {
+                "number": 26,
+                "question": "Jak se odstraňuje tramp oil?",
+                "correct_answer": "Skimmerem nebo separátorem oleje",
+                "keywords": ["skimmer", "separátor", "odstranění"],
+                "enabled": True
+            },
+            {
+                "number": 27,
+                "question": "Jaká je optimální teplota obráběcích kapalin?",
+                "correct_answer": "20-35 stupňů Celsia",
+                "keywords": ["teplota", "20", "35", "Celsius"],
+                "enabled": True
+            },
+            {
+                "number": 28,
+                "question": "Co je to centrální systém obráběcích kapalin?",
+                "correct_answer": "Systém zásobující více strojů z jednoho zdroje",
+                "keywords": ["centrální", "systém", "více", "strojů"],
+                "enabled": True
+            },
+            {
+                "number": 29,
+                "question": "Proč se kontroluje tvrdost vody pro přípravu emulzí?",
+                "correct_answer": "Tvrdá voda může způsobit nestabilitu emulze",
+                "keywords": ["tvrdost", "voda", "nestabilita", "emulze"],
+                "enabled": True
+            },
+            {
+                "number": 30,
+                "question": "Co jsou to MWF (Metalworking Fluids)?",
+                "correct_answer": "Obecný název pro všechny obráběcí kapaliny",
+                "keywords": ["MWF", "metalworking", "fluids", "obecný"],
+                "enabled": True
+            }
+        ]
+        
+        session = SessionLocal()
+        
+        # Zkontroluj, jestli už Lekce 0 neexistuje
+        existing_lesson = session.query(Lesson).filter(Lesson.title.contains("Lekce 0")).first()
+        if existing_lesson:
+            session.close()
+            return templates.TemplateResponse("message.html", {
+                "request": request,
+                "message": f"✅ Lekce 0 již existuje! (ID: {existing_lesson.id})",
+                "back_url": "/admin/lessons",
+                "back_text": "Zpět na lekce"
+            })
+        
+        # Vytvoř novou lekci
+        lesson = Lesson(
+            title="Lekce 0: Vstupní test - Obráběcí kapaliny a servis",
+            description="Základní test znalostí z oboru obráběcích kapalin a jejich servisu. Nutné dosáhnout 90% úspěšnosti pro postup do Lekce 1.",
+            language="cs",
+            script="",  # Prázdný script pro vstupní test
+            questions=questions,
+            level="entry_test"
+        )
+        
+        session.add(lesson)
+        session.commit()
+        
+        lesson_id = lesson.id
+        session.close()
+        
+        logger.info(f"✅ Lekce 0 vytvořena s ID: {lesson_id}")
+        
+        return templates.TemplateResponse("message.html", {
+            "request": request,
+            "message": f"🎉 Lekce 0 úspěšně vytvořena!\n\n📝 ID: {lesson_id}\n📚 30 otázek z obráběcích kapalin\n🎯 Úroveň: Vstupní test",
+            "back_url": "/admin/lessons",
+            "back_text": "Zobrazit všechny lekce"
+        })
+        
+    except Exception as e:
+        logger.error(f"❌ Chyba při vytváření Lekce 0: {e}")
+        return templates.TemplateResponse("message.html", {
+            "request": request,
+            "message": f"❌ Chyba při vytváření Lekce 0: {str(e)}",
+            "back_url": "/admin/lessons",
+            "back_text": "Zpět na lekce"
+        })
+
+@router.get("/lessons", response_class=HTMLResponse, name="admin_list_lessons")
+def admin_list_lessons(
+    request: Request,
+    q: str = Query("", max_length=100),
+    sort: str = Query("id", pattern="^(id|created_at)$"),
+    after: Optional[str] = Query(None),
+    before: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    session = ReadSessionLocal()
+    try:
+        # Jen sloupce potřebné pro tabulku - bez script (Text) a questions (JSON)
+        query = session.query(
+            Lesson.id,
+            Lesson.title,
+            Lesson.language,
+            Lesson.level,
+            Lesson.lesson_number,
+            Lesson.lesson_type,
+            Lesson.created_at
+        )
+        
+        search = q.strip()
+        if search:
+            query = query.filter(func.lower(Lesson.title).like(like_prefix(search.lower()), escape=LIKE_ESCAPE))
+        
+        page = keyset_page(query, Lesson, sort=sort, descending=True, after=after, before=before, limit=limit)
+        logger.info(f"✅ Načteno {len(page['items'])} lekcí.")
+        
+        return templates.TemplateResponse("admin/lessons_list.html", {"request": request, "lessons": page["items"], "page": page, "q": search})
+        
+    except Exception as e:
+        logger.error(f"❌ KRITICKÁ CHYBA při načítání lekcí: {e}")
+        session.rollback()  # Důležitý rollback pro vyčištění session
+        
+        return templates.TemplateResponse("message.html", {
+            "request": request,
+            "message": f"❌ Databázová chyba při načítání lekcí.\n\nChyba: {str(e)}\n\nZkuste obnovit stránku za chvíli.",
+            "back_url": "/admin/dashboard",
+            "back_text": "Zpět na dashboard"
+        })
+    finally:
+        session.close()
+
+@router.get("/lessons/new", response_class=HTMLResponse, name="admin_new_lesson_get")
+def admin_new_lesson_get(request: Request):
+    form = {
+        "title": "", "language": "cs", "script": "", "questions": "",
+        "description": "", "lesson_number": "0", "lesson_type": "standard", "required_score": "90.0",
+        "title.errors": [], "language.errors": [], "script.errors": [], "questions.errors": [],
+        "description.errors": [], "lesson_number.errors": [], "lesson_type.errors": [], "required_score.errors": []
+    }
+    return templates.TemplateResponse("admin/lesson_form.html", {"request": request, "lesson": None, "form": form})
+
+@router.post("/lessons/new", response_class=HTMLResponse)
+async def admin_new_lesson_post(request: Request):
+    try:
+        form_data = await request.form()
+        
+        title = form_data.get("title", "")
+        language = form_data.get("language", "cs")
+        script = form_data.get("script", "")
+        questions = form_data.get("questions", "")
+        description = form_data.get("description", "")
+        lesson_number = form_data.get("lesson_number", "0")
+        lesson_type = form_data.get("lesson_type", "standard")
+        required_score = form_data.get("required_score", "90.0")
+        
+        errors = {"title": [], "language": [], "script": [], "questions": [], "lesson_number": [], "lesson_type": [], "required_score": [], "description": []}
+        
+        # Validace
+        if not title:
+            errors["title"].append("Název je povinný.")
+        if language not in ["cs", "en"]:
+            errors["language"].append("Neplatný jazyk.")
+        if not script:
+            errors["script"].append("Skript je povinný.")
+        
+        # Validace lesson_number
+        try:
+            lesson_number_int = int(lesson_number)
+            if lesson_number_int < 0 or lesson_number_int > 100:
+                errors["lesson_number"].append("Číslo lekce musí být mezi 0-100.")
+        except ValueError:
+            errors["lesson_number"].append("Číslo lekce musí být číslo.")
+            lesson_number_int = 0
+        
+        # Validace required_score
+        try:
+            required_score_float = float(required_score)
+            if required_score_float < 0 or required_score_float > 100:
+                errors["required_score"].append("Skóre musí být mezi 0-100%.")
+        except ValueError:
+            errors["required_score"].append("Skóre musí být číslo.")
+            required_score_float = 90.0
+        
+        if lesson_type not in ["entry_test", "standard", "advanced"]:
+            errors["lesson_type"].append("Neplatný typ lekce.")
+        
+        if any(errors.values()):
+            form = {
+                "title": title, "language": language, "script": script, "questions": questions,
+                "description": description, "lesson_number": lesson_number, "lesson_type": lesson_type, 
+                "required_score": required_score,
+                "title.errors": errors["title"], "language.errors": errors["language"], 
+                "script.errors": errors["script"], "questions.errors": errors["questions"],
+                "description.errors": errors["description"], "lesson_number.errors": errors["lesson_number"],
+                "lesson_type.errors": errors["lesson_type"], "required_score.errors": errors["required_score"]
+            }
+            return templates.TemplateResponse("admin/lesson_form.html", {"request": request, "lesson": None, "form": form})
+    
+        # Vytvoření lekce
+        lesson = Lesson(
+            title=title,
+            language=language,
+            script=script,
+            questions=questions,
+            description=description,
+            lesson_number=lesson_number_int,
+            lesson_type=lesson_type,
+            required_score=required_score_float
+        )
+        
+        session = SessionLocal()
+        session.add(lesson)
+        try:
+            session.commit()
+            logger.info(f"✅ Nová lekce vytvořena: {title} (číslo={lesson_number_int}, typ={lesson_type})")
+        except Exception as e:
+            session.rollback()
+            form = {
+                "title": title, "language": language, "script": script, "questions": questions,
+                "description": description, "lesson_number": lesson_number, "lesson_type": lesson_type,
+                "required_score": required_score, "title.errors": [str(e)], "language.errors": [], 
+                "script.errors": [], "questions.errors": [], "description.errors": [], 
+                "lesson_number.errors": [], "lesson_type.errors": [], "required_score.errors": []
+            }
+            session.close()
+            return templates.TemplateResponse("admin/lesson_form.html", {"request": request, "lesson": None, "form": form})
+        session.close()
+        return RedirectResponse(url="/admin/lessons", status_code=status.HTTP_302_FOUND)
+        
+    except Exception as e:
+        logger.error(f"❌ Chyba při vytváření lekce: {e}")
+        form = {
+            "title": "", "language": "cs", "script": "", "questions": "",
+            "description": "", "lesson_number": "0", "lesson_type": "standard", "required_score": "90.0",
+            "title.errors": [f"Chyba: {str(e)}"], "language.errors": [], "script.errors": [], "questions.errors": [],
+            "description.errors": [], "lesson_number.errors": [], "lesson_type.errors": [], "required_score.errors": []
+        }
+        return templates.TemplateResponse("admin/lesson_form.html", {"request": request, "lesson": None, "form": form})
+
+@router.get("/lessons/{id}/edit", response_class=HTMLResponse, name="admin_edit_lesson_get")
+def admin_edit_lesson_get(request: Request, id: int = Path(...)):
+    session = SessionLocal()
+    lesson = session.query(Lesson).get(id)
+    if not lesson:
+        session.close()
+        return RedirectResponse(url="/admin/lessons", status_code=status.HTTP_302_FOUND)
+    
+    # Pro Lekci 0 a nové lekce s otázkami použij novou template
+    if lesson.title.startswith("Lekce 0") or (lesson.questions and isinstance(lesson.questions, list) and len(lesson.questions) > 0 and isinstance(lesson.questions[0], dict)):
+        session.close()
+        return templates.TemplateResponse("admin/lesson_edit.html", {"request": request, "lesson": lesson})
+    
+    # Pro staré lekce použij původní template s novými poli
+    form = {
+        "title": lesson.title, 
+        "language": lesson.language, 
+        "script": lesson.script, 
+        "questions": lesson.questions,
+        "description": getattr(lesson, 'description', ''),
+        "lesson_number": getattr(lesson, 'lesson_number', 0),
+        "lesson_type": getattr(lesson, 'lesson_type', 'standard'),
+        "required_score": getattr(lesson, 'required_score', 90.0),
+        "title.errors": [], "language.errors": [], "script.errors": [], "questions.errors": [],
+        "description.errors": [], "lesson_number.errors": [], "lesson_type.errors": [], "required_score.errors": []
+    }
+    session.close()
+    return templates.TemplateResponse("admin/lesson_form.html", {"request": request, "lesson": lesson, "form": form})
+
+@router.post("/lessons/{id}/edit", response_class=HTMLResponse)
+async def admin_edit_lesson_post(request: Request, id: int = Path(...)):
+    session = SessionLocal()
+    lesson = session.query(Lesson).get(id)
+    if not lesson:
+        session.close()
+        return RedirectResponse(url="/admin/lessons", status_code=status.HTTP_302_FOUND)
+    
+    try:
+        form_data = await request.form()
+        
+        # Pro Lekci 0 a nové lekce s otázkami
+        if lesson.title.startswith("Lekce 0") or (lesson.questions and isinstance(lesson.questions, list) and len(lesson.questions) > 0 and isinstance(lesson.questions[0], dict)):
+            title = form_data.get("title", "")
+            description = form_data.get("description", "")
+            level = form_data.get("level", "beginner")
+            enabled_questions = form_data.getlist("enabled_questions")
+            
+            logger.info(f"🔍 DEBUG: Přijato {len(enabled_questions)} aktivních otázek: {enabled_questions}")
+            
+            if not title:
+                session.close()
+                return templates.TemplateResponse("admin/lesson_edit.html", {
+                    "request": request, 
+                    "lesson": lesson, 
+                    "error": "Název je povinný."
+                })
+            
+            # Aktualizuj základní info
+            lesson.title = title
+            lesson.description = description
+            lesson.level = level
+            
+            # Aktualizuj enabled stav otázek
+            if lesson.questions and isinstance(lesson.questions, list):
+                logger.info(f"🔍 DEBUG: Aktualizuji {len(lesson.questions)} otázek")
+                for i, question in enumerate(lesson.questions):
+                    if isinstance(question, dict):
+                        old_enabled = question.get('enabled', True)
+                        new_enabled = str(i) in enabled_questions
+                        question['enabled'] = new_enabled
+                        logger.info(f"🔍 DEBUG: Otázka {i}: {old_enabled} → {new_enabled}")
+                
+                # KRITICKÉ: Oznám SQLAlchemy, že se JSON sloupec změnil
+                from sqlalchemy.orm.attributes import flag_modified
+                flag_modified(lesson, 'questions')
+                logger.info("🔍 DEBUG: flag_modified() zavolán pro questions sloupec")
+            
+            session.commit()
+            logger.info(f"✅ Lekce {lesson.id} aktualizována: {len(enabled_questions)} aktivních otázek")
+            session.close()
+            return RedirectResponse(url="/admin/lessons", status_code=status.HTTP_302_FOUND)
+        
+        # Pro staré lekce - rozšířená logika s novými poli
+        title = form_data.get("title", "")
+        language = form_data.get("language", "cs")
+        script = form_data.get("script", "")
+        questions = form_data.get("questions", "")
+        description = form_data.get("description", "")
+        
+        # Nová pole
+        lesson_number = form_data.get("lesson_number", "0")
+        lesson_type = form_data.get("lesson_type", "standard")
+        required_score = form_data.get("required_score", "90.0")
+        
+        errors = {"title": [], "language": [], "script": [], "questions": [], "lesson_number": [], "lesson_type": [], "required_score": [], "description": []}
+        
+        # Validace
+        if not title:
+            errors["title"].append("Název je povinný.")
+        if language not in ["cs", "en"]:
+            errors["language"].append("Neplatný jazyk.")
+        if not script:
+            errors["script"].append("Skript je povinný.")
+        
+        # Validace lesson_number
+        try:
+            lesson_number_int = int(lesson_number)
+            if lesson_number_int < 0 or lesson_number_int > 100:
+                errors["lesson_number"].append("Číslo lekce musí být mezi 0-100.")
+        except ValueError:
+            errors["lesson_number"].append("Číslo lekce musí být číslo.")
+            lesson_number_int = 0
+        
+        # Validace required_score
+        try:
+            required_score_float = float(required_score)
+            if required_score_float < 0 or required_score_float > 100:
+                errors["required_score"].append("Skóre musí být mezi 0-100%.")
+        except ValueError:
+            errors["required_score"].append("Skóre musí být číslo.")
+            required_score_float = 90.0
+        
+        if lesson_type not in ["entry_test", "standard", "advanced"]:
+            errors["lesson_type"].append("Neplatný typ lekce.")
+        
+        if any(errors.values()):
+            form = {
+                "title": title, "language": language, "script": script, "questions": questions,
+                "description": description, "lesson_number": lesson_number, "lesson_type": lesson_type, 
+                "required_score": required_score,
+                "title.errors": errors["title"], "language.errors": errors["language"], 
+                "script.errors": errors["script"], "questions.errors": errors["questions"],
+                "description.errors": errors["description"], "lesson_number.errors": errors["lesson_number"],
+                "lesson_type.errors": errors["lesson_type"], "required_score.errors": errors["required_score"]
+            }
+            session.close()
+            return templates.TemplateResponse("admin/lesson_form.html", {"request": request, "lesson": lesson, "form": form})
+        
+        # Aktualizace lekce
+        lesson.title = title
+        lesson.language = language
+        lesson.script = script
+        lesson.questions = questions
+        lesson.description = description
+        lesson.lesson_number = lesson_number_int
+        lesson.lesson_type = lesson_type
+        lesson.required_score = required_score_float
+        
+        session.commit()
+        logger.info(f"✅ Lekce {lesson.id} aktualizována: číslo={lesson_number_int}, typ={lesson_type}")
+        
+    except Exception as e:
+        session.rollback()
+        logger.error(f"❌ Chyba při editaci lekce {id}: {e}")
+        session.close()
+        return templates.TemplateResponse("admin/lesson_edit.html", {
+            "request": request, 
+            "lesson": lesson, 
+            "error": f"Chyba při ukládání: {str(e)}"
+        })
+    session.close()
+    return RedirectResponse(url="/admin/lessons", status_code=status.HTTP_302_FOUND)
+
+@router.post("/lessons/{lesson_id}/delete", name="admin_delete_lesson")
+def admin_delete_lesson(lesson_id: int = Path(...)):
+    session = SessionLocal()
+    lesson = session.query(Lesson).get(lesson_id)
+    if lesson:
+        try:
+            session.delete(lesson)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+        finally:
+            session.close()
+    else:
+        session.close()
+    return RedirectResponse(url="/admin/lessons", status_code=status.HTTP_302_FOUND)
+
+@router.post("/lessons/generate-questions", response_class=JSONResponse)
+async def admin_generate_questions(request: Request):
+    import json
+    data = None
+    try:
+        data = await request.json()
+    except Exception:
+        return JSONResponse({"error": "Neplatný JSON"}, status_code=400)
+    script = data.get("script")
+    language = data.get("language", "cs")
+    if not script:
+        return JSONResponse({"error": "Chybí text skriptu"}, status_code=400)
+    try:
+        from app.services.openai_service import OpenAIService
+        openai = OpenAIService()
+        questions = openai.generate_questions(script, language)
+        if not questions:
+            return JSONResponse({"error": "Nepodařilo se vygenerovat otázky. Zkontrolujte OpenAI API klíč."}, status_code=500)
+        return JSONResponse({"questions": questions})
+    except Exception as e:
+        # Simulace pro vývoj bez OpenAI
+        print(f"Chyba při generování otázek: {e}")
+        return JSONResponse({"questions": [{"question": "Ukázková otázka?", "answer": "Ukázková odpověď"}]})
+
+@router.get("/questions/search", response_class=JSONResponse, name="admin_search_questions")
+def admin_search_questions(
+    category: Optional[str] = Query(None, max_length=100),
+    difficulty: Optional[str] = Query(None, pattern="^(easy|medium|hard)$"),
+    enabled: Optional[bool] = Query(None),
+    lesson_id: Optional[int] = Query(None)
+):
+    """Otázky napříč lekcemi podle kategorie/obtížnosti/enabled (na Postgresu jedním dotazem přes GIN index)"""
+    with ReadSessionLocal() as session:
+        questions = find_questions(session, category=category, difficulty=difficulty, enabled=enabled, lesson_id=lesson_id)
+    return {"count": len(questions), "questions": questions}
+
+@router.get("/users/deletion-jobs/{job_id}", response_class=JSONResponse)
+def admin_user_deletion_job(job_id: int = Path(...)):
+    """Průběh mazání uživatele na pozadí (fáze a počty smazaných řádků)"""
+    job = get_deletion_job(job_id)
+    if not job:
+        return JSONResponse(status_code=404, content={"error": f"Job {job_id} nenalezen"})
+    return jsonable_encoder(job)
+
+@router.post("/users/deletion-jobs/resume", response_class=JSONResponse)
+def admin_resume_user_deletion_jobs():
+    """Znovu spustí čekající, selhané a spadlé joby mazání uživatelů"""
+    return {"resumed": resume_stale_deletion_jobs()}
+
+@router.post("/analytics/rebuild", response_class=JSONResponse)
+def admin_rebuild_analytics(batch_size: int = Query(500, ge=1, le=10000)):
+    """Přepočítá analytické rollupy (question_stats, category_stats) z historie sessions"""
+    try:
+        result = rebuild_rollups(batch_size=batch_size)
+        dashboard_stats_service.invalidate()
+        return {"status": "completed", **result}
+    except Exception as e:
+        logger.error(f"❌ Chyba při přepočtu rollupů: {e}")
+        return JSONResponse(status_code=500, content={"status": "error", "error": str(e)})
+
+@router.post("/analytics/review-states/recompute", response_class=JSONResponse)
+def admin_recompute_review_states(user_batch_size: int = Query(500, ge=1, le=10000)):
+    """Přepočítá spaced-repetition stavy všech uživatelů z historie sessions a přeplánuje pokusy"""
+    from app.services.spaced_repetition import recompute_review_states  # NumPy až při prvním použití
+    try:
+        return {"status": "completed", **recompute_review_states(user_batch_size=user_batch_size)}
+    except Exception as e:
+        logger.error(f"❌ Chyba při přepočtu review stavů: {e}")
+        return JSONResponse(status_code=500, content={"status": "error", "error": str(e)})
+
+@router.post("/sessions/archive", response_class=JSONResponse, name="admin_archive_sessions")
+def admin_archive_sessions(
+    older_than_days: int = Query(ARCHIVE_AFTER_DAYS, ge=1),
+    batch_size: int = Query(500, ge=1, le=5000),
+    max_batches: Optional[int] = Query(None, ge=1)
+):
+    """Přesune dokončené sessions starší než N dní do archivu (v test_sessions zůstane souhrn)"""
+    try:
+        result = archive_completed_sessions(older_than_days=older_than_days, batch_size=batch_size,
+                                            max_batches=max_batches)
+        return {"status": "completed", **result}
+    except Exception as e:
+        logger.error(f"❌ Chyba při archivaci sessions: {e}")
+        return JSONResponse(status_code=500, content={"status": "error", "error": str(e)})
+
+@router.post("/sessions/sweep-abandoned", response_class=JSONResponse, name="admin_sweep_abandoned_sessions")
+def admin_sweep_abandoned_sessions(ttl_minutes: int = Query(SESSION_IDLE_TTL_MINUTES, ge=1)):
+    """Označí nedokončené sessions nečinné déle než TTL jako opuštěné (jinak dělá scheduler periodicky)"""
+    try:
+        return {"status": "completed", **sweep_abandoned_sessions(ttl_minutes=ttl_minutes)}
+    except Exception as e:
+        logger.error(f"❌ Chyba při úklidu opuštěných sessions: {e}")
+        return JSONResponse(status_code=500, content={"status": "error", "error": str(e)})
+
+@router.get("/analytics/trends", response_class=JSONResponse)
+def admin_analytics_trends(
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    granularity: str = Query("week", pattern="^(day|week)$"),
+    lesson_id: Optional[int] = Query(None)
+):
+    """Trendy výkonu za libovolný rozsah dat (čte předagregované buckety)"""
+    try:
+        start = datetime.strptime(date_from, "%Y-%m-%d").date() if date_from else None
+        end = datetime.strptime(date_to, "%Y-%m-%d").date() if date_to else None
+    except ValueError:
+        return JSONResponse(status_code=400, content={"error": "Datum musí být ve formátu YYYY-MM-DD"})
+    try:
+        stats_generator = DashboardStats()
+        return stats_generator.get_user_performance_trends(start=start, end=end, granularity=granularity, lesson_id=lesson_id)
+    except Exception as e:
+        logger.error(f"❌ Chyba při analýze trendů: {e}")
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+@router.post("/analytics/trends/backfill", response_class=JSONResponse)
+def admin_backfill_trends(since: Optional[str] = Query(None), batch_size: int = Query(500, ge=1, le=10000)):
+    """Přepočítá časové rollupy z dokončených sessions (celá historie nebo od data `since`)"""
+    try:
+        since_date = datetime.strptime(since, "%Y-%m-%d").date() if since else None
+        result = backfill_trend_rollups(since=since_date, batch_size=batch_size)
+        dashboard_stats_service.invalidate("performance_trends")
+        return {"status": "completed", **result}
+    except Exception as e:
+        logger.error(f"❌ Chyba při backfillu trendů: {e}")
+        return JSONResponse(status_code=500, content={"status": "error", "error": str(e)})
+
+@router.get("/export/results", name="admin_export_results")
+def admin_export_results(
+    export_format: str = Query("csv", alias="format", pattern="^(csv|parquet)$"),
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    lesson_id: Optional[int] = Query(None)
+):
+    """Streamovaný export sessions a odpovědí (CSV nebo Parquet) s filtrem data a lekce"""
+    try:
+        start = datetime.strptime(date_from, "%Y-%m-%d").date() if date_from else None
+        end = datetime.strptime(date_to, "%Y-%m-%d").date() if date_to else None
+    except ValueError:
+        return JSONResponse(status_code=400, content={"error": "Datum musí být ve formátu YYYY-MM-DD"})
+
+    # Tělo se generuje až po návratu z middleware (mimo prefer_primary) - zdroj se volí teď
+    rows = iter_export_rows(start=start, end=end, lesson_id=lesson_id, session_factory=ReadSessionLocal.pinned())
+    filename = export_filename(export_format, start, end, lesson_id)
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    logger.info(f"📤 Export výsledků: {filename}")
+
+    if export_format == "parquet":
+        try:
+            check_parquet_available()
+        except ExportUnavailableError as e:
+            return JSONResponse(status_code=501, content={"error": str(e)})
+        return StreamingResponse(stream_parquet(rows), media_type="application/vnd.apache.parquet", headers=headers)
+    return StreamingResponse(stream_csv(rows), media_type="text/csv; charset=utf-8", headers=headers)
+
+@router.get("/campaigns", response_class=HTMLResponse, name="admin_list_campaigns")
+def admin_list_campaigns(
+    request: Request,
+    after: Optional[str] = Query(None),
+    before: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    """Seznam volacích kampaní s průběhem a formulář pro novou kampaň"""
+    session = SessionLocal()
+    try:
+        query = session.query(
+            Campaign.id, Campaign.name, Campaign.status, Campaign.stats,
+            Campaign.max_concurrent_calls, Campaign.created_at, Lesson.title.label("lesson_title")
+        ).join(Lesson, Lesson.id == Campaign.lesson_id)
+        page = keyset_page(query, Campaign, sort="id", descending=True, after=after, before=before, limit=limit)
+        lessons = session.query(Lesson.id, Lesson.title).order_by(Lesson.lesson_number, Lesson.id).all()
+        return templates.TemplateResponse("admin/campaigns.html", {
+            "request": request, "campaigns": page["items"], "page": page, "lessons": lessons
+        })
+    except Exception as e:
+        logger.error(f"❌ Chyba při načítání kampaní: {e}")
+        return templates.TemplateResponse("message.html", {
+            "request": request,
+            "message": f"❌ Chyba při načítání kampaní: {str(e)}",
+            "back_url": "/admin/dashboard",
+            "back_text": "Zpět na dashboard"
+        })
+    finally:
+        session.close()
+
+@router.post("/campaigns", name="admin_create_campaign")
+def admin_create_campaign(
+    request: Request,
+    name: str = Form(...),
+    lesson_id: int = Form(...),
+    language: str = Form(""),
+    lesson_level: Optional[str] = Form(None),
+    user_ids: str = Form(""),
+    calls_per_second: float = Form(1.0),
+    max_concurrent_calls: int = Form(5),
+    max_retries: int = Form(2),
+    retry_delay_minutes: int = Form(10)
+):
+    """Založí kampaň a zařadí hovory pro vybranou kohortu (spouští se zvlášť)"""
+    session = SessionLocal()
+    try:
+        ids = [int(part) for part in user_ids.replace(";", ",").split(",") if part.strip()]
+        campaign = create_campaign(
+            session,
+            name=name.strip(),
+            lesson_id=lesson_id,
+            language=language or None,
+            lesson_level=int(lesson_level) if lesson_level not in (None, "") else None,
+            user_ids=ids or None,
+            calls_per_second=max(0.1, min(calls_per_second, 10.0)),
+            max_concurrent_calls=max(1, min(max_concurrent_calls, 100)),
+            max_retries=max(0, min(max_retries, 10)),
+            retry_delay_seconds=max(1, retry_delay_minutes) * 60,
+        )
+        logger.info(f"✅ Kampaň {campaign.id} vytvořena")
+        return RedirectResponse(url="/admin/campaigns", status_code=status.HTTP_302_FOUND)
+    except Exception as e:
+        session.rollback()
+        logger.error(f"❌ Chyba při vytváření kampaně: {e}")
+        return templates.TemplateResponse("message.html", {
+            "request": request,
+            "message": f"❌ Kampaň se nepodařilo vytvořit: {str(e)}",
+            "back_url": "/admin/campaigns",
+            "back_text": "Zpět na kampaně"
+        })
+    finally:
+        session.close()
+
+@router.post("/campaigns/{campaign_id}/start", name="admin_start_campaign")
+def admin_start_campaign(campaign_id: int = Path(...)):
+    start_campaign(campaign_id)
+    return RedirectResponse(url="/admin/campaigns", status_code=status.HTTP_302_FOUND)
+
+@router.post("/campaigns/{campaign_id}/pause", name="admin_pause_campaign")
+def admin_pause_campaign(campaign_id: int = Path(...)):
+    set_campaign_status(campaign_id, "paused")
+    return RedirectResponse(url="/admin/campaigns", status_code=status.HTTP_302_FOUND)
+
+@router.post("/campaigns/{campaign_id}/cancel", name="admin_cancel_campaign")
+def admin_cancel_campaign(campaign_id: int = Path(...)):
+    set_campaign_status(campaign_id, "cancelled")
+    return RedirectResponse(url="/admin/campaigns", status_code=status.HTTP_302_FOUND)
+
+@router.get("/campaigns/{campaign_id}/stats", response_class=JSONResponse, name="admin_campaign_stats")
+def admin_campaign_stats(campaign_id: int = Path(...)):
+    """Aktuální počty hovorů kampaně podle stavu"""
+    session = SessionLocal()
+    try:
+        campaign = session.get(Campaign, campaign_id)
+        if not campaign:
+            return JSONResponse(status_code=404, content={"error": f"Kampaň {campaign_id} nenalezena"})
+        return jsonable_encoder({
+            "id": campaign.id,
+            "name": campaign.name,
+            "status": campaign.status,
+            "started_at": campaign.started_at,
+            "completed_at": campaign.completed_at,
+            "stats": campaign_stats(session, campaign_id),
+        })
+    finally:
+        session.close()
+
+@router.get("/calls/latency", response_class=HTMLResponse, name="admin_call_latency")
+def admin_call_latency(request: Request, call_sid: Optional[str] = Query(None)):
+    """Rozpad latence posledních hovorů po fázích (DB, GPT, ukládání, TwiML) z trace bufferu"""
+    turns = [{"trace": trace, "spans": trace_tree(trace)} for trace in recent_traces(call_sid)] if call_sid else []
+    return templates.TemplateResponse("admin/call_latency.html", {
+        "request": request,
+        "calls": call_latency_summary(),
+        "call_sid": call_sid,
+        "turns": turns,
+        "buffer_size": TRACE_BUFFER_SIZE
+    })
+
+@router.get("/openai-usage", response_class=HTMLResponse, name="admin_openai_usage")
+def admin_openai_usage(request: Request, days: int = Query(COST_WINDOW_DAYS, ge=1, le=90)):
+    """Denní odhad nákladů na OpenAI s rozpadem podle místa volání a modelu"""
+    try:
+        usage = daily_usage(days=days)
+    except Exception as e:
+        logger.error(f"❌ Chyba při načítání spotřeby OpenAI: {e}")
+        return templates.TemplateResponse("message.html", {
+            "request": request,
+            "message": f"❌ Chyba při načítání spotřeby OpenAI: {str(e)}",
+            "back_url": "/admin/dashboard",
+            "back_text": "Zpět na přehled"
+        })
+    return templates.TemplateResponse("admin/openai_usage.html", {
+        "request": request,
+        "usage": usage,
+        "days": days,
+        "total_cost": sum(day["cost_usd"] for day in usage)
+    })
+
+# NOVÉ ADMIN ENDPOINTY - MUSÍ BÝT PŘED REGISTRACÍ ROUTERU
+
+@router.get("/create-lesson-1", name="admin_create_lesson_1")
+def admin_create_lesson_1(request: Request):
+    """Endpoint pro vytvoření Lekce 1 - Základy obráběcích kapalin"""
+    try:
+        logger.info("🚀 Vytváření Lekce 1...")
+        
+        session = SessionLocal()
+        
+        # Zkontroluj, jestli už lekce 1 existuje
+        existing_lesson = session.query(Lesson).filter(
+            Lesson.title.contains("Lekce 1")
+        ).first()
+        
+        if existing_lesson:
+            session.close()
+            return templates.TemplateResponse("message.html", {
+                "request": request,
+                "message": f"✅ Lekce 1 již existuje! (ID: {existing_lesson.id})",
+                "back_url": "/admin/lessons",
+                "back_text": "Zpět na lekce"
+            })
+        
+        # Obsah lekce 1 - Základy obráběcích kapalin
+        lesson_script = """
+# Lekce 1: Základy obráběcích kapalin
+
+## Úvod
+Obráběcí kapaliny jsou nezbytnou součástí moderního obrábění kovů. Jejich správné použití a údržba výrazně ovlivňuje kvalitu výroby, životnost nástrojů a bezpečnost práce.
+
+## Hlavní funkce obráběcích kapalin
+
+### 1. Chlazení
+- Odvod tepla vznikajícího při řezném procesu
+- Zabránění přehřátí nástroje a obrobku
+- Udržení stálé teploty řezné hrany
+
+### 2. Mazání
+- Snížení tření mezi nástrojem a obrobkem
+- Zlepšení kvality povrchu
+- Prodloužení životnosti nástroje
+
+### 3. Odvod třísek
+- Transport třísek pryč z místa řezu
+- Zabránění zanášení nástroje
+- Udržení čistoty řezné zóny
+
+## Typy obráběcích kapalin
+
+### Řezné oleje
+- Vysoká mazací schopnost
+- Použití při těžkém obrábění
+- Nevhodné pro vysoké rychlosti
+
+### Emulze (směsi oleje a vody)
+- Kombinace mazání a chlazení
+- Nejčastěji používané
+- Koncentrace 3-8%
+
+### Syntetické kapaliny
+- Bez oleje, pouze chemické přísady
+- Výborné chladicí vlastnosti
+- Dlouhá životnost
+
+## Kontrola a údržba
+
+### Denní kontrola
+- Měření koncentrace refraktometrem
+- Kontrola pH hodnoty (8,5-9,5)
+- Vizuální kontrola čistoty
+
+### Týdenní údržba
+- Doplnění kapaliny
+- Odstranění nečistot
+- Kontrola bakteriální kontaminace
+
+### Měsíční servis
+- Výměna filtrů
+- Hloubková analýza
+- Případná regenerace
+
+## Bezpečnost
+- Používání ochranných pomůcek
+- Prevence kontaktu s kůží
+- Správné skladování a likvidace
+
+## Závěr
+Správná práce s obráběcími kapalinami je základem efektivního obrábění. Pravidelná kontrola a údržba zajišťuje optimální výkon a bezpečnost provozu.
+        """
+        
+        # Vytvoř lekci 1
+        lesson = Lesson(
+            title="Lekce 1: Základy obráběcích kapalin",
+            description="Komplexní úvod do problematiky obráběcích kapalin - funkce, typy, kontrola a údržba.",
+            language="cs",
+            script=lesson_script,
+            questions=[],  # Otázky se budou generovat dynamicky
+            level="beginner"
+        )
+        
+        session.add(lesson)
+        session.commit()
+        lesson_id = lesson.id
+        session.close()
+        
+        logger.info(f"✅ Lekce 1 vytvořena s ID: {lesson_id}")
+        
+        return templates.TemplateResponse("message.html", {
+            "request": request,
+            "message": f"🎉 Lekce 1 úspěšně vytvořena!\n\n📝 ID: {lesson_id}\n📚 Obsah: Základy obráběcích kapalin\n🎯 Úroveň: Začátečník\n\n⚡ Otázky se generují automaticky při testování!",
+            "back_url": "/admin/lessons",
+            "back_text": "Zobrazit všechny lekce"
+        })
+        
+    except Exception as e:
+        logger.error(f"❌ Chyba při vytváření Lekce 1: {e}")
+        return templates.TemplateResponse("message.html", {
+            "request": request,
+            "message": f"❌ Chyba při vytváření Lekce 1: {str(e)}",
+            "back_url": "/admin/lessons",
+            "back_text": "Zpět na lekce"
+        })
+
+@router.get("/user-progress", response_class=HTMLResponse, name="admin_user_progress")
+def admin_user_progress(
+    request: Request,
+    after: Optional[str] = Query(None),
+    before: Optional[str] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    """Zobrazí pokrok uživatelů (stránkovaně, jedním agregačním dotazem)"""
+    session = ReadSessionLocal()
+    try:
+        page = get_user_progress_page(session, after=after, before=before, limit=limit)
+        return templates.TemplateResponse("admin/user_progress.html", {
+            "request": request, 
+            "progress_data": page["items"],
+            "page": page
+        })
+        
+    except Exception as e:
+        logger.error(f"❌ Chyba při načítání pokroku: {e}")
+        return templates.TemplateResponse("message.html", {
+            "request": request,
+            "message": f"❌ Chyba při načítání pokroku uživatelů: {str(e)}",
+            "back_url": "/admin/users",
+            "back_text": "Zpět na uživatele"
+        })
+    finally:
+        session.close()
+
+@router.get("/lesson-0-questions", response_class=HTMLResponse, name="admin_lesson_0_questions")
+def admin_lesson_0_questions(request: Request):
+    """Zobrazení a editace otázek vstupního testu (Lekce 0)"""
+    session = SessionLocal()
+    try:
+        # Najdi Lekci 0
+        lesson_0 = session.query(Lesson).filter(Lesson.lesson_number == 0).first()
+        
+        if not lesson_0:
+            return HTMLResponse(content="""
+            <!DOCTYPE html>
+            <html>
+            <head>
+                <title>Správa otázek - Lekce 0</title>
+                <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css" rel="stylesheet">
+            </head>
+            <body>
+                <div class="container mt-4">
+                    <h2>❌ Lekce 0 nebyla nalezena</h2>
+                    <p>Nejprve vytvořte Lekci 0 pomocí <a href="/admin/create-lesson-0">tohoto odkazu</a>.</p>
+                    <a href="/admin" class="btn btn-primary">← Zpět na admin</a>
+                </div>
+            </body>
+            </html>
+            """)
+        
+        questions = lesson_0.questions if isinstance(lesson_0.questions, list) else []
+        
+        # Vytvoření HTML tabulky s otázkami
+        questions_html = ""
+        for i, question in enumerate(questions):
+            if isinstance(question, dict):
+                question_text = question.get('question', 'N/A')
+                correct_answer = question.get('correct_answer', 'N/A')
+                keywords = ', '.join(question.get('keywords', []))
+                enabled = question.get('enabled', True)
+                
+                questions_html += f"""
+                <tr>
+                    <td>{i + 1}</td>
+                    <td>
+                        <textarea class="form-control" name="question_{i}" rows="2">{question_text}</textarea>
+                    </td>
+                    <td>
+                        <textarea class="form-control" name="answer_{i}" rows="2">{correct_answer}</textarea>
+                    </td>
+                    <td>
+                        <input type="text" class="form-control" name="keywords_{i}" value="{keywords}" placeholder="klíčová slova oddělená čárkami">
+                    </td>
+                    <td>
+                        <div class="form-check">
+                            <input class="form-check-input" type="checkbox" name="enabled_{i}" {'checked' if enabled else ''}>
+                        </div>
+                    </td>
+                </tr>
+                """
+        
+        html_content = f"""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <title>Správa otázek - Lekce 0</title>
+            <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css" rel="stylesheet">
+            <script src="https://unpkg.com/htmx.org@1.9.10"></script>
+        </head>
+        <body>
+            <div class="container mt-4">
+                <div class="d-flex justify-content-between align-items-center mb-4">
+                    <h2>📝 Správa otázek - Vstupní test (Lekce 0)</h2>
+                    <a href="/admin" class="btn btn-secondary">← Zpět na admin</a>
+                </div>
+                
+                <div class="alert alert-info">
+                    <strong>💡 Tip:</strong> Můžete upravit otázky, správné odpovědi, klíčová slova a povolit/zakázat otázky.
+                    Klíčová slova oddělujte čárkami (např. "refraktometr, titrace").
+                </div>
+                
+                <form hx-post="/admin/lesson-0-questions" hx-target="#result" class="mb-4">
+                    <div class="table-responsive">
+                        <table class="table table-striped">
+                            <thead class="table-dark">
+                                <tr>
+                                    <th>#</th>
+                                    <th>Otázka</th>
+                                    <th>Správná odpověď</th>
+                                    <th>Klíčová slova</th>
+                                    <th>Povoleno</th>
+                                </tr>
+                            </thead>
+                            <tbody>
+                                {questions_html}
+                            </tbody>
+                        </table>
+                    </div>
+                    
+                    <div class="d-flex gap-2">
+                        <button type="submit" class="btn btn-primary">
+                            💾 Uložit změny
+                        </button>
+                        <a href="/admin/create-lesson-0" class="btn btn-warning">
+                            🔄 Obnovit výchozí otázky
+                        </a>
+                    </div>
+                </form>
+                
+                <div id="result"></div>
+            </div>
+        </body>
+        </html>
+        """
+        
+        return HTMLResponse(content=html_content)
+        
+    except Exception as e:
+        logger.error(f"Chyba při načítání otázek Lekce 0: {e}")
+        return HTMLResponse(content=f"""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <title>Chyba</title>
+            <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css" rel="stylesheet">
+        </head>
+        <body>
+            <div class="container mt-4">
+                <div class="alert alert-danger">
+                    <h4>❌ Chyba při načítání otázek</h4>
+                    <p>{str(e)}</p>
+                </div>
+                <a href="/admin" class="btn btn-primary">← Zpět na admin</a>
+            </div>
+        </body>
+        </html>
+        """)
+    finally:
+        session.close()
+
+@router.post("/lesson-0-questions", response_class=HTMLResponse)
+async def admin_lesson_0_questions_post(request: Request):
+    """Uložení změn v otázkách vstupního testu"""
+    session = SessionLocal()
+    try:
+        form = await request.form()
+        
+        # Najdi Lekci 0
+        lesson_0 = session.query(Lesson).filter(Lesson.lesson_number == 0).first()
+        if not lesson_0:
+            return HTMLResponse(content="<div class='alert alert-danger'>❌ Lekce 0 nebyla nalezena</div>")
+        
+        # Získej aktuální otázky
+        current_questions = lesson_0.questions if isinstance(lesson_0.questions, list) else []
+        updated_questions = []
+        
+        # Zpracuj každou otázku
+        for i, question in enumerate(current_questions):
+            if isinstance(question, dict):
+                # Získej hodnoty z formuláře
+                question_text = form.get(f'question_{i}', question.get('question', ''))
+                correct_answer = form.get(f'answer_{i}', question.get('correct_answer', ''))
+                keywords_str = form.get(f'keywords_{i}', '')
+                enabled = form.get(f'enabled_{i}') == 'on'
+                
+                # Zpracuj klíčová slova
+                keywords = [kw.strip() for kw in keywords_str.split(',') if kw.strip()]
+                
+                # Vytvoř aktualizovanou otázku
+                updated_question = {
+                    'number': i + 1,
+                    'question': question_text,
+                    'correct_answer': correct_answer,
+                    'keywords': keywords,
+                    'enabled': enabled
+                }
+                updated_questions.append(updated_question)
+        
+        # Ulož změny
+        lesson_0.questions = updated_questions
+        session.commit()
+        
+        return HTMLResponse(content=f"""
+        <div class="alert alert-success">
+            ✅ Otázky byly úspěšně uloženy! ({len(updated_questions)} otázek)
+        </div>
+        """)
+        
+    except Exception as e:
+        logger.error(f"Chyba při ukládání otázek Lekce 0: {e}")
+        session.rollback()
+        return HTMLResponse(content=f"""
+        <div class="alert alert-danger">
+            ❌ Chyba při ukládání: {str(e)}
+        </div>
+        """)
+    finally:
+        session.close()
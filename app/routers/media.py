@@ -0,0 +1,813 @@
+"""
+Media Streams a WebSockety: obousměrný audio stream Twilia, TTS a testovací
+WebSocket endpointy. Audio knihovny (pydub, audioop) a OpenAI SDK se importují
+až při prvním použití.
+"""
+
+import asyncio
+import base64
+import io
+import json
+import logging
+import os
+from datetime import datetime
+
+from fastapi import APIRouter, Request, Response, WebSocket, WebSocketDisconnect
+
+from app.database import SessionLocal
+from app.models import Answer, Attempt
+from app.services.openai_client import openai_client
+
+logger = logging.getLogger("uvicorn")
+
+router = APIRouter(tags=["media"])
+
+@router.post("/voice/start-stream/")
+async def voice_start_stream(request: Request):
+    """TwiML odpověď s <Start><Stream> pro Media Streams (obousměrně)."""
+    response = """
+<?xml version="1.0" encoding="UTF-8"?>
+<Response>
+    <Say language="cs-CZ" rate="0.9" voice="Google.cs-CZ-Standard-A">
+        Vítejte u AI asistenta pro výuku jazyků.
+    </Say>
+    <Start>
+        <Stream url="wss://lecture-app-production.up.railway.app/audio" track="both" />
+    </Start>
+</Response>
+"""
+    return Response(content=response, media_type="text/xml")
+
+# Pomocná funkce pro práci s OpenAI Assistant
+async def get_assistant_info(client, assistant_id: str):
+    """Získá informace o OpenAI asistentovi"""
+    try:
+        assistant = await client.beta.assistants.retrieve(assistant_id)
+        logger.info(f"Assistant info - ID: {assistant.id}, Name: {assistant.name}, Model: {assistant.model}")
+        return assistant
+    except Exception as e:
+        logger.error(f"Chyba při získávání informací o asistentovi {assistant_id}: {e}")
+        return None
+
+async def wav_to_mulaw(audio_data: bytes) -> bytes:
+    """Převede WAV audio na μ-law formát pro Twilio"""
+    try:
+        import audioop
+        from pydub import AudioSegment
+        
+        # Načteme WAV audio
+        audio_segment = AudioSegment.from_wav(io.BytesIO(audio_data))
+        
+        # Převedeme na 8kHz mono
+        audio_segment = audio_segment.set_frame_rate(8000).set_channels(1)
+        
+        # Převedeme na μ-law
+        raw_audio = audio_segment.raw_data
+        mulaw_audio = audioop.lin2ulaw(raw_audio, 2)  # 2 bytes per sample
+        
+        return mulaw_audio
+    except Exception as e:
+        logger.error(f"Chyba při převodu WAV na μ-law: {e}")
+        return b""
+
+async def send_tts_to_twilio(websocket: WebSocket, text: str, stream_sid: str, client):
+    """Odešle TTS audio do Twilio WebSocket streamu"""
+    try:
+        # Kontrola jestli je WebSocket stále připojen
+        try:
+            # Ping test pro ověření připojení
+            await websocket.ping()
+            logger.debug("TTS: WebSocket ping OK")
+        except Exception as ping_error:
+            logger.warning(f"TTS: WebSocket ping failed: {ping_error}")
+            logger.warning("WebSocket není připojen, přeskakujem TTS")
+            return
+            
+        logger.info(f"🔊 Generuji TTS pro text: '{text[:50]}...'")
+        
+        # Generace TTS pomocí OpenAI
+        response = client.with_caller("tts").audio.speech.create(
+            model="tts-1",
+            voice="nova",
+            input=text,
+            response_format="wav"
+        )
+        
+        # Převod na G.711 μ-law pro Twilio
+        audio_data = response.content
+        
+        # Zde by měla být konverze na G.711, ale pro jednoduchost použijeme base64
+        import base64
+        audio_b64 = base64.b64encode(audio_data).decode()
+        
+        # Rozdělíme na chunky a pošleme
+        chunk_size = 1000  # Base64 chunky
+        for i in range(0, len(audio_b64), chunk_size):
+            chunk = audio_b64[i:i+chunk_size]
+            
+            media_message = {
+                "event": "media",
+                "streamSid": stream_sid,
+                "media": {
+                    "payload": chunk
+                }
+            }
+            
+            if stream_sid:  # Pouze pokud máme stream_sid
+                await websocket.send_text(json.dumps(media_message))
+                await asyncio.sleep(0.05)  # 50ms mezi chunky
+        
+        logger.info("✅ TTS audio odesláno")
+        
+    except Exception as e:
+        logger.error(f"Chyba při TTS: {e}")
+
+async def process_audio_chunk(websocket: WebSocket, audio_data: bytes, 
+                             stream_sid: str, client, assistant_id: str, thread_id: str):
+    """Zpracuje audio chunk pomocí OpenAI Assistant API v real-time"""
+    try:
+        logger.info(f"🎧 === PROCESS_AUDIO_CHUNK SPUŠTĚN === ({len(audio_data)} bajtů)")
+        
+        if len(audio_data) < 1000:  # Příliš malý chunk, ignorujeme
+            logger.info(f"⚠️ Příliš malý chunk ({len(audio_data)} bajtů), ignoruji")
+            return
+            
+        logger.info(f"🎧 Zpracovávám audio chunk ({len(audio_data)} bajtů)")
+        
+        # Uložíme audio do dočasného souboru
+        import tempfile
+        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_file:
+            logger.info("📁 Vytvářím dočasný WAV soubor")
+            # Vytvoříme jednoduchý WAV header pro μ-law audio
+            import struct
+            
+            # WAV header pro μ-law, 8kHz, mono
+            wav_header = struct.pack('<4sI4s4sIHHIIHH4sI',
+                b'RIFF', len(audio_data) + 44 - 8,  # File size
+                b'WAVE',
+                b'fmt ', 16,  # Format chunk size
+                7,  # μ-law format
+                1,  # Mono
+                8000,  # Sample rate
+                8000,  # Byte rate
+                1,  # Block align
+                8,  # Bits per sample
+                b'data', len(audio_data)
+            )
+            
+            tmp_file.write(wav_header)
+            tmp_file.write(audio_data)
+            tmp_file_path = tmp_file.name
+            logger.info(f"📁 WAV soubor vytvořen: {tmp_file_path}")
+        
+        try:
+            logger.info("🎤 Spouštím Whisper STT...")
+            # OpenAI Whisper pro STT
+            with open(tmp_file_path, "rb") as audio_file:
+                transcript = client.with_caller("whisper").audio.transcriptions.create(
+                    model="whisper-1",
+                    file=audio_file,
+                    language="cs"
+                )
+            
+            user_text = transcript.text.strip()
+            logger.info(f"📝 Transkripce DOKONČENA: '{user_text}'")
+            
+            if not user_text or len(user_text) < 3:
+                logger.info("⚠️ Příliš krátká transkripce, ignoruji")
+                return
+            
+            logger.info("🤖 Přidávám zprávu do Assistant threadu...")
+            # Přidáme zprávu do threadu
+            client.with_caller("assistant_chat").beta.threads.messages.create(
+                thread_id=thread_id,
+                role="user",
+                content=user_text
+            )
+            
+            logger.info("🚀 Spouštím Assistant run...")
+            # Spustíme asistenta
+            run = client.with_caller("assistant_chat").beta.threads.runs.create(
+                thread_id=thread_id,
+                assistant_id=assistant_id
+            )
+            
+            logger.info(f"⏳ Čekám na dokončení Assistant run (ID: {run.id})...")
+            # Čekáme na dokončení (s timeout)
+            import time
+            max_wait = 15  # 15 sekund timeout pro rychlejší odpověď
+            start_time = time.time()
+            
+            while run.status in ["queued", "in_progress"] and (time.time() - start_time) < max_wait:
+                await asyncio.sleep(0.5)  # Kratší interval pro rychlejší odpověď
+                run = client.with_caller("assistant_chat").beta.threads.runs.retrieve(thread_id=thread_id, run_id=run.id)
+                logger.info(f"⏳ Run status: {run.status}")
+            
+            if run.status == "completed":
+                logger.info("✅ Assistant run DOKONČEN! Získávám odpověď...")
+                # Získáme nejnovější odpověď
+                messages = client.with_caller("assistant_chat").beta.threads.messages.list(thread_id=thread_id, limit=1)
+                
+                for message in messages.data:
+                    if message.role == "assistant":
+                        for content in message.content:
+                            if content.type == "text":
+                                assistant_response = content.text.value
+                                logger.info(f"🤖 Assistant odpověď ZÍSKÁNA: '{assistant_response}'")
+                                
+                                # Pošleme jako TTS
+                                logger.info("🔊 Odesílám TTS odpověď...")
+                                await send_tts_to_twilio(websocket, assistant_response, stream_sid, client)
+                                logger.info("✅ TTS odpověď ODESLÁNA!")
+                                return
+                
+                logger.warning("⚠️ Žádná assistant odpověď nenalezena")
+            else:
+                logger.warning(f"⚠️ Assistant run neúspěšný: {run.status}")
+                
+        finally:
+            # Vyčistíme dočasný soubor
+            import os
+            try:
+                os.unlink(tmp_file_path)
+                logger.info("🗑️ Dočasný soubor vymazán")
+            except:
+                pass
+                
+    except Exception as e:
+        logger.error(f"❌ CHYBA při zpracování audio: {e}")
+        import traceback
+        logger.error(f"Traceback: {traceback.format_exc()}")
+
+@router.websocket("/audio-test")
+async def audio_stream_test(websocket: WebSocket):
+    """Jednoduchý test WebSocket handler bez OpenAI připojení"""
+    await websocket.accept()
+    logger.info("=== AUDIO TEST WEBSOCKET HANDLER SPUŠTĚN ===")
+    
+    try:
+        while True:
+            # Čekáme na zprávu od klienta
+            data = await websocket.receive_text()
+            logger.debug(f"Přijata zpráva: {data[:100]}...")
+            
+            # Parsujeme JSON
+            try:
+                message = json.loads(data)
+                event_type = message.get("event", "unknown")
+                logger.debug(f"Event type: {event_type}")
+                
+                if event_type == "start":
+                    logger.info("Start event - odesílám odpověď")
+                    response = {
+                        "event": "test_response",
+                        "message": "Test WebSocket funguje!"
+                    }
+                    await websocket.send_text(json.dumps(response))
+                    
+                elif event_type == "media":
+                    logger.debug("Media event - ignoruji")
+                    
+                elif event_type == "stop":
+                    logger.info("Stop event - ukončuji")
+                    break
+                    
+            except json.JSONDecodeError as e:
+                logger.error(f"Chyba při parsování JSON: {e}")
+                
+    except WebSocketDisconnect:
+        logger.info("WebSocket odpojení")
+    except Exception as e:
+        logger.error(f"Chyba v test handleru: {e}")
+        import traceback
+        logger.error(f"Traceback: {traceback.format_exc()}")
+    finally:
+        logger.info("=== AUDIO TEST WEBSOCKET HANDLER UKONČEN ===")
+
+@router.websocket("/audio")
+async def audio_stream(websocket: WebSocket):
+    """WebSocket endpoint pro Twilio Media Stream s robustním connection managementem"""
+    
+    logger.info("🚀 === AUDIO_STREAM FUNKCE SPUŠTĚNA! ===")
+    logger.info(f"🔗 WebSocket client: {websocket.client}")
+    logger.debug(f"📋 WebSocket headers: {dict(websocket.headers)}")
+    
+    # KRITICKÉ: Musíme nejprve přijmout WebSocket připojení
+    try:
+        await websocket.accept()
+        logger.debug("✅ DEBUG: WebSocket connection accepted.")
+    except Exception as accept_error:
+        logger.error(f"❌ CHYBA při websocket.accept(): {accept_error}")
+        return
+        
+    # Inicializace OpenAI klienta
+    openai_api_key = os.getenv('OPENAI_API_KEY')
+    if not openai_api_key:
+        logger.error("❌ OPENAI_API_KEY není nastaven")
+        await websocket.close()
+        return
+        
+    logger.info("🤖 Inicializuji OpenAI klienta...")
+    client = openai_client("assistant_stream", openai_api_key)
+    logger.info("✅ OpenAI klient inicializován")
+    
+    # Vytvoříme nového assistanta s českými instrukcemi pro výuku jazyků
+    logger.info("🎯 Vytvářím nového Assistant...")
+    try:
+        assistant = client.beta.assistants.create(
+            name="AI Asistent pro výuku jazyků",
+            instructions="""Jsi AI asistent pro výuku jazyků. Komunikuješ POUZE v češtině.
+
+TVOJE ROLE:
+- Pomáháš studentům s výukou jazyků
+- Mluvíš pouze česky, přirozeně a srozumitelně
+- Jsi trpělivý, povzbuzující a přátelský
+- Odpovídáš stručně a jasně
+
+TVOJE ÚKOLY:
+- Odpovídej na otázky studentů
+- Vysvětluj jazykové koncepty
+- Poskytuj zpětnou vazbu na odpovědi
+- Kladeš jednoduché otázky pro ověření porozumění
+- Buď konstruktivní a motivující
+
+STYL KOMUNIKACE:
+- Používej přirozený konverzační styl
+- Krátké, srozumitelné věty
+- Pozitivní přístup
+- Pokud student něco neví, vysvětli to jednoduše
+
+Vždy zůstávaj v roli učitele jazyků a komunikuj pouze v češtině.""",
+            model="gpt-4-1106-preview",
+            tools=[]
+        )
+        assistant_id = assistant.id
+        logger.info(f"✅ Vytvořen nový Assistant: {assistant_id}")
+    except Exception as e:
+        logger.error(f"❌ Chyba při vytváření Assistanta: {e}")
+        # Fallback na existující Assistant
+        assistant_id = "asst_W6120kPP1lLBzU5OQLYvH6W1"
+        logger.info(f"🔄 Používám existující Assistant: {assistant_id}")
+    
+    thread = None
+    
+    try:
+        logger.info("=== AUDIO WEBSOCKET HANDLER SPUŠTĚN ===")
+        
+        # Vytvoříme nový thread pro konverzaci
+        thread = client.beta.threads.create()
+        logger.info(f"✅ Thread vytvořen: {thread.id}")
+        
+        # Inicializace proměnných
+        stream_sid = None
+        audio_buffer = bytearray()
+        
+        # Úvodní zpráva - počkáme na stream_sid
+        initial_message = "Ahoj! Jsem AI asistent pro výuku jazyků. Jak vám mohu pomoci?"
+        initial_message_sent = False
+        
+        # Okamžitá úvodní zpráva (bez čekání na stream_sid)
+        welcome_message = "Připojuji se k AI asistentovi. Moment prosím."
+        welcome_sent = False
+        
+        # Keepalive task pro udržení WebSocket připojení
+        keepalive_task = None
+        websocket_active = True  # Flag pro sledování stavu připojení
+        
+        async def keepalive_sender():
+            """Periodicky odesílá keepalive zprávy"""
+            nonlocal websocket_active
+            try:
+                while websocket_active:
+                    await asyncio.sleep(10)  # Každých 10 sekund
+                    
+                    if not websocket_active:
+                        logger.info("💓 WebSocket neaktivní, ukončujem keepalive")
+                        break
+                        
+                    if stream_sid:
+                        try:
+                            # Pošleme prázdný media chunk jako keepalive
+                            keepalive_msg = {
+                                "event": "media",
+                                "streamSid": stream_sid,
+                                "media": {
+                                    "payload": ""  # Prázdný payload
+                                }
+                            }
+                            await websocket.send_text(json.dumps(keepalive_msg))
+                            logger.debug("💓 Keepalive odesláno")
+                        except Exception as send_error:
+                            logger.error(f"💓 Keepalive send error: {send_error}")
+                            websocket_active = False
+                            break
+            except Exception as e:
+                logger.error(f"Keepalive chyba: {e}")
+        
+        # Hlavní smyčka pro zpracování WebSocket zpráv
+        while websocket_active:
+            try:
+                logger.debug("🔄 DEBUG: Čekám na WebSocket data...")
+                
+                # Kontrola stavu WebSocket před čtením
+                try:
+                    # Pokusíme se o rychlý ping test
+                    await websocket.ping()
+                    logger.debug("✅ DEBUG: WebSocket ping OK")
+                except Exception as ping_error:
+                    logger.info(f"❌ DEBUG: WebSocket ping failed: {ping_error}")
+                    logger.info("DEBUG: WebSocket je pravděpodobně zavřen, ukončujem smyčku")
+                    websocket_active = False
+                    break
+                
+                logger.debug("📥 DEBUG: Volám websocket.receive_text()...")
+                data = await websocket.receive_text()
+                logger.debug(f"📨 DEBUG: Přijata data ({len(data)} znaků): {data[:200]}...")
+                
+                try:
+                    msg = json.loads(data)
+                    logger.debug(f"✅ DEBUG: JSON parsování OK")
+                    event = msg.get("event", "unknown")
+                    logger.debug(f"🎯 DEBUG: Event typ: '{event}'")
+                except json.JSONDecodeError as json_error:
+                    logger.error(f"❌ DEBUG: JSON parsing CHYBA: {json_error}")
+                    logger.error(f"❌ DEBUG: Problematická data: {data}")
+                    continue
+                
+                if event == "start":
+                    logger.info("=== MEDIA STREAM START EVENT PŘIJAT! ===")
+                    stream_sid = msg.get("streamSid")
+                    logger.info(f"Stream SID: {stream_sid}")
+                    
+                    # Spustíme keepalive task
+                    if not keepalive_task:
+                        keepalive_task = asyncio.create_task(keepalive_sender())
+                        logger.info("💓 Keepalive task spuštěn")
+                    
+                    # Pošleme okamžitou welcome zprávu
+                    if not welcome_sent:
+                        logger.info("🔊 Odesílám welcome zprávu")
+                        await send_tts_to_twilio(websocket, welcome_message, stream_sid, client)
+                        welcome_sent = True
+                    
+                    # Pošleme úvodní zprávu po krátké pauze
+                    if not initial_message_sent:
+                        await asyncio.sleep(3)  # Krátká pauza po welcome zprávě
+                        logger.info("🔊 Odesílám úvodní zprávu")
+                        await send_tts_to_twilio(websocket, initial_message, stream_sid, client)
+                        initial_message_sent = True
+                    
+                elif event == "media":
+                    logger.debug(f"🎵 MEDIA EVENT PŘIJAT! Track: {msg['media'].get('track', 'unknown')}")
+                    payload = msg["media"]["payload"]
+                    track = msg["media"]["track"]
+                    
+                    if track == "inbound":
+                        logger.debug("📥 INBOUND TRACK - zpracovávám audio data")
+                        # Real-time zpracování - zpracujeme audio ihned
+                        audio_data = base64.b64decode(payload)
+                        audio_buffer.extend(audio_data)
+                        
+                        logger.debug(f"📊 Audio buffer: {len(audio_buffer)} bajtů")
+                        
+                        # Zpracujeme audio každých 800 bajtů (~1 sekunda audio při 8kHz)
+                        if len(audio_buffer) >= 800:  # ~1 sekunda audio při 8kHz
+                            logger.info(f"🎧 Zpracovávám audio chunk ({len(audio_buffer)} bajtů) - PRÁH DOSAŽEN!")
+                            
+                            # Zkopírujeme buffer před vymazáním
+                            audio_to_process = bytes(audio_buffer)
+                            audio_buffer.clear()
+                            
+                            # Zpracujeme audio v background tasku
+                            asyncio.create_task(
+                                process_audio_chunk(
+                                    websocket, audio_to_process, stream_sid, 
+                                    client, assistant_id, thread.id
+                                )
+                            )
+                    else:
+                        logger.debug(f"📤 OUTBOUND TRACK - ignoruji (track: {track})")
+                    
+                elif event == "stop":
+                    logger.info("Media Stream ukončen")
+                    websocket_active = False
+                    
+                    # Zpracujeme zbývající audio i když je malé
+                    if audio_buffer and len(audio_buffer) > 100:  # Alespoň 100 bajtů
+                        logger.info(f"🎧 Zpracovávám zbývající audio ({len(audio_buffer)} bajtů)")
+                        await process_audio_chunk(
+                            websocket, bytes(audio_buffer), stream_sid, 
+                            client, assistant_id, thread.id
+                        )
+                    break
+                    
+            except json.JSONDecodeError as e:
+                logger.error(f"DEBUG: Neplatný JSON z Twilia: {e}")
+            except RuntimeError as e:
+                if "Need to call \"accept\" first" in str(e):
+                    logger.error(f"DEBUG: WebSocket nebyl přijat nebo byl zavřen: {e}")
+                else:
+                    logger.error(f"DEBUG: WebSocket runtime error: {e}")
+                websocket_active = False
+                break
+            except Exception as e:
+                error_msg = str(e)
+                logger.error(f"DEBUG: Chyba při zpracování zprávy: {error_msg}")
+                
+                # Zkontrolujeme různé typy WebSocket chyb
+                if any(keyword in error_msg.lower() for keyword in [
+                    "websocket", "disconnect", "connection", "closed", "broken pipe"
+                ]):
+                    logger.info("DEBUG: Detekováno WebSocket odpojení")
+                    websocket_active = False
+                    break
+                    
+                # Pro ostatní chyby pokračujeme
+                continue
+                    
+    except Exception as e:
+        logger.error(f"Chyba v Assistant API handleru: {e}")
+        import traceback
+        logger.error(f"Traceback: {traceback.format_exc()}")
+    finally:
+        # Označíme WebSocket jako neaktivní
+        if 'websocket_active' in locals():
+            websocket_active = False
+        
+        # Vyčistíme keepalive task
+        if 'keepalive_task' in locals() and keepalive_task and not keepalive_task.done():
+            keepalive_task.cancel()
+            logger.info("💓 Keepalive task ukončen")
+        
+        # Vyčistíme thread
+        if thread:
+            try:
+                client.beta.threads.delete(thread.id)
+                logger.info(f"Thread {thread.id} smazán")
+            except:
+                pass
+        
+        logger.info("=== AUDIO WEBSOCKET HANDLER UKONČEN ===")
+
+@router.websocket("/voice/media-stream")
+async def media_stream(websocket: WebSocket):
+    logger.info("=== MEDIA STREAM WEBSOCKET HANDLER SPUŠTĚN ===")
+    logger.info(f"WebSocket client: {websocket.client}")
+    logger.debug(f"WebSocket headers: {websocket.headers}")
+    logger.debug(f"WebSocket query params: {websocket.query_params}")
+    
+    await websocket.accept()
+    logger.info("=== WEBSOCKET ACCEPTED - ČEKÁM NA TWILIO DATA ===")
+    
+    # Inicializace služeb
+    from app.services.openai_service import OpenAIService
+    from app.services.twilio_service import TwilioService
+    openai_service = OpenAIService()
+    twilio_service = TwilioService()
+    
+    # Stav konverzace
+    conversation_state = {
+        "phase": "introduction",  # introduction, teaching, questioning, evaluation
+        "current_question_index": 0,
+        "questions": [],
+        "user_answers": [],
+        "attempt_id": None,
+        "user_id": None,
+        "lesson_id": None,
+        "lesson": None,
+        "audio_buffer": b"",
+        "last_audio_time": None
+    }
+    
+    async def safe_send_text(msg):
+        try:
+            await websocket.send_text(msg)
+        except Exception as e:
+            logger.error(f"[safe_send_text] WebSocket není připojen: {e}")
+
+    async def process_audio_and_respond(websocket, conversation_state, openai_service, twilio_service):
+        """Zpracuje audio buffer a odpoví podle fáze konverzace."""
+        try:
+            # Převod audia na text
+            audio_text = openai_service.speech_to_text(
+                conversation_state["audio_buffer"], 
+                language=conversation_state["lesson"].language if conversation_state["lesson"] else "cs"
+            )
+            
+            if not audio_text.strip():
+                logger.info("Prázdný audio - ignoruji")
+                conversation_state["audio_buffer"] = b""
+                return
+            
+            logger.info(f"Přepsaný text: {audio_text}")
+            
+            # Zpracování podle fáze konverzace
+            if conversation_state["phase"] == "introduction":
+                # Přechod do fáze výuky
+                conversation_state["phase"] = "teaching"
+                await send_twiml_response(websocket, twilio_service.create_teaching_response(
+                    conversation_state["lesson"]
+                ))
+                
+            elif conversation_state["phase"] == "teaching":
+                # Kontrola, zda uživatel chce přejít k otázkám
+                if any(keyword in audio_text.lower() for keyword in ["otázky", "zkoušení", "test", "hotovo", "konec"]):
+                    conversation_state["phase"] = "questioning"
+                    await send_twiml_response(websocket, twilio_service.create_questioning_start_response())
+                else:
+                    # Odpověď na otázku o lekci
+                    response = openai_service.answer_user_question(
+                        audio_text,
+                        current_lesson=conversation_state["lesson"].__dict__ if conversation_state["lesson"] else None,
+                        language=conversation_state["lesson"].language if conversation_state["lesson"] else "cs"
+                    )
+                    await send_twiml_response(websocket, twilio_service.create_chat_response(
+                        response["answer"],
+                        conversation_state["lesson"].language if conversation_state["lesson"] else "cs"
+                    ))
+                    
+            elif conversation_state["phase"] == "questioning":
+                # Zpracování odpovědi na otázku
+                if conversation_state["current_question_index"] < len(conversation_state["questions"]):
+                    current_question = conversation_state["questions"][conversation_state["current_question_index"]]
+                    
+                    # Vyhodnocení odpovědi
+                    evaluation = openai_service.evaluate_voice_answer(
+                        current_question["question"],
+                        current_question["correct_answer"],
+                        audio_text,
+                        conversation_state["lesson"].language if conversation_state["lesson"] else "cs"
+                    )
+                    
+                    # Uložení odpovědi
+                    conversation_state["user_answers"].append({
+                        "question": current_question["question"],
+                        "correct_answer": current_question["correct_answer"],
+                        "user_answer": audio_text,
+                        "score": evaluation["score"],
+                        "feedback": evaluation["feedback"],
+                        "is_correct": evaluation["is_correct"]
+                    })
+                    
+                    # Odpověď s feedbackem
+                    feedback_text = f"Vaše odpověď: {evaluation['feedback']}. Skóre: {evaluation['score']}%."
+                    await send_twiml_response(websocket, twilio_service.create_feedback_response(
+                        feedback_text,
+                        conversation_state["lesson"].language if conversation_state["lesson"] else "cs"
+                    ))
+                    
+                    conversation_state["current_question_index"] += 1
+                    
+                    # Další otázka nebo konec
+                    if conversation_state["current_question_index"] < len(conversation_state["questions"]):
+                        next_question = conversation_state["questions"][conversation_state["current_question_index"]]
+                        await send_twiml_response(websocket, twilio_service.create_question_response(
+                            next_question["question"],
+                            conversation_state["lesson"].language if conversation_state["lesson"] else "cs"
+                        ))
+                    else:
+                        # Konec zkoušení
+                        conversation_state["phase"] = "evaluation"
+                        await send_twiml_response(websocket, twilio_service.create_evaluation_response(
+                            conversation_state["user_answers"],
+                            conversation_state["lesson"].language if conversation_state["lesson"] else "cs"
+                        ))
+            
+            # Vyčištění bufferu
+            conversation_state["audio_buffer"] = b""
+            
+        except Exception as e:
+            logger.error(f"Chyba při zpracování audia: {e}")
+            conversation_state["audio_buffer"] = b""
+
+    async def send_twiml_response(websocket, twiml_content):
+        """Pošle TwiML odpověď zpět do Twilio."""
+        try:
+            await websocket.send_text(json.dumps({
+                "event": "media",
+                "streamSid": "placeholder",
+                "media": {
+                    "payload": twiml_content
+                }
+            }))
+        except Exception as e:
+            logger.error(f"Chyba při odesílání TwiML: {e}")
+
+    async def save_conversation_results(conversation_state):
+        """Uloží výsledky konverzace do databáze."""
+        if not conversation_state["attempt_id"]:
+            return
+        
+        session = SessionLocal()
+        try:
+            attempt = session.query(Attempt).get(conversation_state["attempt_id"])
+            if attempt and conversation_state["user_answers"]:
+                total_score = sum(answer["score"] for answer in conversation_state["user_answers"])
+                average_score = total_score / len(conversation_state["user_answers"])
+                attempt.score = average_score
+                attempt.status = "completed"
+                attempt.completed_at = datetime.now()
+                from app.services.spaced_repetition import record_attempt_review  # NumPy až při prvním použití
+                record_attempt_review(session, attempt)
+                for i, answer_data in enumerate(conversation_state["user_answers"]):
+                    answer = Answer(
+                        attempt_id=attempt.id,
+                        question_index=i,
+                        question_text=answer_data["question"],
+                        correct_answer=answer_data["correct_answer"],
+                        user_answer=answer_data["user_answer"],
+                        score=answer_data["score"],
+                        is_correct=answer_data["is_correct"],
+                        feedback=answer_data["feedback"]
+                    )
+                    session.add(answer)
+                session.commit()
+                logger.info(f"Uloženy výsledky pro pokus {attempt.id}, průměrné skóre: {average_score:.1f}%")
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Chyba při ukládání výsledků: {e}")
+        finally:
+            session.close() 
+
+@router.get("/test-websocket")
+async def test_websocket():
+    """Test endpoint pro ověření WebSocket funkčnosti"""
+    return {
+        "message": "WebSocket test endpoint",
+        "websocket_url": "wss://lecture-app-production.up.railway.app/audio",
+        "test_url": "wss://lecture-app-production.up.railway.app/audio-test"
+    } 
+
+@router.websocket("/test")
+async def websocket_test(websocket: WebSocket):
+    """Velmi jednoduchý WebSocket test"""
+    logger.info("🧪 === WEBSOCKET TEST ENDPOINT SPUŠTĚN ===")
+    await websocket.accept()
+    logger.info("🧪 WebSocket test připojení přijato")
+    
+    try:
+        while True:
+            data = await websocket.receive_text()
+            logger.info(f"🧪 Test přijal: {data}")
+            await websocket.send_text(f"Echo: {data}")
+    except Exception as e:
+        logger.info(f"🧪 Test WebSocket ukončen: {e}")
+    finally:
+        logger.info("🧪 === WEBSOCKET TEST UKONČEN ===") 
+
+@router.get("/websocket-status")
+async def websocket_status():
+    """Kontrola stavu WebSocket endpointů"""
+    return {
+        "message": "WebSocket status check",
+        "endpoints": {
+            "audio": "/audio",
+            "test": "/test", 
+            "audio-test": "/audio-test"
+        },
+        "railway_websocket_support": "Testing...",
+        "timestamp": "2025-07-24T19:15:00Z"
+    } 
+
+@router.post("/tts")
+async def generate_tts(request: Request):
+    """HTTP endpoint pro generování TTS audio"""
+    try:
+        data = await request.json()
+        text = data.get('text', '')
+        
+        if not text:
+            return {"error": "Missing text parameter"}
+        
+        logger.info(f"🔊 Generuji TTS pro: {text[:50]}...")
+        
+        # OpenAI TTS
+        openai_api_key = os.getenv('OPENAI_API_KEY')
+        if not openai_api_key:
+            return {"error": "OpenAI API key not configured"}
+        
+        client = openai_client("tts", openai_api_key)
+        
+        response = client.audio.speech.create(
+            model="tts-1",
+            voice="nova",
+            input=text,
+            response_format="wav"
+        )
+        
+        # Převod na base64 pro Twilio
+        import base64
+        audio_b64 = base64.b64encode(response.content).decode()
+        
+        logger.info("✅ TTS audio vygenerováno")
+        
+        return {
+            "success": True,
+            "audio": audio_b64,
+            "format": "wav",
+            "text": text[:100]
+        }
+        
+    except Exception as e:
+        logger.error(f"Chyba při TTS: {e}")
+        return {"error": str(e)}
@@ -0,0 +1,132 @@
+"""
+Profilování běžícího workeru (/admin/profile/*): CPU profil na N sekund, profil
+jednoho requestu a diff snímků paměti (tracemalloc). Viz app.profiling.
+
+Admin nemá přihlášení, proto jsou endpointy vypnuté, dokud není nastavený
+PROFILING_TOKEN; každý request ho musí poslat v hlavičce X-Profiling-Token.
+"""
+
+import asyncio
+import os
+import secrets
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from app.profiling import (
+    PROFILE_MAX_SECONDS, ProfilerBusyError, arm_request_profile, get_request_profile, memory_diff,
+    memory_status, profile_cpu, start_memory_tracing, stop_memory_tracing,
+)
+
+router = APIRouter(prefix="/admin/profile", tags=["profiling"])
+
+
+def _denied(request: Request) -> Optional[JSONResponse]:
+    expected = os.getenv("PROFILING_TOKEN")
+    if not expected:
+        return JSONResponse(status_code=404, content={"error": "Profilování je vypnuté (nastavte PROFILING_TOKEN)"})
+    if not secrets.compare_digest(request.headers.get("x-profiling-token", ""), expected):
+        return JSONResponse(status_code=403, content={"error": "Neplatný X-Profiling-Token"})
+    return None
+
+
+def _collapsed_response(content: str, name: str, summary: dict) -> PlainTextResponse:
+    filename = f"{name}-{datetime.utcnow():%Y%m%d-%H%M%S}.collapsed"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"',
+               **{f"X-Profile-{key.replace('_', '-').title()}": str(value) for key, value in summary.items()}}
+    return PlainTextResponse(content, headers=headers)
+
+
+@router.post("/cpu")
+async def admin_profile_cpu(
+    request: Request,
+    seconds: float = Query(10, gt=0, le=PROFILE_MAX_SECONDS),
+    interval_ms: float = Query(10, gt=0, le=1000)
+):
+    """Vzorkuje všechna vlákna workeru `seconds` sekund a vrátí collapsed stacks (flamegraph.pl, speedscope)"""
+    denied = _denied(request)
+    if denied:
+        return denied
+    try:
+        # Vzorkuje se mimo event loop - hovory běží dál a profil je zachytí
+        profiler = await asyncio.to_thread(profile_cpu, seconds, interval_ms)
+    except ProfilerBusyError as e:
+        return JSONResponse(status_code=409, content={"error": str(e)})
+    return _collapsed_response(profiler.collapsed(), "cpu", profiler.summary())
+
+
+@router.post("/request")
+def admin_profile_request(
+    request: Request,
+    route: Optional[str] = Query(None, description="Šablona routy, např. /voice/process"),
+    interval_ms: float = Query(5, gt=0, le=1000)
+):
+    """Nastraží profil dalšího requestu na `route`, případně s hlavičkou X-Profile-Request: <token>"""
+    denied = _denied(request)
+    if denied:
+        return denied
+    profile = arm_request_profile(route=route, interval_ms=interval_ms)
+    return {**profile.as_dict(), "result_url": str(request.url_for("admin_profile_request_result", token=profile.token))}
+
+
+@router.get("/request/{token}", name="admin_profile_request_result")
+def admin_profile_request_result(request: Request, token: str):
+    """Výsledek profilu requestu - collapsed stacks, nebo stav, pokud ještě neskončil"""
+    denied = _denied(request)
+    if denied:
+        return denied
+    profile = get_request_profile(token)
+    if profile is None:
+        return JSONResponse(status_code=404, content={"error": f"Profil {token} nenalezen"})
+    status = profile.as_dict()
+    if profile.status == "done":
+        return _collapsed_response(profile.result, "request", profile.summary)
+    return JSONResponse(status_code=410 if profile.status == "expired" else 202, content=status)
+
+
+@router.post("/memory/start")
+def admin_profile_memory_start(request: Request, frames: int = Query(10, ge=1, le=50)):
+    """Zapne tracemalloc a uloží výchozí snímek paměti"""
+    denied = _denied(request)
+    if denied:
+        return denied
+    try:
+        return start_memory_tracing(frames)
+    except ProfilerBusyError as e:
+        return JSONResponse(status_code=409, content={"error": str(e)})
+
+
+@router.get("/memory/diff")
+def admin_profile_memory_diff(
+    request: Request,
+    top: int = Query(30, ge=1, le=500),
+    key_type: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    reset: bool = Query(False, description="Aktuální snímek se stane novou baseline")
+):
+    """Největší přírůstky paměti od baseline (místa alokací)"""
+    denied = _denied(request)
+    if denied:
+        return denied
+    try:
+        return PlainTextResponse(memory_diff(top=top, key_type=key_type, reset_baseline=reset))
+    except RuntimeError as e:
+        return JSONResponse(status_code=409, content={"error": str(e)})
+
+
+@router.post("/memory/stop")
+def admin_profile_memory_stop(request: Request):
+    """Vypne tracemalloc"""
+    denied = _denied(request)
+    if denied:
+        return denied
+    return stop_memory_tracing()
+
+
+@router.get("/memory")
+def admin_profile_memory_status(request: Request):
+    denied = _denied(request)
+    if denied:
+        return denied
+    return memory_status()
@@ -0,0 +1,571 @@
+"""
+Systémové a diagnostické endpointy adminu: testy připojení, ladicí výpisy,
+migrace databáze a stav poolu spojení.
+"""
+
+import os
+import socket
+from datetime import datetime
+
+from fastapi import APIRouter, Request
+from fastapi.responses import HTMLResponse, JSONResponse
+from sqlalchemy import text
+
+from app.database import SessionLocal, engine, pool_metrics, replica_engine, replica_pool_metrics
+from app.models import Attempt, Lesson, TestSession, User
+from app.phone import format_phone_number_e164
+from app.routers.common import templates
+from app.services.session_archive import archive_database_url, default_archive_session_factory
+
+router = APIRouter(prefix="/admin", tags=["system"])
+
+@router.get("/network-test", response_class=JSONResponse)
+def admin_network_test():
+    results = {}
+    # Test DNS
+    try:
+        socket.gethostbyname('api.twilio.com')
+        results['dns_twilio'] = 'OK'
+    except Exception as e:
+        results['dns_twilio'] = f'CHYBA: {str(e)}'
+    try:
+        socket.gethostbyname('api.openai.com')
+        results['dns_openai'] = 'OK'
+    except Exception as e:
+        results['dns_openai'] = f'CHYBA: {str(e)}'
+    # Test HTTP
+    try:
+        import requests
+        response = requests.get('https://httpbin.org/ip', timeout=10)
+        results['http_test'] = f"OK - IP: {response.json().get('origin', 'unknown')}"
+    except Exception as e:
+        results['http_test'] = f'CHYBA: {str(e)}'
+    return results
+
+@router.get("/db-test", response_class=JSONResponse)
+def admin_db_test():
+    session = SessionLocal()
+    results = {}
+    try:
+        session.execute(text('SELECT 1'))
+        results['db_connection'] = 'OK'
+    except Exception as e:
+        results['db_connection'] = f'CHYBA: {str(e)}'
+    try:
+        user_count = User.query.count()
+        results['user_table'] = f'OK - {user_count} uživatelů'
+    except Exception as e:
+        results['user_table'] = f'CHYBA: {str(e)}'
+    try:
+        lesson_count = Lesson.query.count()
+        results['lesson_table'] = f'OK - {lesson_count} lekcí'
+    except Exception as e:
+        results['lesson_table'] = f'CHYBA: {str(e)}'
+    session.close()
+    return results
+
+@router.get("/init-db", response_class=JSONResponse)
+def admin_init_db():
+    session = SessionLocal()
+    results = {}
+    try:
+        session.create_all()
+        results['create_tables'] = 'OK'
+    except Exception as e:
+        results['create_tables'] = f'CHYBA: {str(e)}'
+    try:
+        user_count = User.query.count()
+        lesson_count = Lesson.query.count()
+        results['tables_check'] = f'OK - {user_count} uživatelů, {lesson_count} lekcí'
+    except Exception as e:
+        results['tables_check'] = f'CHYBA: {str(e)}'
+    session.close()
+    return results
+
+@router.get("/debug/openai", response_class=JSONResponse)
+def admin_debug_openai():
+    try:
+        from app.services.openai_service import OpenAIService
+        api_key = os.getenv('OPENAI_API_KEY')
+        api_key_exists = bool(api_key)
+        api_key_length = len(api_key) if api_key else 0
+        api_key_start = api_key[:7] + "..." if api_key and len(api_key) > 7 else "N/A"
+        openai = OpenAIService()
+        openai_enabled = getattr(openai, 'enabled', False)
+        openai_client_exists = bool(getattr(openai, 'client', None))
+        debug_info = {
+            "environment_variables": {
+                "OPENAI_API_KEY_exists": api_key_exists,
+                "OPENAI_API_KEY_length": api_key_length,
+                "OPENAI_API_KEY_start": api_key_start
+            },
+            "openai_service": {
+                "service_exists": bool(openai),
+                "enabled": openai_enabled,
+                "client_exists": openai_client_exists
+            },
+            "timestamp": datetime.now().isoformat()
+        }
+        return debug_info
+    except Exception as e:
+        return {"error": str(e)}
+
+@router.get("/debug/database", response_class=JSONResponse)
+def admin_debug_database():
+    session = SessionLocal()
+    database_url = os.getenv('DATABASE_URL')
+    database_url_exists = bool(database_url)
+    database_url_start = database_url[:20] + "..." if database_url and len(database_url) > 20 else "N/A"
+    app_database_uri = session.engine.url if hasattr(session, 'engine') else 'N/A'
+    app_database_uri_start = str(app_database_uri)[:20] + "..." if app_database_uri and len(str(app_database_uri)) > 20 else "N/A"
+    try:
+        session.execute(text('SELECT 1'))
+        database_connection = "OK"
+    except Exception as db_error:
+        database_connection = f"ERROR: {str(db_error)}"
+    session.close()
+    debug_info = {
+        "environment_variables": {
+            "DATABASE_URL_exists": database_url_exists,
+            "DATABASE_URL_start": database_url_start,
+            "DATABASE_URL_full": database_url if database_url else "N/A"
+        },
+        "app_configuration": {
+            "SQLALCHEMY_DATABASE_URI_start": app_database_uri_start,
+            "SQLALCHEMY_DATABASE_URI_full": str(app_database_uri)
+        },
+        "database_connection": database_connection,
+        "timestamp": datetime.now().isoformat()
+    }
+    return debug_info
+
+@router.get("/debug/env", response_class=JSONResponse)
+def admin_debug_env():
+    env_vars = [
+        'DATABASE_URL',
+        'OPENAI_API_KEY',
+        'TWILIO_ACCOUNT_SID',
+        'TWILIO_AUTH_TOKEN',
+        'TWILIO_PHONE_NUMBER',
+        'WEBHOOK_BASE_URL',
+        'SECRET_KEY',
+        'PORT',
+        'FLASK_ENV',
+        'FLASK_DEBUG'
+    ]
+    env_info = {}
+    for var in env_vars:
+        value = os.getenv(var)
+        if value:
+            if 'KEY' in var or 'TOKEN' in var or 'SID' in var:
+                env_info[var] = f"{value[:10]}..." if len(value) > 10 else "***"
+            elif 'URL' in var:
+                env_info[var] = value
+            else:
+                env_info[var] = value
+        else:
+            env_info[var] = "NENASTAVENO"
+    debug_info = {
+        "environment_variables": env_info,
+        "timestamp": datetime.now().isoformat()
+    }
+    return debug_info
+
+@router.get("/migrate-db", response_class=JSONResponse)
+def admin_migrate_db():
+    """Provede databázové migrace pro nové funkce"""
+    session = SessionLocal()
+    results = {"migrations": []}
+    
+    try:
+        # 1. Přidej current_lesson_level do users
+        try:
+            session.execute(text("SELECT current_lesson_level FROM users LIMIT 1"))
+            results["migrations"].append("current_lesson_level: již existuje")
+        except Exception:
+            try:
+                session.execute(text("ALTER TABLE users ADD COLUMN current_lesson_level INTEGER DEFAULT 0"))
+                session.commit()
+                results["migrations"].append("current_lesson_level: ✅ přidán")
+            except Exception as e:
+                results["migrations"].append(f"current_lesson_level: ❌ {str(e)}")
+                session.rollback()
+        
+        # 2. Přidej lesson_number do lessons
+        try:
+            session.execute(text("SELECT lesson_number FROM lessons LIMIT 1"))
+            results["migrations"].append("lesson_number: již existuje")
+        except Exception:
+            try:
+                session.execute(text("ALTER TABLE lessons ADD COLUMN lesson_number INTEGER DEFAULT 0"))
+                session.execute(text("ALTER TABLE lessons ADD COLUMN required_score FLOAT DEFAULT 90.0"))
+                session.execute(text("ALTER TABLE lessons ADD COLUMN lesson_type VARCHAR(20) DEFAULT 'standard'"))
+                session.execute(text("ALTER TABLE lessons ADD COLUMN description TEXT"))
+                session.commit()
+                results["migrations"].append("lesson columns: ✅ přidány")
+            except Exception as e:
+                results["migrations"].append(f"lesson columns: ❌ {str(e)}")
+                session.rollback()
+        
+        # 3. Vytvoř user_progress tabulku
+        try:
+            session.execute(text("SELECT id FROM user_progress LIMIT 1"))
+            results["migrations"].append("user_progress: již existuje")
+        except Exception:
+            try:
+                create_progress_table = """
+                CREATE TABLE user_progress (
+                    id SERIAL PRIMARY KEY,
+                    user_id INTEGER REFERENCES users(id),
+                    lesson_number INTEGER NOT NULL,
+                    is_completed BOOLEAN DEFAULT FALSE,
+                    best_score FLOAT,
+                    attempts_count INTEGER DEFAULT 0,
+                    first_completed_at TIMESTAMP,
+                    last_attempt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+                session.execute(text(create_progress_table))
+                session.commit()
+                results["migrations"].append("user_progress: ✅ vytvořena")
+            except Exception as e:
+                results["migrations"].append(f"user_progress: ❌ {str(e)}")
+                session.rollback()
+        
+        # 4. Vytvoř analytické rollup tabulky
+        from app.models import QuestionStat, CategoryStat, PerformanceRollup
+        for model in (QuestionStat, CategoryStat, PerformanceRollup):
+            try:
+                model.__table__.create(bind=session.get_bind(), checkfirst=True)
+                results["migrations"].append(f"{model.__tablename__}: ✅ připravena")
+            except Exception as e:
+                results["migrations"].append(f"{model.__tablename__}: ❌ {str(e)}")
+        
+        # 5. Indexy pro vyhledávání a stránkování uživatelů (unikátní telefon zakládá až krok 16)
+        for index in User.__table__.indexes:
+            if index.name == "uq_users_phone_normalized":
+                continue
+            try:
+                index.create(bind=session.get_bind(), checkfirst=True)
+                results["migrations"].append(f"{index.name}: ✅ připraven")
+            except Exception as e:
+                results["migrations"].append(f"{index.name}: ❌ {str(e)}")
+        
+        # 6. Tabulka jobů pro mazání uživatelů na pozadí
+        from app.models import UserDeletionJob
+        try:
+            UserDeletionJob.__table__.create(bind=session.get_bind(), checkfirst=True)
+            results["migrations"].append("user_deletion_jobs: ✅ připravena")
+        except Exception as e:
+            results["migrations"].append(f"user_deletion_jobs: ❌ {str(e)}")
+        
+        # 7. Volací kampaně
+        from app.models import Campaign, CampaignCall
+        for model in (Campaign, CampaignCall):
+            try:
+                model.__table__.create(bind=session.get_bind(), checkfirst=True)
+                results["migrations"].append(f"{model.__tablename__}: ✅ připravena")
+            except Exception as e:
+                results["migrations"].append(f"{model.__tablename__}: ❌ {str(e)}")
+        
+        # 8. Lease a index pro dispatcher splatných pokusů
+        try:
+            session.execute(text("SELECT lease_until FROM attempts LIMIT 1"))
+            results["migrations"].append("attempts.lease_until: již existuje")
+        except Exception:
+            session.rollback()
+            try:
+                session.execute(text("ALTER TABLE attempts ADD COLUMN lease_until TIMESTAMP"))
+                session.commit()
+                results["migrations"].append("attempts.lease_until: ✅ přidán")
+            except Exception as e:
+                results["migrations"].append(f"attempts.lease_until: ❌ {str(e)}")
+                session.rollback()
+        try:
+            # Dřív dostával next_due každý pokus - naplánovaný zůstane jen nejnovější naplánovaný pokus
+            # uživatele, jinak by zapnutý dispatcher vytočil každý historický pokus zvlášť
+            cleared = session.execute(text(
+                "UPDATE attempts SET next_due = NULL WHERE next_due IS NOT NULL AND id NOT IN "
+                "(SELECT MAX(id) FROM attempts WHERE next_due IS NOT NULL GROUP BY user_id)"
+            )).rowcount
+            session.commit()
+            results["migrations"].append(f"attempts.next_due starších pokusů: ✅ zrušeno {cleared}")
+        except Exception as e:
+            results["migrations"].append(f"attempts.next_due starších pokusů: ❌ {str(e)}")
+            session.rollback()
+        for index in Attempt.__table__.indexes:
+            try:
+                index.create(bind=session.get_bind(), checkfirst=True)
+                results["migrations"].append(f"{index.name}: ✅ připraven")
+            except Exception as e:
+                results["migrations"].append(f"{index.name}: ❌ {str(e)}")
+        
+        # 9. Spaced-repetition stavy uživatelů po kategoriích
+        from app.models import ReviewState
+        try:
+            ReviewState.__table__.create(bind=session.get_bind(), checkfirst=True)
+            results["migrations"].append("review_states: ✅ připravena")
+        except Exception as e:
+            results["migrations"].append(f"review_states: ❌ {str(e)}")
+        
+        # 10. Deklarativní pravidla odznaků
+        try:
+            session.execute(text("SELECT rule FROM badges LIMIT 1"))
+            results["migrations"].append("badges.rule: již existuje")
+        except Exception:
+            session.rollback()
+            try:
+                session.execute(text("ALTER TABLE badges ADD COLUMN rule JSON"))
+                session.commit()
+                results["migrations"].append("badges.rule: ✅ přidán")
+            except Exception as e:
+                results["migrations"].append(f"badges.rule: ❌ {str(e)}")
+                session.rollback()
+        
+        # 11. Unikátní odznak na uživatele (po odstranění duplicit) a checkpointy jobů
+        from app.models import UserBadge, JobCheckpoint
+        try:
+            deleted = session.execute(text(
+                "DELETE FROM user_badges WHERE id NOT IN "
+                "(SELECT MIN(id) FROM user_badges GROUP BY user_id, badge_id)"
+            )).rowcount
+            session.commit()
+            results["migrations"].append(f"user_badges duplicity: ✅ odstraněno {deleted}")
+        except Exception as e:
+            results["migrations"].append(f"user_badges duplicity: ❌ {str(e)}")
+            session.rollback()
+        for index in UserBadge.__table__.indexes:
+            try:
+                index.create(bind=session.get_bind(), checkfirst=True)
+                results["migrations"].append(f"{index.name}: ✅ připraven")
+            except Exception as e:
+                results["migrations"].append(f"{index.name}: ❌ {str(e)}")
+        try:
+            JobCheckpoint.__table__.create(bind=session.get_bind(), checkfirst=True)
+            results["migrations"].append("job_checkpoints: ✅ připravena")
+        except Exception as e:
+            results["migrations"].append(f"job_checkpoints: ❌ {str(e)}")
+        
+        # 12. JSONB sloupce a GIN index otázek (jen PostgreSQL, SQLite zůstává u JSON)
+        if session.get_bind().dialect.name == "postgresql":
+            jsonb_columns = [("lessons", "questions"), ("test_sessions", "questions_data"),
+                             ("test_sessions", "failed_categories"), ("test_sessions", "answers"),
+                             ("test_sessions", "scores")]
+            for table, column in jsonb_columns:
+                try:
+                    data_type = session.execute(text(
+                        "SELECT data_type FROM information_schema.columns WHERE table_name = :table AND column_name = :column"
+                    ), {"table": table, "column": column}).scalar()
+                    if data_type == "jsonb":
+                        results["migrations"].append(f"{table}.{column} jsonb: již existuje")
+                        continue
+                    session.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE JSONB USING {column}::jsonb"))
+                    session.commit()
+                    results["migrations"].append(f"{table}.{column} jsonb: ✅ převedeno")
+                except Exception as e:
+                    results["migrations"].append(f"{table}.{column} jsonb: ❌ {str(e)}")
+                    session.rollback()
+            for index in Lesson.__table__.indexes:
+                try:
+                    index.create(bind=session.get_bind(), checkfirst=True)
+                    results["migrations"].append(f"{index.name}: ✅ připraven")
+                except Exception as e:
+                    results["migrations"].append(f"{index.name}: ❌ {str(e)}")
+        
+        # 13. Archivace dokončených sessions: příznak v test_sessions a archivní tabulka
+        from app.models import ArchivedTestSession
+        try:
+            session.execute(text("SELECT archived_at FROM test_sessions LIMIT 1"))
+            results["migrations"].append("test_sessions.archived_at: již existuje")
+        except Exception:
+            session.rollback()
+            try:
+                session.execute(text("ALTER TABLE test_sessions ADD COLUMN archived_at TIMESTAMP"))
+                session.commit()
+                results["migrations"].append("test_sessions.archived_at: ✅ přidán")
+            except Exception as e:
+                results["migrations"].append(f"test_sessions.archived_at: ❌ {str(e)}")
+                session.rollback()
+        for index in TestSession.__table__.indexes:
+            try:
+                index.create(bind=session.get_bind(), checkfirst=True)
+                results["migrations"].append(f"{index.name}: ✅ připraven")
+            except Exception as e:
+                results["migrations"].append(f"{index.name}: ❌ {str(e)}")
+        try:
+            if archive_database_url() is None:
+                # Postgres: partitionovaná tabulka, měsíční partition zakládá archivace podle potřeby
+                ArchivedTestSession.__table__.create(bind=session.get_bind(), checkfirst=True)
+                results["migrations"].append("test_session_archive: ✅ připravena")
+            else:
+                default_archive_session_factory()
+                results["migrations"].append(f"test_session_archive: ✅ připravena v {archive_database_url()}")
+        except Exception as e:
+            results["migrations"].append(f"test_session_archive: ❌ {str(e)}")
+        
+        # 14. Nečinnost a opuštění rozpracovaných sessions (sweeper) + částečné indexy
+        for column in ("last_activity_at", "abandoned_at"):
+            try:
+                session.execute(text(f"SELECT {column} FROM test_sessions LIMIT 1"))
+                results["migrations"].append(f"test_sessions.{column}: již existuje")
+            except Exception:
+                session.rollback()
+                try:
+                    session.execute(text(f"ALTER TABLE test_sessions ADD COLUMN {column} TIMESTAMP"))
+                    session.commit()
+                    results["migrations"].append(f"test_sessions.{column}: ✅ přidán")
+                except Exception as e:
+                    results["migrations"].append(f"test_sessions.{column}: ❌ {str(e)}")
+                    session.rollback()
+        try:
+            # Rozpracované sessions bez záznamu aktivity počítají nečinnost od začátku
+            filled = session.execute(text(
+                "UPDATE test_sessions SET last_activity_at = started_at "
+                "WHERE last_activity_at IS NULL AND is_completed = :completed"
+            ), {"completed": False}).rowcount
+            session.commit()
+            results["migrations"].append(f"test_sessions.last_activity_at: ✅ doplněno {filled}")
+        except Exception as e:
+            results["migrations"].append(f"test_sessions.last_activity_at: ❌ {str(e)}")
+            session.rollback()
+        for index in TestSession.__table__.indexes:
+            try:
+                index.create(bind=session.get_bind(), checkfirst=True)
+                results["migrations"].append(f"{index.name}: ✅ připraven")
+            except Exception as e:
+                results["migrations"].append(f"{index.name}: ❌ {str(e)}")
+        
+        # 15. Denní spotřeba a odhad nákladů OpenAI
+        from app.models import OpenAIUsageDaily
+        try:
+            OpenAIUsageDaily.__table__.create(bind=session.get_bind(), checkfirst=True)
+            results["migrations"].append("openai_usage_daily: ✅ připravena")
+        except Exception as e:
+            results["migrations"].append(f"openai_usage_daily: ❌ {str(e)}")
+        
+        # 16. Normalizovaný telefon uživatelů s unikátním indexem (duplicitní starší účty zůstanou bez něj)
+        try:
+            session.execute(text("SELECT phone_normalized FROM users LIMIT 1"))
+            results["migrations"].append("users.phone_normalized: již existuje")
+        except Exception:
+            session.rollback()
+            try:
+                session.execute(text("ALTER TABLE users ADD COLUMN phone_normalized VARCHAR(20)"))
+                session.commit()
+                results["migrations"].append("users.phone_normalized: ✅ přidán")
+            except Exception as e:
+                results["migrations"].append(f"users.phone_normalized: ❌ {str(e)}")
+                session.rollback()
+        try:
+            taken = set(session.execute(text(
+                "SELECT phone_normalized FROM users WHERE phone_normalized IS NOT NULL"
+            )).scalars())
+            updates, duplicates = [], 0
+            for user_id, phone in session.execute(text(
+                "SELECT id, phone FROM users WHERE phone_normalized IS NULL ORDER BY id"
+            )):
+                normalized = format_phone_number_e164(phone or "")
+                if not normalized or normalized in taken:
+                    duplicates += 1
+                    continue
+                taken.add(normalized)
+                updates.append({"id": user_id, "phone_normalized": normalized})
+            if updates:
+                session.execute(text("UPDATE users SET phone_normalized = :phone_normalized WHERE id = :id"), updates)
+            session.commit()
+            results["migrations"].append(f"users.phone_normalized: ✅ doplněno {len(updates)}, duplicit bez čísla {duplicates}")
+        except Exception as e:
+            results["migrations"].append(f"users.phone_normalized: ❌ {str(e)}")
+            session.rollback()
+        for index in User.__table__.indexes:
+            try:
+                index.create(bind=session.get_bind(), checkfirst=True)
+                results["migrations"].append(f"{index.name}: ✅ připraven")
+            except Exception as e:
+                results["migrations"].append(f"{index.name}: ❌ {str(e)}")
+        
+        results["status"] = "completed"
+        
+    except Exception as e:
+        results["status"] = "error"
+        results["error"] = str(e)
+        session.rollback()
+    finally:
+        session.close()
+    
+    return results
+
+@router.get("/db/pool", response_class=JSONResponse, name="admin_db_pool")
+def admin_db_pool():
+    """
+    Stav poolu DB spojení: půjčená spojení, overflow, čekání na vyčerpaný pool a timeouty.
+    checked_out se po odeznění provozu musí vrátit na 0 (jinak únik session).
+    """
+    result = {"pool": engine.pool.status(), **pool_metrics.snapshot(engine.pool)}
+    if replica_engine is not None:
+        result["replica"] = {"pool": replica_engine.pool.status(), **replica_pool_metrics.snapshot(replica_engine.pool)}
+    return result
+
+# PŘÍMÝ ENDPOINT NA HLAVNÍ APP - GARANTOVANĚ DOSTUPNÝ
+@router.get("/system/run-migrations", response_class=HTMLResponse)
+def direct_run_migrations(request: Request):
+    """
+    PŘÍMÝ endpoint pro databázové migrace - registrovaný přímo na hlavní app.
+    """
+    session = SessionLocal()
+    results = {"success": [], "errors": []}
+    
+    # Kompletní seznam migrací
+    migrations = {
+        "lessons": [
+            ("base_difficulty", "VARCHAR(20)", "medium"),
+        ],
+        "test_sessions": [
+            ("difficulty_score", "FLOAT", 50.0),
+            ("failed_categories", "JSON", "[]"),
+        ]
+    }
+    
+    try:
+        for table, columns in migrations.items():
+            for column_name, column_type, default_value in columns:
+                # Pro default hodnoty stringového typu potřebujeme uvozovky
+                default_sql = f"'{default_value}'" if isinstance(default_value, str) else default_value
+                
+                try:
+                    # Zkusit přidat sloupec
+                    session.execute(text(f"ALTER TABLE {table} ADD COLUMN {column_name} {column_type} DEFAULT {default_sql}"))
+                    session.commit()
+                    results["success"].append(f"✅ Sloupec '{column_name}' úspěšně přidán do tabulky '{table}'.")
+                except Exception as e:
+                    # Pokud sloupec již existuje, ignorovat chybu
+                    if "already exists" in str(e) or "duplicate column" in str(e):
+                        results["success"].append(f"☑️ Sloupec '{column_name}' v tabulce '{table}' již existuje.")
+                    else:
+                        results["errors"].append(f"❌ Chyba při přidávání sloupce '{column_name}': {e}")
+                    session.rollback() # Důležitý rollback po každé chybě
+                    
+        if not results["errors"]:
+            message = "🎉 Všechny migrace proběhly úspěšně! Databáze je nyní synchronizována."
+        else:
+            message = "⚠️ Některé migrace selhaly. Zkontrolujte detaily níže."
+            
+        return templates.TemplateResponse("message.html", {
+            "request": request,
+            "message": message,
+            "details": results,
+            "back_url": "/admin/dashboard",
+            "back_text": "Zpět na dashboard"
+        })
+
+    except Exception as e:
+        session.rollback()
+        return templates.TemplateResponse("message.html", {
+            "request": request,
+            "message": f"❌ Kritická chyba při migraci: {e}",
+            "back_url": "/admin/dashboard",
+            "back_text": "Zpět na dashboard"
+        })
+    finally:
+        session.close()
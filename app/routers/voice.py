@@ -0,0 +1,1256 @@
+"""
+Twilio hlasové webhooky (/voice/*) a logika testových sessions: vstupní test,
+běžné lekce, ukládání odpovědí a adaptivní výběr otázek.
+
+OpenAI SDK, Twilio TwiML a NumPy (spaced repetition) se importují až při prvním hovoru, aby
+start aplikace a health check nečekaly na jejich načtení.
+"""
+
+import logging
+import os
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Form, Query, Request, Response
+from sqlalchemy.orm.attributes import flag_modified
+
+from app.database import SessionLocal
+from app.models import Attempt, Lesson, TestSession, User
+from app.services.analytics_service import record_session_answers, record_session_completion
+from app.services.campaign_service import handle_status_callback
+from app.services.session_sweeper import active_session_filter
+from app.services.openai_client import openai_client
+from app.tracing import SPAN_KIND_SERVER, set_call_sid, span, traced
+
+logger = logging.getLogger("uvicorn")
+
+router = APIRouter(tags=["voice"])
+
+@router.post("/")
+async def root_post(request: Request, attempt_id: str = Query(None)):
+    """Twilio někdy volá root endpoint místo /voice/ - použijeme stejnou logiku"""
+    logger.info("Přijat Twilio webhook na ROOT / endpoint")
+    logger.info(f"Attempt ID: {attempt_id}")
+    
+    # PŘESMĚRUJ NA /voice/ handler pro konzistentní chování
+    logger.info("🔄 Přesměrovávám ROOT request na voice_handler")
+    return await voice_handler(request)
+
+@router.post("/stream-callback")
+async def stream_callback(request: Request):
+    """Twilio Stream statusCallback endpoint"""
+    logger.info("Přijat Twilio Stream statusCallback")
+    
+    # Přečteme data z requestu
+    form_data = await request.form()
+    callback_data = dict(form_data)
+    
+    logger.info(f"Stream callback data: {callback_data}")
+    
+    # Zpracujeme různé typy stream eventů
+    stream_event = callback_data.get('StreamEvent')
+    stream_sid = callback_data.get('StreamSid')
+    
+    if stream_event == 'stream-started':
+        logger.info(f"🟢 Stream {stream_sid} spuštěn")
+    elif stream_event == 'stream-stopped':
+        logger.info(f"🔴 Stream {stream_sid} ukončen - WebSocket by měl být uzavřen")
+        # Zde by mohlo být dodatečné cleanup pokud potřebujeme
+    elif stream_event == 'stream-error':
+        error_code = callback_data.get('StreamErrorCode')
+        error_msg = callback_data.get('StreamError')
+        logger.error(f"❌ Stream {stream_sid} chyba {error_code}: {error_msg}")
+    
+    return {"status": "ok"}
+
+@router.post("/voice/call")
+async def voice_call_handler(request: Request):
+    """Handler pro Twilio Voice webhook na /voice/call endpoint"""
+    logger.info("Přijat Twilio webhook na /voice/call")
+    
+    # Získáme form data z Twilio
+    form_data = await request.form()
+    
+    # Logování důležitých informací
+    from_number = form_data.get('From', 'Unknown')
+    to_number = form_data.get('To', 'Unknown') 
+    call_sid = form_data.get('CallSid', 'Unknown')
+    
+    logger.info(f"Call SID: {call_sid}")
+    logger.info(f"From: {from_number} -> To: {to_number}")
+    
+    # Zkusíme získat attempt_id z query parametrů
+    attempt_id = request.query_params.get('attempt_id')
+    logger.info(f"Attempt ID: {attempt_id}")
+    
+    # Vytvoříme TwiML odpověď
+    twiml_response = f'''<?xml version="1.0" encoding="UTF-8"?>
+<Response>
+    <Say language="cs-CZ" rate="0.9" voice="Google.cs-CZ-Standard-A">Vítejte u AI asistenta pro výuku jazyků.</Say>
+    <Say language="cs-CZ" rate="0.9" voice="Google.cs-CZ-Standard-A">WebSocket test - pokud slyšíte tuto zprávu, HTTP funguje.</Say>
+    <Say language="cs-CZ" rate="0.9" voice="Google.cs-CZ-Standard-A">Nyní testuji WebSocket připojení.</Say>
+    <Start>
+        <Stream 
+            name="ai_assistant_stream"
+            url="wss://lecture-app-production.up.railway.app/audio" 
+            track="both_tracks" 
+            statusCallback="https://lecture-app-production.up.railway.app/stream-callback"
+            statusCallbackMethod="POST"
+        />
+    </Start>
+    <Pause length="3600"/>
+</Response>'''
+    
+    logger.info(f"TwiML odpověď z /voice/call: {twiml_response}")
+    
+    return Response(
+        content=twiml_response,
+        media_type="application/xml"
+    )
+
+@router.post("/voice/campaign-status")
+def voice_campaign_status(
+    call_id: int = Query(...),
+    CallSid: Optional[str] = Form(None),
+    CallStatus: str = Form(...),
+    CallDuration: Optional[int] = Form(None)
+):
+    """Twilio status callback pro hovory kampaní (busy / no-answer se zařadí k opakování)"""
+    session = SessionLocal()
+    try:
+        new_status = handle_status_callback(session, call_id, CallSid, CallStatus, CallDuration)
+        logger.info(f"📣 Hovor kampaně {call_id} ({CallSid}): {CallStatus} -> {new_status}")
+    except Exception as e:
+        session.rollback()
+        logger.error(f"❌ Chyba při zpracování status callbacku {call_id}: {e}")
+    finally:
+        session.close()
+    return Response(status_code=204)
+
+@router.post("/voice/")
+async def voice_handler(request: Request):
+    logger.info("Přijat Twilio webhook na /voice/")
+    attempt_id = request.query_params.get('attempt_id')
+    logger.info(f"Attempt ID: {attempt_id}")
+    
+    # Získání parametrů hovoru
+    form = await request.form()
+    caller_country = form.get("CallerCountry", "")
+    to_country = form.get("ToCountry", "")
+    logger.info(f"Volající: {caller_country} -> {to_country}")
+    
+    from twilio.twiml.voice_response import VoiceResponse  # Twilio SDK až při prvním hovoru
+    response = VoiceResponse()
+    
+    # Inteligentní uvítání podle aktuální lekce uživatele
+    session = SessionLocal()
+    try:
+        current_user = None
+        current_lesson = None
+        lesson_info = ""
+        
+        # Pokusíme se najít uživatele podle attempt_id
+        if attempt_id:
+            try:
+                attempt = session.query(Attempt).get(int(attempt_id))
+                if attempt:
+                    current_user = attempt.user
+                    current_lesson = attempt.lesson
+            except:
+                pass
+        
+        # Pokud není attempt, najdi posledního uživatele
+        if not current_user:
+            current_user = session.query(User).order_by(User.id.desc()).first()
+        
+        if current_user:
+            # Získej aktuální úroveň uživatele
+            user_level = getattr(current_user, 'current_lesson_level', 0)
+            
+            # Najdi správnou lekci podle úrovně
+            if user_level == 0:
+                target_lesson = session.query(Lesson).filter(
+                    Lesson.lesson_number == 0
+                ).first()
+                if target_lesson:
+                    lesson_info = f"Lekce {target_lesson.lesson_number}: Vstupní test z obráběcích kapalin. Hned začneme s testem!"
+                else:
+                    lesson_info = "Lekce 0: Vstupní test. Hned začneme!"
+            else:
+                target_lesson = session.query(Lesson).filter(
+                    Lesson.lesson_number == user_level
+                ).first()
+                if target_lesson:
+                    lesson_info = f"Lekce {target_lesson.lesson_number}: {target_lesson.title.replace(f'Lekce {target_lesson.lesson_number}:', '').strip()}. Začínáme s výukou!"
+                else:
+                    lesson_info = f"Lekce {user_level}. Začínáme s výukou!"
+    except Exception as e:
+        logger.error(f"Chyba při načítání lekce: {e}")
+        lesson_info = "Lekce 0: Vstupní test. Hned začneme!"
+    finally:
+        session.close()
+    
+    # Nové, lepší uvítání s první otázkou (pokud je to nová session)
+    if current_user and user_level == 0:
+        # Pro vstupní test zkontroluj, jestli už existuje aktivní session
+        test_session_check = session.query(TestSession).filter(
+            TestSession.user_id == current_user.id,
+            TestSession.lesson_id == target_lesson.id if target_lesson else None,
+            *active_session_filter()
+        ).first()
+        
+        if not test_session_check and target_lesson:
+            # NOVÁ SESSION - řekni uvítání + první otázku
+            enabled_questions = []
+            if isinstance(target_lesson.questions, list):
+                enabled_questions = [
+                    q for q in target_lesson.questions 
+                    if isinstance(q, dict) and q.get('enabled', True)
+                ]
+            
+            if enabled_questions:
+                first_question = enabled_questions[0].get('question', '')
+                full_intro = f"Ahoj, jsem tvůj lektor! Začínáme s {lesson_info} První otázka: {first_question}"
+                # Přidej přirozenější pauzy do úvodní řeči
+                intro_with_pauses = create_natural_speech_response(full_intro)
+                response.say(intro_with_pauses, language="cs-CZ", rate="0.8", voice="Google.cs-CZ-Standard-A")
+                logger.info(f"🎯 Úvodní otázka řečena v voice_handler: {first_question}")
+            else:
+                intro_text = f"Ahoj, jsem tvůj lektor! Začínáme s {lesson_info}"
+                intro_with_pauses = create_natural_speech_response(intro_text)
+                response.say(intro_with_pauses, language="cs-CZ", rate="0.8", voice="Google.cs-CZ-Standard-A")
+        else:
+            # EXISTUJÍCÍ SESSION - pouze uvítání
+            existing_intro = "Ahoj, jsem tvůj lektor! Pokračujeme v testu."
+            existing_intro_with_pauses = create_natural_speech_response(existing_intro)
+            response.say(existing_intro_with_pauses, language="cs-CZ", rate="0.8", voice="Google.cs-CZ-Standard-A")
+    else:
+        # Běžné lekce
+        lesson_intro = f"Ahoj, jsem tvůj lektor! Začínáme s {lesson_info}"
+        lesson_intro_with_pauses = create_natural_speech_response(lesson_intro)
+        response.say(lesson_intro_with_pauses, language="cs-CZ", rate="0.8", voice="Google.cs-CZ-Standard-A")
+    
+    # Kratší pauza a přechod do action
+    response.pause(length=1)
+    
+    # Gather s vylepšenými parametry pro lepší detekci konce odpovědi
+    gather = response.gather(
+        input='speech',
+        timeout=8,  # Kratší základní timeout
+        speech_timeout=3,  # Konkrétní hodnota místo 'auto' pro lepší detekci konce
+        action='/voice/process',
+        method='POST',
+        language='cs-CZ',
+        speech_model='phone_call',
+        partial_result_callback='',  # Zakážeme partial results pro čistší zpracování
+        enhanced='true'  # Vylepšené rozpoznávání
+    )
+    
+    gather.say(
+        "Píp.",
+        language="cs-CZ",
+        rate="0.8",
+        voice="Google.cs-CZ-Standard-A"
+    )
+    
+    # Vylepšený fallback s možností připomenutí
+    response.say(
+        "Nerozuměl jsem vám nebo jste neodpověděl. Zkuste mluvit jasně a výrazně.",
+        language="cs-CZ",
+        rate="0.8",
+        voice="Google.cs-CZ-Standard-A"
+    )
+    
+    # Nabídka opakování
+    response.redirect('/voice/process?reminder=true')
+    
+    logger.info(f"TwiML odpověď s inteligentním uvítáním: {response}")
+    return Response(content=str(response), media_type="text/xml")
+
+@router.post("/voice/process")
+@traced("voice.process", kind=SPAN_KIND_SERVER)
+async def process_speech(request: Request):
+    """Vylepšené zpracování hlasového vstupu s inteligentním flow"""
+    logger.info("🎙️ === PROCESS_SPEECH START ===")
+    
+    form = await request.form()
+    set_call_sid(form.get('CallSid'))
+    speech_result = form.get('SpeechResult', '').strip()
+    confidence = form.get('Confidence', '0')
+    attempt_id = request.query_params.get('attempt_id')
+    is_reminder = request.query_params.get('reminder') == 'true'
+    is_confirmation = request.query_params.get('confirmation') == 'true'
+    original_text = request.query_params.get('original_text', '')
+    
+    # URL decode original_text pokud je potřeba
+    if original_text:
+        from urllib.parse import unquote_plus
+        original_text = unquote_plus(original_text)
+    
+    logger.info(f"📝 Rozpoznaná řeč: '{speech_result}' (confidence: {confidence})")
+    logger.info(f"🔗 attempt_id: {attempt_id}, reminder: {is_reminder}, confirmation: {is_confirmation}")
+    
+    from twilio.twiml.voice_response import VoiceResponse  # Twilio SDK až při prvním hovoru
+    response = VoiceResponse()
+    
+    # Zpracování confirmation workflow
+    if is_confirmation and original_text:
+        logger.info(f"🔄 === CONFIRMATION WORKFLOW ===")
+        logger.info(f"📋 Původní text: '{original_text}'")
+        logger.info(f"🎤 Nová odpověď: '{speech_result}'")
+        
+        # Zkontroluj jestli uživatel potvrdil ("ano", "yes", "správně", atd.)
+        confirmation_words = ['ano', 'yes', 'správně', 'jo', 'jasně', 'přesně', 'souhlasím']
+        speech_lower = speech_result.lower()
+        
+        found_confirmation = [word for word in confirmation_words if word in speech_lower]
+        
+        if found_confirmation:
+            # Potvrzeno - použij původní text
+            speech_result = original_text
+            logger.info(f"✅ POTVRZENO ('{found_confirmation[0]}') → používám původní: '{speech_result}'")
+        else:
+            # Nepotvrzeno - použij nový text
+            logger.info(f"❌ NEPOTVRZENO → používám nový text: '{speech_result}'")
+        
+        logger.info(f"🎯 Finální text pro zpracování: '{speech_result}'")
+        
+        # Pokračuj normálním flow (bez dalších confidence kontrol)
+        confidence_float = 1.0  # Nastavíme vysokou confidence aby se přeskočily další kontroly
+    else:
+        # Kontrola confidence threshold pro ASR
+        confidence_float = float(confidence) if confidence else 0.0
+
+    LOW_CONFIDENCE_THRESHOLD = 0.5  # Zvýšený práh pro lepší kontrolu
+
+    # Pokud máme speech_result ale confidence je 0, pravděpodobně je to false positive
+    # Twilio někdy neposkytne confidence i když rozpoznání bylo úspěšné
+    if speech_result and confidence_float == 0.0:
+        logger.info(f"🔍 Speech result existuje ale confidence je 0 - pravděpodobně OK rozpoznání")
+        confidence_float = 0.5  # Nastavíme střední confidence pro pokračování
+
+    # Zpracování připomenutí když uživatel neodpověděl
+    if is_reminder:
+        response.say(
+            "Připomínám - pokud mi nerozumíte nebo potřebujete čas na zamyšlení, řekněte to prosím nahlas.",
+            language="cs-CZ",
+            rate="0.9",
+            voice="Google.cs-CZ-Standard-A"
+        )
+        # Pokračuj do normálního flow
+    
+    # Použij chytřejší logiku rozpoznávání
+    elif speech_result:
+        # Kontrola, zda uživatel signalizuje dokončení odpovědi
+        if is_completion_signal(speech_result):
+            logger.info(f"✅ Uživatel signalizoval dokončení: '{speech_result}' - pokračuji s vyhodnocením")
+            # Pokračuj s normálním flow jako by měl vysokou confidence
+            confidence_float = 1.0
+        
+        recognition_decision = should_ask_for_confirmation(speech_result, confidence_float)
+        logger.info(f"🧠 Rozpoznání: {recognition_decision['reason']} → {recognition_decision['action']}")
+        
+        if recognition_decision['action'] in ['ask_confirm', 'ask_repeat', 'ask_complete']:
+            # Vytvoř přirozenější odpověď s pauzami
+            message_with_pauses = create_natural_speech_response(recognition_decision['message'])
+            
+            response.say(
+                message_with_pauses,
+                language="cs-CZ",
+                rate="0.8",  # Trochu pomalejší pro jasnost
+                voice="Google.cs-CZ-Standard-A"
+            )
+            
+            if recognition_decision['action'] == 'ask_confirm':
+                # URL encode pro bezpečné předání parametrů
+                from urllib.parse import quote_plus
+                encoded_text = quote_plus(speech_result)
+                
+                gather = response.gather(
+                    input='speech',
+                    timeout=12,  # Více času na rozmyšlení
+                    speech_timeout=4,
+                    action=f'/voice/process?confirmation=true&original_text={encoded_text}',
+                    method='POST',
+                    language='cs-CZ',
+                    speech_model='phone_call',
+                    enhanced='true'
+                )
+                
+                gather.say(
+                    "Řekněte 'ano' pokud je to správně, nebo zopakujte vaši odpověď.",
+                    language="cs-CZ",
+                    rate="0.8",
+                    voice="Google.cs-CZ-Standard-A"
+                )
+            
+            elif recognition_decision['action'] == 'ask_complete':
+                # Nabídka doplnění odpovědi
+                gather = response.gather(
+                    input='speech',
+                    timeout=15,  # Více času na rozmyšlení delší odpovědi
+                    speech_timeout=5,
+                    action='/voice/process',
+                    method='POST',
+                    language='cs-CZ',
+                    speech_model='phone_call',
+                    enhanced='true'
+                )
+                
+                gather.say(
+                    "Pokud chcete něco doplnit, pokračujte. Nebo řekněte 'hotovo' pokud je odpověď kompletní.",
+                    language="cs-CZ",
+                    rate="0.8",
+                    voice="Google.cs-CZ-Standard-A"
+                )
+            
+            else:  # ask_repeat
+                gather = response.gather(
+                    input='speech',
+                    timeout=12,
+                    speech_timeout=4,
+                    action='/voice/process',
+                    method='POST',
+                    language='cs-CZ',
+                    speech_model='phone_call',
+                    enhanced='true'
+                )
+            
+            response.say(
+                "Nerozuměl jsem vám. Zkuste to prosím znovu pomaleji.",
+                language="cs-CZ",
+                rate="0.8",
+                voice="Google.cs-CZ-Standard-A"
+            )
+            response.redirect('/voice/process?reminder=true')
+            
+            return Response(content=str(response), media_type="text/xml")
+    
+    # Pokud je odpověď prázdná a není to reminder
+    if not speech_result and not is_reminder:
+        response.say(
+            "Nerozuměl jsem vám nebo jste neodpověděl. Zkuste mluvit jasně a zřetelně.",
+            language="cs-CZ",
+            rate="0.9",
+            voice="Google.cs-CZ-Standard-A"
+        )
+        
+        # Vylepšený gather s lepšími parametry
+        gather = response.gather(
+            input='speech',
+            timeout=10,
+            speech_timeout=4,  # Delší speech_timeout pro lepší detekci konce
+            action='/voice/process',
+            method='POST',
+            language='cs-CZ',
+            speech_model='phone_call',
+            enhanced='true'
+        )
+        
+        gather.say(
+            "Zkuste to prosím znovu. Naslouchám...",
+            language="cs-CZ",
+            rate="0.9",
+            voice="Google.cs-CZ-Standard-A"
+        )
+        
+        response.say(
+            "Pokud máte potíže s připojením, zkuste zavolat znovu.",
+            language="cs-CZ",
+            rate="0.9",
+            voice="Google.cs-CZ-Standard-A"
+        )
+        response.hangup()
+        
+        return Response(content=str(response), media_type="text/xml")
+    
+    # Hlavní zpracování s OpenAI
+    try:
+        openai_api_key = os.getenv('OPENAI_API_KEY')
+        if not openai_api_key:
+            response.say("AI služba není dostupná.", language="cs-CZ")
+            response.hangup()
+            return Response(content=str(response), media_type="text/xml")
+        
+        client = openai_client("voice", openai_api_key)
+        
+        session = SessionLocal()
+        current_user = None
+        user_level = 0
+        should_continue = False
+        
+        try:
+            # Načtení uživatele
+            with span("db.load_user"):
+                if attempt_id:
+                    try:
+                        attempt = session.query(Attempt).get(int(attempt_id))
+                        if attempt:
+                            current_user = attempt.user
+                    except:
+                        pass
+                
+                if not current_user:
+                    current_user = session.query(User).order_by(User.id.desc()).first()
+            
+            if not current_user:
+                response.say("Technická chyba - uživatel nenalezen.", language="cs-CZ")
+                response.hangup()
+                return Response(content=str(response), media_type="text/xml")
+            
+            user_level = getattr(current_user, 'current_lesson_level', 0)
+            logger.info(f"👤 Uživatel: {current_user.name}, Úroveň: {user_level}")
+            
+            if user_level == 0:
+                # === VSTUPNÍ TEST (LEKCE 0) ===
+                should_continue = await handle_entry_test(session, current_user, speech_result, response, client, attempt_id, confidence_float)
+            else:
+                # === BĚŽNÉ LEKCE (1+) ===
+                should_continue = await handle_regular_lesson(session, current_user, user_level, speech_result, response, client)
+                
+        except Exception as db_error:
+            logger.error(f"❌ DB chyba: {db_error}")
+            response.say("Došlo k technické chybě. Zkuste to prosím později.", language="cs-CZ")
+            response.hangup()
+            return Response(content=str(response), media_type="text/xml")
+        finally:
+            session.close()
+    
+    except Exception as e:
+        logger.error(f"❌ Celková chyba: {e}")
+        response.say("Došlo k neočekávané chybě.", language="cs-CZ")
+        response.hangup()
+        return Response(content=str(response), media_type="text/xml")
+    
+    # === POKRAČOVÁNÍ KONVERZACE ===
+    if should_continue:
+        gather = response.gather(
+            input='speech',
+            timeout=15,  # Delší timeout pro úvahu
+            speech_timeout=4,  # Lepší detekce konce odpovědi
+            action='/voice/process',
+            method='POST',
+            language='cs-CZ',
+            speech_model='phone_call',
+            enhanced='true'
+        )
+        
+        if user_level == 0:
+            gather.say(
+                "Píp.",
+                language="cs-CZ",
+                rate="0.8",
+                voice="Google.cs-CZ-Standard-A"
+            )
+        else:
+            question_prompt = "Máte další otázku?"
+            question_prompt_with_pauses = create_natural_speech_response(question_prompt)
+            gather.say(
+                question_prompt_with_pauses,
+                language="cs-CZ",
+                rate="0.8",
+                voice="Google.cs-CZ-Standard-A"
+            )
+        
+        # Vylepšený fallback
+        response.say(
+            "Nerozuměl jsem vaší odpovědi. Zkuste mluvit jasně nebo řekněte 'konec' pro ukončení.",
+            language="cs-CZ",
+            rate="0.8",
+            voice="Google.cs-CZ-Standard-A"
+        )
+        response.redirect('/voice/process?reminder=true')
+    else:
+        response.say(
+            "Děkuji za rozhovor. Na shledanou!",
+            language="cs-CZ",
+            rate="0.9",
+            voice="Google.cs-CZ-Standard-A"
+        )
+        response.hangup()
+    
+    return Response(content=str(response), media_type="text/xml")
+
+
+@traced("voice.handle_entry_test")
+async def handle_entry_test(session, current_user, speech_result, response, client, attempt_id, confidence_float):
+    """Zpracování vstupního testu (Lekce 0)"""
+    logger.info("🎯 Zpracovávám vstupní test...")
+    
+    # Najdi Lekci 0
+    target_lesson = session.query(Lesson).filter(
+        Lesson.lesson_number == 0
+    ).first()
+    
+    if not target_lesson:
+        target_lesson = session.query(Lesson).filter(
+            Lesson.title.contains("Lekce 0")
+        ).first()
+    
+    if not target_lesson:
+        response.say("Vstupní test nebyl nalezen. Kontaktujte administrátora.", language="cs-CZ")
+        return False
+    
+    # Zkontroluj, jestli už existuje aktivní session PŘED jejím získáním
+    with span("db.find_active_session"):
+        session_db = SessionLocal()
+        existing_active_session = session_db.query(TestSession).filter(
+            TestSession.user_id == current_user.id,
+            TestSession.lesson_id == target_lesson.id,
+            *active_session_filter()
+        ).first()
+        session_db.close()
+    
+    # Získej nebo vytvoř test session
+    test_session = get_or_create_test_session(
+        user_id=current_user.id,
+        lesson_id=target_lesson.id,
+        attempt_id=int(attempt_id) if attempt_id else None
+    )
+    
+    # Rozlišení: NOVÁ session (první otázka) vs EXISTUJÍCÍ session (odpověď)
+    if not existing_active_session:
+        # NOVÁ SESSION - první otázka už byla řečena v voice_handler
+        logger.info(f"🎯 Nová session vytvořena, první otázka už byla řečena")
+        return True
+    else:
+        # EXISTUJÍCÍ SESSION - vyhodnotit odpověď
+        logger.info(f"💬 Vyhodnocuji odpověď: '{speech_result}'")
+        
+        current_question = get_current_question(test_session)
+        if not current_question or not speech_result:
+            response.say("Nerozuměl jsem vaší odpovědi. Zkuste to prosím znovu.", language="cs-CZ")
+            return True
+        
+        # AI vyhodnocení podle nových instrukcí s vylepšeným matching algoritmem
+        keywords = current_question.get('keywords', [])
+        system_prompt = f"""ÚKOL:
+Vyhodnoť studentskou odpověď na zadanou otázku a porovnej ji s ideální správnou odpovědí.
+
+OTÁZKA: {current_question.get('question', '')}
+SPRÁVNÁ ODPOVĚĎ: {current_question.get('correct_answer', '')}
+STUDENTSKÁ ODPOVĚĎ: "{speech_result}"
+
+DŮLEŽITÉ PRAVIDLA PRO VYHODNOCENÍ:
+1. POROVNÁVÁNÍ SE SPRÁVNOU ODPOVĚDÍ: Hlavní kritérium je podobnost s ideální správnou odpovědí, ne klíčová slova.
+
+2. ROZPOZNÁVÁNÍ CHYB ASR: Ber v úvahu možné chyby rozpoznávání řeči:
+   - 'operátorem' = 'separátorem' (ČASTÁ CHYBA ASR!)
+   - 'reparátor' = 'separátor' (ČASTÁ CHYBA ASR!)
+   - 'chlazení' = 'hlazení'
+   - 'mazání' = 'mazaní'
+   - 'odvod' = 'odvod'
+
+3. SYNONYMA A VARIANTY: Uznávej tyto varianty:
+   - 'refraktometr' = 'refraktometrický', 'refraktometrické'
+   - 'koncentrace' = 'koncentrovaný', 'koncentrovaná'
+   - 'bakterie' = 'bakteriální', 'bakterií', 'bakteriálního'
+   - 'pH' = 'ph', 'PH', 'ph hodnota'
+   - 'emulze' = 'emulzní', 'emulzní kapalina'
+   - 'chlazení' = 'chlazen', 'ochlazován', 'chlazená'
+   - 'separátor' = 'separátor oleje', 'separátorem', 'separátoru', 'operátorem', 'operátor', 'reparátor', 'reparátorem'
+   - 'odstranění' = 'odstranit', 'odstraňuje', 'odstraněno', 'odstraňování'
+   - 'skimmer' = 'skimmerem', 'skimmeru', 'skimmer'
+
+4. KRITICKÉ PRAVIDLO: 
+   - Pokud student řekne 'operátorem' nebo 'operátor', považuj to za 'separátorem'!
+   - Pokud student řekne 'separátor', považuj to za 'separátorem' (stejný význam)!
+   - Různé tvary slov mají stejný význam: 'separátor' = 'separátorem' = 'separátoru'
+
+5. PRAVIDLO PRO ČÁSTEČNÉ SHODY:
+   - Pokud student zmíní hlavní koncept (např. 'separátor'), ale chybí upřesnění (např. 'oleje'), stále to považuj za správné, pokud je kontext jasný.
+   - Příklad: Na otázku "Jak se odstraňuje tramp oil?" je odpověď "separátorem" správná, i když ideální je "separátorem oleje".
+
+6. ROZPOZNÁVÁNÍ KOŘENŮ SLOV:
+   - Pokud kořen slova je správný, považuj to za správné
+   - Příklad: 'chlazení' = 'chlazen', 'chlazená', 'chlazený', 'ochlazování'
+   - Příklad: 'mazání' = 'mazan', 'mazaný', 'mazán', 'mazání'
+   - Příklad: 'odstranění' = 'odstranit', 'odstraňuje', 'odstraněno', 'odstraňování'
+   - Příklad: 'separátor' = 'separátorem', 'separátoru', 'separátorový'
+   - Příklad: 'skimmer' = 'skimmerem', 'skimmeru', 'skimmerový'
+   - Příklad: 'refraktometr' = 'refraktometrický', 'refraktometrické', 'refraktometrů'
+   - Příklad: 'koncentrace' = 'koncentrovaný', 'koncentrovaná', 'koncentrovat'
+   - Příklad: 'bakterie' = 'bakteriální', 'bakterií', 'bakteriálního'
+
+7. VYPOČET SKÓRE: 
+   - 100%: Odpověď obsahuje všechny klíčové koncepty ze správné odpovědi
+   - 80-99%: Odpověď obsahuje většinu klíčových konceptů
+   - 60-79%: Odpověď obsahuje některé klíčové koncepty
+   - 40-59%: Odpověď obsahuje málo klíčových konceptů
+   - 0-39%: Odpověď neobsahuje klíčové koncepty
+
+VÝSTUP:
+1. Procentuální skóre: Vypočítej podle pravidel výše
+2. Ultra krátká zpětná vazba (max. 1–2 věty):  
+   - Pokud chybí klíčové koncepty, vyjmenuj je stručně: „Chybí: …"  
+   - Pokud odpověď obsahuje všechny klíčové koncepty: „Výborně, úplná odpověď!"
+
+Formát odpovědi: [FEEDBACK] [SKÓRE: XX%]"""
+        
+        try:
+            gpt_response = client.with_caller("entry_test_eval").chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "system", "content": system_prompt}],
+                max_tokens=150,
+                temperature=0.3
+            )
+            
+            ai_answer = gpt_response.choices[0].message.content
+            
+            # Extrakce skóre - robustní regex pro různé formáty
+            import re
+            score_match = re.search(r'\[SKÓRE:\s*(\d+)%?\]', ai_answer, re.IGNORECASE)
+            current_score = int(score_match.group(1)) if score_match else 0
+            
+            # Vyčistění feedback od skóre tagu
+            clean_feedback = re.sub(r'\[SKÓRE:\s*\d+%?\]', '', ai_answer, flags=re.IGNORECASE).strip()
+            
+            # Log pro debug AI odpovědi
+            logger.info(f"🤖 AI raw odpověď: '{ai_answer}'")
+            logger.info(f"🎯 Extrahované skóre: {current_score}%")
+            logger.info(f"💬 Čistý feedback: '{clean_feedback}'")
+            
+            # Vylepšené logování před uložením odpovědi
+            log_answer_analysis(
+                user_id=current_user.id,
+                question=current_question,
+                user_answer=speech_result,
+                ai_score=current_score,
+                ai_feedback=clean_feedback,
+                confidence=confidence_float
+            )
+            
+            # Uložení odpovědi a posun
+            updated_session = save_answer_and_advance(
+                test_session.id, 
+                speech_result, 
+                float(current_score), 
+                clean_feedback,
+                test_session.current_question_index  # Přidán chybějící parametr
+            )
+            
+            if updated_session and updated_session.get('is_completed'):
+                # Test dokončen
+                final_score = updated_session.get('current_score', 0)
+                total_questions = len(updated_session.get('answers', []))
+                
+                if final_score >= 90:
+                    current_user.current_lesson_level = 1
+                    session.commit()
+                    final_message = f"{clean_feedback} Test dokončen! Skóre: {final_score:.1f}% z {total_questions} otázek. Gratulujeme, postoupili jste do Lekce 1!"
+                else:
+                    final_message = f"{clean_feedback} Test dokončen. Skóre: {final_score:.1f}% z {total_questions} otázek. Pro postup potřebujete 90%. Můžete zkusit znovu!"
+                
+                # Použij přirozenější pauzy pro finální zprávu
+                final_message_with_pauses = create_natural_speech_response(final_message)
+                response.say(final_message_with_pauses, language="cs-CZ", rate="0.8")
+                return False  # Ukončit konverzaci
+            else:
+                # Další otázka - použij adaptivní výběr
+                next_question = get_next_adaptive_question(updated_session)
+                if next_question:
+                    # Aktualizace indexu v databázi
+                    test_session = session.query(TestSession).get(updated_session['id'])
+                    test_session.current_question_index = next_question['original_index']
+                    session.commit()
+                    
+                    difficulty_indicator = {"easy": "⭐", "medium": "⭐⭐", "hard": "⭐⭐⭐"}.get(
+                        next_question.get('difficulty', 'medium'), "⭐⭐"
+                    )
+                    
+                    next_text = f"{clean_feedback} Další otázka {difficulty_indicator}: {next_question.get('question', '')}"
+                    # Použij přirozenější pauzy
+                    next_text_with_pauses = create_natural_speech_response(next_text)
+                    response.say(next_text_with_pauses, language="cs-CZ", rate="0.8")
+                    return True  # Pokračovat
+                else:
+                    response.say("Všechny otázky zodpovězeny. Test končí.", language="cs-CZ", rate="0.8")
+                    return False
+                    
+        except Exception as e:
+            logger.error(f"❌ AI chyba: {e}")
+            response.say("Chyba při vyhodnocování odpovědi.", language="cs-CZ")
+            return False
+
+
+def log_answer_analysis(user_id: int, question: dict, user_answer: str, ai_score: int, ai_feedback: str, confidence: float):
+    """Detailní logování odpovědi pro analýzu typických chyb"""
+    try:
+        question_text = question.get('question', 'N/A')
+        correct_answer = question.get('correct_answer', 'N/A')
+        keywords = question.get('keywords', [])
+        
+        logger.info(f"""
+📊 === ANALÝZA ODPOVĚDI ===
+👤 User ID: {user_id}
+❓ Otázka: {question_text}
+✅ Správná odpověď: {correct_answer}
+🔑 Klíčová slova: {', '.join(keywords) if keywords else 'žádná'}
+💬 Odpověď uživatele: '{user_answer}'
+🎯 AI skóre: {ai_score}%
+📝 AI feedback: {ai_feedback}
+🎤 Speech confidence: {confidence:.2f}
+📏 Délka odpovědi: {len(user_answer)} znaků, {len(user_answer.split())} slov
+===========================""")
+        
+        # Analýza typických problémů
+        issues = []
+        
+        # Příliš krátká odpověď
+        if len(user_answer.split()) < 2:
+            issues.append("KRÁTKÁ_ODPOVĚĎ")
+        
+        # Nízká confidence
+        if confidence < 0.3:
+            issues.append("NÍZKÁ_CONFIDENCE")
+        elif confidence < 0.5:
+            issues.append("STŘEDNÍ_CONFIDENCE")
+        
+        # Nízké skóre
+        if ai_score < 30:
+            issues.append("VELMI_NÍZKÉ_SKÓRE")
+        elif ai_score < 60:
+            issues.append("NÍZKÉ_SKÓRE")
+        
+        # Detailní analýza klíčových slov
+        if keywords:
+            found_keywords = []
+            missing_keywords = []
+            
+            for kw in keywords:
+                kw_lower = kw.lower()
+                answer_lower = user_answer.lower()
+                found_match = False
+                match_type = ""
+                
+                # 1. PŘESNÁ SHODA
+                if kw_lower in answer_lower:
+                    found_keywords.append(kw)
+                    found_match = True
+                    match_type = "přesná"
+                
+                # 2. SUBSTRING MATCHING (hotfix) - klíčové slovo jako součást delšího slova
+                elif not found_match:
+                    # Hledej klíčové slovo jako substring v libovolném slově odpovědi
+                    words_in_answer = answer_lower.split()
+                    for word in words_in_answer:
+                        if kw_lower in word or word in kw_lower:
+                            found_keywords.append(f"{kw}({word})")
+                            found_match = True
+                            match_type = "substring"
+                            break
+                
+                # 3. SYNONYMA A VARIANTY (rozšířený seznam)
+                if not found_match:
+                    synonyms = {
+                        'chlazení': ['hlazení', 'chladění', 'ochlazování', 'chlazen', 'ochlazován'],
+                        'mazání': ['mazaní', 'lubrication', 'lubrikace', 'mazan', 'mazán'],
+                        'odvod': ['odvedení', 'odvádění', 'odváděn', 'odváděný'],
+                        'refraktometr': ['refraktometric', 'refraktometrický', 'refraktometrů'],
+                        'koncentrace': ['koncentrac', 'koncentraci', 'koncentrovat'],
+                        'bakterie': ['bakterií', 'bakteriálního', 'mikroorganismy'],
+                        'pH': ['ph', 'kyselost', 'kyselá', 'zásaditá'],
+                        'emulze': ['emulzní', 'emulgovat', 'emulgovaný'],
+                        'separátor': ['separátor oleje', 'separátorem', 'operátorem', 'operátor', 'reparátor', 'reparátorem'],
+                        'odstranění': ['odstranit', 'odstraňuje', 'odstraněno', 'odstraňování'],
+                        'skimmer': ['skimmerem', 'skimmeru', 'skimmer']
+                    }
+                    
+                    if kw_lower in synonyms:
+                        for syn in synonyms[kw_lower]:
+                            if syn in answer_lower:
+                                found_keywords.append(f"{kw}({syn})")
+                                found_match = True
+                                match_type = "synonymum"
+                                break
+                
+                # 4. POKUD NEBYLO NALEZENO
+                if not found_match:
+                    missing_keywords.append(kw)
+                    
+                # Log pro debug
+                if found_match:
+                    logger.debug(f"✓ '{kw}' nalezeno jako {match_type}: {found_keywords[-1]}")
+            
+            # Výpočet pokrytí klíčových slov
+            keyword_coverage = len(found_keywords) / len(keywords) * 100 if keywords else 0
+            
+            if not found_keywords:
+                issues.append("ŽÁDNÁ_KLÍČOVÁ_SLOVA")
+            elif keyword_coverage < 50:
+                issues.append("MÁLO_KLÍČOVÝCH_SLOV")
+                
+            # Detailní breakdown matchingu
+            exact_matches = [kw for kw in found_keywords if '(' not in str(kw)]
+            fuzzy_matches = [kw for kw in found_keywords if '(' in str(kw)]
+            
+            logger.info(f"🔍 ANALÝZA KLÍČOVÝCH SLOV ({len(found_keywords)}/{len(keywords)}):")
+            logger.info(f"  ✅ Přesné shody: {exact_matches}")
+            logger.info(f"  🔄 Fuzzy/substring shody: {fuzzy_matches}")
+            logger.info(f"  ❌ Chybějící: {missing_keywords}")
+            logger.info(f"📊 Celkové pokrytí: {keyword_coverage:.1f}%")
+        
+        if issues:
+            logger.warning(f"⚠️ Identifikované problémy: {', '.join(issues)}")
+        else:
+            logger.info(f"✅ Odpověď bez evidentních problémů")
+            
+    except Exception as e:
+        logger.error(f"❌ Chyba při logování analýzy: {e}")
+
+
+@traced("voice.handle_regular_lesson")
+async def handle_regular_lesson(session, current_user, user_level, speech_result, response, client):
+    """Zpracování běžných lekcí (1+)"""
+    logger.info(f"📚 Zpracovávám lekci úrovně {user_level}")
+    
+    # Najdi lekci podle čísla
+    target_lesson = session.query(Lesson).filter(
+        Lesson.lesson_number == user_level
+    ).first()
+    
+    if not target_lesson:
+        # Fallback - najdi podle úrovně
+        target_lesson = session.query(Lesson).filter(
+            Lesson.level == "beginner"
+        ).first()
+    
+    if not target_lesson:
+        response.say(f"Lekce {user_level} nebyla nalezena. Kontaktujte administrátora.", language="cs-CZ")
+        return False
+    
+    logger.info(f"✅ Nalezena lekce: {target_lesson.title}")
+    
+    # Obecná konverzace nebo testování
+    lesson_content = target_lesson.script or target_lesson.description or ""
+    
+    # Jednoduchý AI chat o lekci
+    system_prompt = f"""Jsi AI lektor pro lekci: {target_lesson.title}
+
+OBSAH LEKCE:
+{lesson_content[:800]}
+
+INSTRUKCE:
+1. Odpovídej na otázky studenta o lekci
+2. Buď věcný a srozumitelný
+3. Pokud student chce test, připrav otázku
+4. Udržuj rozhovor aktivní
+
+Student řekl: "{speech_result}"
+Odpověz mu v češtině (max 2 věty)."""
+    
+    try:
+        gpt_response = client.with_caller("lesson_chat").chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[{"role": "system", "content": system_prompt}],
+            max_tokens=200,
+            temperature=0.6
+        )
+        
+        ai_answer = gpt_response.choices[0].message.content
+        response.say(ai_answer, language="cs-CZ", rate="0.9")
+        return True  # Pokračovat v konverzaci
+        
+    except Exception as e:
+        logger.error(f"❌ AI chyba: {e}")
+        response.say("Chyba při zpracování dotazu.", language="cs-CZ")
+        return False
+
+# Funkce pro správu test sessions
+@traced("db.get_or_create_test_session")
+def get_or_create_test_session(user_id: int, lesson_id: int, attempt_id: int = None) -> TestSession:
+    """Najde existující aktivní test session nebo vytvoří novou"""
+    session = SessionLocal()
+    try:
+        # NEJDŘÍV zkus najít existující aktivní session
+        existing_session = session.query(TestSession).filter(
+            TestSession.user_id == user_id,
+            TestSession.lesson_id == lesson_id,
+            *active_session_filter()
+        ).first()
+        
+        # Pokud existuje aktivní session, vrať ji (navázání hovoru je aktivita, TTL běží znovu)
+        if existing_session:
+            existing_session.last_activity_at = datetime.utcnow()
+            session.commit()
+            logger.info(f"📋 Pokračuji v existující test session {existing_session.id} (otázka {existing_session.current_question_index + 1}/{existing_session.total_questions})")
+            session.close()
+            return existing_session
+        
+        # Pokud neexistuje aktivní session, vytvoř novou
+        logger.info(f"🆕 Vytvářím novou test session pro uživatele {user_id}")
+        
+        # Vytvoř novou session
+        lesson = session.query(Lesson).get(lesson_id)
+        if not lesson:
+            raise ValueError(f"Lekce {lesson_id} neexistuje")
+        
+        # Získej aktivní otázky z lekce
+        enabled_questions = []
+        if isinstance(lesson.questions, list):
+            enabled_questions = [
+                q for q in lesson.questions 
+                if isinstance(q, dict) and q.get('enabled', True)
+            ]
+        
+        if not enabled_questions:
+            raise ValueError("Žádné aktivní otázky v lekci")
+        
+        # Vytvoř novou test session
+        test_session = TestSession(
+            user_id=user_id,
+            lesson_id=lesson_id,
+            attempt_id=attempt_id,
+            current_question_index=0,
+            total_questions=len(enabled_questions),
+            questions_data=enabled_questions,
+            answers=[],
+            scores=[]
+        )
+        
+        session.add(test_session)
+        session.commit()
+        
+        logger.info(f"🆕 Vytvořena nová test session: {test_session.id} s {len(enabled_questions)} otázkami")
+        logger.info(f"🔍 První 3 otázky: {[q.get('question', 'N/A')[:50] for q in enabled_questions[:3]]}")
+        return test_session
+        
+    finally:
+        session.close()
+
+def get_current_question(test_session) -> dict:
+    """Získá aktuální otázku pro test session (přijímá TestSession objekt nebo dict)"""
+    if isinstance(test_session, dict):
+        current_index = test_session.get('current_question_index', 0)
+        questions_data = test_session.get('questions_data', [])
+    else:
+        current_index = test_session.current_question_index
+        questions_data = test_session.questions_data
+    
+    if current_index >= len(questions_data):
+        return None
+    
+    return questions_data[current_index]
+
+def get_next_adaptive_question(test_session) -> Optional[dict]:
+    """
+    Vybere další otázku na základě adaptivní obtížnosti.
+    """
+    if isinstance(test_session, dict):
+        answered_indices = {a['question_index'] for a in test_session.get('answers', [])}
+        all_questions = test_session.get('questions_data', [])
+        difficulty_score = test_session.get('difficulty_score', 50.0)
+    else: # Je to TestSession objekt
+        # Bezpečnější přístup k potentially None 'answers'
+        answered_indices = {a['question_index'] for a in (test_session.answers or [])}
+        all_questions = test_session.questions_data
+        difficulty_score = getattr(test_session, 'difficulty_score', 50.0) or 50.0
+
+    unanswered_questions = [
+        (idx, q) for idx, q in enumerate(all_questions) if idx not in answered_indices
+    ]
+
+    if not unanswered_questions:
+        return None
+
+    difficulty_map = {"easy": 25, "medium": 50, "hard": 75}
+    
+    best_question = None
+    min_diff = float('inf')
+
+    for idx, q_data in unanswered_questions:
+        q_difficulty = difficulty_map.get(q_data.get("difficulty", "medium"), 50)
+        diff = abs(q_difficulty - difficulty_score)
+        
+        if diff < min_diff:
+            min_diff = diff
+            best_question = q_data.copy() # Vytvoříme kopii
+            best_question['original_index'] = idx 
+            
+    return best_question
+
+@traced("db.save_answer_and_advance")
+def save_answer_and_advance(test_session_id: int, user_answer: str, score: float, feedback: str, question_index: int):
+    """
+    Uloží odpověď, aktualizuje skóre obtížnosti, sleduje chyby a posune na další otázku.
+    """
+    session = SessionLocal()
+    try:
+        test_session = session.query(TestSession).get(test_session_id)
+        if not test_session:
+            return None
+        test_session.last_activity_at = datetime.utcnow()
+        
+        # Získání otázky podle předaného indexu
+        current_question = test_session.questions_data[question_index]
+        
+        # Aktualizace skóre obtížnosti
+        difficulty_map = {"easy": 25, "medium": 50, "hard": 75}
+        q_difficulty_val = difficulty_map.get(current_question.get("difficulty", "medium"), 50)
+        
+        if score >= 80:
+            adjustment = (100 - q_difficulty_val) / 10
+            current_difficulty = getattr(test_session, 'difficulty_score', 50.0) or 50.0
+            test_session.difficulty_score = current_difficulty + adjustment
+        else:
+            adjustment = q_difficulty_val / 10
+            current_difficulty = getattr(test_session, 'difficulty_score', 50.0) or 50.0
+            test_session.difficulty_score = current_difficulty - adjustment
+            
+            category = current_question.get("category", "Neznámá")
+            if not test_session.failed_categories:
+                test_session.failed_categories = []
+            if category not in test_session.failed_categories:
+                test_session.failed_categories.append(category)
+                flag_modified(test_session, "failed_categories")
+
+        current_difficulty = getattr(test_session, 'difficulty_score', 50.0) or 50.0
+        test_session.difficulty_score = max(0, min(100, current_difficulty))
+        final_difficulty = getattr(test_session, 'difficulty_score', 50.0) or 50.0
+        logger.info(f"🧠 Nové skóre obtížnosti: {final_difficulty:.2f} (změna: {adjustment:.2f})")
+
+        answer_data = {
+            "question": current_question.get("question", ""),
+            "correct_answer": current_question.get("correct_answer", ""),
+            "user_answer": user_answer,
+            "score": score,
+            "feedback": feedback,
+            "question_index": question_index,
+            "category": current_question.get("category", "Neznámá")
+        }
+        
+        if not test_session.answers:
+            test_session.answers = []
+        if not test_session.scores:
+            test_session.scores = []
+            
+        test_session.answers.append(answer_data)
+        test_session.scores.append(score)
+        
+        test_session.current_score = sum(test_session.scores) / len(test_session.scores)
+        
+        question_num = len(test_session.answers)
+        logger.info(f"""
+💾 === ODPOVĚĎ ULOŽENA ===
+🔢 Otázka: {question_num}/{test_session.total_questions}
+📝 Uživatel: "{user_answer}"
+🎯 Skóre: {score}%
+💬 Feedback: "{feedback}"
+📊 Průměr: {test_session.current_score:.1f}%
+=========================""")
+        
+        if len(test_session.answers) >= test_session.total_questions:
+            test_session.is_completed = True
+            test_session.completed_at = datetime.utcnow()
+            record_session_completion(session, test_session.lesson_id, test_session.completed_at, test_session.current_score)
+            # Analytické rollupy odpovědí ve stejné transakci jako dokončení
+            record_session_answers(session, test_session.answers, test_session.questions_data)
+            # Spaced-repetition stav kategorií + termín dalšího opakovacího hovoru (NumPy až tady)
+            from app.services.spaced_repetition import record_session_review
+            record_session_review(session, test_session)
+        
+        # KRITICKÉ: Oznámení SQLAlchemy o změnách JSON sloupců
+        flag_modified(test_session, 'answers')
+        flag_modified(test_session, 'scores')
+        flag_modified(test_session, 'failed_categories')
+        
+        # KRITICKÉ: Commit změn do databáze
+        session.commit()
+        
+        return {
+            'id': test_session.id,
+            'current_question_index': test_session.current_question_index,
+            'total_questions': test_session.total_questions,
+            'questions_data': test_session.questions_data,
+            'answers': test_session.answers,
+            'scores': test_session.scores,
+            'current_score': test_session.current_score,
+            'is_completed': test_session.is_completed,
+            'completed_at': test_session.completed_at,
+            'failed_categories': test_session.failed_categories,
+            'difficulty_score': getattr(test_session, 'difficulty_score', 50.0)
+        }
+            
+    finally:
+        session.close()
+    
+    return None
+
+# === NOVÁ FUNKCE: Inteligentní rozhodování o kvalitě rozpoznání ===
+def should_ask_for_confirmation(speech_result: str, confidence_float: float, context: str = "") -> dict:
+    """
+    Chytrá logika pro rozhodování, zda se ptát na potvrzení odpovědi.
+    Vrací slovník s doporučením a důvodem.
+    """
+    
+    # Základní kontroly
+    if not speech_result:
+        return {"action": "ask_repeat", "reason": "empty_response", "message": "Nerozuměl jsem vám. Můžete zopakovat svou odpověď?"}
+    
+    speech_lower = speech_result.lower().strip()
+    word_count = len(speech_result.split())
+    
+    # 1. VYSOKÁ KVALITA - pokračovat bez ptaní
+    if confidence_float >= 0.8 and word_count >= 2:
+        return {"action": "continue", "reason": "high_confidence", "message": ""}
+    
+    # 2. VELMI KRÁTKÉ ODPOVĚDI - možná neúplné
+    if word_count == 1 and confidence_float < 0.7:
+        return {
+            "action": "ask_complete", 
+            "reason": "too_short", 
+            "message": f"Rozuměl jsem: '{speech_result}'. Chtěli byste svou odpověď rozšířit nebo je to vše?"
+        }
+    
+    # 3. STŘEDNÍ KVALITA - rozhoduj podle obsahu
+    if 0.4 <= confidence_float < 0.8:
+        # Pokud obsahuje jasná slova, pravděpodobně je OK
+        clear_indicators = ['ano', 'ne', 'nevím', 'není', 'je', 'má', 'nemá']
+        has_clear_word = any(word in speech_lower for word in clear_indicators)
+        
+        if has_clear_word and word_count >= 2:
+            return {"action": "continue", "reason": "clear_content", "message": ""}
+        elif word_count >= 4:  # Delší odpověď, pravděpodobně OK
+            return {"action": "continue", "reason": "sufficient_length", "message": ""}
+        else:
+            return {
+                "action": "ask_confirm", 
+                "reason": "medium_confidence", 
+                "message": f"Rozuměl jsem: '{speech_result}'. Je to správně?"
+            }
+    
+    # 4. NÍZKÁ KVALITA - požádat o zopakování
+    if confidence_float < 0.4:
+        return {
+            "action": "ask_repeat", 
+            "reason": "low_confidence", 
+            "message": "Omlouvám se, nerozuměl jsem vám dobře. Můžete zopakovat svou odpověď pomaleji a jasněji?"
+        }
+    
+    # 5. VÝCHOZÍ - pokračovat
+    return {"action": "continue", "reason": "default", "message": ""}
+
+
+def create_natural_speech_response(text: str, language: str = "cs-CZ", add_pauses: bool = True) -> str:
+    """
+    Vrací čistý text bez SSML tagů - TwiML je nepodporuje správně.
+    Používáme pomalejší tempo řeči místo SSML pauz.
+    """
+    # Jednoduchý return bez jakýchkoliv SSML modifikací
+    return text.strip()
+
+
+def is_completion_signal(speech_text: str) -> bool:
+    """
+    Rozpozná, zda uživatel signalizuje dokončení odpovědi.
+    """
+    if not speech_text:
+        return False
+    
+    completion_signals = [
+        'hotovo', 'konec', 'dokončeno', 'to je vše', 'to je všechno',
+        'stačí', 'už ne', 'už nechci', 'končím', 'finish', 'done'
+    ]
+    
+    speech_lower = speech_text.lower().strip()
+    return any(signal in speech_lower for signal in completion_signals)
@@ -0,0 +1,366 @@
+"""
+Inkrementálně udržované analytické tabulky (rollupy) pro admin dashboard.
+
+Odpovědi dokončeného testu se přičtou do `question_stats` a `category_stats`
+ve stejné transakci, ve které se session označuje jako dokončená, a test sám do
+denních a týdenních bucketů v `performance_rollups`. Stejně jako dřívější
+statistiky dashboardu se počítají jen dokončené sessions - rozpracované
+a opuštěné ne. Dashboard pak čte jen rollupy a nemusí procházet JSON odpovědí
+všech historických sessions.
+"""
+
+import hashlib
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+
+from app.database import SessionLocal, dialect_insert
+from app.models import CategoryStat, PerformanceRollup, QuestionStat, TestSession
+from app.services.session_archive import with_archived_payloads
+
+logger = logging.getLogger(__name__)
+
+# Od jakého skóre se odpověď počítá jako správná (stejně jako v DashboardStats)
+CORRECT_SCORE_THRESHOLD = 80
+# Od jakého celkového skóre se test počítá jako úspěšný
+SUCCESSFUL_TEST_THRESHOLD = 90
+TREND_GRANULARITIES = ("day", "week")
+UNKNOWN_QUESTION = "Neznámá otázka"
+UNKNOWN_CATEGORY = "Neznámá"
+
+
+def counted_session_filter() -> list:
+    """Sessions, které se počítají do statistik: dokončené, ne ukončené adminem (reset je označí jako opuštěné)."""
+    return [TestSession.is_completed == True, TestSession.abandoned_at.is_(None)]
+
+
+def question_key(question_text: str) -> str:
+    """Stabilní klíč otázky - SHA-1 jejího textu."""
+    return hashlib.sha1(question_text.encode("utf-8")).hexdigest()
+
+
+def _upsert_question_stats(session, rows: Dict[str, dict]) -> None:
+    if not rows:
+        return
+    insert = dialect_insert(session.get_bind())
+    stmt = insert(QuestionStat).values(list(rows.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[QuestionStat.question_key],
+        set_={
+            "attempts": QuestionStat.attempts + stmt.excluded.attempts,
+            "score_sum": QuestionStat.score_sum + stmt.excluded.score_sum,
+            "correct_count": QuestionStat.correct_count + stmt.excluded.correct_count,
+            "category": stmt.excluded.category,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    session.execute(stmt)
+
+
+def _upsert_category_stats(session, rows: Dict[str, dict]) -> None:
+    if not rows:
+        return
+    insert = dialect_insert(session.get_bind())
+    stmt = insert(CategoryStat).values(list(rows.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CategoryStat.category],
+        set_={
+            "attempts": CategoryStat.attempts + stmt.excluded.attempts,
+            "score_sum": CategoryStat.score_sum + stmt.excluded.score_sum,
+            "correct_count": CategoryStat.correct_count + stmt.excluded.correct_count,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    session.execute(stmt)
+
+
+def _accumulate(question_rows: Dict[str, dict], category_rows: Dict[str, dict],
+                question_text: str, category: str, score: float, now: datetime) -> None:
+    """Přičte jednu odpověď do rozpracovaných agregací (klíčovaných podle otázky / kategorie)."""
+    correct = 1 if score >= CORRECT_SCORE_THRESHOLD else 0
+
+    key = question_key(question_text)
+    q_row = question_rows.get(key)
+    if q_row is None:
+        q_row = question_rows[key] = {
+            "question_key": key,
+            "question_text": question_text,
+            "category": category,
+            "attempts": 0,
+            "score_sum": 0.0,
+            "correct_count": 0,
+            "updated_at": now,
+        }
+    q_row["attempts"] += 1
+    q_row["score_sum"] += score
+    q_row["correct_count"] += correct
+
+    c_row = category_rows.get(category)
+    if c_row is None:
+        c_row = category_rows[category] = {
+            "category": category,
+            "attempts": 0,
+            "score_sum": 0.0,
+            "correct_count": 0,
+            "updated_at": now,
+        }
+    c_row["attempts"] += 1
+    c_row["score_sum"] += score
+    c_row["correct_count"] += correct
+
+
+def record_session_answers(session, answers: Optional[list], questions_data: Optional[list]) -> None:
+    """
+    Přičte odpovědi dokončené session do rollup tabulek (stejně jako rebuild_rollups).
+    Necommituje - volá se v transakci, která session označuje jako dokončenou.
+    """
+    question_rows, category_rows = {}, {}
+    now = datetime.utcnow()
+    for answer in answers or []:
+        if isinstance(answer, dict):
+            _accumulate_answer(question_rows, category_rows, answer, questions_data, now)
+    _upsert_question_stats(session, question_rows)
+    _upsert_category_stats(session, category_rows)
+
+
+def resolve_answer_question(answer: dict, default: Optional[str] = UNKNOWN_QUESTION) -> Optional[str]:
+    """Text otázky odpovědi - nejstarší odpovědi ukládaly celou otázku jako dict."""
+    question = answer.get("question")
+    if isinstance(question, dict):
+        question = question.get("question")
+    return question or default
+
+
+def resolve_answer_category(answer: dict, questions_data: Optional[list],
+                            default: Optional[str] = UNKNOWN_CATEGORY) -> Optional[str]:
+    """
+    Kategorie odpovědi - nejstarší odpovědi ukládaly otázku jako dict, starší
+    kategorii vůbec nemají a dohledá se v questions_data podle question_index.
+    """
+    question = answer.get("question")
+    category = question.get("category") if isinstance(question, dict) else answer.get("category")
+    if category:
+        return category
+    question_index = answer.get("question_index", -1)
+    if questions_data and isinstance(question_index, int) and 0 <= question_index < len(questions_data):
+        question = questions_data[question_index]
+        if isinstance(question, dict) and question.get("category"):
+            return question["category"]
+    return default
+
+
+def _accumulate_answer(question_rows: Dict[str, dict], category_rows: Dict[str, dict], answer: dict,
+                       questions_data: Optional[list], now: datetime) -> None:
+    _accumulate(
+        question_rows,
+        category_rows,
+        resolve_answer_question(answer),
+        resolve_answer_category(answer, questions_data),
+        float(answer.get("score") or 0),
+        now,
+    )
+
+
+def rebuild_rollups(batch_size: int = 500, session_factory=SessionLocal,
+                    archive_session_factory=None) -> Dict[str, int]:
+    """
+    Přepočítá rollup tabulky z historie dokončených test sessions (včetně archivovaných).
+
+    Sessions se čtou po dávkách (yield_per) a jen potřebné sloupce, takže paměť
+    roste s počtem různých otázek, ne s počtem sessions. Výsledek se zapíše
+    v jedné transakci (smazání + vložení), dashboard tak nikdy nevidí poloviční stav.
+    """
+    question_rows: Dict[str, dict] = {}
+    category_rows: Dict[str, dict] = {}
+    sessions_scanned = 0
+    answers_scanned = 0
+    now = datetime.utcnow()
+
+    read_session = session_factory()
+    try:
+        stmt = (
+            select(TestSession.id, TestSession.answers, TestSession.questions_data, TestSession.archived_at)
+            .where(*counted_session_filter())
+            .order_by(TestSession.id)
+            .execution_options(yield_per=batch_size)
+        )
+        rows = with_archived_payloads(read_session.execute(stmt), id_index=0, archived_index=3,
+                                      columns={1: "answers", 2: "questions_data"}, batch_size=batch_size,
+                                      archive_session_factory=archive_session_factory)
+        for _, answers, questions_data, _ in rows:
+            sessions_scanned += 1
+            for answer in answers or []:
+                if not isinstance(answer, dict):
+                    continue
+                _accumulate_answer(question_rows, category_rows, answer, questions_data, now)
+                answers_scanned += 1
+            if sessions_scanned % batch_size == 0:
+                logger.info(f"📊 Rebuild rollupů: zpracováno {sessions_scanned} sessions")
+    finally:
+        read_session.close()
+
+    write_session = session_factory()
+    try:
+        write_session.execute(delete(QuestionStat))
+        write_session.execute(delete(CategoryStat))
+        # Vkládáme po dávkách, aby jeden INSERT nepřekročil limit parametrů
+        q_values = list(question_rows.items())
+        for start in range(0, len(q_values), batch_size):
+            _upsert_question_stats(write_session, dict(q_values[start:start + batch_size]))
+        _upsert_category_stats(write_session, category_rows)
+        write_session.commit()
+    except Exception:
+        write_session.rollback()
+        raise
+    finally:
+        write_session.close()
+
+    logger.info(f"✅ Rollupy přepočítány: {sessions_scanned} sessions, {answers_scanned} odpovědí, "
+                f"{len(question_rows)} otázek, {len(category_rows)} kategorií")
+    return {
+        "sessions": sessions_scanned,
+        "answers": answers_scanned,
+        "questions": len(question_rows),
+        "categories": len(category_rows),
+    }
+
+
+# === Časové rollupy výsledků testů ===
+
+def bucket_start(granularity: str, moment: datetime) -> date:
+    """Začátek bucketu - den, resp. pondělí týdne."""
+    day = moment.date() if isinstance(moment, datetime) else moment
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def _accumulate_completion(rows: Dict[Tuple[str, date, int], dict], lesson_id: int,
+                           completed_at: datetime, score: float, now: datetime) -> None:
+    successful = 1 if score >= SUCCESSFUL_TEST_THRESHOLD else 0
+    for granularity in TREND_GRANULARITIES:
+        start = bucket_start(granularity, completed_at)
+        key = (granularity, start, lesson_id)
+        row = rows.get(key)
+        if row is None:
+            row = rows[key] = {
+                "granularity": granularity,
+                "bucket_start": start,
+                "lesson_id": lesson_id,
+                "tests": 0,
+                "score_sum": 0.0,
+                "successful_tests": 0,
+                "updated_at": now,
+            }
+        row["tests"] += 1
+        row["score_sum"] += score
+        row["successful_tests"] += successful
+
+
+def _upsert_performance_rollups(session, rows: List[dict]) -> None:
+    if not rows:
+        return
+    insert = dialect_insert(session.get_bind())
+    stmt = insert(PerformanceRollup).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PerformanceRollup.granularity, PerformanceRollup.bucket_start, PerformanceRollup.lesson_id],
+        set_={
+            "tests": PerformanceRollup.tests + stmt.excluded.tests,
+            "score_sum": PerformanceRollup.score_sum + stmt.excluded.score_sum,
+            "successful_tests": PerformanceRollup.successful_tests + stmt.excluded.successful_tests,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    session.execute(stmt)
+
+
+def record_session_completion(session, lesson_id: int, completed_at: datetime, score: Optional[float]) -> None:
+    """
+    Přičte dokončený test do denního a týdenního bucketu jeho lekce.
+    Session bez skóre se přeskočí stejně jako v backfill_trend_rollups.
+    Necommituje - volá se v transakci, která session označuje jako dokončenou.
+    """
+    if score is None:
+        return
+    rows = {}
+    now = datetime.utcnow()
+    _accumulate_completion(rows, lesson_id, completed_at or now, float(score), now)
+    _upsert_performance_rollups(session, list(rows.values()))
+
+
+def backfill_trend_rollups(since: Optional[date] = None, batch_size: int = 500,
+                           session_factory=SessionLocal) -> Dict[str, int]:
+    """
+    Přepočítá časové rollupy z dokončených sessions (celou historii, nebo od `since`).
+
+    `since` se zarovná na pondělí, aby se přepočítávaly jen celé týdny. Existující
+    buckety od tohoto data se v jedné transakci smažou a nahradí přepočtenými.
+    """
+    aligned_since = bucket_start("week", since) if since else None
+    rows: Dict[Tuple[str, date, int], dict] = {}
+    sessions_scanned = 0
+    now = datetime.utcnow()
+
+    read_session = session_factory()
+    try:
+        stmt = select(TestSession.lesson_id, TestSession.completed_at, TestSession.current_score).where(
+            *counted_session_filter(),
+            TestSession.completed_at.isnot(None),
+            TestSession.current_score.isnot(None),
+        )
+        if aligned_since:
+            stmt = stmt.where(TestSession.completed_at >= datetime.combine(aligned_since, datetime.min.time()))
+        stmt = stmt.order_by(TestSession.id).execution_options(yield_per=batch_size)
+        for lesson_id, completed_at, score in read_session.execute(stmt):
+            _accumulate_completion(rows, lesson_id, completed_at, float(score), now)
+            sessions_scanned += 1
+    finally:
+        read_session.close()
+
+    write_session = session_factory()
+    try:
+        stmt = delete(PerformanceRollup)
+        if aligned_since:
+            stmt = stmt.where(PerformanceRollup.bucket_start >= aligned_since)
+        write_session.execute(stmt)
+        values = list(rows.values())
+        for start in range(0, len(values), batch_size):
+            _upsert_performance_rollups(write_session, values[start:start + batch_size])
+        write_session.commit()
+    except Exception:
+        write_session.rollback()
+        raise
+    finally:
+        write_session.close()
+
+    logger.info(f"✅ Časové rollupy přepočítány: {sessions_scanned} sessions, {len(rows)} bucketů")
+    return {"sessions": sessions_scanned, "buckets": len(rows)}
+
+
+def get_trend_buckets(session, start: date, end: date, granularity: str = "week",
+                      lesson_id: Optional[int] = None) -> List[dict]:
+    """Omezené čtení bucketů v rozsahu [start, end], sečtené přes lekce (pokud není zadána lekce)."""
+    if granularity not in TREND_GRANULARITIES:
+        raise ValueError(f"Neznámá granularita: {granularity}")
+
+    query = session.query(
+        PerformanceRollup.bucket_start,
+        func.sum(PerformanceRollup.tests),
+        func.sum(PerformanceRollup.score_sum),
+        func.sum(PerformanceRollup.successful_tests),
+    ).filter(
+        PerformanceRollup.granularity == granularity,
+        PerformanceRollup.bucket_start >= bucket_start(granularity, start),
+        PerformanceRollup.bucket_start <= end,
+    )
+    if lesson_id is not None:
+        query = query.filter(PerformanceRollup.lesson_id == lesson_id)
+    query = query.group_by(PerformanceRollup.bucket_start).order_by(PerformanceRollup.bucket_start)
+
+    return [
+        {"bucket_start": start_day, "tests": int(tests or 0),
+         "score_sum": float(score_sum or 0), "successful_tests": int(successful or 0)}
+        for start_day, tests, score_sum, successful in query
+    ]
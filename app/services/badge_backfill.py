@@ -0,0 +1,122 @@
+"""
+Zpětné udělení odznaků za historické sessions.
+
+Dokončené sessions se čtou podle id po blocích (`id > checkpoint`), uvnitř bloku
+server-side kurzorem s `yield_per` a jen potřebnými sloupci. Pravidla všech odznaků
+se vyhodnotí v paměti (zkompilovaná pravidla z badge_rules), chybějící dvojice
+uživatel/odznak se vloží hromadně s ON CONFLICT DO NOTHING a checkpoint se uloží
+ve stejné transakci. Opakované spuštění pokračuje od posledního checkpointu.
+"""
+
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import select
+
+from app.database import SessionLocal, dialect_insert
+from app.models import TestSession, UserBadge
+from app.services.badge_rules import aggregate_session, load_compiled_badges
+from app.services.checkpoints import advance_checkpoint, get_checkpoint, reset_checkpoint
+from app.services.session_archive import with_archived_payloads
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_CHECKPOINT_NAME = "badge_backfill"
+BACKFILL_BATCH_SIZE = int(os.getenv("BADGE_BACKFILL_BATCH_SIZE", "5000"))
+BACKFILL_CHUNK_SIZE = int(os.getenv("BADGE_BACKFILL_CHUNK_SIZE", "50000"))
+INSERT_BATCH_SIZE = 1000
+
+
+def _insert_awards(session, rows: list) -> None:
+    insert = dialect_insert(session.get_bind())
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        session.execute(insert(UserBadge).on_conflict_do_nothing(), rows[start:start + INSERT_BATCH_SIZE])
+
+
+def backfill_badges(batch_size: int = BACKFILL_BATCH_SIZE, chunk_size: int = BACKFILL_CHUNK_SIZE,
+                    restart: bool = False, max_chunks: Optional[int] = None,
+                    session_factory=SessionLocal, archive_session_factory=None) -> Dict:
+    """
+    Projde dokončené sessions od posledního checkpointu a udělí chybějící odznaky.
+
+    `restart=True` začne od první session (např. po přidání nového odznaku),
+    `max_chunks` omezí počet bloků jednoho běhu. Vrací souhrn běhu.
+    """
+    started = time.monotonic()
+    session = session_factory()
+    try:
+        checkpoint = get_checkpoint(session, BACKFILL_CHECKPOINT_NAME)
+        if restart:
+            reset_checkpoint(checkpoint)
+        session.commit()
+
+        badges = load_compiled_badges(session)
+        badge_names = {badge.id: badge.name for badge in badges}
+        # Už udělené dvojice - vkládáme jen nové, ON CONFLICT pokryje souběh s živým udělováním
+        held = set(session.execute(select(UserBadge.user_id, UserBadge.badge_id)).tuples())
+
+        last_id = checkpoint.last_id
+        by_badge = dict((checkpoint.stats or {}).get("by_badge", {}))
+        processed = awarded = chunks = 0
+
+        while badges and (max_chunks is None or chunks < max_chunks):
+            stmt = (
+                select(TestSession.id, TestSession.user_id, TestSession.current_score,
+                       TestSession.answers, TestSession.completed_at, TestSession.archived_at)
+                .where(TestSession.is_completed == True, TestSession.id > last_id)
+                .order_by(TestSession.id)
+                .limit(chunk_size)
+                .execution_options(yield_per=batch_size)
+            )
+            rows = []
+            chunk_count = 0
+            session_rows = with_archived_payloads(session.execute(stmt), id_index=0, archived_index=5,
+                                                  columns={3: "answers"}, batch_size=batch_size,
+                                                  archive_session_factory=archive_session_factory)
+            for session_id, user_id, score, answers, completed_at, _ in session_rows:
+                chunk_count += 1
+                last_id = session_id
+                aggregates = aggregate_session(answers, score)
+                for badge in badges:
+                    key = (user_id, badge.id)
+                    if key in held or not badge.evaluate(aggregates):
+                        continue
+                    held.add(key)
+                    rows.append({"user_id": user_id, "badge_id": badge.id,
+                                 "awarded_at": completed_at or datetime.utcnow()})
+                    by_badge[badge_names[badge.id]] = by_badge.get(badge_names[badge.id], 0) + 1
+
+            if not chunk_count:
+                break
+
+            _insert_awards(session, rows)
+            advance_checkpoint(checkpoint, last_id, chunk_count, {
+                "awarded": (checkpoint.stats or {}).get("awarded", 0) + len(rows),
+                "by_badge": dict(by_badge),
+            })
+            session.commit()
+
+            chunks += 1
+            processed += chunk_count
+            awarded += len(rows)
+            logger.info(f"🏅 Backfill odznaků: {processed} sessions (do id {last_id}), uděleno {awarded}")
+
+            if chunk_count < chunk_size:
+                break
+
+        return {
+            "processed": processed,
+            "awarded": awarded,
+            "last_id": last_id,
+            "chunks": chunks,
+            "by_badge": by_badge,
+            "seconds": round(time.monotonic() - started, 2),
+        }
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
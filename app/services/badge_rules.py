@@ -0,0 +1,205 @@
+"""
+Deklarativní pravidla odznaků.
+
+Pravidlo je JSON uložený u odznaku (`badges.rule`), např.:
+    {"type": "category_mastery", "category": "Typy Kapalin", "min_avg_score": 80, "min_questions": 2}
+    {"type": "session_score", "min_score": 95}
+    {"type": "all_answers", "min_count": 5, "min_score": 80}
+    {"type": "detailed_answers", "min_words": 5, "min_count": 3}
+    {"all": [...]} / {"any": [...]}
+
+Pravidla se zkompilují jednou do Python funkcí (cache podle obsahu pravidla)
+a vyhodnocují se nad agregáty session spočítanými jedním průchodem odpovědí.
+Odznaky bez pravidla dostanou původní pevně zadaná kritéria
+(`LEGACY_CATEGORY_RULES`, `LEGACY_NAME_RULES`).
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from app.models import Badge
+
+logger = logging.getLogger(__name__)
+
+BADGE_CACHE_TTL_SECONDS = float(os.getenv("BADGE_CACHE_TTL", "300"))
+
+# Původní kritéria z BadgeSystem._meets_badge_criteria pro odznaky bez uloženého pravidla
+LEGACY_CATEGORY_RULES = {
+    "Filtrace a Čištění": {"type": "category_mastery", "category": "Filtrace a Čištění", "min_avg_score": 85, "min_questions": 2},
+    "Chemické Vlastnosti": {"type": "category_mastery", "category": "Chemické Vlastnosti", "min_avg_score": 90, "min_questions": 3},
+    "Typy Kapalin": {"type": "category_mastery", "category": "Typy Kapalin", "min_avg_score": 80, "min_questions": 2},
+    "Bezpečnost a Ekologie": {"type": "category_mastery", "category": "Bezpečnost a Ekologie", "min_avg_score": 95, "min_questions": 2},
+}
+LEGACY_NAME_RULES = {
+    "Perfekcionista": {"type": "session_score", "min_score": 95},
+    "Rychlá Ruka": {"type": "all_answers", "min_count": 5, "min_score": 80},
+    "Analytik": {"type": "detailed_answers", "min_words": 5, "min_count": 3},
+}
+
+
+@dataclass
+class SessionAggregates:
+    """Vše, co pravidla potřebují, spočítané jedním průchodem přes odpovědi session."""
+    session_score: float = 0.0
+    answer_count: int = 0
+    min_score: Optional[float] = None
+    category_counts: Dict[str, int] = field(default_factory=dict)
+    category_sums: Dict[str, float] = field(default_factory=dict)
+    word_counts: List[int] = field(default_factory=list)  # seřazené počty slov odpovědí
+
+    def category_average(self, category: str) -> Tuple[int, float]:
+        count = self.category_counts.get(category, 0)
+        return count, (self.category_sums[category] / count if count else 0.0)
+
+    def answers_with_words(self, min_words: int) -> int:
+        return len(self.word_counts) - bisect_left(self.word_counts, min_words)
+
+
+def answer_category(answer: dict) -> Optional[str]:
+    """Kategorie odpovědi - nový formát má 'category' vedle textu otázky, starší vnořený dict 'question'."""
+    question = answer.get("question")
+    if isinstance(question, dict):
+        return question.get("category")
+    return answer.get("category")
+
+
+def aggregate_session(answers: Optional[list], session_score: Optional[float]) -> SessionAggregates:
+    aggregates = SessionAggregates(session_score=session_score or 0.0)
+    word_counts = []
+    for answer in answers or []:
+        score = answer.get("score", 0) or 0
+        aggregates.answer_count += 1
+        aggregates.min_score = score if aggregates.min_score is None else min(aggregates.min_score, score)
+        category = answer_category(answer)
+        if category:
+            aggregates.category_counts[category] = aggregates.category_counts.get(category, 0) + 1
+            aggregates.category_sums[category] = aggregates.category_sums.get(category, 0.0) + score
+        word_counts.append(len((answer.get("user_answer") or "").split()))
+    word_counts.sort()
+    aggregates.word_counts = word_counts
+    return aggregates
+
+
+def _compile(rule: dict) -> Callable[[SessionAggregates], bool]:
+    if "all" in rule:
+        parts = [_compile(part) for part in rule["all"]]
+        return lambda agg: all(part(agg) for part in parts)
+    if "any" in rule:
+        parts = [_compile(part) for part in rule["any"]]
+        return lambda agg: any(part(agg) for part in parts)
+
+    rule_type = rule.get("type")
+    if rule_type == "category_mastery":
+        category = rule["category"]
+        min_avg = float(rule.get("min_avg_score", 0))
+        min_questions = int(rule.get("min_questions", 1))
+
+        def category_mastery(agg: SessionAggregates) -> bool:
+            count, average = agg.category_average(category)
+            return count >= min_questions and average >= min_avg
+        return category_mastery
+
+    if rule_type == "session_score":
+        min_score = float(rule["min_score"])
+        return lambda agg: agg.session_score >= min_score
+
+    if rule_type == "all_answers":
+        min_count = int(rule.get("min_count", 1))
+        min_score = float(rule["min_score"])
+        return lambda agg: agg.answer_count >= min_count and agg.min_score is not None and agg.min_score >= min_score
+
+    if rule_type == "detailed_answers":
+        min_words = int(rule.get("min_words", 1))
+        min_count = int(rule.get("min_count", 1))
+        return lambda agg: agg.answers_with_words(min_words) >= min_count
+
+    raise ValueError(f"Neznámý typ pravidla odznaku: {rule_type}")
+
+
+_compiled_rules: Dict[str, Callable[[SessionAggregates], bool]] = {}
+
+
+def compile_rule(rule: dict) -> Callable[[SessionAggregates], bool]:
+    """Zkompiluje pravidlo; stejné pravidlo (podle obsahu) se kompiluje jen jednou."""
+    key = json.dumps(rule, sort_keys=True, ensure_ascii=False)
+    compiled = _compiled_rules.get(key)
+    if compiled is None:
+        compiled = _compile(rule)
+        _compiled_rules[key] = compiled
+    return compiled
+
+
+def effective_rule(badge) -> Optional[dict]:
+    """Uložené pravidlo odznaku, jinak původní kritérium podle kategorie nebo názvu."""
+    if badge.rule:
+        return badge.rule
+    return LEGACY_CATEGORY_RULES.get(badge.category) or LEGACY_NAME_RULES.get(badge.name)
+
+
+@dataclass(frozen=True)
+class CompiledBadge:
+    id: int
+    name: str
+    description: str
+    category: str
+    icon_svg: Optional[str]
+    evaluate: Callable[[SessionAggregates], bool]
+
+    def to_dict(self) -> Dict:
+        return {"name": self.name, "description": self.description, "category": self.category, "icon_svg": self.icon_svg}
+
+
+def load_compiled_badges(session) -> List[CompiledBadge]:
+    """Načte všechny odznaky a zkompiluje jejich pravidla; neplatná pravidla zaloguje a přeskočí."""
+    compiled = []
+    for badge in session.execute(select(Badge).order_by(Badge.id)).scalars():
+        rule = effective_rule(badge)
+        if not rule:
+            continue
+        try:
+            evaluate = compile_rule(rule)
+        except (KeyError, ValueError, TypeError) as e:
+            logger.error(f"❌ Neplatné pravidlo odznaku '{badge.name}': {e}")
+            continue
+        compiled.append(CompiledBadge(badge.id, badge.name, badge.description, badge.category, badge.icon_svg, evaluate))
+    logger.info(f"🏅 Zkompilováno {len(compiled)} pravidel odznaků")
+    return compiled
+
+
+class BadgeRuleCache:
+    """Zkompilované odznaky načtené z DB jednou za TTL (a po `invalidate()`)."""
+
+    def __init__(self, ttl_seconds: float = BADGE_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._badges: Optional[List[CompiledBadge]] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, session) -> List[CompiledBadge]:
+        with self._lock:
+            if self._badges is None or time.monotonic() - self._loaded_at > self.ttl_seconds:
+                self._badges = load_compiled_badges(session)
+                self._loaded_at = time.monotonic()
+            return self._badges
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._badges = None
+
+
+badge_rule_cache = BadgeRuleCache()
+
+
+def evaluate_badges(badges: List[CompiledBadge], answers: Optional[list], session_score: Optional[float],
+                    exclude_ids=frozenset()) -> List[CompiledBadge]:
+    """Odznaky (mimo `exclude_ids`), jejichž pravidlo session splňuje."""
+    aggregates = aggregate_session(answers, session_score)
+    return [badge for badge in badges if badge.id not in exclude_ids and badge.evaluate(aggregates)]
@@ -0,0 +1,393 @@
+"""
+Hromadné volací kampaně.
+
+Kampaň = kohorta uživatelů + lekce. Hovory se zařadí do `campaign_calls`
+a dispatcher (vlákno na pozadí) je vytáčí přes token bucket limiter
+(`calls_per_second`) s horním limitem souběžně živých hovorů
+(`max_concurrent_calls`). Navíc všechny kampaně i plánovač opakování
+sdílí jeden bucket procesu (`outbound_call_bucket`) s limitem Twilio účtu. Stav hovorů aktualizuje Twilio status callback;
+obsazeno / nedostupné se opakuje po `retry_delay_seconds`, nejvýše
+`max_retries`krát. Veškerý stav je v databázi, takže dispatcher lze
+po restartu jednoduše spustit znovu.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import func, insert, literal, select, update
+
+from app.database import SessionLocal
+from app.models import Attempt, Campaign, CampaignCall, User
+
+logger = logging.getLogger(__name__)
+
+LIVE_STATUSES = ("dialing", "in_progress")
+FINAL_STATUSES = ("completed", "busy", "no_answer", "failed", "cancelled")
+RETRYABLE_STATUSES = ("busy", "no_answer")
+
+# Twilio CallStatus -> stav hovoru kampaně
+TWILIO_STATUS_MAP = {
+    "queued": "dialing",
+    "initiated": "dialing",
+    "ringing": "dialing",
+    "in-progress": "in_progress",
+    "completed": "completed",
+    "busy": "busy",
+    "no-answer": "no_answer",
+    "failed": "failed",
+    "canceled": "failed",
+}
+
+# Hovor bez callbacku déle než tento limit se považuje za ztracený a uvolní slot
+LIVE_CALL_TIMEOUT = timedelta(minutes=int(os.getenv("CAMPAIGN_LIVE_CALL_TIMEOUT_MINUTES", "45")))
+DISPATCH_POLL_SECONDS = float(os.getenv("CAMPAIGN_POLL_SECONDS", "1.0"))
+
+
+class TokenBucket:
+    """Token bucket limiter - `rate` tokenů za sekundu, nejvýše `capacity` naráz."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.rate = max(rate, 0.01)
+        self.capacity = capacity if capacity is not None else max(1.0, self.rate)
+        self.tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def acquire(self) -> None:
+        """Blokuje, dokud není k dispozici token."""
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self._sleep(wait)
+
+
+# Limit odchozích hovorů celého Twilio účtu - sdílí ho všechny kampaně i plánovač opakování v procesu
+OUTBOUND_CALLS_PER_SECOND = float(os.getenv("TWILIO_CALLS_PER_SECOND", "1.0"))
+outbound_call_bucket = TokenBucket(OUTBOUND_CALLS_PER_SECOND)
+
+
+def webhook_base_url() -> str:
+    return os.getenv("WEBHOOK_BASE_URL", "https://lecture-app-production.up.railway.app").rstrip("/")
+
+
+def _twilio_dialer() -> Callable[[str, str, str], Optional[str]]:
+    from app.services.twilio_service import TwilioService
+    twilio = TwilioService()
+
+    def dial(phone: str, webhook_url: str, status_callback: str) -> Optional[str]:
+        if not twilio.enabled:
+            raise RuntimeError("Twilio služba není povolena")
+        return twilio.call(phone, webhook_url, status_callback=status_callback)
+    return dial
+
+
+def create_campaign(session, name: str, lesson_id: int, language: Optional[str] = None,
+                    lesson_level: Optional[int] = None, user_ids: Optional[list] = None,
+                    calls_per_second: float = 1.0, max_concurrent_calls: int = 5,
+                    max_retries: int = 2, retry_delay_seconds: int = 600) -> Campaign:
+    """Založí kampaň a jedním INSERT ... SELECT zařadí hovory pro celou kohortu."""
+    cohort = {"language": language, "lesson_level": lesson_level, "user_ids": user_ids}
+    campaign = Campaign(
+        name=name,
+        lesson_id=lesson_id,
+        status="draft",
+        cohort={key: value for key, value in cohort.items() if value not in (None, [], "")},
+        calls_per_second=calls_per_second,
+        max_concurrent_calls=max_concurrent_calls,
+        max_retries=max_retries,
+        retry_delay_seconds=retry_delay_seconds,
+        stats={},
+    )
+    session.add(campaign)
+    session.flush()
+
+    users = select(
+        literal(campaign.id), User.id, literal("queued"), literal(0),
+        literal(datetime.utcnow()), literal(datetime.utcnow())
+    )
+    if language:
+        users = users.where(User.language == language)
+    if lesson_level is not None:
+        users = users.where(User.current_lesson_level == lesson_level)
+    if user_ids:
+        users = users.where(User.id.in_(user_ids))
+    session.execute(insert(CampaignCall).from_select(
+        ["campaign_id", "user_id", "status", "tries", "created_at", "updated_at"], users
+    ))
+    campaign.stats = campaign_stats(session, campaign.id)
+    session.commit()
+    logger.info(f"📣 Kampaň '{name}' založena: {campaign.stats.get('total', 0)} hovorů ve frontě")
+    return campaign
+
+
+def campaign_stats(session, campaign_id: int) -> Dict[str, int]:
+    """Počty hovorů podle stavu + souhrny (jedna agregační query)."""
+    rows = session.execute(
+        select(CampaignCall.status, func.count(CampaignCall.id), func.coalesce(func.sum(CampaignCall.tries), 0))
+        .where(CampaignCall.campaign_id == campaign_id)
+        .group_by(CampaignCall.status)
+    ).all()
+    stats = {status: count for status, count, _ in rows}
+    total_tries = sum(int(tries) for _, _, tries in rows)
+    stats["total"] = sum(count for _, count, _ in rows)
+    stats["finished"] = sum(stats.get(status, 0) for status in FINAL_STATUSES)
+    stats["live"] = sum(stats.get(status, 0) for status in LIVE_STATUSES)
+    stats["dial_attempts"] = total_tries
+    return stats
+
+
+def _finish_call(call: CampaignCall, campaign: Campaign, status: str, now: datetime, error: Optional[str] = None):
+    """Uloží konečný stav, případně hovor při busy / no-answer znovu zařadí."""
+    if status in RETRYABLE_STATUSES and call.tries <= campaign.max_retries:
+        call.status = "queued"
+        call.next_try_at = now + timedelta(seconds=campaign.retry_delay_seconds)
+    else:
+        call.status = status
+        call.next_try_at = None
+    if error:
+        call.error = error
+    call.updated_at = now
+
+
+def handle_status_callback(session, call_id: int, call_sid: Optional[str], twilio_status: str,
+                           duration: Optional[int] = None) -> Optional[str]:
+    """Zpracuje Twilio status callback; vrací nový stav hovoru kampaně."""
+    call = session.get(CampaignCall, call_id)
+    if not call or (call_sid and call.call_sid and call.call_sid != call_sid):
+        logger.warning(f"⚠️ Status callback pro neznámý hovor kampaně {call_id} ({call_sid})")
+        return None
+    # Pozdní callback staršího pokusu nesmí přepsat nový pokus ani konečný stav
+    if call.status not in LIVE_STATUSES:
+        return call.status
+
+    status = TWILIO_STATUS_MAP.get(twilio_status)
+    if status is None:
+        logger.warning(f"⚠️ Neznámý Twilio stav '{twilio_status}' pro hovor {call_id}")
+        return call.status
+
+    now = datetime.utcnow()
+    call.twilio_status = twilio_status
+    if duration is not None:
+        call.duration_seconds = duration
+    if status in LIVE_STATUSES:
+        call.status = status
+        call.updated_at = now
+    else:
+        campaign = session.get(Campaign, call.campaign_id)
+        _finish_call(call, campaign, status, now)
+    session.commit()
+    return call.status
+
+
+class CampaignDispatcher:
+    """Vytáčí hovory jedné kampaně, dokud není hotová, pozastavená nebo zrušená."""
+
+    def __init__(self, campaign_id: int, dial: Optional[Callable[[str, str, str], Optional[str]]] = None,
+                 session_factory=SessionLocal, bucket: Optional[TokenBucket] = None,
+                 shared_bucket: Optional[TokenBucket] = None):
+        self.campaign_id = campaign_id
+        self.session_factory = session_factory
+        self._dial = dial
+        self.bucket = bucket
+        self.shared_bucket = shared_bucket or outbound_call_bucket
+
+    @property
+    def dial(self):
+        if self._dial is None:
+            self._dial = _twilio_dialer()
+        return self._dial
+
+    def _expire_lost_calls(self, session, campaign: Campaign, now: datetime):
+        lost = session.execute(
+            select(CampaignCall).where(
+                CampaignCall.campaign_id == campaign.id,
+                CampaignCall.status.in_(LIVE_STATUSES),
+                CampaignCall.updated_at < now - LIVE_CALL_TIMEOUT,
+            )
+        ).scalars().all()
+        for call in lost:
+            _finish_call(call, campaign, "failed", now, error="Bez status callbacku - hovor považován za ztracený")
+        if lost:
+            session.commit()
+
+    def _dial_call(self, session, campaign: Campaign, call_id: int) -> None:
+        now = datetime.utcnow()
+        # Atomické převzetí - chrání před dvojím vytočením při více dispatcherech
+        claimed = session.execute(
+            update(CampaignCall)
+            .where(CampaignCall.id == call_id, CampaignCall.status == "queued")
+            .values(status="dialing", tries=CampaignCall.tries + 1, updated_at=now, next_try_at=None)
+        ).rowcount
+        if not claimed:
+            session.rollback()
+            return
+        call = session.get(CampaignCall, call_id)
+        user = session.get(User, call.user_id)
+        # next_due=None - pokus kampaně nesmí znovu vytočit plánovač opakování
+        attempt = Attempt(user_id=call.user_id, lesson_id=campaign.lesson_id, next_due=None)
+        session.add(attempt)
+        session.flush()
+        call.attempt_id = attempt.id
+        session.commit()
+
+        base_url = webhook_base_url()
+        webhook_url = f"{base_url}/voice/?attempt_id={attempt.id}"
+        status_callback = f"{base_url}/voice/campaign-status?call_id={call.id}"
+        try:
+            call.call_sid = self.dial(user.phone, webhook_url, status_callback)
+            logger.info(f"📞 Kampaň {campaign.id}: volám {user.phone} (pokus {call.tries})")
+        except Exception as e:
+            logger.error(f"❌ Kampaň {campaign.id}: volání {user.phone} selhalo: {e}")
+            _finish_call(call, campaign, "failed", datetime.utcnow(), error=str(e))
+        session.commit()
+
+    def dispatch_once(self) -> bool:
+        """Jedno kolo dispatcheru; vrací False, když už kampaň neběží."""
+        session = self.session_factory()
+        try:
+            campaign = session.get(Campaign, self.campaign_id)
+            if not campaign or campaign.status != "running":
+                return False
+            if self.bucket is None:
+                self.bucket = TokenBucket(campaign.calls_per_second)
+
+            now = datetime.utcnow()
+            self._expire_lost_calls(session, campaign, now)
+
+            live = session.scalar(
+                select(func.count(CampaignCall.id)).where(
+                    CampaignCall.campaign_id == campaign.id, CampaignCall.status.in_(LIVE_STATUSES)
+                )
+            )
+            free_slots = campaign.max_concurrent_calls - live
+            due_ids = []
+            if free_slots > 0:
+                due_ids = session.execute(
+                    select(CampaignCall.id)
+                    .where(
+                        CampaignCall.campaign_id == campaign.id,
+                        CampaignCall.status == "queued",
+                        (CampaignCall.next_try_at.is_(None)) | (CampaignCall.next_try_at <= now),
+                    )
+                    .order_by(CampaignCall.id)
+                    .limit(free_slots)
+                ).scalars().all()
+
+            for call_id in due_ids:
+                # Tempo kampaně a zároveň limit účtu sdílený s ostatními kampaněmi a plánovačem
+                self.bucket.acquire()
+                self.shared_bucket.acquire()
+                self._dial_call(session, campaign, call_id)
+
+            stats = campaign_stats(session, campaign.id)
+            campaign.stats = stats
+            if stats["finished"] == stats["total"]:
+                campaign.status = "completed"
+                campaign.completed_at = datetime.utcnow()
+                logger.info(f"✅ Kampaň {campaign.id} dokončena: {stats}")
+            session.commit()
+            return campaign.status == "running"
+        finally:
+            session.close()
+
+    def run(self, poll_interval: float = DISPATCH_POLL_SECONDS) -> None:
+        logger.info(f"📣 Dispatcher kampaně {self.campaign_id} spuštěn")
+        while True:
+            try:
+                if not self.dispatch_once():
+                    break
+            except Exception as e:
+                logger.error(f"❌ Chyba dispatcheru kampaně {self.campaign_id}: {e}")
+            time.sleep(poll_interval)
+        logger.info(f"📣 Dispatcher kampaně {self.campaign_id} ukončen")
+
+
+_dispatchers: Dict[int, threading.Thread] = {}
+_dispatchers_lock = threading.Lock()
+
+
+def _start_dispatcher_thread(campaign_id: int) -> threading.Thread:
+    with _dispatchers_lock:
+        thread = _dispatchers.get(campaign_id)
+        if thread and thread.is_alive():
+            return thread
+        thread = threading.Thread(target=CampaignDispatcher(campaign_id).run, name=f"campaign-{campaign_id}", daemon=True)
+        _dispatchers[campaign_id] = thread
+        thread.start()
+        return thread
+
+
+def start_campaign(campaign_id: int, session_factory=SessionLocal) -> bool:
+    """Spustí (nebo obnoví pozastavenou) kampaň a její dispatcher na pozadí."""
+    session = session_factory()
+    try:
+        campaign = session.get(Campaign, campaign_id)
+        if not campaign or campaign.status in ("completed", "cancelled"):
+            return False
+        campaign.status = "running"
+        campaign.started_at = campaign.started_at or datetime.utcnow()
+        session.commit()
+    finally:
+        session.close()
+    _start_dispatcher_thread(campaign_id)
+    return True
+
+
+def set_campaign_status(campaign_id: int, status: str, session_factory=SessionLocal) -> bool:
+    """Pozastaví nebo zruší kampaň; dispatcher skončí v příštím kole. Živé hovory doběhnou."""
+    session = session_factory()
+    try:
+        campaign = session.get(Campaign, campaign_id)
+        if not campaign or campaign.status in ("completed", "cancelled"):
+            return False
+        campaign.status = status
+        if status == "cancelled":
+            session.execute(
+                update(CampaignCall)
+                .where(CampaignCall.campaign_id == campaign_id, CampaignCall.status == "queued")
+                .values(status="cancelled", next_try_at=None, updated_at=datetime.utcnow())
+            )
+            campaign.completed_at = datetime.utcnow()
+            campaign.stats = campaign_stats(session, campaign_id)
+        session.commit()
+        return True
+    finally:
+        session.close()
+
+
+def resume_running_campaigns(session_factory=SessionLocal) -> list:
+    """Po restartu znovu spustí dispatchery kampaní ve stavu running."""
+    session = session_factory()
+    try:
+        campaign_ids = session.execute(
+            select(Campaign.id).where(Campaign.status == "running")
+        ).scalars().all()
+    finally:
+        session.close()
+    for campaign_id in campaign_ids:
+        _start_dispatcher_thread(campaign_id)
+    return campaign_ids
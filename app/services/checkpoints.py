@@ -0,0 +1,34 @@
+"""
+Checkpointy dlouhých dávkových jobů (tabulka job_checkpoints).
+
+Job si po každé dávce uloží poslední zpracované id ve stejné transakci jako
+výsledky dávky, takže po pádu nebo přerušení naváže přesně tam, kde skončil.
+"""
+
+from datetime import datetime
+
+from app.models import JobCheckpoint
+
+
+def get_checkpoint(session, name: str) -> JobCheckpoint:
+    """Vrátí checkpoint jobu, případně založí nový (ještě necommitnutý) od začátku."""
+    checkpoint = session.get(JobCheckpoint, name)
+    if checkpoint is None:
+        checkpoint = JobCheckpoint(name=name, last_id=0, processed=0, stats={}, updated_at=datetime.utcnow())
+        session.add(checkpoint)
+    return checkpoint
+
+
+def advance_checkpoint(checkpoint: JobCheckpoint, last_id: int, processed: int, stats: dict) -> None:
+    """Posune checkpoint; commit dělá volající spolu s výsledky dávky."""
+    checkpoint.last_id = last_id
+    checkpoint.processed = (checkpoint.processed or 0) + processed
+    checkpoint.stats = stats  # nový dict, aby SQLAlchemy změnu JSON sloupce zaznamenala
+    checkpoint.updated_at = datetime.utcnow()
+
+
+def reset_checkpoint(checkpoint: JobCheckpoint) -> None:
+    checkpoint.last_id = 0
+    checkpoint.processed = 0
+    checkpoint.stats = {}
+    checkpoint.updated_at = datetime.utcnow()
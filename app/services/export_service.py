@@ -0,0 +1,205 @@
+"""
+Streamovaný export výsledků testů (sessions + jednotlivé odpovědi) do CSV nebo Parquet.
+
+Sessions se čtou server-side kurzorem (`yield_per`) jen s potřebnými sloupci,
+takže v paměti je vždy jen jedna dávka řádků - export milionů odpovědí běží
+v konstantní paměti. Parquet se zapisuje po row groupách a jednotlivé bajty
+se posílají klientovi hned, jak je pyarrow vyprodukuje.
+"""
+
+import csv
+import io
+import logging
+from datetime import date, datetime, time
+from typing import Any, Dict, Iterator, Optional
+
+from sqlalchemy import select
+
+from app.database import SessionLocal
+from app.models import Lesson, TestSession, User
+from app.services.analytics_service import resolve_answer_category, resolve_answer_question
+from app.services.session_archive import with_archived_payloads
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("csv", "parquet")
+EXPORT_BATCH_SIZE = 1000
+PARQUET_ROW_GROUP_SIZE = 50000
+
+EXPORT_COLUMNS = [
+    "session_id", "user_id", "user_name", "lesson_id", "lesson_title",
+    "started_at", "completed_at", "is_completed", "session_score",
+    "question_index", "question", "category", "user_answer", "correct_answer", "score",
+]
+
+
+class ExportUnavailableError(RuntimeError):
+    """Požadovaný formát exportu nelze vytvořit (chybí volitelná závislost)."""
+
+
+def _session_query(start: Optional[date], end: Optional[date], lesson_id: Optional[int]):
+    query = (
+        select(
+            TestSession.id, TestSession.user_id, User.name, TestSession.lesson_id, Lesson.title,
+            TestSession.started_at, TestSession.completed_at, TestSession.is_completed,
+            TestSession.current_score, TestSession.answers, TestSession.archived_at, TestSession.questions_data,
+        )
+        .join(User, User.id == TestSession.user_id)
+        .join(Lesson, Lesson.id == TestSession.lesson_id)
+        .order_by(TestSession.id)
+    )
+    if start:
+        query = query.where(TestSession.started_at >= datetime.combine(start, time.min))
+    if end:
+        query = query.where(TestSession.started_at <= datetime.combine(end, time.max))
+    if lesson_id:
+        query = query.where(TestSession.lesson_id == lesson_id)
+    return query
+
+
+def iter_export_rows(start: Optional[date] = None, end: Optional[date] = None, lesson_id: Optional[int] = None,
+                     batch_size: int = EXPORT_BATCH_SIZE, session_factory=SessionLocal,
+                     archive_session_factory=None) -> Iterator[Dict[str, Any]]:
+    """
+    Generuje jeden řádek na odpověď (sessions bez odpovědí mají jeden řádek s prázdnými poli otázky).
+    JSON s odpověďmi se rozbaluje po jedné session, nikdy pro celý výsledek najednou;
+    odpovědi archivovaných sessions se doplní z archivu.
+    """
+    session = session_factory()
+    try:
+        result = with_archived_payloads(
+            session.execute(_session_query(start, end, lesson_id).execution_options(yield_per=batch_size)),
+            id_index=0, archived_index=10, columns={9: "answers", 11: "questions_data"}, batch_size=batch_size,
+            archive_session_factory=archive_session_factory,
+        )
+        for row in result:
+            base = {
+                "session_id": row[0],
+                "user_id": row[1],
+                "user_name": row[2],
+                "lesson_id": row[3],
+                "lesson_title": row[4],
+                "started_at": row[5],
+                "completed_at": row[6],
+                "is_completed": row[7],
+                "session_score": row[8],
+            }
+            answers = row[9] or []
+            if not answers:
+                yield {**base, "question_index": None, "question": None, "category": None,
+                       "user_answer": None, "correct_answer": None, "score": None}
+                continue
+            for index, answer in enumerate(answers):
+                yield {
+                    **base,
+                    "question_index": answer.get("question_index", index),
+                    "question": resolve_answer_question(answer, default=None),
+                    "category": resolve_answer_category(answer, row[11], default=None),
+                    "user_answer": answer.get("user_answer"),
+                    "correct_answer": answer.get("correct_answer"),
+                    "score": answer.get("score"),
+                }
+    finally:
+        session.close()
+
+
+def stream_csv(rows: Iterator[Dict[str, Any]], flush_every: int = 500) -> Iterator[str]:
+    """Převede řádky na CSV po blocích textu (hlavička + `flush_every` řádků na blok)."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    for count, row in enumerate(rows, start=1):
+        writer.writerow({
+            key: value.isoformat() if isinstance(value, datetime) else value
+            for key, value in row.items()
+        })
+        if count % flush_every == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Zapisovatelný 'soubor', ze kterého si generátor průběžně vybírá zapsané bajty."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _parquet_schema(pa):
+    return pa.schema([
+        ("session_id", pa.int64()), ("user_id", pa.int64()), ("user_name", pa.string()),
+        ("lesson_id", pa.int64()), ("lesson_title", pa.string()),
+        ("started_at", pa.timestamp("us")), ("completed_at", pa.timestamp("us")),
+        ("is_completed", pa.bool_()), ("session_score", pa.float64()),
+        ("question_index", pa.int64()), ("question", pa.string()), ("category", pa.string()),
+        ("user_answer", pa.string()), ("correct_answer", pa.string()), ("score", pa.float64()),
+    ])
+
+
+def check_parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise ExportUnavailableError("Export do Parquet vyžaduje balíček pyarrow (pip install pyarrow)")
+
+
+def stream_parquet(rows: Iterator[Dict[str, Any]], row_group_size: int = PARQUET_ROW_GROUP_SIZE) -> Iterator[bytes]:
+    """Zapisuje Parquet po row groupách; v paměti drží nejvýše jednu row group."""
+    check_parquet_available()
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema(pa)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    columns = {name: [] for name in EXPORT_COLUMNS}
+    pending = 0
+    try:
+        for row in rows:
+            for name in EXPORT_COLUMNS:
+                columns[name].append(row.get(name))
+            pending += 1
+            if pending >= row_group_size:
+                writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+                columns = {name: [] for name in EXPORT_COLUMNS}
+                pending = 0
+                yield sink.drain()
+        if pending:
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_filename(export_format: str, start: Optional[date], end: Optional[date], lesson_id: Optional[int]) -> str:
+    parts = ["vysledky"]
+    if lesson_id:
+        parts.append(f"lekce{lesson_id}")
+    if start:
+        parts.append(f"od{start.isoformat()}")
+    if end:
+        parts.append(f"do{end.isoformat()}")
+    return "_".join(parts) + f".{export_format}"
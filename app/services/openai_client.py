@@ -0,0 +1,341 @@
+"""
+Instrumentovaný klient OpenAI - jediný vstupní bod pro všechna volání API.
+
+`openai_client(caller)` vrací obálku SDK klienta se stejným rozhraním
+(`client.chat.completions.create(...)`, `client.audio.speech.create(...)`, ...).
+Každé volání zaznamená volajícího (tag, např. `entry_test_eval`, `lesson_chat`,
+`tts`, `whisper`), model, tokeny, latenci, opakování a chyby:
+
+- metriky pro /metrics (histogram latence, čítače volání, tokenů, opakování a nákladů),
+- span `openai.<operace>` v trace hovoru (app.tracing),
+- denní součty a odhad nákladů v tabulce openai_usage_daily (admin /admin/openai-usage).
+  Součty se drží v paměti a do DB se zapisují nejvýš jednou za OPENAI_USAGE_FLUSH_SECONDS
+  na pozadí, takže hlasová cesta na zápis nečeká.
+
+Opakování řeší obálka (SDK klient má max_retries=0), aby šla počítat. Ceny jsou
+odhad podle ceníku v MODEL_PRICES (přepsatelné přes OPENAI_PRICES jako JSON).
+SDK se importuje až při vytvoření prvního klienta.
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+import os
+import random
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from app.database import SessionLocal, dialect_insert
+from app.metrics import registry
+from app.models import OpenAIUsageDaily
+from app.tracing import SPAN_KIND_CLIENT, span
+
+logger = logging.getLogger(__name__)
+
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+OPENAI_TIMEOUT_SECONDS = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "60"))
+USAGE_FLUSH_SECONDS = int(os.getenv("OPENAI_USAGE_FLUSH_SECONDS", "60"))
+COST_WINDOW_DAYS = int(os.getenv("OPENAI_COST_WINDOW_DAYS", "14"))
+
+# USD: tokeny za 1M, TTS za 1M znaků, přepis za minutu audia
+MODEL_PRICES = {
+    "gpt-4o-mini": {"prompt": 0.15, "completion": 0.60},
+    "gpt-4o": {"prompt": 2.50, "completion": 10.00},
+    "gpt-4.1-mini": {"prompt": 0.40, "completion": 1.60},
+    "gpt-4.1": {"prompt": 2.00, "completion": 8.00},
+    "gpt-4o-realtime-preview": {"prompt": 5.00, "completion": 20.00},
+    "tts-1": {"characters": 15.00},
+    "tts-1-hd": {"characters": 30.00},
+    "whisper-1": {"minutes": 0.006},
+}
+MODEL_PRICES.update(json.loads(os.getenv("OPENAI_PRICES", "{}")))
+
+_request_duration = registry.histogram(
+    "openai_request_duration_seconds", "Latence volání OpenAI včetně opakování", ("caller", "model", "operation"))
+_requests = registry.counter(
+    "openai_requests_total", "Volání OpenAI podle výsledku", ("caller", "model", "operation", "outcome"))
+_retries = registry.counter(
+    "openai_retries_total", "Opakovaná volání OpenAI", ("caller", "model", "operation"))
+_tokens = registry.counter(
+    "openai_tokens_total", "Spotřebované tokeny OpenAI", ("caller", "model", "type"))
+_cost = registry.counter(
+    "openai_cost_usd_total", "Odhad nákladů na OpenAI v USD", ("caller", "model"))
+
+
+def model_prices(model: str) -> Dict[str, float]:
+    """Ceník modelu; verze s datem (gpt-4o-mini-2024-07-18) spadají pod nejdelší shodný prefix."""
+    matches = [name for name in MODEL_PRICES if model == name or model.startswith(f"{name}-")]
+    return MODEL_PRICES[max(matches, key=len)] if matches else {}
+
+
+def estimate_cost(model: str, prompt_tokens: int = 0, completion_tokens: int = 0,
+                  characters: int = 0, audio_seconds: float = 0.0) -> float:
+    prices = model_prices(model)
+    return (prompt_tokens * prices.get("prompt", 0.0) / 1e6
+            + completion_tokens * prices.get("completion", 0.0) / 1e6
+            + characters * prices.get("characters", 0.0) / 1e6
+            + audio_seconds / 60 * prices.get("minutes", 0.0))
+
+
+# === Denní součty ===
+
+_USAGE_FIELDS = ("calls", "errors", "retries", "prompt_tokens", "completion_tokens", "characters",
+                 "audio_seconds", "latency_seconds", "cost_usd")
+_pending: Dict[Tuple[date, str, str], Dict] = {}
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+_flushing = threading.Lock()
+
+
+def record_usage(caller: str, model: str, operation: str, latency: float, prompt_tokens: int = 0,
+                 completion_tokens: int = 0, characters: int = 0, audio_seconds: float = 0.0,
+                 retries: int = 0, error: Optional[BaseException] = None) -> float:
+    """
+    Zaznamená jedno volání (i mimo SDK, např. Realtime API přes websocket) do metrik
+    a denních součtů. Vrací odhad nákladů v USD.
+    """
+    global _last_flush
+    model = model or "-"
+    cost = estimate_cost(model, prompt_tokens, completion_tokens, characters, audio_seconds)
+    _request_duration.observe(latency, caller=caller, model=model, operation=operation)
+    _requests.inc(caller=caller, model=model, operation=operation,
+                  outcome="ok" if error is None else type(error).__name__)
+    if retries:
+        _retries.inc(retries, caller=caller, model=model, operation=operation)
+    if prompt_tokens:
+        _tokens.inc(prompt_tokens, caller=caller, model=model, type="prompt")
+    if completion_tokens:
+        _tokens.inc(completion_tokens, caller=caller, model=model, type="completion")
+    if cost:
+        _cost.inc(cost, caller=caller, model=model)
+
+    values = {"calls": 1, "errors": 0 if error is None else 1, "retries": retries, "prompt_tokens": prompt_tokens,
+              "completion_tokens": completion_tokens, "characters": characters, "audio_seconds": audio_seconds,
+              "latency_seconds": latency, "cost_usd": cost}
+    key = (datetime.utcnow().date(), caller, model)
+    with _pending_lock:
+        row = _pending.setdefault(key, dict.fromkeys(_USAGE_FIELDS, 0))
+        for field, value in values.items():
+            row[field] += value
+        due = time.monotonic() - _last_flush >= USAGE_FLUSH_SECONDS
+        if due:
+            _last_flush = time.monotonic()
+    if due:
+        threading.Thread(target=_flush_in_background, name="openai-usage-flush", daemon=True).start()
+    return cost
+
+
+def _flush_in_background() -> None:
+    try:
+        flush_usage()
+    except Exception as e:
+        logger.warning(f"⚠️ Zápis denní spotřeby OpenAI selhal: {e}")
+
+
+def flush_usage(session_factory=SessionLocal) -> int:
+    """Přičte nezapsané součty do openai_usage_daily (upsert). Při chybě se vrátí do fronty."""
+    with _flushing:
+        with _pending_lock:
+            rows = [{"day": day, "caller": caller, "model": model, **values, "updated_at": datetime.utcnow()}
+                    for (day, caller, model), values in _pending.items()]
+            _pending.clear()
+        if not rows:
+            return 0
+        try:
+            with session_factory() as session:
+                insert = dialect_insert(session.get_bind())
+                stmt = insert(OpenAIUsageDaily).values(rows)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[OpenAIUsageDaily.day, OpenAIUsageDaily.caller, OpenAIUsageDaily.model],
+                    set_={
+                        **{field: getattr(OpenAIUsageDaily, field) + getattr(stmt.excluded, field)
+                           for field in _USAGE_FIELDS},
+                        "updated_at": stmt.excluded.updated_at,
+                    },
+                )
+                session.execute(stmt)
+                session.commit()
+        except Exception:
+            with _pending_lock:
+                for row in rows:
+                    pending = _pending.setdefault((row["day"], row["caller"], row["model"]),
+                                                  dict.fromkeys(_USAGE_FIELDS, 0))
+                    for field in _USAGE_FIELDS:
+                        pending[field] += row[field]
+            raise
+        return len(rows)
+
+
+def daily_usage(days: int = COST_WINDOW_DAYS, today: Optional[date] = None, session_factory=SessionLocal) -> List[Dict]:
+    """Denní odhad nákladů za posledních `days` dní (nejnovější první) s rozpadem podle volajícího a modelu."""
+    flush_usage(session_factory=session_factory)
+    today = today or datetime.utcnow().date()
+    with session_factory() as session:
+        rows = session.execute(
+            select(OpenAIUsageDaily)
+            .where(OpenAIUsageDaily.day > today - timedelta(days=days))
+            .order_by(OpenAIUsageDaily.day.desc(), OpenAIUsageDaily.cost_usd.desc())
+        ).scalars().all()
+        result: Dict[date, Dict] = {}
+        for row in rows:
+            day = result.setdefault(row.day, {"day": row.day, "calls": 0, "errors": 0, "cost_usd": 0.0, "breakdown": []})
+            day["calls"] += row.calls
+            day["errors"] += row.errors
+            day["cost_usd"] += row.cost_usd
+            day["breakdown"].append({field: getattr(row, field) for field in ("caller", "model") + _USAGE_FIELDS})
+    return list(result.values())
+
+
+# === Obálka SDK ===
+
+def _is_retryable(error: BaseException) -> bool:
+    import openai
+    return isinstance(error, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError))
+
+
+def _backoff(attempt: int) -> float:
+    return min(0.5 * 2 ** (attempt - 1), 8.0) * (0.75 + random.random() / 2)
+
+
+def _response_usage(operation: str, kwargs: Dict, response) -> Dict:
+    usage = getattr(response, "usage", None)
+    result = {
+        "prompt_tokens": getattr(usage, "prompt_tokens", None) or getattr(usage, "input_tokens", None) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", None) or getattr(usage, "output_tokens", None) or 0,
+    }
+    if operation.startswith("audio.speech"):
+        result["characters"] = len(kwargs.get("input") or "")
+    elif operation.startswith("audio."):
+        # Whisper vrací délku audia v usage (type=duration), verbose_json v duration
+        result["audio_seconds"] = float(getattr(usage, "seconds", None) or getattr(response, "duration", None) or 0)
+    if not isinstance(result["prompt_tokens"], int) or not isinstance(result["completion_tokens"], int):
+        result["prompt_tokens"] = result["completion_tokens"] = 0
+    return result
+
+
+class _Call:
+    """Jedno volání metody SDK: span, opakování a záznam spotřeby."""
+
+    def __init__(self, client: "OpenAIClient", operation: str, kwargs: Dict):
+        self.client = client
+        self.operation = operation
+        self.kwargs = kwargs
+        self.model = kwargs.get("model") or "-"
+        self.retries = 0
+        self.started = time.perf_counter()
+
+    def span(self):
+        return span(f"openai.{self.operation}", SPAN_KIND_CLIENT,
+                    **{"llm.caller": self.client.caller, "llm.model": self.model})
+
+    def should_retry(self, error: BaseException) -> bool:
+        if self.retries < self.client.max_retries and _is_retryable(error):
+            self.retries += 1
+            logger.warning(f"🔁 OpenAI {self.operation} ({self.client.caller}) opakuji {self.retries}/"
+                           f"{self.client.max_retries}: {type(error).__name__}")
+            return True
+        return False
+
+    def finish(self, current_span, response=None, error: Optional[BaseException] = None) -> None:
+        if self.model == "-" and isinstance(getattr(response, "model", None), str):
+            self.model = response.model  # např. dokončený run Assistants API
+        usage = _response_usage(self.operation, self.kwargs, response) if error is None else {}
+        cost = record_usage(self.client.caller, self.model, self.operation, time.perf_counter() - self.started,
+                            retries=self.retries, error=error, **usage)
+        current_span.set_attribute("llm.model", self.model)
+        current_span.set_attribute("llm.retries", self.retries)
+        current_span.set_attribute("llm.cost_usd", round(cost, 6))
+        for key, value in usage.items():
+            current_span.set_attribute(f"llm.{key}", value)
+
+
+class _Resource:
+    """Zástupce zdroje SDK (chat, chat.completions, audio.speech, ...); metody obalí měřením."""
+
+    def __init__(self, client: "OpenAIClient", target, path: Tuple[str, ...]):
+        self._client = client
+        self._target = target
+        self._path = path
+
+    def __getattr__(self, name):
+        attribute = getattr(self._target, name)
+        path = self._path + (name,)
+        if not inspect.ismethod(attribute):
+            return _Resource(self._client, attribute, path)
+        operation = ".".join(path)
+        client = self._client
+
+        # Metody AsyncOpenAI jsou obalené synchronním dekorátorem SDK - rozhoduje typ klienta
+        if client.is_async:
+            async def async_method(*args, **kwargs):
+                call = _Call(client, operation, kwargs)
+                with call.span() as current:
+                    while True:
+                        try:
+                            response = await attribute(*args, **kwargs)
+                        except Exception as exc:
+                            if call.should_retry(exc):
+                                await asyncio.sleep(_backoff(call.retries))
+                                continue
+                            call.finish(current, error=exc)
+                            raise
+                        call.finish(current, response)
+                        return response
+            return async_method
+
+        def method(*args, **kwargs):
+            call = _Call(client, operation, kwargs)
+            with call.span() as current:
+                while True:
+                    try:
+                        response = attribute(*args, **kwargs)
+                    except Exception as exc:
+                        if call.should_retry(exc):
+                            time.sleep(_backoff(call.retries))
+                            continue
+                        call.finish(current, error=exc)
+                        raise
+                    call.finish(current, response)
+                    return response
+        return method
+
+
+class OpenAIClient:
+    """Obálka SDK klienta se stejným rozhraním; `with_caller` vrací kopii s jiným tagem volajícího."""
+
+    def __init__(self, raw, caller: str, is_async: bool = False, max_retries: int = OPENAI_MAX_RETRIES):
+        self.raw = raw
+        self.caller = caller
+        self.is_async = is_async
+        self.max_retries = max_retries
+
+    def with_caller(self, caller: str) -> "OpenAIClient":
+        return OpenAIClient(self.raw, caller, self.is_async, self.max_retries)
+
+    def __getattr__(self, name):
+        return _Resource(self, getattr(self.raw, name), (name,))
+
+
+_raw_clients: Dict[Tuple[str, bool], object] = {}
+_raw_clients_lock = threading.Lock()
+
+
+def openai_client(caller: str, api_key: Optional[str] = None, use_async: bool = False) -> OpenAIClient:
+    """
+    Instrumentovaný klient pro `caller`. SDK klient (a jeho pool HTTP spojení) se sdílí
+    pro stejný API klíč, opakování počítá obálka.
+    """
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    key = (api_key, use_async)
+    with _raw_clients_lock:
+        raw = _raw_clients.get(key)
+        if raw is None:
+            import openai
+            factory = openai.AsyncOpenAI if use_async else openai.OpenAI
+            raw = _raw_clients[key] = factory(api_key=api_key, max_retries=0, timeout=OPENAI_TIMEOUT_SECONDS)
+    return OpenAIClient(raw, caller, is_async=use_async)
@@ -2,6 +2,8 @@ import os
 import logging
 from typing import List, Dict, Any, Optional, Tuple
 
+from app.services.openai_client import openai_client
+
 logger = logging.getLogger(__name__)
 
 class OpenAIService:
@@ -19,13 +21,13 @@ class OpenAIService:
             
             # Import OpenAI knihovny
             try:
-                from openai import OpenAI
+                import openai  # noqa: F401
             except ImportError:
                 logger.error("OpenAI knihovna není nainstalována")
                 return
             
-            # Inicializace klienta
-            self.client = OpenAI(api_key=api_key)
+            # Inicializace instrumentovaného klienta (latence, tokeny a náklady podle volajícího)
+            self.client = openai_client("openai_service", api_key)
             self.enabled = True
             logger.info("OpenAI služba byla úspěšně inicializována")
             
@@ -42,7 +44,7 @@ class OpenAIService:
             
         try:
             logger.info(f"Generuji otázky pro text délky {len(text)} v jazyce {language}")
-            response = self.client.chat.completions.create(
+            response = self.client.with_caller("question_generation").chat.completions.create(
                 model="gpt-4.1-mini",
                 messages=[
                     {
@@ -90,7 +92,7 @@ class OpenAIService:
             
         try:
             logger.info(f"Hodnotím odpověď na otázku: {question[:50]}...")
-            response = self.client.chat.completions.create(
+            response = self.client.with_caller("answer_scoring").chat.completions.create(
                 model="gpt-4.1-mini",
                 messages=[
                     {
@@ -142,7 +144,7 @@ Vrať odpověď ve formátu JSON pole objektů s klíči:
 - "topic": hlavní téma otázky
 - "difficulty": obtížnost (1-5)"""
 
-            response = self.client.chat.completions.create(
+            response = self.client.with_caller("voice_question_generation").chat.completions.create(
                 model="gpt-4.1-mini",
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -204,7 +206,7 @@ Vrať odpověď ve formátu JSON pole objektů s klíči:
             try:
                 # Volání Whisper API
                 with open(temp_file_path, "rb") as audio_file:
-                    response = self.client.audio.transcriptions.create(
+                    response = self.client.with_caller("whisper").audio.transcriptions.create(
                         model="whisper-1",
                         file=audio_file,
                         language=language,
@@ -258,7 +260,7 @@ Vrať odpověď ve formátu JSON pole objektů s klíči:
 - "topic": hlavní téma otázky
 - "difficulty": obtížnost (1-5, kde 1=snadná, 5=obtížná)"""
 
-            response = self.client.chat.completions.create(
+            response = self.client.with_caller("lesson_question_generation").chat.completions.create(
                 model="gpt-4.1-mini",
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -315,7 +317,7 @@ Vrať JSON ve formátu:
     "suggestions": ["tip1", "tip2"]
 }}"""
 
-            response = self.client.chat.completions.create(
+            response = self.client.with_caller("voice_answer_eval").chat.completions.create(
                 model="gpt-4.1-mini",
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -393,7 +395,7 @@ Vrať odpověď ve formátu JSON:
     "follow_up_questions": ["otázka1", "otázka2"] // navazující otázky
 }}"""
 
-            response = self.client.chat.completions.create(
+            response = self.client.with_caller("lesson_qa").chat.completions.create(
                 model="gpt-4.1-mini",
                 messages=[
                     {"role": "system", "content": system_prompt},
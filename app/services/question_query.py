@@ -0,0 +1,78 @@
+"""
+Vyhledávání otázek napříč lekcemi podle kategorie, obtížnosti a příznaku enabled.
+
+Na Postgresu je lessons.questions JSONB s GIN indexem (jsonb_path_ops), takže
+filtr `questions @> '[{"category": ..., "difficulty": ...}]'` vybere lekce přes
+index a jednotlivé otázky se rozbalí jsonb_array_elements v tomtéž dotazu.
+Na ostatních databázích (SQLite) se lekce filtrují v Pythonu.
+"""
+
+import json
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, text
+
+from app.models import Lesson
+
+_POSTGRES_QUERY = """
+    SELECT l.id AS lesson_id, l.title AS lesson_title, q.ordinality - 1 AS question_index, q.value AS question
+    FROM lessons AS l
+    CROSS JOIN LATERAL jsonb_array_elements(
+        CASE WHEN jsonb_typeof(l.questions) = 'array' THEN l.questions ELSE '[]'::jsonb END
+    ) WITH ORDINALITY AS q(value, ordinality)
+    WHERE l.questions @> CAST(:lesson_pattern AS jsonb)
+      AND q.value @> CAST(:question_pattern AS jsonb)
+      {enabled_filter}
+      {lesson_filter}
+    ORDER BY l.id, question_index
+"""
+
+
+def _criteria(category: Optional[str], difficulty: Optional[str]) -> Dict[str, str]:
+    criteria = {}
+    if category:
+        criteria["category"] = category
+    if difficulty:
+        criteria["difficulty"] = difficulty
+    return criteria
+
+
+def _matches(question: dict, criteria: Dict[str, str], enabled: Optional[bool]) -> bool:
+    if any(question.get(key) != value for key, value in criteria.items()):
+        return False
+    # Chybějící 'enabled' znamená zapnutou otázku (stejně jako při výběru otázek do testu)
+    return enabled is None or bool(question.get("enabled", True)) == enabled
+
+
+def find_questions(session, category: Optional[str] = None, difficulty: Optional[str] = None,
+                   enabled: Optional[bool] = None, lesson_id: Optional[int] = None) -> List[Dict]:
+    """
+    Otázky všech lekcí (nebo jedné lekce) odpovídající filtrům, seřazené podle lekce a pořadí.
+    Každá položka obsahuje lesson_id, lesson_title, question_index a question (dict otázky).
+    """
+    criteria = _criteria(category, difficulty)
+
+    if session.get_bind().dialect.name == "postgresql":
+        question_pattern = dict(criteria)
+        if enabled is False:
+            question_pattern["enabled"] = False
+        enabled_filter = "AND NOT (q.value @> '{\"enabled\": false}'::jsonb)" if enabled else ""
+        lesson_filter = "AND l.id = :lesson_id" if lesson_id is not None else ""
+        stmt = text(_POSTGRES_QUERY.format(enabled_filter=enabled_filter, lesson_filter=lesson_filter))
+        params = {"lesson_pattern": json.dumps([question_pattern], ensure_ascii=False),
+                  "question_pattern": json.dumps(question_pattern, ensure_ascii=False)}
+        if lesson_id is not None:
+            params["lesson_id"] = lesson_id
+        return [dict(row) for row in session.execute(stmt, params).mappings()]
+
+    query = select(Lesson.id, Lesson.title, Lesson.questions).order_by(Lesson.id)
+    if lesson_id is not None:
+        query = query.where(Lesson.id == lesson_id)
+    results = []
+    for lesson_id_, title, questions in session.execute(query):
+        # Lekce se starším formátem otázek (dict místo seznamu) přeskočíme, stejně jako SQL varianta
+        for index, question in enumerate(questions if isinstance(questions, list) else []):
+            if isinstance(question, dict) and _matches(question, criteria, enabled):
+                results.append({"lesson_id": lesson_id_, "lesson_title": title,
+                                "question_index": index, "question": question})
+    return results
@@ -12,6 +12,7 @@ import traceback
 from flask import current_app
 from flask_socketio import emit
 from app.models import Attempt
+from app.services.openai_client import record_usage
 
 logger = logging.getLogger(__name__)
 
@@ -20,8 +21,10 @@ class OpenAIRealtimeService:
     
     def __init__(self):
         self.api_key = os.getenv('OPENAI_API_KEY')
-        self.ws_url = "wss://api.openai.com/v1/realtime?model=gpt-4o-realtime-preview-2024-10-01"  # Správná URL pro OpenAI Realtime API
+        self.model = "gpt-4o-realtime-preview-2024-10-01"
+        self.ws_url = f"wss://api.openai.com/v1/realtime?model={self.model}"  # Správná URL pro OpenAI Realtime API
         self.openai_ws = None
+        self.response_started = None
         self.twilio_ws = None
         self.audio_queue = Queue()
         self.is_connected = False
@@ -144,6 +147,15 @@ Vždy zůstávaj v kontextu výuky a buď konstruktivní.""",
                     except Exception as e:
                         logger.error(f"Chyba při generování odpovědi: {e}")
                     
+                elif message_type == 'response.done':
+                    # Realtime API jde mimo SDK - spotřebu zaznamenáme ručně (metriky a denní náklady)
+                    usage = data.get('response', {}).get('usage') or {}
+                    latency = time.perf_counter() - self.response_started if self.response_started else 0.0
+                    record_usage("realtime", self.model, "realtime.response", latency,
+                                 prompt_tokens=usage.get('input_tokens', 0),
+                                 completion_tokens=usage.get('output_tokens', 0))
+                    self.response_started = None
+                    
                 elif message_type == 'error':
                     error_info = data.get('error', {})
                     logger.error(f"Chyba z OpenAI: {error_info}")
@@ -210,6 +222,7 @@ Vždy zůstávaj v kontextu výuky a buď konstruktivní.""",
                 }
             }
             
+            self.response_started = time.perf_counter()
             await self.openai_ws.send(json.dumps(response_message))
             logger.debug("Požádáno o vytvoření odpovědi z OpenAI")
             
@@ -1,15 +1,17 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.cron import CronTrigger
-from sqlalchemy import select
-from typing import List
+from sqlalchemy import select, update, or_
+from typing import Callable, List, Optional
 import logging
 import os
 
+from app.database import SessionLocal
 from app.models import Attempt, User
-from app.services.twilio_service import TwilioService
-from flask import current_app
+from app.services.campaign_service import TokenBucket, outbound_call_bucket, webhook_base_url
+from app.services.session_sweeper import SWEEP_INTERVAL_MINUTES, sweep_abandoned_sessions
+from app.services.spaced_repetition import provisional_due
 
 logger = logging.getLogger(__name__)
 
@@ -22,17 +24,37 @@ scheduler = BackgroundScheduler(
     }
 )
 
+DUE_BATCH_SIZE = int(os.getenv("DUE_ATTEMPTS_BATCH_SIZE", "50"))
+# Jak dlouho má worker zamčený pokus; po pádu workeru ho po vypršení převezme jiný
+DUE_LEASE_SECONDS = int(os.getenv("DUE_ATTEMPTS_LEASE_SECONDS", "300"))
+# Po neúspěšném vytočení se pokus zkusí znovu až za tuto dobu
+DUE_RETRY_MINUTES = int(os.getenv("DUE_ATTEMPTS_RETRY_MINUTES", "30"))
+DUE_CHECK_INTERVAL_MINUTES = int(os.getenv("DUE_ATTEMPTS_CHECK_MINUTES", "5"))
+
 class SchedulerService:
-    def __init__(self, db_session, twilio_service: TwilioService):
-        self.db = db_session
+    """
+    Vytáčí pokusy, kterým nastal `next_due`. Bezpečné pro N instancí aplikace:
+    pokusy se zamykají leasem (`lease_until`) přes FOR UPDATE SKIP LOCKED
+    a podmíněný UPDATE, po vytočení se přeplánuje `next_due` a lease se uvolní.
+    """
+
+    def __init__(self, session_factory=SessionLocal, twilio_service=None, batch_size: int = DUE_BATCH_SIZE,
+                 lease_seconds: int = DUE_LEASE_SECONDS, dial: Optional[Callable[[str, str], Optional[str]]] = None,
+                 bucket: Optional[TokenBucket] = None):
+        self.session_factory = session_factory
         self.twilio = twilio_service
+        self.batch_size = batch_size
+        self.lease = timedelta(seconds=lease_seconds)
+        self._dial = dial
+        # Tempo vytáčení určuje limit Twilio účtu sdílený s volacími kampaněmi
+        self.bucket = bucket or outbound_call_bucket
     
     def start(self):
         """Spustí plánovač."""
         try:
             scheduler.add_job(
                 self._check_due_attempts,
-                IntervalTrigger(minutes=5),
+                IntervalTrigger(minutes=DUE_CHECK_INTERVAL_MINUTES),
                 id="check_due_attempts",
                 replace_existing=True
             )
@@ -53,31 +75,141 @@ class SchedulerService:
             logger.error(f"Chyba při zastavování scheduleru: {str(e)}")
             raise
     
-    def _check_due_attempts(self):
-        """Zkontroluje a spustí hovory pro opakování lekcí."""
+    def dial(self, phone: str, webhook_url: str) -> Optional[str]:
+        if self._dial:
+            return self._dial(phone, webhook_url)
+        if self.twilio is None:
+            from app.services.twilio_service import TwilioService
+            self.twilio = TwilioService()
+        if not self.twilio.enabled:
+            raise RuntimeError("Twilio služba není povolena")
+        return self.twilio.call(phone, webhook_url)
+    
+    def claim_due_attempts(self, session, now: datetime) -> List[tuple]:
+        """
+        Zamkne nejvýše `batch_size` splatných pokusů leasem a vrátí [(attempt_id, user_id, lease_until)].
+        FOR UPDATE SKIP LOCKED rozdělí řádky mezi souběžné workery (PostgreSQL),
+        podmíněný UPDATE zaručí, že lease získá jen jeden z nich i bez řádkových zámků.
+        """
+        lease_until = now + self.lease
+        free_lease = or_(Attempt.lease_until.is_(None), Attempt.lease_until < now)
+        candidates = session.execute(
+            select(Attempt.id, Attempt.user_id)
+            .where(Attempt.next_due <= now, free_lease)
+            .order_by(Attempt.next_due)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        
+        claimed = []
+        for attempt_id, user_id in candidates:
+            result = session.execute(
+                update(Attempt)
+                .where(Attempt.id == attempt_id, Attempt.next_due <= now, free_lease)
+                .values(lease_until=lease_until)
+            )
+            if result.rowcount == 1:
+                claimed.append((attempt_id, user_id, lease_until))
+        session.commit()
+        return claimed
+    
+    def _finish_attempt(self, session, attempt_id: int, lease_until: datetime, next_due: Optional[datetime]) -> None:
+        """Nastaví nový `next_due` a uvolní lease - jen pokud lease mezitím nepřevzal jiný worker."""
+        attempt = session.execute(
+            select(Attempt).where(Attempt.id == attempt_id, Attempt.lease_until == lease_until)
+        ).scalar_one_or_none()
+        if not attempt:
+            logger.warning(f"⚠️ Lease pokusu {attempt_id} vypršel dřív, než byl hovor dokončen")
+            return
+        attempt.next_due = next_due
+        attempt.lease_until = None
+        session.commit()
+    
+    def dispatch_due_attempts(self, now: Optional[datetime] = None, max_batches: Optional[int] = None) -> dict:
+        """Zpracuje splatné pokusy po dávkách, dokud nějaké zbývají."""
+        result = {"claimed": 0, "dialed": 0, "failed": 0, "superseded": 0}
+        session = self.session_factory()
         try:
-            now = datetime.utcnow()
-            
-            # Najdi pokusy, které jsou na řadě
-            stmt = select(Attempt).where(Attempt.next_due <= now)
-            attempts = self.db.execute(stmt).scalars().all()
-            
-            for attempt in attempts:
-                # Získej uživatele
-                user = self.db.get(User, attempt.user_id)
-                if not user:
-                    continue
+            batches = 0
+            while max_batches is None or batches < max_batches:
+                claimed = self.claim_due_attempts(session, now or datetime.utcnow())
+                if not claimed:
+                    break
+                batches += 1
+                result["claimed"] += len(claimed)
+                
+                # Uživatelé celé dávky jedním dotazem
+                user_ids = {user_id for _, user_id, _ in claimed}
+                phones = dict(session.execute(
+                    select(User.id, User.phone).where(User.id.in_(user_ids))
+                ).all())
                 
-                # Spusť hovor
-                base_url = current_app.config['WEBHOOK_BASE_URL'].rstrip('/')
-                webhook_url = f"{base_url}/voice/?attempt_id={attempt.id}"
-                self.twilio.call(user.phone, webhook_url)
+                # Nejvýše jeden hovor na uživatele - starší splatné pokusy téhož uživatele se jen odplánují
+                latest = {}
+                for attempt_id, user_id, _ in claimed:
+                    latest[user_id] = max(attempt_id, latest.get(user_id, attempt_id))
                 
-            logger.info(f"Kontrola pokusů dokončena, nalezeno {len(attempts)} pokusů")
+                base_url = webhook_base_url()
+                for attempt_id, user_id, lease_until in claimed:
+                    if latest[user_id] != attempt_id:
+                        result["superseded"] += 1
+                        self._finish_attempt(session, attempt_id, lease_until, None)
+                        continue
+                    phone = phones.get(user_id)
+                    dialed = False
+                    if phone:
+                        try:
+                            self.bucket.acquire()
+                            self.dial(phone, f"{base_url}/voice/?attempt_id={attempt_id}")
+                            dialed = True
+                            result["dialed"] += 1
+                        except Exception as e:
+                            logger.error(f"❌ Volání pokusu {attempt_id} selhalo: {e}")
+                    if dialed:
+                        # Předběžný termín pro případ, že hovor nedoběhne; dokončená session ho přeplánuje
+                        next_due = provisional_due()
+                    else:
+                        result["failed"] += 1
+                        next_due = datetime.utcnow() + timedelta(minutes=DUE_RETRY_MINUTES)
+                    self._finish_attempt(session, attempt_id, lease_until, next_due)
+        finally:
+            session.close()
+        return result
+    
+    def _check_due_attempts(self):
+        """Zkontroluje a spustí hovory pro opakování lekcí."""
+        try:
+            result = self.dispatch_due_attempts()
+            logger.info(f"Kontrola pokusů dokončena: {result}")
         except Exception as e:
             logger.error(f"Chyba při kontrole pokusů: {str(e)}")
             raise
 
+def _sweep_abandoned_sessions(session_factory=SessionLocal):
+    """Označí nedokončené test sessions nečinné déle než TTL jako opuštěné."""
+    try:
+        sweep_abandoned_sessions(session_factory=session_factory)
+    except Exception as e:
+        logger.error(f"Chyba při úklidu opuštěných sessions: {str(e)}")
+        raise
+
+def start_session_sweeper(session_factory=SessionLocal):
+    """Zaregistruje periodický úklid opuštěných sessions - nezávisle na plánovači opakovacích hovorů."""
+    try:
+        scheduler.add_job(
+            _sweep_abandoned_sessions,
+            IntervalTrigger(minutes=SWEEP_INTERVAL_MINUTES),
+            kwargs={"session_factory": session_factory},
+            id="sweep_abandoned_sessions",
+            replace_existing=True
+        )
+        if not scheduler.running:
+            scheduler.start()
+            logger.info("Scheduler byl úspěšně spuštěn")
+    except Exception as e:
+        logger.error(f"Chyba při spouštění úklidu sessions: {str(e)}")
+        raise
+
 def init_scheduler():
     """Inicializuje a spustí scheduler."""
     try:
@@ -0,0 +1,232 @@
+"""
+Archivace dokončených test sessions.
+
+Sessions dokončené před více než N dny se po dávkách přesunou do tabulky
+test_session_archive: objemné JSON sloupce (questions_data, answers) se zkopírují
+do archivu a v test_sessions zůstane jen kompaktní souhrn (skóre, kategorie,
+časy) s vyplněným `archived_at`.
+
+Na Postgresu je archiv v téže databázi, rozdělený na měsíční partition podle
+completed_at (partition se zakládají podle potřeby); přesun dávky je jedna
+transakce. Na SQLite leží archiv v samostatném souboru (ARCHIVE_DATABASE_URL,
+výchozí `<db>_archive.db`) - zápis do archivu je idempotentní (ON CONFLICT DO
+NOTHING), takže pád mezi oběma commity se opraví dalším během.
+
+Analytika čte historii přes `with_archived_payloads`, který archivovaným řádkům
+doplní payload z archivu po dávkách.
+"""
+
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from sqlalchemy import delete, select, text, update
+from sqlalchemy.orm import sessionmaker
+
+from app.database import DATABASE_URL, SessionLocal, create_configured_engine, dialect_insert
+from app.models import ArchivedTestSession, TestSession
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("SESSION_ARCHIVE_AFTER_DAYS", "90"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("SESSION_ARCHIVE_BATCH_SIZE", "500"))
+
+_archive_factory = None
+_archive_lock = threading.Lock()
+
+
+def archive_database_url(database_url: str = DATABASE_URL, env=os.environ) -> Optional[str]:
+    """URL samostatné archivní databáze, nebo None, když archiv leží v hlavní databázi (Postgres)."""
+    if env.get("ARCHIVE_DATABASE_URL"):
+        return env["ARCHIVE_DATABASE_URL"]
+    if database_url.startswith("sqlite:///") and ":memory:" not in database_url:
+        base, extension = os.path.splitext(database_url)
+        return f"{base}_archive{extension or '.db'}"
+    return None
+
+
+def default_archive_session_factory():
+    """Session factory archivu; samostatný soubor se při prvním použití připojí a založí v něm tabulku."""
+    global _archive_factory
+    with _archive_lock:
+        if _archive_factory is None:
+            url = archive_database_url()
+            if url is None:
+                _archive_factory = SessionLocal
+            else:
+                archive_engine = create_configured_engine(url)
+                ArchivedTestSession.__table__.create(bind=archive_engine, checkfirst=True)
+                _archive_factory = sessionmaker(bind=archive_engine, autoflush=False)
+                logger.info(f"🗄️ Archiv sessions v samostatné databázi {archive_engine.url!r}")
+        return _archive_factory
+
+
+# === Měsíční partition (PostgreSQL) ===
+
+def month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1)
+
+
+def partition_name(start: datetime) -> str:
+    return f"test_session_archive_{start:%Y_%m}"
+
+
+def ensure_partitions(session, moments: Iterable[datetime]) -> List[str]:
+    """Založí chybějící měsíční partition pro dané časy dokončení; vrací názvy nově založených."""
+    if session.get_bind().dialect.name != "postgresql":
+        return []
+    created = []
+    for start in sorted({month_start(moment) for moment in moments}):
+        name = partition_name(start)
+        # to_regclass nebere zámek na rodičovskou tabulku, CREATE ... PARTITION OF ano
+        if session.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None:
+            continue
+        end = month_start(start + timedelta(days=32))
+        session.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF test_session_archive "
+            f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+        ))
+        created.append(name)
+    return created
+
+
+# === Přesun do archivu ===
+
+def _write_archive(session, values: List[Dict]) -> List[str]:
+    created = ensure_partitions(session, (value["completed_at"] for value in values))
+    insert = dialect_insert(session.get_bind())
+    session.execute(
+        insert(ArchivedTestSession).values(values).on_conflict_do_nothing(index_elements=["session_id", "completed_at"])
+    )
+    return created
+
+
+def archive_completed_sessions(older_than_days: int = ARCHIVE_AFTER_DAYS, batch_size: int = ARCHIVE_BATCH_SIZE,
+                               max_batches: Optional[int] = None, now: Optional[datetime] = None,
+                               session_factory=SessionLocal, archive_session_factory=None) -> Dict:
+    """
+    Přesune sessions dokončené před více než `older_than_days` dny do archivu, po dávkách `batch_size`.
+    Vrací počet archivovaných sessions, dávek a nově založených partition.
+    """
+    archive_factory = archive_session_factory or default_archive_session_factory()
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=older_than_days)
+    result = {"sessions": 0, "batches": 0, "partitions": [], "cutoff": cutoff}
+    last_id = 0
+
+    while max_batches is None or result["batches"] < max_batches:
+        with session_factory() as session:
+            rows = session.execute(
+                select(TestSession.id, TestSession.user_id, TestSession.lesson_id, TestSession.attempt_id,
+                       TestSession.completed_at, TestSession.questions_data, TestSession.answers)
+                .where(TestSession.is_completed.is_(True), TestSession.completed_at < cutoff,
+                       TestSession.archived_at.is_(None), TestSession.id > last_id)
+                .order_by(TestSession.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            values = [
+                {"session_id": session_id, "user_id": user_id, "lesson_id": lesson_id, "attempt_id": attempt_id,
+                 "completed_at": completed_at, "questions_data": questions_data or [], "answers": answers or [],
+                 "archived_at": now}
+                for session_id, user_id, lesson_id, attempt_id, completed_at, questions_data, answers in rows
+            ]
+
+            if archive_factory is session_factory:
+                # Archiv ve stejné databázi - kopie i zkrácení souhrnu v jedné transakci
+                result["partitions"] += _write_archive(session, values)
+            else:
+                with archive_factory() as archive_session:
+                    result["partitions"] += _write_archive(archive_session, values)
+                    archive_session.commit()
+
+            session.execute(
+                update(TestSession)
+                .where(TestSession.id.in_([value["session_id"] for value in values]),
+                       TestSession.archived_at.is_(None))
+                .values(questions_data=[], answers=[], archived_at=now)
+            )
+            session.commit()
+
+        result["sessions"] += len(values)
+        result["batches"] += 1
+        logger.info(f"🗄️ Archivace sessions: {result['sessions']} přesunuto (poslední id {last_id})")
+
+    logger.info(f"✅ Archivace dokončena: {result['sessions']} sessions v {result['batches']} dávkách, "
+                f"nové partition: {len(result['partitions'])}")
+    return result
+
+
+# === Čtení napříč hot tabulkou a archivem ===
+
+def load_archived_payloads(session_ids: Sequence[int], archive_session_factory=None) -> Dict[int, Dict]:
+    """Payload (questions_data, answers) archivovaných sessions podle id."""
+    if not session_ids:
+        return {}
+    factory = archive_session_factory or default_archive_session_factory()
+    with factory() as session:
+        rows = session.execute(
+            select(ArchivedTestSession.session_id, ArchivedTestSession.questions_data, ArchivedTestSession.answers)
+            .where(ArchivedTestSession.session_id.in_(list(session_ids)))
+        )
+        return {session_id: {"questions_data": questions_data, "answers": answers}
+                for session_id, questions_data, answers in rows}
+
+
+def _hydrate(buffer: List, id_index: int, archived_index: int, columns: Dict[int, str],
+             archive_session_factory) -> Iterator[tuple]:
+    archived_ids = [row[id_index] for row in buffer if row[archived_index] is not None]
+    payloads = load_archived_payloads(archived_ids, archive_session_factory) if archived_ids else {}
+    for row in buffer:
+        payload = payloads.get(row[id_index])
+        if payload is None:
+            yield tuple(row)
+            continue
+        values = list(row)
+        for index, column in columns.items():
+            values[index] = payload[column]
+        yield tuple(values)
+
+
+def with_archived_payloads(rows: Iterable, id_index: int, archived_index: int, columns: Dict[int, str],
+                           batch_size: int = ARCHIVE_BATCH_SIZE, archive_session_factory=None) -> Iterator[tuple]:
+    """
+    Řádkům z test_sessions doplní JSON payload archivovaných sessions (řádek má `archived_at`).
+
+    `columns` mapuje pozici v řádku na sloupec archivu ("questions_data" / "answers").
+    Archiv se dotazuje jednou za `batch_size` řádků, pořadí řádků se zachová, takže
+    volající (rollupy, export, backfilly) pracuje se stejnými daty jako před archivací.
+    """
+    buffer = []
+    for row in rows:
+        buffer.append(row)
+        if len(buffer) >= batch_size:
+            yield from _hydrate(buffer, id_index, archived_index, columns, archive_session_factory)
+            buffer = []
+    if buffer:
+        yield from _hydrate(buffer, id_index, archived_index, columns, archive_session_factory)
+
+
+def delete_archived_sessions(session, user_id: int, batch_size: int) -> int:
+    """
+    Smaže dávku archivovaných sessions uživatele. Archiv v hlavní databázi se maže
+    v transakci `session` (commit dělá volající), samostatný archiv vlastním commitem.
+    """
+    def delete_batch(target) -> int:
+        ids = target.execute(
+            select(ArchivedTestSession.session_id).where(ArchivedTestSession.user_id == user_id).limit(batch_size)
+        ).scalars().all()
+        if ids:
+            target.execute(delete(ArchivedTestSession).where(ArchivedTestSession.session_id.in_(ids)))
+        return len(ids)
+
+    if archive_database_url() is None:
+        return delete_batch(session)
+    with default_archive_session_factory()() as archive_session:
+        deleted = delete_batch(archive_session)
+        archive_session.commit()
+        return deleted
@@ -0,0 +1,80 @@
+"""
+Úklid opuštěných test sessions.
+
+Když volající zavěsí uprostřed testu, session zůstane `is_completed=False`.
+Sweeper (periodický job scheduleru, viz scheduler.start_session_sweeper) po omezených dávkách označí rozpracované
+sessions nečinné déle než TTL jako opuštěné (`abandoned_at`). Hledání aktivní
+session je vynechává (částečný index ix_test_sessions_active pokrývá jen
+rozpracované sessions), takže další hovor začne novou session s čerstvým stavem.
+"""
+
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, update
+
+from app.database import SessionLocal
+from app.models import TestSession
+
+logger = logging.getLogger(__name__)
+
+SESSION_IDLE_TTL_MINUTES = int(os.getenv("SESSION_IDLE_TTL_MINUTES", "240"))
+SWEEP_BATCH_SIZE = int(os.getenv("SESSION_SWEEP_BATCH_SIZE", "200"))
+SWEEP_MAX_BATCHES = int(os.getenv("SESSION_SWEEP_MAX_BATCHES", "20"))
+SWEEP_INTERVAL_MINUTES = int(os.getenv("SESSION_SWEEP_INTERVAL_MINUTES", "15"))
+# Sweeper běží nezávisle na plánovači opakovacích hovorů; souběh více instancí je bezpečný
+SESSION_SWEEPER_ENABLED = os.getenv("ENABLE_SESSION_SWEEPER", "true").lower() in ("1", "true", "yes")
+
+
+def _open_criteria() -> List:
+    return [TestSession.is_completed == False, TestSession.abandoned_at.is_(None)]
+
+
+def active_session_filter(now: Optional[datetime] = None, ttl_minutes: int = SESSION_IDLE_TTL_MINUTES) -> List:
+    """
+    Podmínky aktivní (navazovatelné) session: nedokončená, neopuštěná a nečinná kratší dobu než TTL.
+    Nečinnou session, ke které se sweeper ještě nedostal, tak hovor také nenaváže.
+    """
+    cutoff = (now or datetime.utcnow()) - timedelta(minutes=ttl_minutes)
+    return _open_criteria() + [TestSession.last_activity_at >= cutoff]
+
+
+def sweep_abandoned_sessions(ttl_minutes: int = SESSION_IDLE_TTL_MINUTES, batch_size: int = SWEEP_BATCH_SIZE,
+                             max_batches: int = SWEEP_MAX_BATCHES, now: Optional[datetime] = None,
+                             session_factory=SessionLocal) -> Dict[str, int]:
+    """
+    Označí rozpracované sessions nečinné déle než `ttl_minutes` jako opuštěné.
+
+    Jeden běh zpracuje nejvýš `max_batches` dávek po `batch_size` (každá dávka je krátká
+    transakce), zbytek dořeší další běh. Řádky se zamykají FOR UPDATE SKIP LOCKED a UPDATE
+    podmínky opakuje, takže souběžný sweeper ani odpověď přijatá mezitím se nepřepíšou.
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(minutes=ttl_minutes)
+    idle = _open_criteria() + [TestSession.last_activity_at < cutoff]
+    result = {"abandoned": 0, "batches": 0}
+
+    while result["batches"] < max_batches:
+        with session_factory() as session:
+            ids = session.execute(
+                select(TestSession.id)
+                .where(*idle)
+                .order_by(TestSession.last_activity_at)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            ).scalars().all()
+            if not ids:
+                break
+            result["abandoned"] += session.execute(
+                update(TestSession).where(TestSession.id.in_(ids), *idle).values(abandoned_at=now)
+            ).rowcount
+            session.commit()
+        result["batches"] += 1
+        if len(ids) < batch_size:
+            break
+
+    if result["abandoned"]:
+        logger.info(f"🧹 Opuštěné test sessions: označeno {result['abandoned']} (nečinné déle než {ttl_minutes} min)")
+    return result
@@ -0,0 +1,427 @@
+"""
+Spaced-repetition plánování opakovacích hovorů (SM-2 s úpravami).
+
+Stav se drží pro každou dvojici uživatel × kategorie (`review_states`).
+Kvalita odpovědi 0-5 se počítá z průměrného skóre kategorie v test session,
+kategorie z `failed_categories` dostávají penalizaci. Interval roste
+s faktorem snadnosti (easiness), takže silní studenti jsou voláni méně často;
+první interval navazuje na původní pevné intervaly (3 / 7 / 14 dní).
+
+Termín se rozprostře náhodným jitterem intervalu a padne do povoleného
+volacího okna (pracovní dny, časová okna v lokálním čase), aby nevznikaly
+špičky hovorů ve stejnou chvíli. Všechny výpočty jsou vektorové (NumPy),
+jednotlivé hodnocení je jen dávka o velikosti 1 - stejný kód používá
+i hromadný přepočet `recompute_review_states`.
+"""
+
+import logging
+import os
+from datetime import datetime, time
+from typing import Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from sqlalchemy import func, select, update, delete, insert
+
+from app.database import SessionLocal
+from app.models import Attempt, ReviewState, TestSession
+from app.services.analytics_service import counted_session_filter, resolve_answer_category
+from app.services.session_archive import with_archived_payloads
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EASINESS = 2.5
+MIN_EASINESS = 1.3
+PASS_QUALITY = 3.0
+EASY_QUALITY = 4.75
+EASY_BONUS = 1.3
+MAX_INTERVAL_DAYS = 180.0
+FAILED_CATEGORY_PENALTY = 1.0
+# Termíny po splatnosti se při přepočtu rozprostřou do následujících dní, ne všechny hned
+OVERDUE_SPREAD_DAYS = 3.0
+# Kategorie pro hodnocení bez rozpadu na kategorie (jen celkové skóre pokusu)
+OVERALL_CATEGORY = "__celkem__"
+
+# Rozptyl termínu: ±15 % intervalu
+JITTER_FRACTION = float(os.getenv("REVIEW_JITTER_FRACTION", "0.15"))
+CALL_TIMEZONE = ZoneInfo(os.getenv("CALL_TIMEZONE", "Europe/Prague"))
+# Formát numpy weekmask - Po až Ne
+CALL_WEEKMASK = os.getenv("CALL_WEEKMASK", "1111100")
+CALL_WINDOWS = os.getenv("CALL_WINDOWS", "08:00-11:30,13:00-17:00")
+
+
+def parse_call_windows(spec: str) -> np.ndarray:
+    """'08:00-11:30,13:00-17:00' -> pole [[start_min, end_min], ...] seřazené podle začátku."""
+    windows = []
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        start, end = part.strip().split("-")
+        start_h, start_m = (int(x) for x in start.split(":"))
+        end_h, end_m = (int(x) for x in end.split(":"))
+        if end_h * 60 + end_m <= start_h * 60 + start_m:
+            raise ValueError(f"Neplatné volací okno: {part}")
+        windows.append((start_h * 60 + start_m, end_h * 60 + end_m))
+    if not windows:
+        raise ValueError("Není nastaveno žádné volací okno")
+    return np.array(sorted(windows), dtype=np.int64)
+
+
+_WINDOWS = parse_call_windows(CALL_WINDOWS)
+
+
+def score_to_quality(score) -> np.ndarray:
+    """Skóre 0-100 -> SM-2 kvalita 0-5."""
+    return np.clip(np.asarray(score, dtype=np.float64) / 20.0, 0.0, 5.0)
+
+
+def _first_interval(quality: np.ndarray) -> np.ndarray:
+    score = quality * 20.0
+    return np.select([score < 80, score < 90], [3.0, 7.0], 14.0)
+
+
+def sm2_step(easiness, interval, repetitions, lapses, quality) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Jeden krok SM-2 pro celé pole stavů najednou.
+    Vrací (easiness, interval_days, repetitions, lapses).
+    """
+    easiness = np.asarray(easiness, dtype=np.float64)
+    interval = np.asarray(interval, dtype=np.float64)
+    repetitions = np.asarray(repetitions, dtype=np.int64)
+    lapses = np.asarray(lapses, dtype=np.int64)
+    quality = np.asarray(quality, dtype=np.float64)
+
+    passed = quality >= PASS_QUALITY
+    first = repetitions == 0
+    grown = np.maximum(interval * easiness, interval + 1.0)
+    grown = np.where(quality >= EASY_QUALITY, grown * EASY_BONUS, grown)
+    new_interval = np.where(passed, np.where(first, _first_interval(quality), grown), 1.0)
+    new_interval = np.minimum(new_interval, MAX_INTERVAL_DAYS)
+
+    miss = 5.0 - quality
+    new_easiness = np.maximum(MIN_EASINESS, easiness + 0.1 - miss * (0.08 + miss * 0.02))
+    new_repetitions = np.where(passed, repetitions + 1, 0)
+    new_lapses = lapses + (~passed).astype(np.int64)
+    return new_easiness, new_interval, new_repetitions, new_lapses
+
+
+def _utc_offsets_minutes(days: np.ndarray) -> np.ndarray:
+    """Posun lokálního času volacích oken vůči UTC pro každý den (počítá se jen pro unikátní dny)."""
+    unique_days, inverse = np.unique(days, return_inverse=True)
+    offsets = np.array([
+        int(datetime.combine(day.astype(datetime), time(12), CALL_TIMEZONE).utcoffset().total_seconds() // 60)
+        for day in unique_days
+    ], dtype=np.int64)
+    return offsets[inverse]
+
+
+def spread_due_times(reviewed_at: np.ndarray, interval_days: np.ndarray, rng: Optional[np.random.Generator] = None,
+                     jitter: float = JITTER_FRACTION, windows: np.ndarray = _WINDOWS,
+                     weekmask: str = CALL_WEEKMASK) -> np.ndarray:
+    """
+    Termíny opakování (naivní UTC, datetime64[m]): interval s jitterem, posun na nejbližší
+    povolený den a náhodný čas uvnitř volacích oken.
+    """
+    rng = rng or np.random.default_rng()
+    reviewed_at = np.asarray(reviewed_at, dtype="datetime64[m]")
+    interval_days = np.asarray(interval_days, dtype=np.float64)
+
+    factor = 1.0 + rng.uniform(-jitter, jitter, size=interval_days.shape)
+    offset_minutes = np.maximum(interval_days * factor, 1.0) * 24 * 60
+    target = reviewed_at + offset_minutes.astype("timedelta64[m]")
+    days = np.busday_offset(target.astype("datetime64[D]"), 0, roll="forward", weekmask=weekmask)
+
+    lengths = windows[:, 1] - windows[:, 0]
+    ends = np.cumsum(lengths)
+    position = rng.uniform(0, ends[-1], size=days.shape)
+    window_index = np.searchsorted(ends, position, side="right")
+    window_index = np.minimum(window_index, len(windows) - 1)
+    local_minute = windows[window_index, 0] + (position - (ends[window_index] - lengths[window_index])).astype(np.int64)
+
+    local = days.astype("datetime64[m]") + local_minute.astype("timedelta64[m]")
+    return local - _utc_offsets_minutes(days).astype("timedelta64[m]")
+
+
+def _to_datetime(value: np.datetime64) -> datetime:
+    return value.astype("datetime64[s]").astype(datetime)
+
+
+def session_category_qualities(answers: Optional[list], failed_categories: Optional[list],
+                               questions_data: Optional[list] = None) -> Dict[str, float]:
+    """
+    Kvalita 0-5 pro každou kategorii test session (průměr skóre, penalizace za chybné kategorie).
+    Kategorie odpovědi se určuje stejně jako v rollupech (resolve_answer_category).
+    """
+    totals: Dict[str, List[float]] = {}
+    for answer in answers or []:
+        score = answer.get("score")
+        if score is None:
+            continue
+        bucket = totals.setdefault(resolve_answer_category(answer, questions_data), [0.0, 0])
+        bucket[0] += float(score)
+        bucket[1] += 1
+    failed = set(failed_categories or [])
+    qualities = {}
+    for category, (score_sum, count) in totals.items():
+        quality = float(score_to_quality(score_sum / count))
+        if category in failed:
+            quality = max(0.0, quality - FAILED_CATEGORY_PENALTY)
+        qualities[category] = quality
+    return qualities
+
+
+def record_review(session, user_id: int, qualities: Dict[str, float], reviewed_at: Optional[datetime] = None,
+                  rng: Optional[np.random.Generator] = None) -> Optional[datetime]:
+    """
+    Zapíše hodnocení kategorií uživatele (bez commitu) a vrátí nejbližší termín
+    opakování napříč všemi kategoriemi uživatele.
+    """
+    reviewed_at = reviewed_at or datetime.utcnow()
+    if not qualities:
+        return next_due_for_user(session, user_id, after=reviewed_at)
+    categories = list(qualities)
+    existing = {
+        state.category: state
+        for state in session.execute(
+            select(ReviewState).where(ReviewState.user_id == user_id, ReviewState.category.in_(categories))
+        ).scalars()
+    }
+    states = []
+    for category in categories:
+        state = existing.get(category)
+        if state is None:
+            state = ReviewState(user_id=user_id, category=category, easiness=DEFAULT_EASINESS,
+                                interval_days=0.0, repetitions=0, lapses=0)
+            session.add(state)
+        states.append(state)
+
+    easiness, interval, repetitions, lapses = sm2_step(
+        [state.easiness if state.easiness is not None else DEFAULT_EASINESS for state in states],
+        [state.interval_days or 0.0 for state in states],
+        [state.repetitions or 0 for state in states],
+        [state.lapses or 0 for state in states],
+        [qualities[category] for category in categories],
+    )
+    due = spread_due_times(np.full(len(states), np.datetime64(reviewed_at, "m")), interval, rng=rng)
+    for i, state in enumerate(states):
+        state.easiness = float(easiness[i])
+        state.interval_days = float(interval[i])
+        state.repetitions = int(repetitions[i])
+        state.lapses = int(lapses[i])
+        state.last_quality = float(qualities[categories[i]])
+        state.last_reviewed_at = reviewed_at
+        state.due_at = _to_datetime(due[i])
+        state.updated_at = datetime.utcnow()
+    session.flush()
+    return next_due_for_user(session, user_id, after=reviewed_at)
+
+
+def next_due_for_user(session, user_id: int, after: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    Nejbližší termín napříč kategoriemi uživatele. S `after` se ignorují kategorie,
+    které byly po splatnosti už při hodnocení (hovor je nepokryl) - jinak by se volalo každý den.
+    """
+    query = select(func.min(ReviewState.due_at)).where(ReviewState.user_id == user_id)
+    if after is not None:
+        query = query.where(ReviewState.due_at > after)
+    return session.scalar(query)
+
+
+def _unschedule_older_attempts(session, keep_attempt_ids: Dict[int, int]) -> int:
+    """
+    Zruší `next_due` všech pokusů uživatelů kromě `keep_attempt_ids[user_id]`,
+    aby dispatcher vytáčel jen jeden pokus na uživatele. Vrátí počet odplánovaných pokusů.
+    """
+    if not keep_attempt_ids:
+        return 0
+    return session.execute(
+        update(Attempt)
+        .where(Attempt.user_id.in_(list(keep_attempt_ids)), Attempt.next_due.isnot(None),
+               Attempt.id.notin_(list(keep_attempt_ids.values())))
+        .values(next_due=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def _schedule_attempt(session, attempt: Attempt, next_due: datetime) -> None:
+    attempt.next_due = next_due
+    _unschedule_older_attempts(session, {attempt.user_id: attempt.id})
+
+
+def record_session_review(session, test_session: TestSession, rng: Optional[np.random.Generator] = None) -> Optional[datetime]:
+    """Po dokončení test session aktualizuje stavy kategorií a přeplánuje navázaný pokus."""
+    qualities = session_category_qualities(test_session.answers, test_session.failed_categories,
+                                           test_session.questions_data)
+    next_due = record_review(session, test_session.user_id, qualities, test_session.completed_at, rng=rng)
+    if test_session.attempt_id and next_due:
+        attempt = session.get(Attempt, test_session.attempt_id)
+        if attempt:
+            _schedule_attempt(session, attempt, next_due)
+    return next_due
+
+
+def first_review_due(score: Optional[float], rng: Optional[np.random.Generator] = None) -> datetime:
+    """
+    Bezestavový termín prvního opakování podle skóre (náhrada pevných intervalů
+    v Attempt.calculate_next_due) - nic nezapisuje.
+    """
+    quality = score_to_quality(score if score is not None else 0.0)
+    _, interval, _, _ = sm2_step([DEFAULT_EASINESS], [0.0], [0], [0], [quality])
+    due = spread_due_times(np.array([np.datetime64(datetime.utcnow(), "m")]), interval, rng=rng)
+    return _to_datetime(due[0])
+
+
+def record_attempt_review(session, attempt: Attempt, rng: Optional[np.random.Generator] = None) -> datetime:
+    """
+    Zapíše celkové skóre dokončeného pokusu jako hodnocení celkové kategorie uživatele
+    (bez commitu), přeplánuje pokus a odplánuje starší pokusy téhož uživatele.
+    """
+    quality = float(score_to_quality(attempt.score if attempt.score is not None else 0.0))
+    next_due = record_review(session, attempt.user_id, {OVERALL_CATEGORY: quality}, rng=rng)
+    _schedule_attempt(session, attempt, next_due or first_review_due(attempt.score, rng=rng))
+    return attempt.next_due
+
+
+def provisional_due(now: Optional[datetime] = None, days: float = 1.0, rng: Optional[np.random.Generator] = None) -> datetime:
+    """Náhradní termín po vytočení, než hovor doběhne (výsledek hovoru ho přepíše)."""
+    now = now or datetime.utcnow()
+    due = spread_due_times(np.array([np.datetime64(now, "m")]), np.array([days]), rng=rng)
+    return _to_datetime(due[0])
+
+
+def _batch_reviews(rows: Iterable) -> Tuple[list, list, list, list]:
+    users, categories, times, qualities = [], [], [], []
+    for user_id, completed_at, answers, failed_categories, questions_data in rows:
+        for category, quality in session_category_qualities(answers, failed_categories, questions_data).items():
+            users.append(user_id)
+            categories.append(category)
+            times.append(np.datetime64(completed_at, "m"))
+            qualities.append(quality)
+    return users, categories, times, qualities
+
+
+def recompute_review_states(user_batch_size: int = 500, session_factory=SessionLocal,
+                            rng: Optional[np.random.Generator] = None,
+                            archive_session_factory=None) -> Dict[str, int]:
+    """
+    Přepočítá stavy všech uživatelů z historie dokončených test sessions (bez resetů adminem).
+
+    Uživatelé se zpracují po dávkách (jedna transakce na dávku). V dávce se k-tá
+    revize všech dvojic uživatel × kategorie spočítá jedním vektorovým krokem
+    SM-2, takže počet NumPy průchodů = maximální počet revizí jedné dvojice.
+    Navíc se posune `next_due` posledního naplánovaného pokusu každého uživatele
+    a starší pokusy se odplánují.
+    """
+    rng = rng or np.random.default_rng()
+    result = {"users": 0, "states": 0, "reviews": 0, "attempts": 0, "unscheduled": 0}
+    last_user_id = 0
+    while True:
+        session = session_factory()
+        try:
+            user_ids = session.execute(
+                select(TestSession.user_id)
+                .where(*counted_session_filter(), TestSession.user_id > last_user_id)
+                .group_by(TestSession.user_id)
+                .order_by(TestSession.user_id)
+                .limit(user_batch_size)
+            ).scalars().all()
+            if not user_ids:
+                break
+            last_user_id = user_ids[-1]
+
+            rows = session.execute(
+                select(TestSession.user_id, TestSession.completed_at, TestSession.answers, TestSession.failed_categories,
+                       TestSession.questions_data, TestSession.id, TestSession.archived_at)
+                .where(*counted_session_filter(), TestSession.completed_at.isnot(None),
+                       TestSession.user_id.in_(user_ids))
+                .execution_options(yield_per=1000)
+            )
+            rows = with_archived_payloads(rows, id_index=5, archived_index=6,
+                                          columns={2: "answers", 4: "questions_data"},
+                                          batch_size=1000, archive_session_factory=archive_session_factory)
+            users, categories, times, qualities = _batch_reviews(row[:5] for row in rows)
+            result["users"] += len(user_ids)
+            if not users:
+                continue
+
+            users = np.array(users, dtype=np.int64)
+            times = np.array(times, dtype="datetime64[m]")
+            qualities = np.array(qualities, dtype=np.float64)
+            pair_keys = list(zip(users.tolist(), categories))
+            unique_pairs = list(dict.fromkeys(pair_keys))
+            pair_index = {pair: i for i, pair in enumerate(unique_pairs)}
+            pairs = np.array([pair_index[pair] for pair in pair_keys], dtype=np.int64)
+
+            # Pořadí revize v rámci dvojice (chronologicky)
+            order = np.lexsort((times, pairs))
+            pairs, times, qualities = pairs[order], times[order], qualities[order]
+            starts = np.r_[0, np.flatnonzero(np.diff(pairs)) + 1]
+            rank = np.arange(len(pairs)) - np.repeat(starts, np.diff(np.r_[starts, len(pairs)]))
+
+            count = len(unique_pairs)
+            easiness = np.full(count, DEFAULT_EASINESS)
+            interval = np.zeros(count)
+            repetitions = np.zeros(count, dtype=np.int64)
+            lapses = np.zeros(count, dtype=np.int64)
+            last_quality = np.zeros(count)
+            last_review = np.zeros(count, dtype="datetime64[m]")
+            for r in range(int(rank.max()) + 1):
+                mask = rank == r
+                idx = pairs[mask]
+                easiness[idx], interval[idx], repetitions[idx], lapses[idx] = sm2_step(
+                    easiness[idx], interval[idx], repetitions[idx], lapses[idx], qualities[mask]
+                )
+                last_quality[idx] = qualities[mask]
+                last_review[idx] = times[mask]
+
+            due = spread_due_times(last_review, interval, rng=rng)
+            now = datetime.utcnow()
+            overdue = due < np.datetime64(now, "m")
+            if overdue.any():
+                due[overdue] = spread_due_times(
+                    np.full(int(overdue.sum()), np.datetime64(now, "m")),
+                    rng.uniform(1.0, OVERDUE_SPREAD_DAYS, size=int(overdue.sum())),
+                    rng=rng,
+                )
+            session.execute(delete(ReviewState).where(ReviewState.user_id.in_(user_ids)))
+            session.execute(insert(ReviewState), [
+                {
+                    "user_id": user_id, "category": category,
+                    "easiness": float(easiness[i]), "interval_days": float(interval[i]),
+                    "repetitions": int(repetitions[i]), "lapses": int(lapses[i]),
+                    "last_quality": float(last_quality[i]), "last_reviewed_at": _to_datetime(last_review[i]),
+                    "due_at": _to_datetime(due[i]), "updated_at": now,
+                }
+                for i, (user_id, category) in enumerate(unique_pairs)
+            ])
+
+            # Nejbližší termín každého uživatele -> poslední naplánovaný pokus
+            pair_users = np.array([user_id for user_id, _ in unique_pairs], dtype=np.int64)
+            by_user = np.argsort(pair_users, kind="stable")
+            user_starts = np.r_[0, np.flatnonzero(np.diff(pair_users[by_user])) + 1]
+            user_due = np.minimum.reduceat(due[by_user].astype(np.int64), user_starts).astype("datetime64[m]")
+            due_by_user = dict(zip(pair_users[by_user][user_starts].tolist(), user_due))
+            latest_attempts = session.execute(
+                select(Attempt.user_id, func.max(Attempt.id))
+                .where(Attempt.user_id.in_(list(due_by_user)), Attempt.next_due.isnot(None))
+                .group_by(Attempt.user_id)
+            ).all()
+            if latest_attempts:
+                session.execute(update(Attempt), [
+                    {"id": attempt_id, "next_due": _to_datetime(due_by_user[user_id])}
+                    for user_id, attempt_id in latest_attempts
+                ])
+            unscheduled = _unschedule_older_attempts(session, dict(latest_attempts))
+            session.commit()
+
+            result["states"] += count
+            result["reviews"] += len(pairs)
+            result["attempts"] += len(latest_attempts)
+            result["unscheduled"] += unscheduled
+            logger.info(f"🧠 Přepočteno {len(user_ids)} uživatelů ({count} stavů, {len(pairs)} revizí)")
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+    return result
@@ -125,8 +125,11 @@ class TwilioService:
                 self._openai_service = None
         return self._openai_service
 
-    def call(self, to_number: str, webhook_url: str) -> None:
-        """Zavolá na zadané číslo a přehraje TwiML z webhooku."""
+    def call(self, to_number: str, webhook_url: str, status_callback: Optional[str] = None) -> Optional[str]:
+        """
+        Zavolá na zadané číslo a přehraje TwiML z webhooku. Vrací Call SID.
+        Se `status_callback` posílá Twilio změny stavu hovoru (ringing, completed, busy, no-answer...).
+        """
         if not self.enabled:
             logger.warning("Twilio služba není povolena - volání nebude provedeno")
             return
@@ -143,10 +146,19 @@ class TwilioService:
             if not webhook_url.startswith('http'):
                 raise ValueError("Webhook URL musí začínat na 'http'")
             
+            callback_params = {}
+            if status_callback:
+                callback_params = {
+                    "status_callback": status_callback,
+                    "status_callback_method": "POST",
+                    "status_callback_event": ["initiated", "ringing", "answered", "completed"],
+                }
+            
             call = self.client.calls.create(
                 to=to_number,
                 from_=self.phone_number,
-                url=webhook_url
+                url=webhook_url,
+                **callback_params
             )
             logger.info(f"Volání bylo úspěšně zahájeno: {call.sid}")
             return call.sid
@@ -173,7 +185,7 @@ class TwilioService:
                 chat_response = "Omlouvám se, služba pro generování odpovědí není momentálně dostupná. Zkuste to prosím později."
             else:
             # Získání odpovědi od ChatGPT
-                response = openai_svc.client.chat.completions.create(
+                response = openai_svc.client.with_caller("twilio_chat").chat.completions.create(
                 model="gpt-4.1-mini",
                 messages=[
                     {
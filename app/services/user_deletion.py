@@ -0,0 +1,221 @@
+"""
+Mazání uživatele včetně celé historie na pozadí.
+
+Závislé řádky se mažou po omezených dávkách (odpovědi, archiv i test sessions, odznaky,
+pokusy a nakonec samotný uživatel), každá dávka ve vlastní krátké transakci
+spolu s aktualizací průběhu v `user_deletion_jobs`. Po pádu workeru lze job
+kdykoli obnovit - pokračuje od fáze a stavu uloženého v databázi.
+"""
+
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.orm.attributes import flag_modified
+
+from app.database import SessionLocal
+from app.models import Answer, Attempt, CampaignCall, ReviewState, TestSession, User, UserBadge, UserDeletionJob
+from app.services.session_archive import delete_archived_sessions
+
+logger = logging.getLogger(__name__)
+
+DELETION_BATCH_SIZE = int(os.getenv("USER_DELETION_BATCH_SIZE", "500"))
+# Job, jehož worker se tak dlouho neozval, se považuje za spadlý a může ho převzít jiný
+STALE_JOB_AFTER = timedelta(seconds=int(os.getenv("USER_DELETION_STALE_SECONDS", "120")))
+ACTIVE_STATUSES = ("pending", "running")
+
+
+def _delete_answers(session, user_id: int, batch_size: int) -> int:
+    attempt_ids = select(Attempt.id).where(Attempt.user_id == user_id)
+    ids = session.execute(
+        select(Answer.id).where(Answer.attempt_id.in_(attempt_ids)).limit(batch_size)
+    ).scalars().all()
+    if ids:
+        session.execute(delete(Answer).where(Answer.id.in_(ids)))
+    return len(ids)
+
+
+def _delete_by_user(model) -> Callable:
+    def delete_batch(session, user_id: int, batch_size: int) -> int:
+        ids = session.execute(
+            select(model.id).where(model.user_id == user_id).limit(batch_size)
+        ).scalars().all()
+        if ids:
+            session.execute(delete(model).where(model.id.in_(ids)))
+        return len(ids)
+    return delete_batch
+
+
+def _delete_user(session, user_id: int, batch_size: int) -> int:
+    return session.execute(delete(User).where(User.id == user_id)).rowcount
+
+
+# Pořadí respektuje cizí klíče: answers, test_sessions a campaign_calls -> attempts
+DELETION_PHASES: List[Tuple[str, Callable]] = [
+    ("answers", _delete_answers),
+    ("archived_sessions", delete_archived_sessions),
+    ("test_sessions", _delete_by_user(TestSession)),
+    ("campaign_calls", _delete_by_user(CampaignCall)),
+    ("review_states", _delete_by_user(ReviewState)),
+    ("user_badges", _delete_by_user(UserBadge)),
+    ("attempts", _delete_by_user(Attempt)),
+    ("user", _delete_user),
+]
+PHASE_NAMES = [name for name, _ in DELETION_PHASES]
+
+
+def job_to_dict(job: UserDeletionJob) -> Dict:
+    return {
+        "id": job.id,
+        "user_id": job.user_id,
+        "user_name": job.user_name,
+        "status": job.status,
+        "phase": job.phase,
+        "deleted_counts": job.deleted_counts or {},
+        "error": job.error,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+        "completed_at": job.completed_at,
+    }
+
+
+def create_deletion_job(user_id: int, session_factory=SessionLocal) -> Dict:
+    """Založí job pro uživatele, nebo vrátí už běžící job stejného uživatele."""
+    session = session_factory()
+    try:
+        job = session.query(UserDeletionJob).filter(
+            UserDeletionJob.user_id == user_id,
+            UserDeletionJob.status.in_(ACTIVE_STATUSES)
+        ).first()
+        if not job:
+            user = session.get(User, user_id)
+            job = UserDeletionJob(
+                user_id=user_id,
+                user_name=user.name if user else None,
+                status="pending",
+                phase=PHASE_NAMES[0],
+                deleted_counts={},
+            )
+            session.add(job)
+            session.commit()
+            logger.info(f"🗑️ Založen job {job.id} pro smazání uživatele {user_id}")
+        return job_to_dict(job)
+    finally:
+        session.close()
+
+
+def _claim_job(session, job_id: int) -> bool:
+    """Atomicky převezme job - uspěje jen pro čekající nebo spadlý (bez heartbeatu) job."""
+    now = datetime.utcnow()
+    result = session.execute(
+        update(UserDeletionJob)
+        .where(
+            UserDeletionJob.id == job_id,
+            or_(
+                UserDeletionJob.status == "pending",
+                (UserDeletionJob.status == "running") & (UserDeletionJob.updated_at < now - STALE_JOB_AFTER),
+            ),
+        )
+        .values(status="running", updated_at=now)
+    )
+    session.commit()
+    return result.rowcount == 1
+
+
+def run_deletion_job(job_id: int, batch_size: int = DELETION_BATCH_SIZE, session_factory=SessionLocal) -> Optional[Dict]:
+    """
+    Provede (nebo obnoví) job. Každá dávka = jedna krátká transakce, která smaže
+    nejvýše `batch_size` řádků a zároveň uloží průběh a heartbeat jobu.
+    """
+    session = session_factory()
+    try:
+        if not _claim_job(session, job_id):
+            logger.info(f"🗑️ Job {job_id} už zpracovává jiný worker nebo je dokončen")
+            return None
+
+        job = session.get(UserDeletionJob, job_id)
+        start_index = PHASE_NAMES.index(job.phase) if job.phase in PHASE_NAMES else 0
+        for phase_name, delete_batch in DELETION_PHASES[start_index:]:
+            job.phase = phase_name
+            while True:
+                deleted = delete_batch(session, job.user_id, batch_size)
+                counts = dict(job.deleted_counts or {})
+                counts[phase_name] = counts.get(phase_name, 0) + deleted
+                job.deleted_counts = counts
+                flag_modified(job, "deleted_counts")
+                job.updated_at = datetime.utcnow()
+                session.commit()
+                if deleted < batch_size or phase_name == "user":
+                    break
+            logger.info(f"🗑️ Job {job_id}: fáze '{phase_name}' hotová ({job.deleted_counts.get(phase_name, 0)} řádků)")
+
+        job.phase = "done"
+        job.status = "completed"
+        job.completed_at = datetime.utcnow()
+        job.updated_at = job.completed_at
+        session.commit()
+        logger.info(f"✅ Uživatel {job.user_id} smazán jobem {job_id}: {job.deleted_counts}")
+        return job_to_dict(job)
+
+    except Exception as e:
+        session.rollback()
+        logger.error(f"❌ Chyba v jobu mazání {job_id}: {e}")
+        job = session.get(UserDeletionJob, job_id)
+        if job:
+            job.status = "failed"
+            job.error = str(e)
+            job.updated_at = datetime.utcnow()
+            session.commit()
+        return None
+    finally:
+        session.close()
+
+
+def start_deletion_job_in_background(job_id: int) -> threading.Thread:
+    """Spustí job ve vlákně na pozadí - HTTP request na něj nečeká."""
+    thread = threading.Thread(target=run_deletion_job, args=(job_id,), name=f"user-deletion-{job_id}", daemon=True)
+    thread.start()
+    return thread
+
+
+def get_deletion_job(job_id: int, session_factory=SessionLocal) -> Optional[Dict]:
+    session = session_factory()
+    try:
+        job = session.get(UserDeletionJob, job_id)
+        return job_to_dict(job) if job else None
+    finally:
+        session.close()
+
+
+def resume_stale_deletion_jobs(session_factory=SessionLocal) -> List[int]:
+    """Najde čekající a spadlé joby (např. po restartu) a znovu je spustí na pozadí."""
+    session = session_factory()
+    try:
+        now = datetime.utcnow()
+        job_ids = session.execute(
+            select(UserDeletionJob.id).where(
+                or_(
+                    UserDeletionJob.status == "pending",
+                    (UserDeletionJob.status == "running") & (UserDeletionJob.updated_at < now - STALE_JOB_AFTER),
+                    UserDeletionJob.status == "failed",
+                )
+            )
+        ).scalars().all()
+        # Selhané joby se před obnovou vrátí do fronty
+        if job_ids:
+            session.execute(
+                update(UserDeletionJob)
+                .where(UserDeletionJob.id.in_(job_ids), UserDeletionJob.status == "failed")
+                .values(status="pending", error=None)
+            )
+            session.commit()
+    finally:
+        session.close()
+
+    for job_id in job_ids:
+        logger.info(f"🔁 Obnovuji job mazání {job_id}")
+        start_deletion_job_in_background(job_id)
+    return job_ids
@@ -0,0 +1,155 @@
+"""
+Hromadný import uživatelů z CSV.
+
+CSV se čte průběžně (řádek po řádku), telefony se normalizují na E.164,
+duplicity se hledají v souboru i v databázi (unikátní `users.phone_normalized`)
+a nové řádky se vkládají po dávkách - jedna transakce na dávku. Vkládá se
+s ON CONFLICT DO NOTHING, takže ani souběžný import duplicitu nevytvoří.
+Výsledkem je report s chybou pro každý odmítnutý řádek.
+"""
+
+import csv
+import logging
+from typing import Dict, Iterable, List
+
+from sqlalchemy import select
+
+from app.database import SessionLocal, dialect_insert
+from app.models import User
+from app.phone import format_phone_number_e164, is_valid_e164
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = 500
+SUPPORTED_LANGUAGES = ("cs", "en")
+
+# České hlavičky z personálních exportů
+HEADER_ALIASES = {
+    "jméno": "name", "jmeno": "name",
+    "telefon": "phone", "tel": "phone",
+    "jazyk": "language",
+    "poznámka": "detail", "poznamka": "detail",
+}
+
+
+def _normalize_header(name: str) -> str:
+    key = (name or "").strip().lower()
+    return HEADER_ALIASES.get(key, key)
+
+
+def _parse_row(raw: Dict[str, str]) -> Dict[str, str]:
+    """Zvaliduje řádek; při chybě vyhodí ValueError s popisem pro report."""
+    name = (raw.get("name") or "").strip()
+    phone_raw = (raw.get("phone") or "").strip()
+    language = (raw.get("language") or "cs").strip().lower() or "cs"
+    detail = (raw.get("detail") or "").strip() or None
+
+    if not name:
+        raise ValueError("Jméno je povinné")
+    if len(name) > 100:
+        raise ValueError("Jméno je delší než 100 znaků")
+    if not phone_raw:
+        raise ValueError("Telefon je povinný")
+    phone = format_phone_number_e164(phone_raw)
+    if not is_valid_e164(phone):
+        raise ValueError(f"Neplatné telefonní číslo: {phone_raw}")
+    if language not in SUPPORTED_LANGUAGES:
+        raise ValueError(f"Neplatný jazyk: {language}")
+
+    return {"name": name, "phone": phone, "language": language, "detail": detail}
+
+
+def _report_duplicate(report: Dict, row: Dict) -> None:
+    report["duplicates"] += 1
+    report["errors"].append({"row": row["row"], "phone": row["phone"], "error": "Uživatel s tímto telefonem už existuje"})
+
+
+def _flush_batch(batch: List[Dict], report: Dict, dry_run: bool, session_factory) -> None:
+    """Vyřadí telefony, které už v DB jsou, a zbytek vloží jednou transakcí."""
+    if not batch:
+        return
+    session = session_factory()
+    try:
+        existing = set(session.execute(
+            select(User.phone_normalized).where(User.phone_normalized.in_([row["phone"] for row in batch]))
+        ).scalars())
+
+        new_rows = []
+        for row in batch:
+            if row["phone"] in existing:
+                _report_duplicate(report, row)
+            else:
+                new_rows.append(row)
+
+        if new_rows and not dry_run:
+            insert = dialect_insert(session.get_bind())
+            stmt = insert(User).values([
+                {"name": row["name"], "phone": row["phone"], "phone_normalized": row["phone"],
+                 "language": row["language"], "detail": row["detail"], "current_lesson_level": 0}
+                for row in new_rows
+            ]).on_conflict_do_nothing(index_elements=[User.phone_normalized]).returning(User.phone_normalized)
+            inserted = set(session.execute(stmt).scalars())
+            session.commit()
+            # Co mezitím vložil souběžný import, přeskočil ON CONFLICT - hlásí se jako duplicita
+            for row in new_rows:
+                if row["phone"] not in inserted:
+                    _report_duplicate(report, row)
+            new_rows = [row for row in new_rows if row["phone"] in inserted]
+        report["created"] += len(new_rows)
+    except Exception as e:
+        session.rollback()
+        logger.error(f"❌ Import dávky selhal: {e}")
+        for row in batch:
+            report["errors"].append({"row": row["row"], "phone": row["phone"], "error": f"Dávka selhala: {e}"})
+    finally:
+        session.close()
+    batch.clear()
+
+
+def import_users_csv(lines: Iterable[str], batch_size: int = IMPORT_BATCH_SIZE, dry_run: bool = False,
+                     session_factory=SessionLocal) -> Dict:
+    """
+    Importuje uživatele z CSV (sloupce name, phone, volitelně language, detail).
+
+    `lines` může být otevřený textový soubor nebo jiný iterátor řádků - celé CSV
+    se nikdy nenačítá do paměti. Čísla řádků v reportu odpovídají řádkům souboru
+    (hlavička = řádek 1).
+    """
+    batch_size = max(1, batch_size)
+    report = {"total_rows": 0, "created": 0, "duplicates": 0, "invalid": 0, "dry_run": dry_run, "errors": []}
+
+    reader = csv.DictReader(lines)
+    if reader.fieldnames is None:
+        report["errors"].append({"row": 1, "error": "Prázdný soubor"})
+        return report
+    reader.fieldnames = [_normalize_header(name) for name in reader.fieldnames]
+    missing = {"name", "phone"} - set(reader.fieldnames)
+    if missing:
+        report["errors"].append({"row": 1, "error": f"Chybí sloupce: {', '.join(sorted(missing))}"})
+        return report
+
+    seen_phones = set()
+    batch: List[Dict] = []
+    for raw in reader:
+        report["total_rows"] += 1
+        row_number = reader.line_num
+        try:
+            row = _parse_row(raw)
+        except ValueError as e:
+            report["invalid"] += 1
+            report["errors"].append({"row": row_number, "error": str(e)})
+            continue
+        if row["phone"] in seen_phones:
+            report["duplicates"] += 1
+            report["errors"].append({"row": row_number, "phone": row["phone"], "error": "Duplicitní telefon v souboru"})
+            continue
+        seen_phones.add(row["phone"])
+        row["row"] = row_number
+        batch.append(row)
+        if len(batch) >= batch_size:
+            _flush_batch(batch, report, dry_run, session_factory)
+    _flush_batch(batch, report, dry_run, session_factory)
+
+    logger.info(f"📥 Import uživatelů: {report['created']} vytvořeno, {report['duplicates']} duplicit, "
+                f"{report['invalid']} neplatných z {report['total_rows']} řádků")
+    return report
@@ -0,0 +1,315 @@
+"""
+Lehké span tracování hlasové cesty (jedno kolo hovoru = jeden strom spanů).
+
+`span(name, **attributes)` je context manager (sync i async kód), `traced(name)`
+dekorátor funkcí. Aktuální span se drží v contextvars, takže vnořené volání
+(handle_entry_test -> save_answer_and_advance -> OpenAI) se zapojí pod rodiče
+bez předávání parametrů. `set_call_sid` připojí kolo k hovoru: trace_id se
+odvodí z CallSid, všechna kola jednoho hovoru tak v kolektoru tvoří jeden trace.
+
+Dokončená kola hovoru (root span SPAN_KIND_SERVER nebo kolo s CallSid) se drží v paměti (admin stránka /admin/calls/latency) a volitelně
+exportují ve formátu OTLP JSON - do souboru (TRACE_EXPORT_FILE, JSON na řádek)
+nebo na OTLP/HTTP kolektor (TRACE_EXPORT_ENDPOINT, např. http://collector:4318/v1/traces).
+Export běží ve vlákně na pozadí, request na něj nečeká.
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+import urllib.request
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "500"))
+TRACE_EXPORT_FILE = os.getenv("TRACE_EXPORT_FILE")
+TRACE_EXPORT_ENDPOINT = os.getenv("TRACE_EXPORT_ENDPOINT")
+TRACE_EXPORT_QUEUE_SIZE = int(os.getenv("TRACE_EXPORT_QUEUE_SIZE", "1000"))
+SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "lecture-app")
+
+CALL_SID_ATTRIBUTE = "twilio.call_sid"
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+SPAN_KIND_INTERNAL, SPAN_KIND_SERVER, SPAN_KIND_CLIENT = 1, 2, 3
+
+
+class Trace:
+    """Spany jednoho kola (jednoho webhooku); trace_id je z CallSid, jakmile je znám."""
+
+    __slots__ = ("trace_id", "call_sid", "spans")
+
+    def __init__(self):
+        self.trace_id = secrets.token_hex(16)
+        self.call_sid: Optional[str] = None
+        self.spans: List["Span"] = []
+
+    def set_call_sid(self, call_sid: str) -> None:
+        self.call_sid = call_sid
+        self.trace_id = hashlib.sha256(call_sid.encode("utf-8")).hexdigest()[:32]
+
+    @property
+    def root(self) -> "Span":
+        return next(span for span in self.spans if span.parent_id is None)
+
+
+class Span:
+    __slots__ = ("trace", "name", "span_id", "parent_id", "kind", "attributes", "start_ns", "end_ns",
+                 "status", "status_message")
+
+    def __init__(self, trace: Trace, name: str, parent_id: Optional[str], kind: int, attributes: Dict):
+        self.trace = trace
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = STATUS_UNSET
+        self.status_message = ""
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(error).__name__}: {error}"
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+_recent: deque = deque(maxlen=TRACE_BUFFER_SIZE)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def set_call_sid(call_sid: Optional[str]) -> None:
+    """Přiřadí aktuální kolo k hovoru (CallSid z Twilio formuláře)."""
+    span = _current_span.get()
+    if span is not None and call_sid:
+        span.trace.set_call_sid(call_sid)
+        span.set_attribute(CALL_SID_ATTRIBUTE, call_sid)
+
+
+@contextmanager
+def span(name: str, kind: int = SPAN_KIND_INTERNAL, **attributes):
+    """Změří blok jako span; bez rodiče založí nové kolo (root span)."""
+    parent = _current_span.get()
+    trace = parent.trace if parent is not None else Trace()
+    current = Span(trace, name, parent.span_id if parent is not None else None, kind, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.record_error(exc)
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+        trace.spans.append(current)
+        if parent is None:
+            _finish_trace(trace)
+
+
+def traced(name: str, kind: int = SPAN_KIND_INTERNAL):
+    """Dekorátor: celé volání funkce (sync i async) jako span."""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, kind):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, kind):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# === Export ===
+
+def _attribute_value(value) -> Dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(traces: List[Trace]) -> Dict:
+    """Kola jako OTLP JSON (ExportTraceServiceRequest) - formát kolektoru OpenTelemetry."""
+    spans = []
+    for trace in traces:
+        for item in trace.spans:
+            attributes = dict(item.attributes)
+            if trace.call_sid:
+                attributes.setdefault(CALL_SID_ATTRIBUTE, trace.call_sid)
+            otlp_span = {
+                "traceId": trace.trace_id,
+                "spanId": item.span_id,
+                "name": item.name,
+                "kind": item.kind,
+                "startTimeUnixNano": str(item.start_ns),
+                "endTimeUnixNano": str(item.end_ns),
+                "attributes": [{"key": key, "value": _attribute_value(value)} for key, value in attributes.items()],
+                "status": {"code": item.status, **({"message": item.status_message} if item.status_message else {})},
+            }
+            if item.parent_id:
+                otlp_span["parentSpanId"] = item.parent_id
+            spans.append(otlp_span)
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+        "scopeSpans": [{"scope": {"name": "app.tracing"}, "spans": spans}],
+    }]}
+
+
+class TraceExporter:
+    """Exportuje dokončená kola na pozadí; při plné frontě kolo zahodí (request nikdy nečeká)."""
+
+    def __init__(self, file_path: Optional[str] = TRACE_EXPORT_FILE, endpoint: Optional[str] = TRACE_EXPORT_ENDPOINT,
+                 queue_size: int = TRACE_EXPORT_QUEUE_SIZE):
+        self.file_path = file_path
+        self.endpoint = endpoint
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.file_path or self.endpoint)
+
+    def submit(self, trace: Trace) -> None:
+        if not self.enabled:
+            return
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+
+    def export(self, traces: List[Trace]) -> None:
+        payload = json.dumps(to_otlp(traces), ensure_ascii=False)
+        if self.file_path:
+            with open(self.file_path, "a", encoding="utf-8") as handle:
+                handle.write(payload + "\n")
+        if self.endpoint:
+            request = urllib.request.Request(self.endpoint, data=payload.encode("utf-8"),
+                                             headers={"Content-Type": "application/json"}, method="POST")
+            urllib.request.urlopen(request, timeout=5).close()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < 50:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.export(batch)
+            except Exception as e:
+                logger.warning(f"⚠️ Export traců selhal ({len(batch)} kol): {e}")
+
+
+exporter = TraceExporter()
+
+
+def _is_call_turn(trace: Trace) -> bool:
+    """Kolo hovoru = root je serverový span webhooku, nebo je kolo přiřazené k CallSid."""
+    return trace.call_sid is not None or trace.root.kind == SPAN_KIND_SERVER
+
+
+def _finish_trace(trace: Trace) -> None:
+    # Samostatné spany mimo hovor (např. OpenAI volání z admin přepočtu) by zaplnily buffer
+    # i kolektor a v /admin/calls/latency by se tvářily jako hovory bez CallSid
+    if not _is_call_turn(trace):
+        return
+    _recent.append(trace)
+    exporter.submit(trace)
+
+
+# === Souhrn pro admin ===
+
+def recent_traces(call_sid: Optional[str] = None) -> List[Trace]:
+    traces = list(_recent)
+    if call_sid:
+        traces = [trace for trace in traces if trace.call_sid == call_sid]
+    return traces
+
+
+def _stage_times(trace: Trace) -> Dict[str, float]:
+    """Čas kola po fázích; vlastní čas root spanu (parsování formuláře, TwiML) jako samostatná fáze."""
+    stages: Dict[str, float] = {}
+    child_time: Dict[str, float] = {}
+    for item in trace.spans:
+        if item.parent_id:
+            child_time[item.parent_id] = child_time.get(item.parent_id, 0.0) + item.duration_ms
+    for item in trace.spans:
+        self_time = max(item.duration_ms - child_time.get(item.span_id, 0.0), 0.0)
+        stages[item.name] = stages.get(item.name, 0.0) + self_time
+    return stages
+
+
+def call_latency_summary(limit: int = 50) -> List[Dict]:
+    """Poslední hovory (podle CallSid) s rozpadem latence kol na fáze (vlastní čas spanů, ms)."""
+    calls: Dict[str, Dict] = {}
+    for trace in recent_traces():
+        key = trace.call_sid or f"bez CallSid ({trace.trace_id[:8]})"
+        root = trace.root
+        call = calls.setdefault(key, {"call_sid": key, "turns": 0, "total_ms": 0.0, "max_turn_ms": 0.0,
+                                      "errors": 0, "last_seen": root.end_ns, "stages": {}})
+        call["turns"] += 1
+        call["total_ms"] += root.duration_ms
+        call["max_turn_ms"] = max(call["max_turn_ms"], root.duration_ms)
+        call["errors"] += sum(1 for item in trace.spans if item.status == STATUS_ERROR)
+        call["last_seen"] = max(call["last_seen"], root.end_ns)
+        for name, duration in _stage_times(trace).items():
+            call["stages"][name] = call["stages"].get(name, 0.0) + duration
+    result = sorted(calls.values(), key=lambda call: call["last_seen"], reverse=True)[:limit]
+    for call in result:
+        call["avg_turn_ms"] = call["total_ms"] / call["turns"]
+        call["stages"] = dict(sorted(call["stages"].items(), key=lambda item: item[1], reverse=True))
+    return result
+
+
+def trace_tree(trace: Trace) -> List[Dict]:
+    """Spany kola v pořadí stromu (rodič před potomky) s hloubkou a odsazením od začátku kola."""
+    children: Dict[Optional[str], List[Span]] = {}
+    for item in trace.spans:
+        children.setdefault(item.parent_id, []).append(item)
+    root = trace.root
+    rows = []
+
+    def walk(item: Span, depth: int):
+        rows.append({"name": item.name, "depth": depth, "duration_ms": item.duration_ms,
+                     "offset_ms": (item.start_ns - root.start_ns) / 1e6, "status": item.status,
+                     "status_message": item.status_message, "attributes": item.attributes})
+        for child in sorted(children.get(item.span_id, []), key=lambda child: child.start_ns):
+            walk(child, depth + 1)
+
+    walk(root, 0)
+    return rows
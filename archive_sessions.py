@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Skript pro archivaci dokončených test sessions starších než N dní.
+
+Otázky a odpovědi se přesunou do test_session_archive (Postgres: měsíční
+partition, SQLite: samostatný soubor), v test_sessions zůstane souhrn.
+Lze kdykoli přerušit a znovu spustit - pokračuje nearchivovanými sessions.
+
+Použití:
+    python archive_sessions.py [--older-than-days 90] [--batch-size 500] [--max-batches N]
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.session_archive import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, archive_completed_sessions
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archivace dokončených test sessions")
+    parser.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS, help="Archivovat sessions dokončené před více než N dny")
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE, help="Počet sessions v jedné dávce (transakci)")
+    parser.add_argument("--max-batches", type=int, help="Zpracovat nejvýš N dávek a skončit")
+    args = parser.parse_args()
+
+    print(f"🗄️ Archivuji sessions dokončené před více než {args.older_than_days} dny...")
+    result = archive_completed_sessions(older_than_days=args.older_than_days, batch_size=args.batch_size,
+                                        max_batches=args.max_batches)
+
+    print(f"✅ Hotovo: archivováno {result['sessions']} sessions v {result['batches']} dávkách")
+    for name in result["partitions"]:
+        print(f"  • nová partition {name}")
+
+
+if __name__ == "__main__":
+    main()
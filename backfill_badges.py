@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Skript pro zpětné udělení odznaků za historické (dokončené) sessions.
+
+Pokračuje od posledního checkpointu (job_checkpoints), takže ho lze kdykoli
+přerušit a znovu spustit. Po přidání nového odznaku spusťte s --restart.
+
+Použití:
+    python backfill_badges.py [--batch-size 5000] [--chunk-size 50000] [--restart] [--max-chunks N]
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.badge_backfill import BACKFILL_BATCH_SIZE, BACKFILL_CHUNK_SIZE, backfill_badges
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Zpětné udělení odznaků za historické sessions")
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE, help="Počet řádků načtených z kurzoru najednou")
+    parser.add_argument("--chunk-size", type=int, default=BACKFILL_CHUNK_SIZE, help="Počet sessions mezi checkpointy (jedna transakce)")
+    parser.add_argument("--restart", action="store_true", help="Začít od první session místo posledního checkpointu")
+    parser.add_argument("--max-chunks", type=int, help="Zpracovat nejvýš N bloků a skončit")
+    args = parser.parse_args()
+
+    print("🏅 Spouštím backfill odznaků...")
+    result = backfill_badges(batch_size=args.batch_size, chunk_size=args.chunk_size,
+                             restart=args.restart, max_chunks=args.max_chunks)
+
+    print(f"✅ Hotovo: {result['processed']} sessions za {result['seconds']} s, "
+          f"uděleno {result['awarded']} odznaků (checkpoint id {result['last_id']})")
+    for name, count in sorted(result["by_badge"].items()):
+        print(f"  • {name}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,150 +6,106 @@ Systém odznaků a gamifikace pro hlasového asistenta
 
 from datetime import datetime
 from typing import List, Dict, Optional
-from app.database import SessionLocal
+from sqlalchemy import select
+from app.database import SessionLocal, dialect_insert
 from app.models import Badge, UserBadge, User, TestSession
+from app.services.badge_rules import LEGACY_CATEGORY_RULES, LEGACY_NAME_RULES, badge_rule_cache, evaluate_badges
 import logging
 
 logger = logging.getLogger(__name__)
 
 class BadgeSystem:
-    """Správa odznaků a gamifikace."""
-    
-    def __init__(self):
-        self.session = SessionLocal()
+    """
+    Správa odznaků a gamifikace.
+
+    Každá operace si otevře vlastní session z `session_factory` a na konci ji
+    zavře, takže instance nedrží spojení z poolu mezi voláními.
+    """
     
-    def __del__(self):
-        if hasattr(self, 'session'):
-            self.session.close()
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
     
     def check_and_award_badges(self, user_id: int, test_session: dict) -> List[Dict]:
         """
         Zkontroluje a udělí odznaky na základě výkonu uživatele.
         Vrací seznam nově udělených odznaků.
+
+        Pravidla odznaků jsou zkompilovaná a cachovaná (`badge_rule_cache`), odpovědi
+        session se projdou jen jednou a nové odznaky se vloží jedním INSERTem.
         """
-        awarded_badges = []
-        
-        try:
-            user = self.session.query(User).get(user_id)
-            if not user:
-                return awarded_badges
-            
-            # Získej všechny dostupné odznaky
-            all_badges = self.session.query(Badge).all()
-            
-            # Získej už udělené odznaky pro tohoto uživatele
-            existing_badges = {ub.badge_id for ub in user.badges}
-            
-            for badge in all_badges:
-                if badge.id in existing_badges:
-                    continue  # Odznak už má
-                
-                if self._meets_badge_criteria(badge, user_id, test_session):
-                    # Uděl odznak
-                    user_badge = UserBadge(
-                        user_id=user_id,
-                        badge_id=badge.id,
-                        awarded_at=datetime.utcnow()
-                    )
-                    self.session.add(user_badge)
-                    
-                    awarded_badges.append({
-                        'name': badge.name,
-                        'description': badge.description,
-                        'category': badge.category,
-                        'icon_svg': badge.icon_svg
-                    })
-                    
+        with self.session_factory() as session:
+            try:
+                if session.get(User, user_id) is None:
+                    return []
+
+                badges = badge_rule_cache.get(session)
+                existing_ids = set(session.execute(
+                    select(UserBadge.badge_id).where(UserBadge.user_id == user_id)
+                ).scalars())
+
+                earned = evaluate_badges(badges, test_session.get('answers'), test_session.get('current_score'),
+                                         exclude_ids=existing_ids)
+                if not earned:
+                    return []
+
+                awarded_at = datetime.utcnow()
+                # Unikátní index (user_id, badge_id) - souběžné udělení téhož odznaku se tiše přeskočí
+                # a RETURNING vrátí jen skutečně vložené odznaky
+                insert = dialect_insert(session.get_bind())
+                stmt = insert(UserBadge).values([
+                    {'user_id': user_id, 'badge_id': badge.id, 'awarded_at': awarded_at} for badge in earned
+                ]).on_conflict_do_nothing().returning(UserBadge.badge_id)
+                inserted_ids = set(session.execute(stmt).scalars())
+                session.commit()
+
+                awarded = [badge for badge in earned if badge.id in inserted_ids]
+                for badge in awarded:
                     logger.info(f"🏅 Udělen odznak '{badge.name}' uživateli {user_id}")
-            
-            self.session.commit()
-            return awarded_badges
-            
-        except Exception as e:
-            logger.error(f"❌ Chyba při udělování odznaků: {e}")
-            self.session.rollback()
-            return []
-    
-    def _meets_badge_criteria(self, badge: Badge, user_id: int, test_session: dict) -> bool:
-        """Zkontroluje, zda uživatel splňuje kritéria pro daný odznak."""
-        
-        category = badge.category
-        answers = test_session.get('answers', [])
-        
-        if category == "Filtrace a Čištění":
-            return self._check_category_mastery(answers, "Filtrace a Čištění", min_score=85, min_questions=2)
-        
-        elif category == "Chemické Vlastnosti":
-            return self._check_category_mastery(answers, "Chemické Vlastnosti", min_score=90, min_questions=3)
-        
-        elif category == "Typy Kapalin":
-            return self._check_category_mastery(answers, "Typy Kapalin", min_score=80, min_questions=2)
-        
-        elif category == "Bezpečnost a Ekologie":
-            return self._check_category_mastery(answers, "Bezpečnost a Ekologie", min_score=95, min_questions=2)
-        
-        # Speciální odznaky
-        elif badge.name == "Perfekcionista":
-            return test_session.get('current_score', 0) >= 95
-        
-        elif badge.name == "Rychlá Ruka":
-            # Pokud by měli časování odpovědí
-            return len(answers) >= 5 and all(a.get('score', 0) >= 80 for a in answers)
-        
-        elif badge.name == "Analytik":
-            # Pro studenty, kteří dávají podrobné odpovědi
-            detailed_answers = [a for a in answers if len(a.get('user_answer', '').split()) >= 5]
-            return len(detailed_answers) >= 3
-        
-        return False
-    
-    def _check_category_mastery(self, answers: List[dict], category: str, min_score: float, min_questions: int) -> bool:
-        """Zkontroluje zvládnutí kategorie."""
-        category_answers = [a for a in answers if a.get('question', {}).get('category') == category]
-        
-        if len(category_answers) < min_questions:
-            return False
-        
-        avg_score = sum(a.get('score', 0) for a in category_answers) / len(category_answers)
-        return avg_score >= min_score
+                return [badge.to_dict() for badge in awarded]
+
+            except Exception as e:
+                logger.error(f"❌ Chyba při udělování odznaků: {e}")
+                session.rollback()
+                return []
     
     def get_user_progress(self, user_id: int) -> Dict:
         """Vrací přehled pokroku uživatele."""
         try:
-            user = self.session.query(User).get(user_id)
-            if not user:
-                return {}
-            
-            # Statistiky odznaků
-            total_badges = self.session.query(Badge).count()
-            user_badges = len(user.badges)
-            
-            # Poslední test sessions pro statistiky
-            recent_sessions = self.session.query(TestSession).filter(
-                TestSession.user_id == user_id,
-                TestSession.is_completed == True
-            ).order_by(TestSession.completed_at.desc()).limit(5).all()
-            
-            recent_scores = [s.current_score for s in recent_sessions if s.current_score]
-            
-            return {
-                'user_id': user_id,
-                'badges_earned': user_badges,
-                'total_badges': total_badges,
-                'badge_completion': (user_badges / total_badges * 100) if total_badges > 0 else 0,
-                'recent_average': sum(recent_scores) / len(recent_scores) if recent_scores else 0,
-                'tests_completed': len(recent_sessions),
-                'current_level': user.current_lesson_level,
-                'badges': [
-                    {
-                        'name': ub.badge.name,
-                        'description': ub.badge.description,
-                        'awarded_at': ub.awarded_at,
-                        'category': ub.badge.category
-                    } for ub in user.badges
-                ]
-            }
-            
+            with self.session_factory() as session:
+                user = session.get(User, user_id)
+                if not user:
+                    return {}
+                
+                # Statistiky odznaků
+                total_badges = session.query(Badge).count()
+                user_badges = len(user.badges)
+                
+                # Poslední test sessions pro statistiky
+                recent_sessions = session.query(TestSession).filter(
+                    TestSession.user_id == user_id,
+                    TestSession.is_completed == True
+                ).order_by(TestSession.completed_at.desc()).limit(5).all()
+                
+                recent_scores = [s.current_score for s in recent_sessions if s.current_score]
+                
+                return {
+                    'user_id': user_id,
+                    'badges_earned': user_badges,
+                    'total_badges': total_badges,
+                    'badge_completion': (user_badges / total_badges * 100) if total_badges > 0 else 0,
+                    'recent_average': sum(recent_scores) / len(recent_scores) if recent_scores else 0,
+                    'tests_completed': len(recent_sessions),
+                    'current_level': user.current_lesson_level,
+                    'badges': [
+                        {
+                            'name': ub.badge.name,
+                            'description': ub.badge.description,
+                            'awarded_at': ub.awarded_at,
+                            'category': ub.badge.category
+                        } for ub in user.badges
+                    ]
+                }
+                
         except Exception as e:
             logger.error(f"❌ Chyba při získávání pokroku: {e}")
             return {}
@@ -264,37 +220,43 @@ def create_default_badges():
                 "name": "Mistr Filtrace",
                 "category": "Filtrace a Čištění",
                 "description": "Za vynikající znalosti v oblasti filtrace a čištění kapalin.",
-                "icon_svg": "🔧"
+                "icon_svg": "🔧",
+                "rule": LEGACY_CATEGORY_RULES["Filtrace a Čištění"]
             },
             {
                 "name": "pH Šampion",
                 "category": "Chemické Vlastnosti",
                 "description": "Za perfektní přehled o pH a jeho vlivu na obráběcí kapaliny.",
-                "icon_svg": "⚗️"
+                "icon_svg": "⚗️",
+                "rule": LEGACY_CATEGORY_RULES["Chemické Vlastnosti"]
             },
             {
                 "name": "Expert na Emulze",
                 "category": "Typy Kapalin",
                 "description": "Za hluboké porozumění emulzím a jejich přípravě.",
-                "icon_svg": "🧪"
+                "icon_svg": "🧪",
+                "rule": LEGACY_CATEGORY_RULES["Typy Kapalin"]
             },
             {
                 "name": "Bezpečnostní Profík",
                 "category": "Bezpečnost a Ekologie",
                 "description": "Za znalosti bezpečnostních postupů a ekologické likvidace.",
-                "icon_svg": "🛡️"
+                "icon_svg": "🛡️",
+                "rule": LEGACY_CATEGORY_RULES["Bezpečnost a Ekologie"]
             },
             {
                 "name": "Perfekcionista",
                 "category": "Výkon",
                 "description": "Za dosažení 95% a více v testu.",
-                "icon_svg": "⭐"
+                "icon_svg": "⭐",
+                "rule": LEGACY_NAME_RULES["Perfekcionista"]
             },
             {
                 "name": "Analytik",
                 "category": "Styl",
                 "description": "Za podrobné a promyšlené odpovědi.",
-                "icon_svg": "🔍"
+                "icon_svg": "🔍",
+                "rule": LEGACY_NAME_RULES["Analytik"]
             }
         ]
         
@@ -304,8 +266,12 @@ def create_default_badges():
                 badge = Badge(**badge_data)
                 session.add(badge)
                 logger.info(f"✅ Vytvořen odznak: {badge_data['name']}")
+            elif existing.rule is None:
+                # Starší odznaky bez pravidla dostanou to, které dříve plnil if/elif řetězec
+                existing.rule = badge_data['rule']
         
         session.commit()
+        badge_rule_cache.invalidate()
         logger.info("🏅 Výchozí odznaky vytvořeny")
         
     except Exception as e:
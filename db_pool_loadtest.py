@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Load test poolu DB spojení - jak propustnost a latence škálují s velikostí poolu.
+
+Každý worker (vlákno = souběžný request) si v cyklu půjčí session, provede dotaz
+a spojení drží po dobu --hold-ms (simulace práce requestu). Pro každou kombinaci
+pool_size/max_overflow vypíše requesty za sekundu, p50/p95 latenci, počet
+čekání na vyčerpaný pool a timeouty checkoutu.
+
+Použití:
+    python db_pool_loadtest.py [--url postgresql://...] [--workers 50] [--duration 10]
+                               [--pool-sizes 5,10,20] [--overflows 0,10] [--hold-ms 20]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import exc, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import DATABASE_URL, InstrumentedQueuePool, PoolMetrics, create_configured_engine
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_scenario(url: str, pool_size: int, max_overflow: int, workers: int, duration: float,
+                 hold_seconds: float, pool_timeout: float) -> dict:
+    engine = create_configured_engine(url, poolclass=InstrumentedQueuePool, pool_size=pool_size,
+                                      max_overflow=max_overflow, pool_timeout=pool_timeout)
+    metrics = PoolMetrics().install(engine)
+    factory = sessionmaker(bind=engine)
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker():
+        nonlocal errors
+        local_latencies = []
+        local_errors = 0
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                with factory() as session:
+                    session.execute(text("SELECT 1"))
+                    if hold_seconds:
+                        time.sleep(hold_seconds)
+                local_latencies.append(time.perf_counter() - started)
+            except exc.TimeoutError:
+                local_errors += 1
+        with lock:
+            latencies.extend(local_latencies)
+            errors += local_errors
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    snapshot = metrics.snapshot(engine.pool)
+    engine.dispose()
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": _percentile(latencies, 0.50) * 1000,
+        "p95_ms": _percentile(latencies, 0.95) * 1000,
+        "waits": snapshot["waits"],
+        "timeouts": errors,
+        "leaked": snapshot["checked_out"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test poolu DB spojení")
+    parser.add_argument("--url", default=DATABASE_URL, help="DB URL (výchozí DATABASE_URL)")
+    parser.add_argument("--workers", type=int, default=50, help="Počet souběžných workerů")
+    parser.add_argument("--duration", type=float, default=10.0, help="Délka jednoho scénáře v sekundách")
+    parser.add_argument("--pool-sizes", default="5,10,20", help="Velikosti poolu oddělené čárkou")
+    parser.add_argument("--overflows", default="0,10", help="Hodnoty max_overflow oddělené čárkou")
+    parser.add_argument("--hold-ms", type=float, default=20.0, help="Jak dlouho request drží spojení")
+    parser.add_argument("--pool-timeout", type=float, default=5.0, help="Timeout čekání na spojení v sekundách")
+    args = parser.parse_args()
+
+    print(f"🔥 Load test poolu: {args.workers} workerů, {args.duration:.0f} s na scénář, hold {args.hold_ms:.0f} ms")
+    print(f"{'pool':>5} {'overflow':>9} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'čekání':>8} {'timeouty':>9} {'úniky':>6}")
+    for pool_size in (int(value) for value in args.pool_sizes.split(",")):
+        for max_overflow in (int(value) for value in args.overflows.split(",")):
+            result = run_scenario(args.url, pool_size, max_overflow, args.workers, args.duration,
+                                  args.hold_ms / 1000, args.pool_timeout)
+            print(f"{result['pool_size']:>5} {result['max_overflow']:>9} {result['rps']:>9.1f} "
+                  f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['waits']:>8} "
+                  f"{result['timeouts']:>9} {result['leaked']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Skript pro hromadný import uživatelů z CSV (sloupce name/jméno, phone/telefon,
+volitelně language/jazyk a detail/poznámka).
+
+Použití:
+    python import_users.py uzivatele.csv [--batch-size 500] [--dry-run] [--report chyby.json]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.user_import import IMPORT_BATCH_SIZE, import_users_csv
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hromadný import uživatelů z CSV")
+    parser.add_argument("csv_file", help="Cesta k CSV souboru (UTF-8)")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE, help="Počet uživatelů vložených v jedné transakci")
+    parser.add_argument("--dry-run", action="store_true", help="Jen zkontrolovat, nic nevkládat")
+    parser.add_argument("--report", help="Uložit report chyb do JSON souboru")
+    args = parser.parse_args()
+
+    print(f"📥 Importuji uživatele z {args.csv_file}...")
+    with open(args.csv_file, encoding="utf-8-sig", newline="") as csv_file:
+        report = import_users_csv(csv_file, batch_size=args.batch_size, dry_run=args.dry_run)
+
+    print(f"✅ Hotovo{' (dry run)' if args.dry_run else ''}: {report['created']} vytvořeno, "
+          f"{report['duplicates']} duplicit, {report['invalid']} neplatných z {report['total_rows']} řádků")
+    for error in report["errors"][:20]:
+        print(f"  ❌ řádek {error['row']}: {error['error']}")
+    if len(report["errors"]) > 20:
+        print(f"  ... a dalších {len(report['errors']) - 20} chyb")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as report_file:
+            json.dump(report, report_file, ensure_ascii=False, indent=2)
+        print(f"📝 Report uložen do {args.report}")
+
+    sys.exit(1 if report["errors"] and not report["created"] else 0)
+
+
+if __name__ == "__main__":
+    main()
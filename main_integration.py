@@ -253,7 +253,7 @@ async def handle_entry_test_v2(session, current_user, speech_result, response, c
         )
         
         # AI vyhodnocení
-        gpt_response = client.chat.completions.create(
+        gpt_response = client.with_caller("entry_test_eval").chat.completions.create(
             model="gpt-4o-mini",
             messages=[{"role": "system", "content": advanced_prompt}],
             max_tokens=200,
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Skript pro přepočet analytických rollupů z historie test sessions:
+- question_stats, category_stats (výkon otázek a kategorií)
+- performance_rollups (denní a týdenní trendy výsledků)
+- review_states (spaced-repetition stavy uživatelů a termíny opakovacích hovorů)
+
+Použití:
+    python rebuild_analytics.py [--batch-size 500] [--only answers|trends|reviews] [--since YYYY-MM-DD]
+"""
+
+import argparse
+import logging
+import os
+import sys
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import engine
+from app.models import CategoryStat, PerformanceRollup, QuestionStat, ReviewState
+from app.services.analytics_service import backfill_trend_rollups, rebuild_rollups
+from app.services.spaced_repetition import recompute_review_states
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Přepočet analytických rollupů z historie")
+    parser.add_argument("--batch-size", type=int, default=500, help="Počet sessions načtených najednou")
+    parser.add_argument("--only", choices=["answers", "trends", "reviews"], help="Přepočítat jen jednu skupinu rollupů")
+    parser.add_argument("--since", help="Trendy přepočítat jen od data (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    # Tabulky mohou na starší databázi chybět
+    for model in (QuestionStat, CategoryStat, PerformanceRollup, ReviewState):
+        model.__table__.create(bind=engine, checkfirst=True)
+
+    if args.only in (None, "answers"):
+        print("📊 Přepočítávám rollupy otázek a kategorií...")
+        result = rebuild_rollups(batch_size=args.batch_size)
+        print(f"✅ Hotovo: {result['sessions']} sessions, {result['answers']} odpovědí, "
+              f"{result['questions']} otázek, {result['categories']} kategorií")
+
+    if args.only in (None, "trends"):
+        since = datetime.strptime(args.since, "%Y-%m-%d").date() if args.since else None
+        print("📈 Přepočítávám časové rollupy trendů...")
+        result = backfill_trend_rollups(since=since, batch_size=args.batch_size)
+        print(f"✅ Hotovo: {result['sessions']} sessions, {result['buckets']} bucketů")
+
+    if args.only in (None, "reviews"):
+        print("🧠 Přepočítávám spaced-repetition stavy uživatelů...")
+        result = recompute_review_states(user_batch_size=args.batch_size)
+        print(f"✅ Hotovo: {result['users']} uživatelů, {result['states']} stavů, "
+              f"{result['reviews']} revizí, {result['attempts']} přeplánovaných pokusů")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Benchmark souběžných hlasových tahů nad SQLite - výchozí nastavení vs. výkonnostní profil.
+
+Jeden "tah" odpovídá databázové práci /voice/process (save_answer_and_advance):
+načte test session a uživatele, připíše odpověď do JSON sloupců, přepočítá skóre,
+vloží řádek do answers a commitne. Externí volání (OpenAI, Twilio) se neměří.
+Worker = souběžný webhook; --processes simuluje více uvicorn workerů nad jedním souborem.
+
+Použití:
+    python sqlite_benchmark.py [--threads 16] [--processes 1] [--duration 10] [--sessions 200]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, exc
+from sqlalchemy.orm import sessionmaker
+
+from app.database import RoutingSession, create_sqlite_engines
+from app.models import Answer, Attempt, Base, Lesson, TestSession, User
+
+QUESTIONS = [{"question": f"Otázka {i}", "correct_answer": "odpověď", "category": "Základy"} for i in range(10)]
+
+
+def _session_factory(url: str, mode: str):
+    if mode == "profile":
+        writer, reader = create_sqlite_engines(url)
+        return sessionmaker(class_=RoutingSession, autoflush=False, writer=writer, reader=reader)
+    return sessionmaker(bind=create_engine(url), autoflush=False)
+
+
+def seed(url: str, sessions: int) -> None:
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as session:
+        session.add(Lesson(title="Benchmark", questions=QUESTIONS, lesson_number=1))
+        for i in range(sessions):
+            user = User(name=f"Uživatel {i}", phone=f"+420777{i:06d}")
+            session.add(user)
+            session.flush()
+            attempt = Attempt(user_id=user.id, lesson_id=1)
+            session.add(attempt)
+            session.flush()
+            session.add(TestSession(user_id=user.id, lesson_id=1, attempt_id=attempt.id, questions_data=QUESTIONS,
+                                    total_questions=len(QUESTIONS), answers=[], scores=[]))
+        session.commit()
+    engine.dispose()
+
+
+def voice_turn(factory, session_id: int) -> None:
+    with factory() as session:
+        test_session = session.get(TestSession, session_id)
+        session.get(User, test_session.user_id)
+        index = len(test_session.answers or []) % len(QUESTIONS)
+        score = float(random.randint(40, 100))
+        question = test_session.questions_data[index]
+        test_session.answers = (test_session.answers or []) + [{
+            "question": question["question"], "user_answer": "moje odpověď", "score": score,
+            "question_index": index, "category": question["category"],
+        }]
+        test_session.scores = (test_session.scores or []) + [score]
+        test_session.current_score = sum(test_session.scores) / len(test_session.scores)
+        session.add(Answer(attempt_id=test_session.attempt_id, question_index=index, question_text=question["question"],
+                           correct_answer=question["correct_answer"], user_answer="moje odpověď", score=score,
+                           is_correct=score >= 80))
+        session.commit()
+
+
+def run_worker_process(url: str, mode: str, threads: int, duration: float, sessions: int, queue) -> None:
+    factory = _session_factory(url, mode)
+    latencies, errors = [], []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker():
+        local_latencies, local_errors = [], 0
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                voice_turn(factory, random.randint(1, sessions))
+                local_latencies.append(time.perf_counter() - started)
+            except exc.OperationalError:
+                local_errors += 1  # "database is locked"
+        with lock:
+            latencies.extend(local_latencies)
+            errors.append(local_errors)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    queue.put((latencies, sum(errors)))
+
+
+def run_mode(mode: str, args) -> dict:
+    directory = tempfile.mkdtemp(prefix="sqlite-bench-")
+    url = f"sqlite:///{os.path.join(directory, 'voice_learning.db')}"
+    seed(url, args.sessions)
+
+    queue = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=run_worker_process,
+                                         args=(url, mode, args.threads, args.duration, args.sessions, queue))
+                 for _ in range(args.processes)]
+    started = time.monotonic()
+    for process in processes:
+        process.start()
+    results = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.monotonic() - started
+    shutil.rmtree(directory, ignore_errors=True)
+
+    latencies = sorted(latency for result in results for latency in result[0])
+    percentile = lambda fraction: latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000 if latencies else 0.0
+    return {
+        "mode": mode,
+        "turns": len(latencies),
+        "turns_per_second": len(latencies) / elapsed,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "locked_errors": sum(result[1] for result in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark souběžných hlasových tahů nad SQLite")
+    parser.add_argument("--threads", type=int, default=16, help="Souběžných webhooků na proces")
+    parser.add_argument("--processes", type=int, default=1, help="Počet procesů (uvicorn workerů)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Délka běhu jednoho režimu v sekundách")
+    parser.add_argument("--sessions", type=int, default=200, help="Počet aktivních test sessions")
+    args = parser.parse_args()
+
+    print(f"🗄️ SQLite benchmark: {args.processes} × {args.threads} souběžných tahů, {args.duration:.0f} s na režim")
+    print(f"{'režim':>8} {'tahů':>7} {'tahů/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'locked':>7}")
+    for mode in ("default", "profile"):
+        result = run_mode(mode, args)
+        print(f"{result['mode']:>8} {result['turns']:>7} {result['turns_per_second']:>8.1f} "
+              f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['locked_errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
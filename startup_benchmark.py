@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark studeného startu aplikace - import main.py a první odpověď /health.
+
+Každé měření běží v čistém podprocesu (prázdná cache modulů), stejně jako
+restart workeru na Railway. `python -X importtime` ukáže, které importy start
+nejvíc zdržují; čas do prvního /health zahrnuje import main.py, sestavení
+routerů a obsloužení prvního requestu.
+
+Použití:
+    python startup_benchmark.py [--runs 3] [--top 15]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# SDK, která se smí importovat až při prvním použití (hovor, TTS, přepočet), ne při startu
+LAZY_MODULES = ("openai", "numpy", "pydub", "requests", "twilio")
+
+_FIRST_HEALTH = """
+import json, time
+from fastapi.testclient import TestClient
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+status = TestClient(main.app).get("/health").status_code
+finished = time.perf_counter()
+print(json.dumps({"import_seconds": imported - started, "health_seconds": finished - started, "status": status}))
+"""
+
+
+def _run(args: List[str]) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], cwd=ROOT, capture_output=True, text=True, check=True)
+
+
+def import_profile(module: str = "main") -> Dict[str, int]:
+    """Kumulativní čas importu (µs) každého modulu načteného při `import <module>`."""
+    stderr = _run(["-X", "importtime", "-c", f"import {module}"]).stderr
+    profile = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        profile[name.strip()] = int(cumulative)
+    return profile
+
+
+def time_to_first_health() -> Dict:
+    """Sekundy od začátku importu main.py do odpovědi na první /health (podproces)."""
+    return json.loads(_run(["-c", _FIRST_HEALTH]).stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark studeného startu aplikace")
+    parser.add_argument("--runs", type=int, default=3, help="Počet opakování měření")
+    parser.add_argument("--top", type=int, default=15, help="Kolik nejdražších importů vypsat")
+    args = parser.parse_args()
+
+    profile = import_profile()
+    print(f"📦 Import main.py: {profile.get('main', 0) / 1000:.0f} ms (kumulativně)")
+    top_level = sorted(((us, name) for name, us in profile.items() if "." not in name and name != "main"), reverse=True)
+    for us, name in top_level[:args.top]:
+        print(f"  {us / 1000:>8.1f} ms  {name}")
+    eager = [name for name in LAZY_MODULES if name in profile]
+    print(f"💤 Líně importovaná SDK načtená při startu: {', '.join(eager) if eager else 'žádná'}")
+
+    runs = [time_to_first_health() for _ in range(args.runs)]
+    print(f"🩺 První /health: medián {statistics.median(run['health_seconds'] for run in runs) * 1000:.0f} ms "
+          f"(import {statistics.median(run['import_seconds'] for run in runs) * 1000:.0f} ms, {args.runs} běhy)")
+
+
+if __name__ == "__main__":
+    main()
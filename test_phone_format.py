@@ -2,30 +2,12 @@
 """
 Test formátování telefonního čísla
 """
-import re
+import os
+import sys
 
-def format_phone_number_e164(phone: str) -> str:
-    """Formátuje telefonní číslo do čistého E.164 formátu pro Twilio volání."""
-    # Odstraň všechny nečíselné znaky
-    digits = re.sub(r'[^\d+]', '', phone)
-    
-    # Pokud číslo začíná 00, nahraď to za +420
-    if digits.startswith('00'):
-        digits = '+420' + digits[2:]
-    
-    # Pokud číslo začíná 0, nahraď to za +420
-    elif digits.startswith('0'):
-        digits = '+420' + digits[1:]
-    
-    # Pokud číslo nezačíná +, přidej +420
-    elif not digits.startswith('+'):
-        digits = '+420' + digits
-    
-    # Odstraň duplicitní +420
-    if digits.startswith('+420420'):
-        digits = '+420' + digits[7:]
-    
-    return digits
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.phone import format_phone_number_e164
 
 # Test s různými formáty
 test_numbers = [
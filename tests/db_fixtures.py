@@ -0,0 +1,32 @@
+"""
+Sdílená in-memory databáze pro testy služeb.
+
+tests/conftest.py importuje Flask aplikaci (app.app), proto se fixtures
+importují přímo v testovacím modulu:
+
+    from tests.db_fixtures import engine, session_factory
+
+Každý test si do prázdné databáze nasází vlastní data.
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models import Base
+
+def memory_engine():
+    """In-memory SQLite se schématem; StaticPool drží jedno spojení, takže ho vidí všechny sessions."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return engine
+
+@pytest.fixture
+def engine():
+    engine = memory_engine()
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(bind=engine)
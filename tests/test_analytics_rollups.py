@@ -0,0 +1,105 @@
+from datetime import date, datetime
+
+from app.models import User, Lesson, TestSession, QuestionStat, CategoryStat
+from app.routers import admin
+from app.services.analytics_service import (
+    backfill_trend_rollups, get_trend_buckets, question_key, rebuild_rollups, record_session_answers,
+    record_session_completion,
+)
+from tests.db_fixtures import engine, session_factory
+
+QUESTIONS = [{"question": "Co je pH?", "category": "Chemie"}, {"question": "Proč mazat?", "category": "Mazání"}]
+
+def _seed(factory):
+    """Dokončená session (jedna odpověď ve starším formátu bez kategorie) a rozpracovaná session."""
+    session = factory()
+    session.add_all([User(name="Student", phone="+420777000001"), Lesson(title="Lekce 1", questions=[], lesson_number=1)])
+    session.flush()
+    session.add_all([
+        TestSession(user_id=1, lesson_id=1, questions_data=QUESTIONS, is_completed=True, current_score=65.0,
+                    completed_at=datetime(2024, 1, 9, 9, 0), answers=[
+                        {"question": "Co je pH?", "category": "Chemie", "score": 90, "question_index": 0},
+                        {"question": "Proč mazat?", "score": 40, "question_index": 1},
+                    ]),
+        TestSession(user_id=1, lesson_id=1, questions_data=QUESTIONS, answers=[
+            {"question": "Co je pH?", "category": "Chemie", "score": 10, "question_index": 0},
+        ]),
+    ])
+    session.commit()
+    session.close()
+
+def _rollups(factory):
+    session = factory()
+    questions = {row.question_key: (row.category, row.attempts, row.score_sum, row.correct_count)
+                 for row in session.query(QuestionStat)}
+    categories = {row.category: (row.attempts, row.score_sum, row.correct_count) for row in session.query(CategoryStat)}
+    session.close()
+    return questions, categories
+
+def test_live_rollups_match_rebuild_and_skip_unfinished_sessions(session_factory):
+    """Přičtení při dokončení a rebuild dají stejné rollupy; rozpracovaná session se nepočítá."""
+    _seed(session_factory)
+    session = session_factory()
+    completed = session.get(TestSession, 1)
+    record_session_answers(session, completed.answers, completed.questions_data)
+    session.commit()
+    session.close()
+    live = _rollups(session_factory)
+
+    result = rebuild_rollups(batch_size=1, session_factory=session_factory)
+
+    assert (result["sessions"], result["answers"]) == (1, 2)
+    assert _rollups(session_factory) == live
+    questions, categories = live
+    assert categories == {"Chemie": (1, 90.0, 1), "Mazání": (1, 40.0, 0)}
+    assert questions[question_key("Proč mazat?")] == ("Mazání", 1, 40.0, 0)
+
+def test_rebuild_replaces_previous_rollups(session_factory):
+    """Opakovaný rebuild rollupy nezdvojí - staré řádky nahradí přepočtenými."""
+    _seed(session_factory)
+    rebuild_rollups(session_factory=session_factory)
+    first = _rollups(session_factory)
+
+    rebuild_rollups(session_factory=session_factory)
+
+    assert _rollups(session_factory) == first
+    assert first[1]["Chemie"] == (1, 90.0, 1)
+
+def test_live_trends_match_backfill_without_resets_or_missing_scores(session_factory, monkeypatch):
+    """Živé přičtení a backfill dají stejné buckety; reset adminem ani session bez skóre se nepočítá."""
+    _seed(session_factory)
+    monkeypatch.setattr(admin, "SessionLocal", session_factory)
+    admin.admin_reset_test(user_id=1)  # rozpracovanou session ukončí admin, nejde o dokončení testu
+    session = session_factory()
+    record_session_completion(session, 1, datetime(2024, 1, 9, 9, 0), 65.0)
+    record_session_completion(session, 1, datetime(2024, 1, 10, 9, 0), None)
+    session.commit()
+    live = [get_trend_buckets(session, date(2024, 1, 1), date(2024, 1, 31), granularity)
+            for granularity in ("day", "week")]
+    session.close()
+
+    assert backfill_trend_rollups(session_factory=session_factory)["sessions"] == 1
+    session = session_factory()
+    assert [get_trend_buckets(session, date(2024, 1, 1), date(2024, 1, 31), granularity)
+            for granularity in ("day", "week")] == live
+    session.close()
+    assert live == [[{"bucket_start": date(2024, 1, 9), "tests": 1, "score_sum": 65.0, "successful_tests": 0}],
+                    [{"bucket_start": date(2024, 1, 8), "tests": 1, "score_sum": 65.0, "successful_tests": 0}]]
+    assert rebuild_rollups(session_factory=session_factory)["sessions"] == 1
+
+def test_rebuild_handles_answers_with_question_dict(session_factory):
+    """Nejstarší odpovědi s otázkou uloženou jako dict rebuild nezastaví - klíč se počítá z textu otázky."""
+    session = session_factory()
+    session.add_all([User(name="Student", phone="+420777000001"), Lesson(title="Lekce 1", questions=[], lesson_number=1)])
+    session.flush()
+    session.add(TestSession(user_id=1, lesson_id=1, questions_data=QUESTIONS, is_completed=True, current_score=40.0,
+                            completed_at=datetime(2024, 1, 9, 9, 0), answers=[
+                                {"question": {"question": "Proč mazat?", "category": "Mazání"}, "score": 40},
+                            ]))
+    session.commit()
+    session.close()
+
+    assert rebuild_rollups(session_factory=session_factory)["answers"] == 1
+    questions, categories = _rollups(session_factory)
+    assert questions == {question_key("Proč mazat?"): ("Mazání", 1, 40.0, 0)}
+    assert categories == {"Mazání": (1, 40.0, 0)}
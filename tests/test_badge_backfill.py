@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+from app.models import User, Lesson, Badge, UserBadge, TestSession, JobCheckpoint
+from app.services.badge_backfill import BACKFILL_CHECKPOINT_NAME, backfill_badges
+from tests.db_fixtures import engine, session_factory
+
+START = datetime(2024, 1, 1, 9, 0)
+
+def _seed(factory):
+    """Tři uživatelé, dva odznaky s pravidly a historie dokončených sessions."""
+    session = factory()
+    session.add(Lesson(title="Lekce 1", questions=[], lesson_number=1))
+    session.add_all([User(name=f"Uživatel {i}", phone=f"+42077700000{i}") for i in range(3)])
+    session.add_all([
+        Badge(name="Perfekcionista", category="Výkon", description="95 % a více",
+              rule={"type": "session_score", "min_score": 95}),
+        Badge(name="Expert na Emulze", category="Typy Kapalin", description="Emulze",
+              rule={"type": "category_mastery", "category": "Typy Kapalin", "min_avg_score": 80, "min_questions": 2}),
+    ])
+    session.flush()
+    # Uživatel 1 už Perfekcionistu má z živého udělování
+    session.add(UserBadge(user_id=1, badge_id=1, awarded_at=START))
+    scores = [(1, 96.0), (2, 50.0), (2, 97.0), (3, 99.0), (1, 98.0), (3, 40.0)]
+    for i, (user_id, score) in enumerate(scores):
+        answers = [{"question": "Emulze?", "category": "Typy Kapalin", "score": score}] * 2
+        session.add(TestSession(user_id=user_id, lesson_id=1, questions_data=[], answers=answers,
+                                current_score=score, is_completed=True, completed_at=START + timedelta(days=i)))
+    session.add(TestSession(user_id=2, lesson_id=1, questions_data=[], answers=[], current_score=100.0, is_completed=False))
+    session.commit()
+    session.close()
+
+def _awards(factory):
+    session = factory()
+    awards = {(ub.user_id, ub.badge_id): ub.awarded_at for ub in session.query(UserBadge)}
+    session.close()
+    return awards
+
+def test_backfill_awards_missing_badges_once(session_factory):
+    """Chybějící odznaky se udělí k datu první splňující session, existující a nedokončené se přeskočí."""
+    _seed(session_factory)
+    result = backfill_badges(chunk_size=4, batch_size=2, session_factory=session_factory)
+
+    assert result["processed"] == 6
+    assert result["awarded"] == 5
+    awards = _awards(session_factory)
+    assert set(awards) == {(1, 1), (1, 2), (2, 1), (2, 2), (3, 1), (3, 2)}
+    assert awards[(1, 1)] == START
+    assert awards[(2, 1)] == START + timedelta(days=2)
+
+    # Opakovaný běh naváže na checkpoint a nic nového neudělá
+    assert backfill_badges(session_factory=session_factory)["processed"] == 0
+    assert backfill_badges(restart=True, session_factory=session_factory)["awarded"] == 0
+
+def test_backfill_resumes_from_checkpoint(session_factory):
+    """Přerušený běh uloží checkpoint a další běh pokračuje od následující session."""
+    _seed(session_factory)
+    first = backfill_badges(chunk_size=2, max_chunks=1, session_factory=session_factory)
+    assert (first["processed"], first["last_id"]) == (2, 2)
+
+    session = session_factory()
+    checkpoint = session.get(JobCheckpoint, BACKFILL_CHECKPOINT_NAME)
+    assert (checkpoint.last_id, checkpoint.processed) == (2, 2)
+    session.close()
+
+    second = backfill_badges(chunk_size=2, session_factory=session_factory)
+    assert second["processed"] == 4
+    assert len(_awards(session_factory)) == 6
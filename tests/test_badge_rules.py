@@ -0,0 +1,76 @@
+import pytest
+from sqlalchemy import false, select
+
+import badge_system
+from app.models import User, Badge, UserBadge
+from app.services.badge_rules import BadgeRuleCache, aggregate_session, compile_rule
+from tests.db_fixtures import engine, session_factory
+
+@pytest.fixture(autouse=True)
+def rule_cache(monkeypatch):
+    """Každý test začíná s prázdnou cache zkompilovaných pravidel."""
+    monkeypatch.setattr(badge_system, "badge_rule_cache", BadgeRuleCache())
+
+def _seed(factory):
+    """Uživatel, odznaky s pravidlem a starší odznak bez pravidla."""
+    session = factory()
+    session.add_all([
+        User(name="Student", phone="+420777000001"),
+        Badge(name="Expert na Emulze", category="Typy Kapalin", description="Emulze",
+              rule={"type": "category_mastery", "category": "Typy Kapalin", "min_avg_score": 80, "min_questions": 2}),
+        Badge(name="Perfekcionista", category="Výkon", description="95 % a více"),
+        Badge(name="Analytik", category="Styl", description="Podrobné odpovědi",
+              rule={"all": [{"type": "detailed_answers", "min_words": 5, "min_count": 3},
+                            {"type": "session_score", "min_score": 50}]}),
+    ])
+    session.commit()
+    session.close()
+
+def test_aggregates_handle_both_answer_formats():
+    """Kategorie se čte z nového formátu ('category') i ze staršího vnořeného dictu 'question'."""
+    answers = [
+        {"question": "Co je emulze?", "category": "Typy Kapalin", "score": 70, "user_answer": "směs oleje a vody"},
+        {"question": {"text": "pH?", "category": "Typy Kapalin"}, "score": 90, "user_answer": "devět"},
+    ]
+    aggregates = aggregate_session(answers, 80.0)
+    assert aggregates.category_average("Typy Kapalin") == (2, 80.0)
+    assert aggregates.min_score == 70
+    assert aggregates.answers_with_words(4) == 1
+    assert compile_rule({"type": "session_score", "min_score": 80}) is compile_rule({"min_score": 80, "type": "session_score"})
+    with pytest.raises(ValueError):
+        compile_rule({"type": "neznamy"})
+
+def test_awards_inserted_once_including_legacy_badges(session_factory):
+    """Splněné odznaky se udělí najednou, starší odznak bez pravidla jde přes původní kritérium, podruhé se nic neudělí."""
+    _seed(session_factory)
+    test_session = {
+        "current_score": 96.0,
+        "answers": [{"question": f"Otázka {i}", "category": "Typy Kapalin", "score": 96,
+                     "user_answer": "emulze je směs oleje a vody"} for i in range(3)],
+    }
+    system = badge_system.BadgeSystem(session_factory=session_factory)
+    awarded = system.check_and_award_badges(1, test_session)
+    assert sorted(badge["name"] for badge in awarded) == ["Analytik", "Expert na Emulze", "Perfekcionista"]
+    assert system.check_and_award_badges(1, test_session) == []
+
+    session = session_factory()
+    assert session.query(UserBadge).filter_by(user_id=1).count() == 3
+    session.close()
+
+def test_concurrently_awarded_badge_is_not_reported_again(session_factory, monkeypatch):
+    """Odznak, který mezitím udělil souběžný request, ON CONFLICT přeskočí a nevrátí se jako nový."""
+    _seed(session_factory)
+    session = session_factory()
+    session.add(UserBadge(user_id=1, badge_id=2))
+    session.commit()
+    session.close()
+    # Souběžný request vložil odznak až po načtení existujících odznaků tímto requestem
+    monkeypatch.setattr(badge_system, "select", lambda *columns: select(*columns).where(false()))
+    test_session = {"current_score": 96.0, "answers": [{"question": "Otázka", "category": "Styl", "score": 96}]}
+
+    awarded = badge_system.BadgeSystem(session_factory=session_factory).check_and_award_badges(1, test_session)
+
+    assert awarded == []
+    session = session_factory()
+    assert session.query(UserBadge).filter_by(user_id=1).count() == 1
+    session.close()
@@ -0,0 +1,119 @@
+import pytest
+
+from app.models import User, Lesson, Attempt, Campaign, CampaignCall
+from app.services.campaign_service import (
+    CampaignDispatcher, TokenBucket, create_campaign, handle_status_callback, outbound_call_bucket,
+)
+from app.services.scheduler import SchedulerService
+from tests.db_fixtures import engine, session_factory
+
+def _seed(factory):
+    """Pět uživatelů (čtyři česky, jeden anglicky) a jedna lekce."""
+    session = factory()
+    session.add(Lesson(title="Lekce 1", questions=[], lesson_number=1))
+    for i in range(5):
+        session.add(User(name=f"Uživatel {i}", phone=f"+42077700000{i}", language="cs" if i < 4 else "en"))
+    session.commit()
+    session.close()
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+def test_token_bucket_limits_rate():
+    """Bucket s rychlostí 2/s pustí po vyčerpání další hovor až za půl sekundy."""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, clock=clock, sleep=clock.sleep)
+
+    for _ in range(4):
+        bucket.acquire()
+
+    assert clock.now == pytest.approx(1.0)
+    assert not bucket.try_acquire()
+
+def test_dispatcher_respects_concurrency_and_retries(session_factory):
+    """Nejvýše max_concurrent živých hovorů; busy se znovu zařadí, pokusy mají next_due=None."""
+    _seed(session_factory)
+    session = session_factory()
+    campaign = create_campaign(session, "Směna A", lesson_id=1, language="cs",
+                               max_concurrent_calls=2, max_retries=1, retry_delay_seconds=0)
+    campaign_id = campaign.id
+    campaign.status = "running"
+    session.commit()
+    session.close()
+
+    dialed = []
+    dispatcher = CampaignDispatcher(
+        campaign_id,
+        dial=lambda phone, url, callback: dialed.append(phone) or f"CA{len(dialed)}",
+        session_factory=session_factory,
+        bucket=TokenBucket(rate=1000),
+        shared_bucket=TokenBucket(rate=1000),
+    )
+
+    assert dispatcher.dispatch_once()
+    assert len(dialed) == 2
+
+    session = session_factory()
+    first, second = session.query(CampaignCall).filter(CampaignCall.status == "dialing").order_by(CampaignCall.id)
+    assert handle_status_callback(session, first.id, first.call_sid, "busy") == "queued"
+    assert handle_status_callback(session, second.id, second.call_sid, "completed") == "completed"
+    # Pozdní callback už dokončeného hovoru stav nepřepíše
+    assert handle_status_callback(session, second.id, second.call_sid, "ringing") == "completed"
+    session.close()
+
+    dispatcher.dispatch_once()
+    assert len(dialed) == 4
+
+    session = session_factory()
+    for call in session.query(CampaignCall).filter(CampaignCall.status == "dialing"):
+        handle_status_callback(session, call.id, call.call_sid, "no-answer")
+    session.close()
+
+    while dispatcher.dispatch_once():
+        session = session_factory()
+        for call in session.query(CampaignCall).filter(CampaignCall.status == "dialing"):
+            handle_status_callback(session, call.id, call.call_sid, "no-answer")
+        session.close()
+
+    session = session_factory()
+    campaign = session.get(Campaign, campaign_id)
+    assert campaign.status == "completed"
+    assert campaign.stats["total"] == 4
+    assert campaign.stats["completed"] == 1
+    assert campaign.stats["no_answer"] == 3
+    assert campaign.stats["dial_attempts"] == 7
+    assert session.query(Attempt).filter(Attempt.next_due.isnot(None)).count() == 0
+    session.close()
+
+def test_concurrent_campaigns_share_the_account_rate_limit(session_factory):
+    """Souběžné kampaně čerpají ze společného bucketu účtu; sdílí ho i plánovač opakování."""
+    _seed(session_factory)
+    session = session_factory()
+    campaign_ids = []
+    for name in ("Směna A", "Směna B"):
+        campaign = create_campaign(session, name, lesson_id=1, language="cs", max_concurrent_calls=2,
+                                   calls_per_second=10)
+        campaign.status = "running"
+        campaign_ids.append(campaign.id)
+    session.commit()
+    session.close()
+
+    clock = FakeClock()
+    shared = TokenBucket(rate=2, clock=clock, sleep=clock.sleep)
+    dialed = []
+    for campaign_id in campaign_ids:
+        CampaignDispatcher(campaign_id, dial=lambda phone, url, callback: dialed.append(phone) or "CA1",
+                           session_factory=session_factory, bucket=TokenBucket(rate=1000),
+                           shared_bucket=shared).dispatch_once()
+
+    assert len(dialed) == 4
+    assert clock.now == pytest.approx(1.0)  # 4 hovory při limitu účtu 2/s, ne 2 × 2 hovory při 10/s
+    assert CampaignDispatcher(campaign_ids[0]).shared_bucket is outbound_call_bucket
+    assert SchedulerService().bucket is outbound_call_bucket
@@ -0,0 +1,97 @@
+import threading
+import time
+
+from sqlalchemy.exc import OperationalError
+
+from admin_dashboard import DASHBOARD_SECTIONS, DashboardStats, DashboardStatsService
+from app.database import prefer_primary, primary_preferred
+from tests.db_fixtures import engine, session_factory
+
+class _Stats:
+    """Náhrada DashboardStats: každá metoda se zapíše do `calls`, počká na `gate` a vrátí název metody."""
+
+    def __init__(self, calls, gate=None, failing=()):
+        self.calls = calls
+        self.gate = gate
+        self.failing = failing
+
+    def __getattr__(self, method):
+        def compute():
+            self.calls.append(method)
+            if self.gate is not None:
+                self.gate()
+            if method in self.failing:
+                raise RuntimeError(f"{method} selhala")
+            return {"method": method}
+        return compute
+
+def test_concurrent_requests_share_one_computation_until_ttl(monkeypatch):
+    """Souběžná volání sdílejí jeden výpočet, další čtení jde z cache až do vypršení TTL nebo invalidace."""
+    calls, release = [], threading.Event()
+    service = DashboardStatsService(ttl_seconds={"overview": 60},
+                                    stats_factory=lambda: _Stats(calls, gate=lambda: release.wait(5)))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(service.get_section("overview"))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while not calls:
+        time.sleep(0.001)
+    time.sleep(0.05)  # ostatní vlákna mezitím čekají na rozpracovaný výpočet
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ["get_overview_stats"]
+    assert results == [{"method": "get_overview_stats"}] * 5
+    assert service.get_section("overview") == {"method": "get_overview_stats"} and len(calls) == 1
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+    service.get_section("overview")
+    service.invalidate("overview")
+    service.get_section("overview")
+    assert len(calls) == 3
+
+def test_sections_are_computed_in_parallel_and_errors_stay_isolated():
+    """Sekce se počítají souběžně na thread poolu; chyba jedné sekce ostatní nezastaví a nezůstane v cache."""
+    calls = []
+    barrier = threading.Barrier(len(DASHBOARD_SECTIONS))
+    service = DashboardStatsService(stats_factory=lambda: _Stats(calls, gate=lambda: barrier.wait(5),
+                                                                  failing={"get_badge_statistics"}))
+
+    sections = service.get_sections()
+
+    assert sections["badge_statistics"] is None
+    assert sections["overview"] == {"method": "get_overview_stats"}
+    assert sorted(calls) == sorted(DASHBOARD_SECTIONS.values())
+    service.stats_factory = lambda: _Stats(calls)
+    assert service.get_sections(["overview", "badge_statistics"]) == {
+        "overview": {"method": "get_overview_stats"}, "badge_statistics": {"method": "get_badge_statistics"}}
+    assert calls[-1] == "get_badge_statistics"
+
+def test_primary_preference_reaches_workers_and_bypasses_cache():
+    """Po zápisu admina (prefer_primary) se sekce počítají z primáru i na thread poolu a cache se obejde."""
+    calls, seen = [], []
+    service = DashboardStatsService(stats_factory=lambda: _Stats(calls, gate=lambda: seen.append(primary_preferred())))
+    service.get_sections(["overview"])
+
+    with prefer_primary():
+        service.get_sections(["overview", "badge_statistics"])
+
+    assert seen == [False, True, True]
+    assert service.get_section("overview") == {"method": "get_overview_stats"} and len(calls) == 3
+
+def test_transient_db_error_is_not_cached_as_empty_section(session_factory):
+    """Výpadek databáze vrátí sekci jako None jen pro daný request - prázdný výsledek se do cache neuloží."""
+    outage = {"active": True}
+
+    def flaky_factory():
+        if outage["active"]:
+            raise OperationalError("SELECT 1", {}, Exception("server closed the connection"))
+        return session_factory()
+
+    service = DashboardStatsService(stats_factory=lambda: DashboardStats(session_factory=flaky_factory))
+
+    assert service.get_sections(["category_performance"]) == {"category_performance": None}
+    outage["active"] = False
+    assert service.get_sections(["category_performance"]) == {"category_performance": []}
@@ -0,0 +1,42 @@
+import threading
+
+import pytest
+from sqlalchemy import exc, text
+
+from app.database import InstrumentedQueuePool, PoolMetrics, create_configured_engine, engine_options
+
+def test_engine_options_read_from_environment():
+    """Parametry poolu a statement timeout se čtou z prostředí, SQLite dostane jen pre-ping."""
+    env = {"DB_POOL_SIZE": "12", "DB_MAX_OVERFLOW": "3", "DB_POOL_RECYCLE": "300",
+           "DB_POOL_PRE_PING": "false", "DB_STATEMENT_TIMEOUT_MS": "5000"}
+    options = engine_options("postgresql://user:heslo@db/app", env)
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert (options["pool_size"], options["max_overflow"], options["pool_recycle"]) == (12, 3, 300)
+    assert options["pool_pre_ping"] is False
+    assert options["connect_args"] == {"options": "-c statement_timeout=5000"}
+
+    assert "connect_args" not in engine_options("postgresql://db/app", {})
+    assert engine_options("sqlite:///app.db", env) == {"pool_pre_ping": False}
+
+def test_instrumented_pool_reports_waits_and_timeouts(tmp_path):
+    """Checkout z vyčerpaného poolu se započítá jako čekání a po pool_timeout jako timeout."""
+    engine = create_configured_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=InstrumentedQueuePool,
+                                      pool_size=1, max_overflow=0, pool_timeout=0.2)
+    metrics = PoolMetrics().install(engine)
+
+    held = engine.connect()
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+
+    release = threading.Timer(0.05, held.close)
+    release.start()
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT 1")).scalar() == 1
+    release.join()
+
+    snapshot = metrics.snapshot(engine.pool)
+    assert snapshot["timeouts"] == 1
+    assert snapshot["waits"] == 2
+    assert snapshot["wait_seconds_max"] >= 0.2
+    assert (snapshot["checked_out"], snapshot["pool_size"], snapshot["overflow"]) == (0, 1, 0)
+    engine.dispose()
@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+
+from app.models import User, Lesson, Attempt
+from app.routers import system
+from app.services.campaign_service import TokenBucket
+from app.services.scheduler import SchedulerService
+from tests.db_fixtures import engine, session_factory
+
+NOW = datetime(2024, 3, 1, 8, 0)
+
+def _seed(factory):
+    """Čtyři uživatelé - tři se splatným a jeden s budoucím pokusem."""
+    session = factory()
+    session.add(Lesson(title="Lekce 1", questions=[], lesson_number=1))
+    for i in range(4):
+        session.add(User(name=f"Uživatel {i}", phone=f"+42077700000{i}"))
+    session.flush()
+    for i in range(4):
+        due = NOW - timedelta(hours=1) if i < 3 else NOW + timedelta(days=1)
+        session.add(Attempt(user_id=i + 1, lesson_id=1, score=85.0, next_due=due))
+    session.commit()
+    session.close()
+
+def _service(factory, dialed, **kwargs):
+    return SchedulerService(session_factory=factory, dial=lambda phone, url: dialed.append(phone),
+                            bucket=TokenBucket(rate=1000), **kwargs)
+
+def test_due_attempts_dialed_once_and_rescheduled(session_factory):
+    """Splatné pokusy se vytočí jednou a next_due se posune, takže další tick už nic nevytáčí."""
+    _seed(session_factory)
+    dialed = []
+    first = _service(session_factory, dialed, batch_size=2)
+
+    assert first.dispatch_due_attempts(now=NOW) == {"claimed": 3, "dialed": 3, "failed": 0, "superseded": 0}
+    assert _service(session_factory, dialed).dispatch_due_attempts(now=NOW)["claimed"] == 0
+    assert sorted(dialed) == ["+420777000000", "+420777000001", "+420777000002"]
+
+    session = session_factory()
+    attempts = session.query(Attempt).order_by(Attempt.id).all()
+    assert all(attempt.lease_until is None for attempt in attempts)
+    assert all(attempt.next_due > NOW for attempt in attempts)
+    session.close()
+
+def test_leased_attempts_are_skipped_until_lease_expires(session_factory):
+    """Pokus zamčený jiným workerem se nevytočí; po pádu workeru (vypršení leasu) ho převezme jiný."""
+    _seed(session_factory)
+    crashed_worker = _service(session_factory, [], lease_seconds=300)
+    session = session_factory()
+    claimed = crashed_worker.claim_due_attempts(session, NOW)
+    session.close()
+    assert len(claimed) == 3
+
+    dialed = []
+    other = _service(session_factory, dialed)
+    assert other.dispatch_due_attempts(now=NOW + timedelta(minutes=1))["claimed"] == 0
+    assert other.dispatch_due_attempts(now=NOW + timedelta(minutes=6))["dialed"] == 3
+    assert len(dialed) == 3
+
+def _add_historical_attempts(factory):
+    """Uživatel 1 má další dva pokusy se splatným next_due (dřívější kód ho nastavoval každému pokusu)."""
+    session = factory()
+    for days in (30, 20):
+        session.add(Attempt(user_id=1, lesson_id=1, score=60.0, next_due=NOW - timedelta(days=days)))
+    session.commit()
+    session.close()
+
+def test_user_with_several_due_attempts_is_dialed_once(session_factory):
+    """Více splatných pokusů jednoho uživatele v dávce = jeden hovor; ostatní pokusy se odplánují."""
+    _seed(session_factory)
+    _add_historical_attempts(session_factory)
+    dialed = []
+
+    result = _service(session_factory, dialed).dispatch_due_attempts(now=NOW)
+
+    assert result == {"claimed": 5, "dialed": 3, "failed": 0, "superseded": 2}
+    assert sorted(dialed) == ["+420777000000", "+420777000001", "+420777000002"]
+    session = session_factory()
+    scheduled = session.query(Attempt.id).filter(Attempt.user_id == 1, Attempt.next_due.isnot(None)).all()
+    assert scheduled == [(6,)]  # naplánovaný zůstane jen nejnovější pokus
+    session.close()
+
+def test_migration_keeps_only_latest_scheduled_attempt_per_user(session_factory, monkeypatch):
+    """Migrace zruší next_due starších pokusů, takže zapnutý dispatcher nevytočí historii."""
+    _seed(session_factory)
+    _add_historical_attempts(session_factory)
+    session = session_factory()
+    session.add(Attempt(user_id=2, lesson_id=1, next_due=None))  # novější pokus kampaně bez termínu
+    session.commit()
+    session.close()
+    monkeypatch.setattr(system, "SessionLocal", session_factory)
+
+    assert "attempts.next_due starších pokusů: ✅ zrušeno 2" in system.admin_migrate_db()["migrations"]
+    dialed = []
+    assert _service(session_factory, dialed).dispatch_due_attempts(now=NOW)["claimed"] == 3
+    assert len(dialed) == 3
@@ -0,0 +1,53 @@
+import csv
+import io
+from datetime import date, datetime
+
+from app.models import User, Lesson, TestSession
+from app.services.export_service import EXPORT_COLUMNS, iter_export_rows, stream_csv
+from tests.db_fixtures import engine, session_factory
+
+def _seed(factory):
+    """Dvě lekce a dvě sessions jednoho uživatele (s odpověďmi a bez nich)."""
+    session = factory()
+    lesson_1 = Lesson(title="Lekce 1", questions=[], lesson_number=1)
+    lesson_2 = Lesson(title="Lekce 2", questions=[], lesson_number=2)
+    user = User(name="Exportér", phone="+420777000001")
+    session.add_all([lesson_1, lesson_2, user])
+    session.flush()
+    session.add_all([
+        TestSession(user_id=user.id, lesson_id=lesson_1.id, started_at=datetime(2024, 1, 10),
+                    questions_data=[{}, {}, {"question": "Co je emulze?", "category": "Kapaliny"}],
+                    answers=[
+                        {"question": "Co je pH?", "category": "Chemie", "user_answer": "kyselost", "score": 90},
+                        # Starší formát - otázka uložená jako dict
+                        {"question": {"question": "Proč mazat?", "category": "Mazání"}, "user_answer": "tření", "score": 40},
+                        # Odpověď bez kategorie - dohledá se v questions_data
+                        {"question": "Co je emulze?", "question_index": 2, "user_answer": "směs", "score": 70},
+                    ]),
+        TestSession(user_id=user.id, lesson_id=lesson_2.id, questions_data=[], started_at=datetime(2024, 2, 10), answers=[]),
+    ])
+    session.commit()
+    session.close()
+
+def test_export_rows_one_per_answer(session_factory):
+    """Každá odpověď je samostatný řádek s kategorií i pro starší formáty, session bez odpovědí má jeden prázdný řádek."""
+    _seed(session_factory)
+    rows = list(iter_export_rows(batch_size=1, session_factory=session_factory))
+
+    assert [(row["session_id"], row["question"], row["category"]) for row in rows] == [
+        (1, "Co je pH?", "Chemie"),
+        (1, "Proč mazat?", "Mazání"),
+        (1, "Co je emulze?", "Kapaliny"),
+        (2, None, None),
+    ]
+
+def test_export_csv_filters(session_factory):
+    """Filtr data a lekce se promítne do CSV výstupu."""
+    _seed(session_factory)
+    rows = iter_export_rows(start=date(2024, 2, 1), end=date(2024, 2, 28), session_factory=session_factory)
+    parsed = list(csv.DictReader(io.StringIO("".join(stream_csv(rows, flush_every=1)))))
+
+    assert len(parsed) == 1
+    assert parsed[0]["lesson_title"] == "Lekce 2"
+    assert list(parsed[0].keys()) == EXPORT_COLUMNS
+    assert list(iter_export_rows(lesson_id=999, session_factory=session_factory)) == []
@@ -0,0 +1,69 @@
+import json
+import logging
+
+from fastapi import FastAPI, WebSocket
+from fastapi.testclient import TestClient
+
+from app.metrics import MetricsRegistry, TimingMiddleware
+
+def _app(registry, **kwargs):
+    app = FastAPI()
+
+    @app.get("/users/{user_id}")
+    def user(user_id: int):
+        return {"id": user_id}
+
+    @app.get("/boom")
+    def boom():
+        raise RuntimeError("selhání")
+
+    @app.websocket("/voice/media-stream")
+    async def media_stream(websocket: WebSocket):
+        await websocket.accept()
+        await websocket.receive_text()
+        await websocket.close()
+
+    app.add_middleware(TimingMiddleware, registry=registry, **kwargs)
+    return app
+
+def test_latency_is_recorded_per_route_template_and_rendered():
+    """Latence se počítá podle šablony routy (ne konkrétní URL) a /metrics ji vypíše v Prometheus formátu."""
+    registry = MetricsRegistry()
+    client = TestClient(_app(registry, sample_rate=0.0))
+    for user_id in (1, 2, 3):
+        assert client.get(f"/users/{user_id}").status_code == 200
+    assert client.get("/neexistuje").status_code == 404
+
+    histogram = registry.histogram("http_request_duration_seconds", "", ("method", "route", "status"))
+    assert histogram.snapshot(method="GET", route="/users/{user_id}", status="200")["count"] == 3
+    assert histogram.snapshot(method="GET", route="unmatched", status="404")["count"] == 1
+    assert registry.gauge("http_requests_in_flight", "", ("route",)).value(route="/users/{user_id}") == 0
+
+    text = registry.render()
+    assert "# TYPE http_request_duration_seconds histogram" in text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/users/{user_id}",status="200",le="+Inf"} 3' in text
+    assert 'http_request_duration_seconds_count{method="GET",route="/users/{user_id}",status="200"} 3' in text
+
+def test_request_logs_are_sampled_errors_always_and_media_stream_quiet(caplog):
+    """Úspěšné requesty se logují podle vzorkování, chyby vždy, media stream ve výchozím stavu vůbec."""
+    registry = MetricsRegistry()
+    client = TestClient(_app(registry, sample_rate=1.0), raise_server_exceptions=False)
+    with caplog.at_level(logging.INFO, logger="uvicorn"):
+        client.get("/users/7")
+        assert client.get("/boom").status_code == 500
+        with client.websocket_connect("/voice/media-stream") as websocket:
+            websocket.send_text("{}")
+
+    records = [json.loads(record.getMessage()) for record in caplog.records]
+    assert [(record["route"], record["status"]) for record in records] == [("/users/{user_id}", 200), ("/boom", 500)]
+    assert records[1]["error"] == "RuntimeError: selhání"
+    assert registry.gauge("websocket_connections_open", "", ("route",)).value(route="/voice/media-stream") == 0
+    assert registry.histogram("websocket_connection_duration_seconds", "", ("route",)).snapshot(
+        route="/voice/media-stream")["count"] == 1
+
+    caplog.clear()
+    quiet = TestClient(_app(MetricsRegistry(), sample_rate=0.5, random_fn=lambda: 0.0,
+                            route_rates={"/users/*": 0.0}))
+    with caplog.at_level(logging.INFO, logger="uvicorn"):
+        quiet.get("/users/7")
+    assert caplog.records == []
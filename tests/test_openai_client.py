@@ -0,0 +1,78 @@
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from app import tracing
+from app.services import openai_client as client_module
+from app.services.openai_client import OpenAIClient, daily_usage, estimate_cost, flush_usage
+from tests.db_fixtures import engine, session_factory
+
+class _Completions:
+    """Náhrada chat.completions SDK: vrací připravené odpovědi nebo vyhazuje připravené chyby."""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+def _raw(outcomes):
+    completions = _Completions(outcomes)
+    return SimpleNamespace(chat=SimpleNamespace(completions=completions)), completions
+
+def _reply(prompt_tokens, completion_tokens):
+    return SimpleNamespace(model="gpt-4o-mini-2024-07-18", usage=SimpleNamespace(
+        prompt_tokens=prompt_tokens, completion_tokens=completion_tokens))
+
+@pytest.fixture(autouse=True)
+def usage_state(monkeypatch):
+    """Čistá fronta denních součtů, okamžité opakování a prázdný buffer traces."""
+    monkeypatch.setattr(client_module, "_pending", {})
+    monkeypatch.setattr(client_module, "_last_flush", time.monotonic())
+    monkeypatch.setattr(client_module, "_backoff", lambda attempt: 0)
+    tracing._recent.clear()
+
+def test_calls_record_tokens_cost_and_daily_totals(session_factory):
+    """Volání zaznamená tokeny a náklady do spanu i denních součtů; opakovaný flush součty přičítá."""
+    raw, _ = _raw([_reply(1000, 200), _reply(3000, 100)])
+    client = OpenAIClient(raw, "voice").with_caller("entry_test_eval")
+    with tracing.span("voice.process", tracing.SPAN_KIND_SERVER):
+        client.chat.completions.create(model="gpt-4o-mini", messages=[])
+    flush_usage(session_factory=session_factory)
+    client.chat.completions.create(model="gpt-4o-mini", messages=[])
+
+    openai_span = next(item for item in tracing.recent_traces()[0].spans if item.name == "openai.chat.completions.create")
+    assert openai_span.attributes["llm.caller"] == "entry_test_eval"
+    assert openai_span.attributes["llm.prompt_tokens"] == 1000
+
+    [today] = daily_usage(session_factory=session_factory)
+    assert today["day"] == datetime.utcnow().date() and today["calls"] == 2
+    [row] = today["breakdown"]
+    assert (row["caller"], row["model"], row["prompt_tokens"], row["completion_tokens"]) == (
+        "entry_test_eval", "gpt-4o-mini", 4000, 300)
+    assert row["cost_usd"] == pytest.approx(estimate_cost("gpt-4o-mini", 4000, 300))
+    assert estimate_cost("gpt-4o-mini-2024-07-18", 1_000_000, 0) == pytest.approx(0.15)
+
+def test_transient_errors_are_retried_and_failures_recorded(session_factory):
+    """Přechodné chyby se opakují (počítají se), neopakovatelná chyba se zaznamená a propadne."""
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    raw, completions = _raw([openai.APIConnectionError(request=request), _reply(10, 5),
+                             openai.BadRequestError("špatný požadavek", response=httpx.Response(400, request=request),
+                                                    body=None)])
+    client = OpenAIClient(raw, "lesson_chat")
+    client.chat.completions.create(model="gpt-4o-mini", messages=[])
+    with pytest.raises(openai.BadRequestError):
+        client.chat.completions.create(model="gpt-4o-mini", messages=[])
+
+    assert completions.calls == 3
+    [row] = daily_usage(session_factory=session_factory)[0]["breakdown"]
+    assert (row["calls"], row["retries"], row["errors"]) == (2, 1, 1)
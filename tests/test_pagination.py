@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from app.models import User
+from app.pagination import LIKE_ESCAPE, keyset_page, like_prefix
+from app.routers.admin import _user_search_filter
+from tests.db_fixtures import engine, session_factory
+
+START = datetime(2024, 1, 1, 9, 0)
+
+def _seed(factory, names):
+    """Uživatelé v daném pořadí; dvojice po sobě jdoucích mají stejné created_at (tie-breaker id)."""
+    session = factory()
+    session.add_all([User(name=name, phone=f"+420777{i:06d}", created_at=START + timedelta(hours=i // 2))
+                     for i, name in enumerate(names)])
+    session.commit()
+    session.close()
+
+def _ids(page):
+    return [row.id for row in page["items"]]
+
+def test_keyset_pages_forward_and_back_without_gaps(session_factory):
+    """Listování dopředu a zpět podle created_at|id vrací stejné stránky bez duplicit i při shodném čase."""
+    _seed(session_factory, [f"Uživatel {i}" for i in range(7)])
+    session = session_factory()
+    query = session.query(User.id, User.created_at)
+
+    first = keyset_page(query, User, sort="created_at", descending=True, limit=3)
+    second = keyset_page(query, User, sort="created_at", descending=True, after=first["next_cursor"], limit=3)
+    third = keyset_page(query, User, sort="created_at", descending=True, after=second["next_cursor"], limit=3)
+    back = keyset_page(query, User, sort="created_at", descending=True, before=second["prev_cursor"], limit=3)
+
+    assert (_ids(first), _ids(second), _ids(third)) == ([7, 6, 5], [4, 3, 2], [1])
+    assert first["prev_cursor"] is None and third["next_cursor"] is None
+    assert second["next_cursor"] == f"{START.isoformat()}|2"
+    assert _ids(back) == _ids(first) and back["next_cursor"] == first["next_cursor"]
+    session.close()
+
+def test_search_prefix_treats_wildcards_literally(session_factory):
+    """`_` a `%` v hledaném textu nejsou zástupné znaky - `_` nenajde každého uživatele."""
+    _seed(session_factory, ["a_b", "axb", "100% jistý", "1000 bodů", "c\\d"])
+    session = session_factory()
+
+    def search(term):
+        query = session.query(User.name).filter(func.lower(User.name).like(like_prefix(term), escape=LIKE_ESCAPE))
+        return sorted(name for (name,) in query)
+
+    assert search("a_") == ["a_b"]
+    assert search("_") == []
+    assert search("100%") == ["100% jistý"]
+    assert search("c\\") == ["c\\d"]
+    assert search("a") == ["a_b", "axb"]
+    session.close()
+
+def test_phone_search_matches_numbers_stored_with_spaces(session_factory):
+    """Hledání podle telefonu porovnává normalizovaná čísla - nezáleží na mezerách ani předvolbě v uložení či dotazu."""
+    session = session_factory()
+    session.add_all([User(name="Mezery", phone="+420 777 123 456"), User(name="Bez mezer", phone="+420608000111")])
+    session.commit()
+
+    def search(term):
+        return sorted(name for (name,) in session.query(User.name).filter(_user_search_filter(term)))
+
+    assert search("+420 777 12") == ["Mezery"]
+    assert search("777123") == ["Mezery"]
+    assert search("0608") == ["Bez mezer"]
+    assert search("+420") == ["Bez mezer", "Mezery"]
+    assert search("Mez") == ["Mezery"]
+    session.close()
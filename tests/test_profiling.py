@@ -0,0 +1,85 @@
+import threading
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import profiling
+from app.profiling import ProfilingMiddleware, arm_request_profile, profile_cpu
+from app.routers import profiling as profiling_router
+
+def _spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+def _background_spin(stop):
+    while not stop.is_set():
+        _spin(0.01)
+
+def test_cpu_profile_returns_collapsed_stacks_with_bounded_overhead():
+    """CPU profil zachytí horkou funkci jiného vlákna a režie vzorkování zůstane pod limitem."""
+    stop = threading.Event()
+    worker = threading.Thread(target=_background_spin, args=(stop,), name="busy worker")
+    worker.start()
+    try:
+        profiler = profile_cpu(0.3, interval_ms=5)
+    finally:
+        stop.set()
+        worker.join()
+
+    lines = profiler.collapsed().splitlines()
+    hot = [line for line in lines if line.startswith("busy_worker;")]
+    assert hot and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert "test_profiling:_background_spin;test_profiling:_spin" in hot[0]
+    assert profiler.summary()["samples"] > 10
+    assert profiler.summary()["overhead"] <= profiling.PROFILE_MAX_OVERHEAD * 2
+
+def test_single_request_profile_samples_only_that_request():
+    """Nastražený profil zachytí jen první request na routu; souběžné vlákno v něm není."""
+    app = FastAPI()
+
+    @app.get("/slow")
+    async def slow():
+        _spin(0.2)
+        return {"ok": True}
+
+    app.add_middleware(ProfilingMiddleware)
+    profile = arm_request_profile(route="/slow")
+    stop = threading.Event()
+    worker = threading.Thread(target=_background_spin, args=(stop,), name="busy worker")
+    worker.start()
+    try:
+        client = TestClient(app)
+        assert client.get("/slow").status_code == 200
+    finally:
+        stop.set()
+        worker.join()
+
+    assert profile.status == "done" and profile.path == "/slow"
+    assert "test_profiling:slow;test_profiling:_spin" in profile.result
+    assert "busy_worker" not in profile.result
+    assert client.get("/slow").status_code == 200  # profil je jednorázový
+    assert profile.summary["samples"] > 0
+
+def test_memory_diff_requires_token_and_reports_growth(monkeypatch):
+    """Endpointy jsou bez PROFILING_TOKEN vypnuté; diff ukáže místo, kde paměť roste."""
+    app = FastAPI()
+    app.include_router(profiling_router.router)
+    client = TestClient(app)
+    monkeypatch.delenv("PROFILING_TOKEN", raising=False)
+    assert client.post("/admin/profile/memory/start").status_code == 404
+
+    monkeypatch.setenv("PROFILING_TOKEN", "tajne")
+    assert client.post("/admin/profile/memory/start", headers={"X-Profiling-Token": "spatne"}).status_code == 403
+    headers = {"X-Profiling-Token": "tajne"}
+    try:
+        assert client.post("/admin/profile/memory/start", headers=headers).json()["tracing"] is True
+        leak = [bytearray(1024) for _ in range(2000)]
+        diff = client.get("/admin/profile/memory/diff", params={"top": 5}, headers=headers).text
+    finally:
+        client.post("/admin/profile/memory/stop", headers=headers)
+    assert diff.startswith("# tracemalloc diff")
+    assert "test_profiling.py" in diff.splitlines()[1]
+    assert len(leak) == 2000
+    assert client.get("/admin/profile/memory", headers=headers).json()["tracing"] is False
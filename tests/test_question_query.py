@@ -0,0 +1,44 @@
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+
+from app.models import Lesson, TestSession
+from app.services.question_query import find_questions
+from tests.db_fixtures import engine, session_factory
+
+def _seed(factory):
+    """Dvě lekce s otázkami a jedna lekce se starším formátem otázek."""
+    session = factory()
+    session.add_all([
+        Lesson(title="Chemie", lesson_number=1, questions=[
+            {"question": "Optimální pH?", "category": "Chemické Vlastnosti", "difficulty": "hard"},
+            {"question": "Co je pH?", "category": "Chemické Vlastnosti", "difficulty": "easy"},
+            {"question": "Vypnutá", "category": "Chemické Vlastnosti", "difficulty": "hard", "enabled": False},
+        ]),
+        Lesson(title="Filtrace", lesson_number=2, questions=[
+            {"question": "Typy filtrů?", "category": "Filtrace a Čištění", "difficulty": "hard", "enabled": True},
+        ]),
+        Lesson(title="Stará lekce", lesson_number=3, questions={"all": [], "current": None}),
+    ])
+    session.commit()
+    session.close()
+
+def test_find_questions_filters_on_sqlite_fallback(session_factory):
+    """Na SQLite se filtr kategorie/obtížnosti/enabled vyhodnotí v Pythonu se stejným výsledkem."""
+    _seed(session_factory)
+    session = session_factory()
+    hard_chemistry = find_questions(session, category="Chemické Vlastnosti", difficulty="hard", enabled=True)
+    assert [(q["lesson_title"], q["question_index"]) for q in hard_chemistry] == [("Chemie", 0)]
+
+    assert len(find_questions(session, difficulty="hard")) == 3
+    assert [q["question"]["question"] for q in find_questions(session, enabled=False)] == ["Vypnutá"]
+    assert len(find_questions(session, lesson_id=2)) == 1
+    session.close()
+
+def test_postgres_uses_jsonb_and_gin_index():
+    """Na Postgresu jsou JSON sloupce JSONB a otázky lekcí mají GIN index jsonb_path_ops."""
+    dialect = postgresql.dialect()
+    assert Lesson.__table__.c.questions.type.compile(dialect=dialect) == "JSONB"
+    assert TestSession.__table__.c.answers.type.compile(dialect=dialect) == "JSONB"
+    index = next(index for index in Lesson.__table__.indexes if index.name == "ix_lessons_questions_gin")
+    assert str(CreateIndex(index).compile(dialect=dialect)) == \
+        "CREATE INDEX ix_lessons_questions_gin ON lessons USING gin (questions jsonb_path_ops)"
@@ -0,0 +1,49 @@
+from sqlalchemy.orm import sessionmaker
+
+from admin_dashboard import DashboardStats
+from app.database import ReadSessionRouter, prefer_primary
+from app.models import User
+from tests.db_fixtures import memory_engine
+
+def _factory(*names):
+    """In-memory databáze s uživateli daných jmen."""
+    factory = sessionmaker(bind=memory_engine())
+    with factory() as session:
+        session.add_all([User(name=name, phone=f"+42077700000{i}") for i, name in enumerate(names)])
+        session.commit()
+    return factory
+
+def test_reads_go_to_replica_unless_primary_is_preferred():
+    """Read-only práce jde na repliku; v kontextu prefer_primary (po zápisu admina) na primár."""
+    primary = _factory("Nový uživatel", "Starý uživatel")
+    replica = _factory("Starý uživatel")  # replika ještě nedohnala poslední zápis
+    router = ReadSessionRouter(primary, replica)
+
+    with router() as session:
+        assert session.query(User).count() == 1
+    with prefer_primary():
+        with router() as session:
+            assert session.query(User).count() == 2
+        assert DashboardStats(session_factory=router).get_overview_stats()["total_users"] == 2
+    assert DashboardStats(session_factory=router).get_overview_stats()["total_users"] == 1
+
+def test_without_replica_reads_use_primary():
+    """Bez DATABASE_REPLICA_URL se vše čte z primáru."""
+    primary = _factory("Student")
+    router = ReadSessionRouter(primary)
+    assert not router.has_replica
+    with router() as session:
+        assert session.query(User).count() == 1
+
+def test_pinned_factory_keeps_primary_after_context_exits():
+    """Továrna zvolená uvnitř prefer_primary čte z primáru i po opuštění kontextu (streamovaný export)."""
+    primary = _factory("Nový uživatel", "Starý uživatel")
+    replica = _factory("Starý uživatel")
+    router = ReadSessionRouter(primary, replica)
+
+    with prefer_primary():
+        pinned = router.pinned()
+
+    with pinned() as session:
+        assert session.query(User).count() == 2
+    assert router.pinned() is replica
@@ -0,0 +1,40 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from admin_dashboard import DashboardStats
+from app.database import PoolMetrics
+from app.models import Base, User
+from badge_system import BadgeSystem
+
+def _factory(tmp_path):
+    """Souborová SQLite s malým QueuePoolem (2 spojení, bez overflow) a měřením checkoutů."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", pool_size=2, max_overflow=0, pool_timeout=1)
+    Base.metadata.create_all(engine)
+    metrics = PoolMetrics().install(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as session:
+        session.add(User(name="Student", phone="+420777000001"))
+        session.commit()
+    return engine, factory, metrics
+
+def test_live_instances_do_not_pin_pool_connections(tmp_path):
+    """Desítky živých instancí (i po chybách) nevyčerpají pool o 2 spojeních a vše se vrátí do poolu."""
+    engine, factory, metrics = _factory(tmp_path)
+    kept_alive = []
+    for _ in range(50):
+        stats = DashboardStats(session_factory=factory)
+        badges = BadgeSystem(session_factory=factory)
+        kept_alive.extend([stats, badges])
+
+        assert stats.get_overview_stats()["total_users"] == 1
+        assert stats.get_badge_statistics()["total_badges"] == 0
+        assert badges.check_and_award_badges(1, {"answers": [], "current_score": 100}) == []
+        assert badges.get_user_progress(1)["user_id"] == 1
+        # Chyba uvnitř operace (neplatná data) session taky vrátí
+        assert badges.check_and_award_badges(1, {"answers": [None]}) == []
+
+    snapshot = metrics.snapshot()
+    assert snapshot["checked_out"] == 0
+    assert snapshot["checkouts"] == snapshot["checkins"] >= 250
+    assert snapshot["peak_checked_out"] <= 2
+    engine.dispose()
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+from apscheduler.schedulers.background import BackgroundScheduler
+from sqlalchemy import select
+
+from app.models import User, Lesson, TestSession
+from app.services.session_sweeper import active_session_filter, sweep_abandoned_sessions
+from app.services import scheduler as scheduler_module
+from tests.db_fixtures import engine, session_factory
+
+NOW = datetime(2024, 3, 1, 8, 0)
+
+def _seed(factory):
+    """Nečinné, čerstvá a dokončená session jednoho uživatele."""
+    session = factory()
+    session.add(Lesson(title="Lekce 1", questions=[], lesson_number=1))
+    session.add(User(name="Student", phone="+420777000001"))
+    session.flush()
+    idle_minutes = [60 * 24 * 3, 600, 300, 30]
+    for minutes in idle_minutes:
+        session.add(TestSession(user_id=1, lesson_id=1, questions_data=[], answers=[],
+                                started_at=NOW - timedelta(minutes=minutes + 5),
+                                last_activity_at=NOW - timedelta(minutes=minutes)))
+    session.add(TestSession(user_id=1, lesson_id=1, questions_data=[], answers=[], is_completed=True,
+                            completed_at=NOW - timedelta(days=5), last_activity_at=NOW - timedelta(days=5)))
+    session.commit()
+    session.close()
+
+def test_sweeper_marks_idle_sessions_in_bounded_batches(session_factory):
+    """Nečinné sessions se označí po dávkách s limitem na běh, čerstvá a dokončená zůstanou, opakování nic nezmění."""
+    _seed(session_factory)
+    first = sweep_abandoned_sessions(ttl_minutes=240, batch_size=2, max_batches=1, now=NOW, session_factory=session_factory)
+    assert first == {"abandoned": 2, "batches": 1}
+    second = sweep_abandoned_sessions(ttl_minutes=240, batch_size=2, now=NOW, session_factory=session_factory)
+    assert second == {"abandoned": 1, "batches": 1}
+    assert sweep_abandoned_sessions(ttl_minutes=240, now=NOW, session_factory=session_factory)["abandoned"] == 0
+
+    session = session_factory()
+    abandoned = session.execute(select(TestSession.id).where(TestSession.abandoned_at == NOW)).scalars().all()
+    assert sorted(abandoned) == [1, 2, 3]
+    assert session.get(TestSession, 4).abandoned_at is None
+    assert session.get(TestSession, 5).abandoned_at is None
+    session.close()
+
+def test_active_lookup_excludes_abandoned_and_idle_sessions(session_factory):
+    """Hledání aktivní session najde jen čerstvou session - opuštěné ani nečinné (ještě nezametené) ne."""
+    _seed(session_factory)
+    sweep_abandoned_sessions(ttl_minutes=60 * 24, now=NOW, session_factory=session_factory)
+    session = session_factory()
+    active = session.execute(
+        select(TestSession.id).where(TestSession.user_id == 1, TestSession.lesson_id == 1,
+                                     *active_session_filter(now=NOW, ttl_minutes=240))
+    ).scalars().all()
+    assert active == [4]
+    query = select(TestSession.id).where(TestSession.user_id == 1, TestSession.lesson_id == 1,
+                                         *active_session_filter(now=NOW))
+    compiled = query.compile(session.get_bind())
+    plan = session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", tuple(compiled.params.values())).all()
+    assert "ix_test_sessions_active" in str(plan)
+    session.close()
+
+def test_sweeper_job_runs_without_due_call_scheduler(session_factory, monkeypatch):
+    """Úklid se registruje samostatně - nezávisí na spuštění plánovače opakovacích hovorů."""
+    scheduler = BackgroundScheduler(timezone="UTC")
+    monkeypatch.setattr(scheduler_module, "scheduler", scheduler)
+
+    scheduler_module.start_session_sweeper(session_factory=session_factory)
+    try:
+        assert [job.id for job in scheduler.get_jobs()] == ["sweep_abandoned_sessions"]
+        assert scheduler.get_job("sweep_abandoned_sessions").kwargs == {"session_factory": session_factory}
+    finally:
+        scheduler.shutdown(wait=False)
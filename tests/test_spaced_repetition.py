@@ -0,0 +1,151 @@
+import numpy as np
+import pytest
+from datetime import datetime, timedelta
+
+from app.models import User, Lesson, Attempt, TestSession, ReviewState
+from app.services.spaced_repetition import (
+    OVERALL_CATEGORY, parse_call_windows, record_attempt_review, record_session_review, recompute_review_states,
+    session_category_qualities, sm2_step, spread_due_times
+)
+from tests.db_fixtures import engine, session_factory
+
+def _seed(factory):
+    """Jeden uživatel a jedna lekce."""
+    session = factory()
+    session.add_all([Lesson(title="Lekce 1", questions=[], lesson_number=1), User(name="Student", phone="+420777000001")])
+    session.commit()
+    session.close()
+
+def _answers(**category_scores):
+    return [{"question": f"Otázka {category}", "category": category, "score": score}
+            for category, scores in category_scores.items() for score in scores]
+
+def test_sm2_grows_interval_for_strong_learners():
+    """Opakovaně výborné výsledky prodlužují interval, neúspěch ho vrátí na 1 den."""
+    state = (np.array([2.5]), np.array([0.0]), np.array([0]), np.array([0]))
+    intervals = []
+    for quality in (5, 5, 5):
+        state = sm2_step(*state, np.array([quality]))
+        intervals.append(float(state[1][0]))
+    assert intervals[0] == 14.0
+    assert intervals[0] < intervals[1] < intervals[2]
+
+    easiness, interval, repetitions, lapses = sm2_step(*state, np.array([1.0]))
+    assert (interval[0], repetitions[0], lapses[0]) == (1.0, 0, 1)
+    assert easiness[0] < state[0][0]
+
+def test_due_times_fall_into_call_windows_with_jitter():
+    """Stejné výsledky ve stejnou chvíli nedostanou stejný termín a vždy padnou do pracovního dne v okně."""
+    windows = parse_call_windows("08:00-11:30,13:00-17:00")
+    reviewed = np.full(500, np.datetime64("2024-01-05T09:00", "m"))  # pátek, zimní čas (UTC+1)
+    due = spread_due_times(reviewed, np.full(500, 7.0), rng=np.random.default_rng(7), windows=windows)
+
+    local = due + np.timedelta64(60, "m")
+    minutes = (local - local.astype("datetime64[D]")).astype(int)
+    in_window = ((minutes >= 480) & (minutes < 690)) | ((minutes >= 780) & (minutes < 1020))
+    assert in_window.all()
+    assert np.is_busday(local.astype("datetime64[D]")).all()
+    assert len(np.unique(due)) > 100
+
+def test_session_review_updates_states_and_attempt(session_factory):
+    """Dokončená session aktualizuje stavy kategorií a naplánuje navázaný pokus."""
+    _seed(session_factory)
+    session = session_factory()
+    attempt = Attempt(user_id=1, lesson_id=1, score=None)
+    session.add(attempt)
+    session.flush()
+    test_session = TestSession(
+        user_id=1, lesson_id=1, attempt_id=attempt.id, questions_data=[], is_completed=True,
+        completed_at=datetime(2024, 1, 8, 9, 0),
+        answers=_answers(Chemie=[100, 95], Bezpečnost=[40, 60]), failed_categories=["Bezpečnost"],
+    )
+    session.add(test_session)
+    session.flush()
+
+    next_due = record_session_review(session, test_session, rng=np.random.default_rng(1))
+    session.commit()
+
+    states = {state.category: state for state in session.query(ReviewState)}
+    assert states["Chemie"].interval_days == 14.0
+    assert states["Bezpečnost"].interval_days == 1.0
+    assert states["Bezpečnost"].lapses == 1
+    assert next_due == states["Bezpečnost"].due_at
+    assert session.get(Attempt, attempt.id).next_due == next_due
+    session.close()
+
+def test_recompute_matches_incremental_reviews(session_factory):
+    """Hromadný vektorový přepočet dá stejné SM-2 stavy jako postupné hodnocení."""
+    _seed(session_factory)
+    session = session_factory()
+    start = datetime.utcnow() - timedelta(days=60)
+    history = [_answers(Chemie=[90]), _answers(Chemie=[70], Mazání=[100]), _answers(Chemie=[100])]
+    for i, answers in enumerate(history):
+        session.add(TestSession(user_id=1, lesson_id=1, questions_data=[], is_completed=True,
+                                completed_at=start + timedelta(days=10 * i), answers=answers, failed_categories=[]))
+    session.add_all([Attempt(user_id=1, lesson_id=1, score=70.0, next_due=start - timedelta(days=10)),
+                     Attempt(user_id=1, lesson_id=1, score=80.0, next_due=start)])
+    session.commit()
+    session.close()
+
+    result = recompute_review_states(session_factory=session_factory, rng=np.random.default_rng(3))
+
+    assert result == {"users": 1, "states": 2, "reviews": 4, "attempts": 1, "unscheduled": 1}
+    session = session_factory()
+    chemie = session.query(ReviewState).filter_by(category="Chemie").one()
+    expected = (np.array([2.5]), np.array([0.0]), np.array([0]), np.array([0]))
+    for quality in (4.5, 3.5, 5.0):
+        expected = sm2_step(*expected, np.array([quality]))
+    assert chemie.interval_days == pytest.approx(expected[1][0])
+    assert chemie.easiness == pytest.approx(expected[0][0])
+    assert chemie.repetitions == 3
+    # Termíny po splatnosti se nepřeplánují do minulosti, starší pokus se už nevytočí
+    older, latest = session.query(Attempt).order_by(Attempt.id).all()
+    assert older.next_due is None
+    assert latest.next_due > datetime.utcnow()
+    session.close()
+
+def test_attempt_scheduling_writes_state_only_when_recorded(session_factory):
+    """calculate_next_due jen spočítá termín; stav uživatele zapíše až record_attempt_review a odplánuje starší pokus."""
+    _seed(session_factory)
+    session = session_factory()
+    older = Attempt(user_id=1, lesson_id=1, score=50.0, next_due=datetime.utcnow() - timedelta(days=1))
+    attempt = Attempt(user_id=1, lesson_id=1, score=90.0)
+    session.add_all([older, attempt])
+    session.flush()
+
+    attempt.calculate_next_due()
+    assert attempt.next_due > datetime.utcnow()
+    assert session.query(ReviewState).count() == 0
+
+    next_due = record_attempt_review(session, attempt, rng=np.random.default_rng(5))
+    session.commit()
+
+    state = session.query(ReviewState).one()
+    assert (state.category, state.repetitions) == (OVERALL_CATEGORY, 1)
+    assert attempt.next_due == next_due == state.due_at
+    assert session.get(Attempt, older.id).next_due is None
+    session.close()
+
+def test_recompute_skips_admin_resets_and_resolves_categories_like_rollups(session_factory):
+    """Session ukončená resetem adminem není revize; kategorie odpovědi bez 'category' se dohledá v questions_data."""
+    _seed(session_factory)
+    questions = [{"question": "Co je pH?", "category": "Chemie"}]
+    completed = datetime.utcnow() - timedelta(days=2)
+    session = session_factory()
+    session.add_all([
+        TestSession(user_id=1, lesson_id=1, questions_data=questions, is_completed=True, completed_at=completed,
+                    answers=[{"question": "Co je pH?", "question_index": 0, "score": 90}], failed_categories=[]),
+        TestSession(user_id=1, lesson_id=1, questions_data=[], is_completed=True, completed_at=completed,
+                    abandoned_at=completed, answers=_answers(Mazání=[10]), failed_categories=[]),
+    ])
+    session.commit()
+    session.close()
+
+    result = recompute_review_states(session_factory=session_factory, rng=np.random.default_rng(4))
+
+    assert (result["states"], result["reviews"]) == (1, 1)
+    session = session_factory()
+    assert [state.category for state in session.query(ReviewState)] == ["Chemie"]
+    session.close()
+    assert session_category_qualities([{"question": {"question": "Co je pH?", "category": "Chemie"}, "score": 90}], []) \
+        == session_category_qualities([{"question_index": 0, "score": 90}], [], questions)
@@ -0,0 +1,67 @@
+import threading
+
+import pytest
+from sqlalchemy import exc, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import RoutingSession, create_sqlite_engines, sqlite_performance_enabled
+from app.models import Base, User
+
+@pytest.fixture
+def routing_factory(tmp_path):
+    """Souborová SQLite s profilem: jeden zapisovač a pool read-only čtenářů."""
+    writer, reader = create_sqlite_engines(f"sqlite:///{tmp_path / 'voice_learning.db'}")
+    Base.metadata.create_all(writer)
+    yield sessionmaker(class_=RoutingSession, autoflush=False, writer=writer, reader=reader)
+    writer.dispose()
+    reader.dispose()
+
+def test_profile_applies_pragmas_and_routes_reads(routing_factory):
+    """WAL a pragmy platí na spojeních, SELECTy jdou na čtenáře, po zápisu až do commitu na zapisovač."""
+    assert sqlite_performance_enabled("sqlite:///voice_learning.db", {})
+    assert not sqlite_performance_enabled("sqlite://", {})
+    assert not sqlite_performance_enabled("sqlite:///voice_learning.db", {"SQLITE_PERFORMANCE_MODE": "0"})
+
+    with routing_factory() as session:
+        assert session.get_bind(clause=select(User)) is session.reader
+        assert session.get_bind(clause=select(User).with_for_update()) is session.writer
+        assert session.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+
+    with routing_factory() as session:
+        assert session.execute(text("SELECT 1")).scalar() == 1
+        assert session.get_bind(clause=select(User)) is session.reader
+        session.add(User(name="Student", phone="+420777000001"))
+        session.flush()
+        # Read-your-writes: necommitnutý řádek je vidět, protože čtení jde na zapisovač
+        assert session.query(User).count() == 1
+        session.commit()
+        assert session.get_bind(clause=select(User)) is session.reader
+
+    reader_connection = routing_factory().reader.connect()
+    with pytest.raises(exc.OperationalError):
+        reader_connection.execute(text("DELETE FROM users"))
+    reader_connection.close()
+
+def test_concurrent_writes_do_not_hit_database_locked(routing_factory):
+    """Souběžné zápisy z mnoha vláken se serializují na jednom spojení bez 'database is locked'."""
+    errors = []
+
+    def worker(worker_id):
+        try:
+            for i in range(20):
+                with routing_factory() as session:
+                    session.query(User).count()
+                    session.add(User(name=f"Uživatel {worker_id}-{i}", phone=f"+420777{worker_id:03d}{i:03d}"))
+                    session.commit()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with routing_factory() as session:
+        assert session.query(User).count() == 320
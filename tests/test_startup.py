@@ -0,0 +1,19 @@
+import os
+
+from startup_benchmark import LAZY_MODULES, import_profile, time_to_first_health
+
+# Railway health check čeká řádově sekundy; rozpočet je záměrně volný kvůli pomalým CI strojům
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "5"))
+
+def test_heavy_sdks_are_not_imported_at_startup():
+    """Import main.py nenačte OpenAI SDK, NumPy, pydub, requests ani Twilio SDK - ty se importují až při prvním použití."""
+    profile = import_profile("main")
+    assert "app.routers.voice" in profile and "app.routers.media" in profile
+    assert [name for name in LAZY_MODULES if name in profile] == []
+
+def test_first_health_within_budget():
+    """Studený start (import main.py + první /health) se vejde do rozpočtu."""
+    result = time_to_first_health()
+    timing = f"import main: {result['import_seconds'] * 1000:.0f} ms, první /health: {result['health_seconds'] * 1000:.0f} ms"
+    assert result["status"] == 200, timing
+    assert result["health_seconds"] < STARTUP_BUDGET_SECONDS, timing
@@ -0,0 +1,73 @@
+import asyncio
+import json
+
+import pytest
+
+from app import tracing
+from app.tracing import SPAN_KIND_CLIENT, SPAN_KIND_SERVER, STATUS_ERROR, TraceExporter, call_latency_summary, set_call_sid, span, to_otlp, trace_tree, traced
+
+@pytest.fixture(autouse=True)
+def empty_buffer():
+    """Každý test začíná s prázdným bufferem kol."""
+    tracing._recent.clear()
+    yield
+    tracing._recent.clear()
+
+@traced("db.save")
+def _save():
+    return "uloženo"
+
+@traced("voice.process", kind=SPAN_KIND_SERVER)
+async def _turn(call_sid, fail=False):
+    set_call_sid(call_sid)
+    _save()
+    with span("openai.chat.completions", **{"llm.model": "gpt-4o-mini"}):
+        if fail:
+            raise RuntimeError("timeout")
+    return "ok"
+
+def test_turn_spans_are_nested_and_grouped_by_call_sid():
+    """Spany kola se zanoří pod root, kola jednoho hovoru sdílí trace_id odvozené z CallSid."""
+    asyncio.run(_turn("CA123"))
+    with pytest.raises(RuntimeError):
+        asyncio.run(_turn("CA123", fail=True))
+    asyncio.run(_turn("CA999"))
+
+    first, second, other = tracing.recent_traces()
+    assert first.trace_id == second.trace_id != other.trace_id
+    assert [(row["name"], row["depth"]) for row in trace_tree(first)] == [
+        ("voice.process", 0), ("db.save", 1), ("openai.chat.completions", 1)]
+    assert [item.status for item in second.spans if item.name == "openai.chat.completions"] == [STATUS_ERROR]
+
+    summary = {call["call_sid"]: call for call in call_latency_summary()}
+    assert summary["CA123"]["turns"] == 2 and summary["CA123"]["errors"] == 2
+    assert set(summary["CA123"]["stages"]) == {"voice.process", "db.save", "openai.chat.completions"}
+
+def test_otlp_export_to_file(tmp_path):
+    """Export zapisuje OTLP JSON (ExportTraceServiceRequest) na řádek s CallSid v atributech."""
+    asyncio.run(_turn("CA123"))
+    path = tmp_path / "traces.jsonl"
+    TraceExporter(file_path=str(path), endpoint=None).export(tracing.recent_traces())
+
+    payload = json.loads(path.read_text(encoding="utf-8").splitlines()[0])
+    assert payload == to_otlp(tracing.recent_traces())
+    spans = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    root = next(item for item in spans if item["name"] == "voice.process")
+    assert "parentSpanId" not in root
+    assert all(item["parentSpanId"] == root["spanId"] for item in spans if item is not root)
+    assert {"key": "twilio.call_sid", "value": {"stringValue": "CA123"}} in spans[0]["attributes"]
+    assert int(root["endTimeUnixNano"]) >= int(root["startTimeUnixNano"])
+
+def test_spans_outside_call_turns_are_not_buffered(monkeypatch):
+    """OpenAI volání mimo webhook (bez rodiče a CallSid) se nedostane do bufferu ani do exportu."""
+    submitted = []
+    monkeypatch.setattr(tracing.exporter, "submit", submitted.append)
+
+    with span("openai.chat.completions", kind=SPAN_KIND_CLIENT):
+        pass
+    with span("POST /voice/", kind=SPAN_KIND_SERVER):
+        pass
+
+    assert [trace.root.name for trace in tracing.recent_traces()] == ["POST /voice/"]
+    assert submitted == tracing.recent_traces()
+    assert [call["call_sid"][:12] for call in call_latency_summary()] == ["bez CallSid "]
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+
+from app.models import User, Lesson, Attempt, Answer, TestSession, UserDeletionJob
+from app.services import user_deletion
+from app.services.user_deletion import create_deletion_job, run_deletion_job
+from tests.db_fixtures import engine, session_factory
+
+def _create_user_with_history(factory, attempts=7, answers_per_attempt=3):
+    session = factory()
+    lesson = Lesson(title="Lekce 1", questions=[], lesson_number=1)
+    user = User(name="Mazaný", phone="+420777000001")
+    other = User(name="Zůstává", phone="+420777000002")
+    session.add_all([lesson, user, other])
+    session.flush()
+    for _ in range(attempts):
+        attempt = Attempt(user_id=user.id, lesson_id=lesson.id, score=70.0)
+        session.add(attempt)
+        session.flush()
+        session.add(TestSession(user_id=user.id, lesson_id=lesson.id, attempt_id=attempt.id, questions_data=[]))
+        for i in range(answers_per_attempt):
+            session.add(Answer(attempt_id=attempt.id, question_index=i, question_text="Otázka",
+                               correct_answer="A", user_answer="A", score=100.0, is_correct=True))
+    session.commit()
+    user_id, other_id = user.id, other.id
+    session.close()
+    return user_id, other_id
+
+def test_deletion_job_removes_history_in_batches(session_factory):
+    """Job smaže celou historii po dávkách a ostatní uživatele nechá být."""
+    user_id, other_id = _create_user_with_history(session_factory)
+
+    job = create_deletion_job(user_id, session_factory=session_factory)
+    result = run_deletion_job(job["id"], batch_size=2, session_factory=session_factory)
+
+    assert result["status"] == "completed"
+    assert result["deleted_counts"] == {"answers": 21, "archived_sessions": 0, "test_sessions": 7, "campaign_calls": 0,
+                                       "review_states": 0, "user_badges": 0, "attempts": 7, "user": 1}
+    session = session_factory()
+    assert session.get(User, user_id) is None
+    assert session.get(User, other_id) is not None
+    assert session.query(Attempt).count() == 0
+    session.close()
+
+def test_deletion_job_resumes_after_crash(session_factory, monkeypatch):
+    """Job přerušený uprostřed fáze pokračuje od uloženého stavu."""
+    user_id, _ = _create_user_with_history(session_factory)
+    job = create_deletion_job(user_id, session_factory=session_factory)
+
+    calls = {"count": 0}
+    original = user_deletion._delete_answers
+
+    def crashing_delete(session, user_id, batch_size):
+        calls["count"] += 1
+        if calls["count"] == 3:
+            raise RuntimeError("worker spadl")
+        return original(session, user_id, batch_size)
+
+    monkeypatch.setattr(user_deletion, "DELETION_PHASES", [("answers", crashing_delete)] + user_deletion.DELETION_PHASES[1:])
+    assert run_deletion_job(job["id"], batch_size=5, session_factory=session_factory) is None
+
+    session = session_factory()
+    crashed = session.get(UserDeletionJob, job["id"])
+    assert crashed.status == "failed"
+    assert crashed.deleted_counts == {"answers": 10}
+    # Obnova - job se vrátí do fronty a dokončí
+    crashed.status = "pending"
+    session.commit()
+    session.close()
+
+    monkeypatch.undo()
+    result = run_deletion_job(job["id"], batch_size=5, session_factory=session_factory)
+
+    assert result["status"] == "completed"
+    assert result["deleted_counts"]["answers"] == 21
+
+def test_running_job_is_not_claimed_twice(session_factory):
+    """Job s čerstvým heartbeatem si nepřevezme druhý worker."""
+    user_id, _ = _create_user_with_history(session_factory, attempts=1)
+    job = create_deletion_job(user_id, session_factory=session_factory)
+    session = session_factory()
+    running = session.get(UserDeletionJob, job["id"])
+    running.status = "running"
+    running.updated_at = datetime.utcnow()
+    session.commit()
+
+    assert run_deletion_job(job["id"], session_factory=session_factory) is None
+
+    running.updated_at = datetime.utcnow() - timedelta(hours=1)
+    session.commit()
+    session.close()
+    assert run_deletion_job(job["id"], session_factory=session_factory)["status"] == "completed"
@@ -0,0 +1,94 @@
+import io
+
+from sqlalchemy import false, text
+
+from app.models import User
+from app.routers import system
+from app.services import user_import
+from app.services.user_import import import_users_csv
+from tests.db_fixtures import engine, session_factory
+
+def _seed(factory):
+    """Jeden existující uživatel s telefonem uloženým tak, jak ho zadal admin."""
+    session = factory()
+    session.add(User(name="Stávající", phone="+420 724 369 467"))
+    session.commit()
+    session.close()
+
+CSV_DATA = """jméno,telefon,jazyk
+Jan Novák,724 111 222,cs
+Petra Malá,00420724111333,en
+Duplicitní,0724369467,cs
+,724111444,cs
+Špatné číslo,12,cs
+Jan Znovu,+420724111222,cs
+Anglický,724111555,de
+Karel Nový,724111666,
+"""
+
+def test_import_report_and_batches(session_factory):
+    """Platné řádky se vloží po dávkách, ostatní skončí v reportu s číslem řádku."""
+    _seed(session_factory)
+    report = import_users_csv(io.StringIO(CSV_DATA), batch_size=2, session_factory=session_factory)
+
+    assert report["total_rows"] == 8
+    assert report["created"] == 3
+    assert report["duplicates"] == 2
+    assert report["invalid"] == 3
+    assert sorted(error["row"] for error in report["errors"]) == [4, 5, 6, 7, 8]
+
+    session = session_factory()
+    phones = sorted(phone for (phone,) in session.query(User.phone))
+    session.close()
+    assert phones == ["+420 724 369 467", "+420724111222", "+420724111333", "+420724111666"]
+
+def test_import_dry_run_and_missing_columns(session_factory):
+    """Dry run nic nevloží; chybějící povinné sloupce se nahlásí hned."""
+    _seed(session_factory)
+    report = import_users_csv(io.StringIO(CSV_DATA), dry_run=True, session_factory=session_factory)
+    assert report["created"] == 3
+
+    session = session_factory()
+    assert session.query(User).count() == 1
+    session.close()
+
+    report = import_users_csv(io.StringIO("name,email\nJan,jan@example.com\n"), session_factory=session_factory)
+    assert report["errors"] == [{"row": 1, "error": "Chybí sloupce: phone"}]
+
+def test_concurrently_inserted_phone_is_skipped_not_duplicated(session_factory, monkeypatch):
+    """Číslo vložené jiným importem až po kontrole duplicit přeskočí ON CONFLICT a report ho hlásí jako duplicitu."""
+    _seed(session_factory)
+    original_select = user_import.select
+    # Kontrola existujících čísel nic nenajde - jako by druhý import vložil řádek mezi kontrolou a INSERTem
+    monkeypatch.setattr(user_import, "select", lambda column: original_select(column).where(false()))
+
+    report = import_users_csv(io.StringIO("name,phone\nDuplicitní,724 369 467\nNový,724111777\n"),
+                              session_factory=session_factory)
+
+    assert (report["created"], report["duplicates"]) == (1, 1)
+    assert report["errors"][0]["row"] == 2
+    session = session_factory()
+    assert session.query(User).count() == 2
+    session.close()
+
+def test_migration_fills_normalized_phones_keeping_oldest_duplicate(session_factory, monkeypatch):
+    """Migrace doplní normalizovaný telefon i starým tvarům čísla; z duplicit ho dostane jen nejstarší účet."""
+    session = session_factory()
+    # Databáze před migrací - bez unikátního indexu a normalizovaných čísel
+    session.execute(text("DROP INDEX uq_users_phone_normalized"))
+    for name, phone in [("Mezery", "+420 777 123 456"), ("Bez předvolby", "777123456"), ("Jiný", "0724111222")]:
+        session.execute(text("INSERT INTO users (name, phone, current_lesson_level, created_at) "
+                             "VALUES (:name, :phone, 0, CURRENT_TIMESTAMP)"), {"name": name, "phone": phone})
+    session.commit()
+    session.close()
+    monkeypatch.setattr(system, "SessionLocal", session_factory)
+
+    results = system.admin_migrate_db()
+
+    assert "users.phone_normalized: ✅ doplněno 2, duplicit bez čísla 1" in results["migrations"]
+    session = session_factory()
+    assert session.execute(text("SELECT id, phone_normalized FROM users ORDER BY id")).all() == [
+        (1, "+420777123456"), (2, None), (3, "+420724111222")]
+    session.close()
+    report = import_users_csv(io.StringIO("name,phone\nZnovu,+420777123456\n"), session_factory=session_factory)
+    assert report["duplicates"] == 1
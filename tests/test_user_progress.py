@@ -0,0 +1,71 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+
+from app.models import User, Lesson, Attempt
+from admin_dashboard import get_user_progress_page
+from tests.db_fixtures import engine, session_factory
+
+@pytest.fixture
+def progress_session(engine, session_factory):
+    """Session nad sdílenou in-memory databází s počítadlem SQL příkazů."""
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    session = session_factory()
+    session.statements = statements
+    yield session
+    session.close()
+
+def _create_users(session, count, attempts_per_user=3):
+    lesson = Lesson(title="Lekce 1: Základy obrábění", questions=[], lesson_number=1)
+    session.add(lesson)
+    session.flush()
+    for i in range(count):
+        user = User(name=f"Uživatel {i}", phone=f"+420777{i:06d}", current_lesson_level=i % 3)
+        session.add(user)
+        session.flush()
+        for j in range(attempts_per_user):
+            session.add(Attempt(
+                user_id=user.id,
+                lesson_id=lesson.id,
+                score=60.0 + j * 10,
+                created_at=datetime(2024, 1, 1) + timedelta(days=j)
+            ))
+    session.commit()
+
+@pytest.mark.parametrize("user_count", [3, 40])
+def test_user_progress_constant_query_count(progress_session, user_count):
+    """Počet SQL příkazů nezávisí na počtu uživatelů (žádné N+1 přes user.attempts)."""
+    _create_users(progress_session, user_count)
+    progress_session.expunge_all()
+    progress_session.statements.clear()
+
+    page = get_user_progress_page(progress_session, limit=50)
+
+    assert len(progress_session.statements) == 1
+    assert len(page["items"]) == user_count
+
+def test_user_progress_aggregates(progress_session):
+    """Agregace pokusů a název lekce z katalogu."""
+    _create_users(progress_session, 3)
+
+    items = get_user_progress_page(progress_session)["items"]
+
+    assert [item["attempts_count"] for item in items] == [3, 3, 3]
+    assert items[0]["best_score"] == 80.0
+    assert items[0]["last_attempt_at"] == datetime(2024, 1, 3)
+    assert items[0]["lesson_name"] == "Vstupní test"
+    assert items[1]["lesson_name"] == "Lekce 1: Základy obrábění"
+    assert items[2]["lesson_name"] == "Lekce 2"
+
+def test_user_progress_pagination(progress_session):
+    """Keyset stránkování přes všechny uživatele bez duplicit."""
+    _create_users(progress_session, 7, attempts_per_user=0)
+
+    first = get_user_progress_page(progress_session, limit=5)
+    second = get_user_progress_page(progress_session, after=first["next_cursor"], limit=5)
+
+    assert [item["user_id"] for item in first["items"]] == [1, 2, 3, 4, 5]
+    assert [item["user_id"] for item in second["items"]] == [6, 7]
+    assert second["next_cursor"] is None
+    assert second["prev_cursor"] == "6"